@@ -15,9 +15,19 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import re
+import threading
+
 from django.conf import settings
 from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from django.http import HttpResponse
+from django.template.base import Template
+
+
+
+log = logging.getLogger("cc.debug.queries")
 
 
 
@@ -31,3 +41,110 @@ class AjaxTracebackMiddleware(object):
         if request.is_ajax():
             import traceback
             return HttpResponse(traceback.format_exc().replace("\n", "<br>\n"))
+
+
+
+class QueryBudgetMiddleware(object):
+    """
+    Reports the database queries run for each request (in DEBUG only).
+
+    Sets ``X-Query-Count``, ``X-Query-Time`` (total SQL time, in ms) and
+    ``X-Duplicate-Queries`` (number of repeats of an already-run query)
+    response headers, and logs a summary to the ``cc.debug.queries`` logger.
+    If the request ran more than ``QUERY_BUDGET`` queries or repeated any
+    query, logs a warning listing the fingerprint of each repeated query, how
+    often it ran, and the templates that were rendering when it did.
+
+    """
+    def __init__(self):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        track_templates()
+
+
+    def process_request(self, request):
+        request._query_start = len(connection.queries)
+        _local.templates = {}
+
+
+    def process_response(self, request, response):
+        start = getattr(request, "_query_start", None)
+        if start is None:
+            return response
+        templates = getattr(_local, "templates", {})
+        _local.templates = None
+
+        queries = connection.queries[start:]
+        total_time = sum(float(q["time"]) for q in queries) * 1000
+        seen = {}
+        for i, q in enumerate(queries, start):
+            runs = seen.setdefault(fingerprint(q["sql"]), [])
+            runs.append(templates.get(i))
+        duplicates = sum(len(runs) - 1 for runs in seen.values())
+
+        response["X-Query-Count"] = str(len(queries))
+        response["X-Query-Time"] = "{0:.1f}".format(total_time)
+        response["X-Duplicate-Queries"] = str(duplicates)
+
+        summary = "{0} {1}: {2} queries in {3:.1f}ms, {4} duplicates".format(
+            request.method, request.path, len(queries), total_time, duplicates)
+        budget = getattr(settings, "QUERY_BUDGET", None)
+        if duplicates or (budget is not None and len(queries) > budget):
+            lines = [summary]
+            for sql, runs in sorted(
+                    seen.items(), key=lambda i: len(i[1]), reverse=True):
+                if len(runs) < 2:
+                    break
+                lines.append(
+                    "  {0}x (in {1}): {2}".format(
+                        len(runs),
+                        ", ".join(sorted(set(t or "view" for t in runs))),
+                        sql,
+                        )
+                    )
+            log.warning("\n".join(lines))
+        else:
+            log.info(summary)
+        return response
+
+
+
+# per-thread map of query index to name of the template rendering it
+_local = threading.local()
+
+
+
+def track_templates():
+    """
+    Record the innermost template rendering during each query.
+
+    Wraps ``Template._render`` (once); while a request is being tracked by
+    ``QueryBudgetMiddleware``, each query run while a template renders is
+    attributed to that template (or to the innermost one, if nested).
+
+    """
+    if getattr(Template._render, "tracks_queries", False):
+        return
+    render = Template._render
+
+    def _render(self, context):
+        start = len(connection.queries)
+        try:
+            return render(self, context)
+        finally:
+            templates = getattr(_local, "templates", None)
+            if templates is not None:
+                for i in range(start, len(connection.queries)):
+                    templates.setdefault(i, self.name)
+
+    _render.tracks_queries = True
+    Template._render = _render
+
+
+
+def fingerprint(sql):
+    """Return ``sql`` with literal values (and lists of them) normalized."""
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    sql = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?)", sql)
+    return sql
@@ -23,12 +23,22 @@ from django.db.models import ProtectedError
 
 from registration.models import RegistrationProfile
 
+from .archive.models import ArchivedRow
 from .ccmodel import ConcurrencyError
 from .core.models import Product, ProductVersion
-from .core.auth import User, Role, Permission
-from .environments.models import Environment, Profile, Element, Category
-from .execution.models import Run, RunSuite, RunCaseVersion, Result, StepResult
+from .core.auth import User, Role, Permission, preload_roles
+from .environments.models import (
+    Environment, Profile, Element, Category, Combinations,
+    preload_categories)
+from .execution.models import (
+    Run, RunSuite, RunCaseVersion, Result, StepResult, BugReference,
+    RunStats, RunCaseVersionStats, ResultBatch,
+    result_summaries, completions, preload_result_stats, preload_results)
+from .execution.batch import submit_results
 from .library.bulk import BulkParser
+from .library.importer import import_cases, run_import
 from .library.models import (
-    Case, CaseVersion, CaseAttachment, CaseStep, Suite, SuiteCase)
+    Case, CaseVersion, CaseAttachment, CaseStep, Suite, SuiteCase, CaseImport,
+    preload_tags, preload_steps, preload_attachments)
+from .search.models import SearchTerm
 from .tags.models import Tag
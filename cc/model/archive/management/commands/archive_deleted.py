@@ -0,0 +1,95 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Management command to archive long-deleted objects, and purge the archive.
+
+"""
+import datetime
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import NoArgsCommand, CommandError
+
+from cc.model.archive.models import archive, purge
+from cc.model.ccmodel import utcnow
+from cc.model.sql import BATCH_SIZE
+
+
+
+class Command(NoArgsCommand):
+    help = (
+        "Move objects soft-deleted more than --days ago to the archive, and "
+        "permanently remove archived objects deleted more than --purge-days "
+        "ago.")
+
+    option_list = NoArgsCommand.option_list + (
+        make_option(
+            "--days",
+            type="int",
+            dest="days",
+            default=None,
+            help=(
+                "Archive objects deleted more than this many days ago "
+                "(default: ARCHIVE_DELETED_AFTER_DAYS setting).")),
+        make_option(
+            "--purge-days",
+            type="int",
+            dest="purge_days",
+            default=None,
+            help=(
+                "Purge archived objects deleted more than this many days ago "
+                "(default: PURGE_ARCHIVED_AFTER_DAYS setting; if neither is "
+                "set, nothing is purged).")),
+        make_option(
+            "--batch-size",
+            type="int",
+            dest="batch_size",
+            default=BATCH_SIZE,
+            help="Objects to archive or purge per transaction."),
+        )
+
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get("verbosity", 1))
+        days = options.get("days")
+        if days is None:
+            days = settings.ARCHIVE_DELETED_AFTER_DAYS
+        purge_days = options.get("purge_days")
+        if purge_days is None:
+            purge_days = settings.PURGE_ARCHIVED_AFTER_DAYS
+        batch_size = options.get("batch_size")
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        now = utcnow()
+        counts = archive(now - datetime.timedelta(days=days), batch_size)
+        if verbosity:
+            for model, count in sorted(
+                    counts.items(), key=lambda i: i[0]._meta.object_name):
+                print(u"Archived %s %s." % (
+                    count, model._meta.verbose_name_plural))
+            print("Archived %s objects deleted more than %s days ago." % (
+                sum(counts.values()), days))
+
+        if purge_days is not None:
+            purged = purge(
+                now - datetime.timedelta(days=purge_days), batch_size)
+            if verbosity:
+                print(
+                    "Purged %s archived objects deleted more than %s days ago."
+                    % (purged, purge_days))
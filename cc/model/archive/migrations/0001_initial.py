@@ -0,0 +1,54 @@
+# encoding: utf-8
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        
+        # Adding model 'ArchivedRow'
+        db.create_table('archive_archivedrow', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('content_type', self.gf('django.db.models.fields.related.ForeignKey')(related_name='+', to=orm['contenttypes.ContentType'])),
+            ('object_id', self.gf('django.db.models.fields.PositiveIntegerField')()),
+            ('deleted_on', self.gf('django.db.models.fields.DateTimeField')(db_index=True)),
+            ('archived_on', self.gf('django.db.models.fields.DateTimeField')(default=datetime.datetime(2026, 10, 18, 14, 16, 59, 535218))),
+            ('data', self.gf('django.db.models.fields.TextField')()),
+        ))
+        db.send_create_signal('archive', ['ArchivedRow'])
+
+        # Adding unique constraint on 'ArchivedRow', fields ['content_type', 'object_id']
+        db.create_unique('archive_archivedrow', ['content_type_id', 'object_id'])
+
+
+    def backwards(self, orm):
+        
+        # Removing unique constraint on 'ArchivedRow', fields ['content_type', 'object_id']
+        db.delete_unique('archive_archivedrow', ['content_type_id', 'object_id'])
+
+        # Deleting model 'ArchivedRow'
+        db.delete_table('archive_archivedrow')
+
+
+    models = {
+        'archive.archivedrow': {
+            'Meta': {'unique_together': "[('content_type', 'object_id')]", 'object_name': 'ArchivedRow'},
+            'archived_on': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime(2026, 10, 18, 14, 16, 59, 535925)'}),
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'+'", 'to': "orm['contenttypes.ContentType']"}),
+            'data': ('django.db.models.fields.TextField', [], {}),
+            'deleted_on': ('django.db.models.fields.DateTimeField', [], {'db_index': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'object_id': ('django.db.models.fields.PositiveIntegerField', [], {})
+        },
+        'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        }
+    }
+
+    complete_apps = ['archive']
@@ -0,0 +1,376 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Archive of long-deleted objects.
+
+Soft-deleted objects stay in their model's table (and its indexes), where every
+default-manager query has to skip them. ``archive`` moves objects that have
+been deleted for a while out of their tables into serialized rows of a single
+archive table; undeleting restores them transparently, and ``purge`` later
+removes them for good.
+
+"""
+import json
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, router, transaction
+from django.db.models.sql import DeleteQuery
+
+from ..ccmodel import CCModel, utcnow
+from ..sql import bulk_insert, chunked, BATCH_SIZE
+
+
+
+class ArchivedRow(models.Model):
+    """The serialized row of an archived (long soft-deleted) object."""
+    content_type = models.ForeignKey(ContentType, related_name="+")
+    object_id = models.PositiveIntegerField()
+    deleted_on = models.DateTimeField(db_index=True)
+    archived_on = models.DateTimeField(default=utcnow)
+    # JSON: {"fields": {attname: value}, "m2m": {field name: [target IDs]}}
+    data = models.TextField()
+
+
+    def __unicode__(self):
+        """Unicode representation is model and object ID."""
+        return u"{0} {1}".format(self.content_type, self.object_id)
+
+
+    @property
+    def record(self):
+        """The deserialized data of this row."""
+        if not hasattr(self, "_record"):
+            self._record = json.loads(self.data)
+        return self._record
+
+
+    class Meta:
+        unique_together = [("content_type", "object_id")]
+
+
+
+def archive(cutoff, batch_size=BATCH_SIZE, using=None):
+    """
+    Archive objects of all models soft-deleted before datetime ``cutoff``.
+
+    Objects still referenced by other objects are left in place; models are
+    archived referencing models first, so objects deleted along with their
+    dependents are all archived in the same run. Each batch of up to
+    ``batch_size`` objects is archived in its own transaction. Returns a
+    dictionary mapping models to the number of their objects archived.
+
+    """
+    counts = {}
+    for model in archive_order():
+        db = using or router.db_for_write(model)
+        candidates = _archivable(model, cutoff, db)
+        while True:
+            pks = list(candidates.values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            with transaction.commit_on_success(using=db):
+                _archive_batch(model, pks, db)
+            counts[model] = counts.get(model, 0) + len(pks)
+    return counts
+
+
+
+def purge(cutoff, batch_size=BATCH_SIZE, using=None):
+    """
+    Permanently remove archived objects soft-deleted before ``cutoff``.
+
+    Removes up to ``batch_size`` archived rows per transaction. Returns the
+    number of archived objects removed.
+
+    """
+    if using is None:
+        using = router.db_for_write(ArchivedRow)
+    expired = ArchivedRow.objects.using(using).filter(
+        deleted_on__lt=cutoff).order_by("pk")
+    count = 0
+    while True:
+        pks = list(expired.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            break
+        with transaction.commit_on_success(using=using):
+            DeleteQuery(ArchivedRow).delete_batch(pks, using)
+        count += len(pks)
+    return count
+
+
+
+def restore(model, rows, using=None):
+    """
+    Restore archived ``rows`` (all of ``model``) to the model's table.
+
+    Objects are restored as they were archived, still soft-deleted. Rows with
+    a required foreign key to an object that no longer exists stay archived;
+    nullable foreign keys and many-to-many links to missing objects are
+    dropped. Returns list of restored primary keys.
+
+    """
+    if using is None:
+        using = router.db_for_write(model)
+    restored = []
+    for batch in chunked(rows, BATCH_SIZE):
+        restored.extend(_restore_batch(model, batch, using))
+    return restored
+
+
+
+def restore_cascade(cascade, deletion_times):
+    """
+    Restore archived dependents of a ``SoftDeleteCascade`` being undeleted.
+
+    For each dependent model, restores archived objects deleted at one of the
+    ``deletion_times`` that cascade from an object in the cascade; parents are
+    restored before their children.
+
+    """
+    archived = ArchivedRow.objects.using(cascade.using)
+    if not deletion_times or not archived.exists():
+        return
+    querysets = dict(cascade.querysets)
+    for model, qs in cascade.querysets[1:]:
+        ct = ContentType.objects.db_manager(cascade.using).get_for_model(model)
+        rows = list(
+            archived.filter(
+                content_type=ct, deleted_on__in=list(deletion_times))
+            )
+        if not rows:
+            continue
+        keep = set()
+        for fk, parent in cascade.edges[model]:
+            ids = set(row.record["fields"].get(fk.attname) for row in rows)
+            ids.discard(None)
+            found = set()
+            for batch in chunked(ids, BATCH_SIZE):
+                found.update(
+                    querysets[parent].filter(pk__in=batch).values_list(
+                        "pk", flat=True)
+                    )
+            keep.update(
+                row.pk for row in rows
+                if row.record["fields"].get(fk.attname) in found
+                )
+        restore(model, [row for row in rows if row.pk in keep], cascade.using)
+
+
+
+def unarchive(model, pks, user=None):
+    """
+    Undelete objects of ``model`` with ``pks``, whether archived or not.
+
+    Archived objects are restored first; dependent objects deleted along with
+    them are restored and undeleted too, as with ``CCModel.undelete``.
+
+    """
+    ct = ContentType.objects.get_for_model(model)
+    restore(
+        model, ArchivedRow.objects.filter(content_type=ct, object_id__in=pks))
+    for obj in model.everything.filter(pk__in=pks):
+        obj.undelete(user)
+
+
+
+def archive_order():
+    """
+    Return list of all concrete ``CCModel`` subclasses, in archiving order.
+
+    Every model comes after all models with a foreign key or many-to-many
+    relation to it (barring cycles).
+
+    """
+    ccmodels = [
+        m for m in models.get_models()
+        if issubclass(m, CCModel) and not m._meta.proxy
+        ]
+    referrers = dict((m, set()) for m in ccmodels)
+    for model in ccmodels:
+        for field in model._meta.fields + model._meta.many_to_many:
+            to = getattr(field.rel, "to", None)
+            if to in referrers and to is not model:
+                referrers[to].add(model)
+
+    ordered = []
+    remaining = set(ccmodels)
+    while remaining:
+        ready = [m for m in remaining if not referrers[m] & remaining]
+        # in a cycle, referenced objects just wait for a later run
+        ready = sorted(ready or remaining, key=lambda m: m._meta.db_table)
+        ordered.extend(ready)
+        remaining.difference_update(ready)
+    return ordered
+
+
+
+def _archivable(model, cutoff, using):
+    """Return queryset of ``model`` objects that can be archived."""
+    qs = model._base_manager.using(using).filter(deleted_on__lt=cutoff)
+    own_links = set(f.rel.through for f in _m2m_fields(model))
+    for related in model._meta.get_all_related_objects(include_hidden=True):
+        if related.model in own_links or _is_derived(related):
+            continue
+        fk = related.field.name
+        qs = qs.exclude(
+            pk__in=related.model._base_manager.using(using).filter(
+                **{"{0}__isnull".format(fk): False}).values(fk)
+            )
+    return qs.order_by("pk")
+
+
+
+def _archive_batch(model, pks, using):
+    """Move objects of ``model`` with given ``pks`` to the archive."""
+    fields = model._meta.fields
+    records = {}
+    rows = model._base_manager.using(using).filter(pk__in=pks).values(
+        *[f.name for f in fields])
+    for row in rows:
+        records[row[model._meta.pk.name]] = {
+            "fields": dict((f.attname, row[f.name]) for f in fields),
+            "m2m": {},
+            }
+
+    for field in _m2m_fields(model):
+        through = field.rel.through
+        source = field.m2m_field_name()
+        links = through._default_manager.using(using).filter(
+            **{"{0}__in".format(source): pks}).values_list(
+            "pk", source, field.m2m_reverse_field_name())
+        link_ids = []
+        for link_id, source_id, target_id in links:
+            records[source_id]["m2m"].setdefault(field.name, []).append(
+                target_id)
+            link_ids.append(link_id)
+        DeleteQuery(through).delete_batch(link_ids, using)
+
+    for related in model._meta.get_all_related_objects(include_hidden=True):
+        if _is_derived(related):
+            related.model._default_manager.using(using).filter(
+                **{"{0}__in".format(related.field.name): pks}).delete()
+
+    ct = ContentType.objects.db_manager(using).get_for_model(model)
+    archived_on = utcnow()
+    bulk_insert(
+        [
+            ArchivedRow(
+                content_type=ct,
+                object_id=pk,
+                deleted_on=record["fields"]["deleted_on"],
+                archived_on=archived_on,
+                data=json.dumps(record, default=unicode),
+                )
+            for pk, record in records.items()
+            ],
+        using,
+        )
+    DeleteQuery(model).delete_batch(pks, using)
+
+
+
+def _restore_batch(model, rows, using):
+    """Restore archived ``rows`` of ``model``; return restored pks."""
+    values = []
+    for row in rows:
+        data = row.record["fields"]
+        values.append(
+            dict(
+                (f.attname, f.to_python(data[f.attname]))
+                for f in model._meta.fields if f.attname in data
+                )
+            )
+
+    existing = {}
+    for field in model._meta.fields:
+        if not isinstance(field, models.ForeignKey):
+            continue
+        ids = set(v.get(field.attname) for v in values)
+        ids.discard(None)
+        existing[field] = set(
+            field.rel.to._base_manager.using(using).filter(
+                pk__in=ids).values_list("pk", flat=True)
+            ) if ids else set()
+
+    objs = []
+    restored = []
+    for row, kwargs in zip(rows, values):
+        missing = [
+            f for f, ids in existing.items()
+            if kwargs.get(f.attname) is not None and
+            kwargs[f.attname] not in ids
+            ]
+        if any(not f.null for f in missing):
+            continue
+        for f in missing:
+            kwargs[f.attname] = None
+        objs.append(model(**kwargs))
+        restored.append(row)
+    bulk_insert(objs, using, with_pk=True)
+
+    for field in _m2m_fields(model):
+        through = field.rel.through
+        source = through._meta.get_field(field.m2m_field_name()).attname
+        target = through._meta.get_field(
+            field.m2m_reverse_field_name()).attname
+        links = [
+            (row.object_id, target_id) for row in restored
+            for target_id in row.record["m2m"].get(field.name, [])
+            ]
+        targets = set()
+        for batch in chunked(set(t for s, t in links), BATCH_SIZE):
+            targets.update(
+                field.rel.to._base_manager.using(using).filter(
+                    pk__in=batch).values_list("pk", flat=True)
+                )
+        bulk_insert(
+            [
+                through(**{source: s, target: t})
+                for s, t in links if t in targets
+                ],
+            using,
+            )
+
+    DeleteQuery(ArchivedRow).delete_batch([row.pk for row in restored], using)
+    pks = [row.object_id for row in restored]
+    if pks:
+        model._restored(pks)
+    return pks
+
+
+
+def _m2m_fields(model):
+    """Return ``model``'s many-to-many fields with auto-created through."""
+    return [
+        f for f in model._meta.many_to_many
+        if f.rel.through._meta.auto_created
+        ]
+
+
+
+def _is_derived(related):
+    """
+    Return True if ``related`` objects are data derived from their target.
+
+    Only models that declare ``derived_data = True`` (denormalized stats and
+    indexes) count; they are removed along with archived objects, and rebuilt
+    on restore by the soft-deletion hooks of the restored models. Any other
+    reference keeps its target out of the archive.
+
+    """
+    return getattr(related.model, "derived_data", False)
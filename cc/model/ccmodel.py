@@ -24,18 +24,26 @@ creation, modification, and soft-deletion.
 """
 import datetime
 
-from django.db import models, router
-from django.db.models.deletion import Collector
-from django.db.models.query import QuerySet
+from django.db import models, router, transaction
+from django.db.models.fields.related import (
+    ForeignRelatedObjectsDescriptor,
+    ManyRelatedObjectsDescriptor,
+    ReverseManyRelatedObjectsDescriptor,
+    )
 
 from model_utils import Choices
 
 from .core.auth import User
+from .sql import (
+    bulk_insert, bulk_update, chunked, BATCH_SIZE, PreloadQuerySet)
 
 
 
 class ConcurrencyError(Exception):
-    pass
+    def __init__(self, msg, conflicts=None):
+        """Error for ``msg``; ``conflicts`` lists out-of-date instances."""
+        super(ConcurrencyError, self).__init__(msg)
+        self.conflicts = conflicts or []
 
 
 
@@ -44,54 +52,155 @@ def utcnow():
 
 
 
-class SoftDeleteCollector(Collector):
+class SoftDeleteCascade(object):
     """
-    A variant of Django's default delete-cascade collector that implements soft
-    delete.
+    Soft-deletes or undeletes objects, cascading to dependent objects.
+
+    The cascade is walked at the schema level: rows of each dependent model are
+    selected by subqueries on the rows of the models they cascade from, so each
+    model is updated with a single UPDATE statement, and no instances are ever
+    loaded. Only cascading relations to other ``CCModel``s are followed;
+    dependent objects of other models (e.g. denormalized data) can't be
+    soft-deleted, and are left alone.
 
     """
-    def collect(self, objs, *args, **kwargs):
-        """
-        Collect ``objs`` and dependent objects.
+    def __init__(self, model, pks, using=None):
+        """Prepare cascade from ``model`` instances with given ``pks``."""
+        if using is None:
+            using = router.db_for_write(model)
+        self.model = model
+        self.pks = list(pks)
+        self.using = using
+        self.querysets = self._walk()
 
-        We override in order to store "root" objects for undelete.
 
+    def delete(self, user=None, dry_run=False):
         """
-        if kwargs.get("source", None) is None:
-            self.root_objs = objs
-        super(SoftDeleteCollector, self).collect(objs, *args, **kwargs)
+        Soft-delete root objects and all dependent not-deleted objects.
 
+        Returns a dictionary mapping each model in the cascade to the number of
+        its objects deleted; with ``dry_run``, nothing is changed, and the
+        counts are of objects that would be deleted.
 
-    def delete(self, user=None):
         """
-        Soft-delete all collected instances.
+        return self._update(
+            {"deleted_on__isnull": True},
+            {"deleted_by": user, "deleted_on": utcnow()},
+            dry_run,
+            )
 
+
+    def undelete(self, user=None, dry_run=False):
         """
-        now = utcnow()
-        for model, instances in self.data.iteritems():
-            pk_list = [obj.pk for obj in instances]
-            model._base_manager.filter(
-                pk__in=pk_list, deleted_on__isnull=True).update(
-                deleted_by=user, deleted_on=now)
+        Undelete root objects and dependent objects deleted along with them.
 
+        Only dependent objects deleted at the same time as one of the root
+        objects (that is, in the same cascade) are undeleted; any of those that
+        have been archived are restored first. Returns a dictionary of
+        per-model counts, as ``delete`` does; with ``dry_run``, archived objects
+        are not counted.
 
-    def undelete(self, user=None):
         """
-        Undelete all collected instances that were deleted.
+        from .archive.models import restore_cascade
 
-        """
         # timestamps on which root obj(s) were deleted; only cascade items also
         # deleted in one of these same cascade batches should be undeleted.
-        deletion_times = set([o.deleted_on for o in self.root_objs])
-        for model, instances in self.data.iteritems():
-            pk_list = [obj.pk for obj in instances]
-            model._base_manager.filter(
-                pk__in=pk_list, deleted_on__in=deletion_times).update(
-                deleted_by=None, deleted_on=None)
+        deletion_times = set(
+            self.querysets[0][1].filter(
+                deleted_on__isnull=False).values_list("deleted_on", flat=True)
+            )
+        if not dry_run:
+            restore_cascade(self, deletion_times)
+        return self._update(
+            {"deleted_on__in": deletion_times},
+            {"deleted_by": None, "deleted_on": None},
+            dry_run,
+            )
+
+
+    def _update(self, filters, values, dry_run):
+        """Update ``filters``-matching rows of all models; return counts."""
+        counts = {}
+        changed = []
+        for model, qs in self.querysets:
+            qs = qs.filter(**filters)
+            if dry_run:
+                counts[model] = qs.count()
+                continue
+            if _has_soft_deletion_hook(model):
+                changed.append((model, list(qs.values_list("pk", flat=True))))
+            counts[model] = qs.update(**values)
+        for model, pks in changed:
+            model._soft_deletion_changed(pks)
+        return counts
+
+
+    def _walk(self):
+        """
+        Return list of (model, queryset) pairs for all models in the cascade.
+
+        The root model comes first, and every model comes after all models it
+        cascades from. Each queryset selects rows (deleted or not) that cascade
+        from the root objects, by way of any cascading relation. Also sets
+        ``self.edges``, mapping each dependent model to a list of (foreign key,
+        parent model) pairs it cascades by.
+
+        """
+        self.edges = edges = {}
+        pending = [self.model]
+        seen = set(pending)
+        while pending:
+            model = pending.pop()
+            for related in model._meta.get_all_related_objects(
+                    include_hidden=True):
+                child = related.model
+                if not (issubclass(child, CCModel) and
+                        related.field.rel.on_delete is models.CASCADE):
+                    continue
+                edges.setdefault(child, []).append((related.field, model))
+                if child not in seen:
+                    seen.add(child)
+                    pending.append(child)
+
+        querysets = {
+            self.model: self.model._base_manager.using(self.using).filter(
+                pk__in=self.pks)
+            }
+        ordered = [(self.model, querysets[self.model])]
+        remaining = set(edges)
+        while remaining:
+            ready = [
+                child for child in remaining
+                if all(parent in querysets for fk, parent in edges[child])
+                ]
+            if not ready:
+                raise ValueError(
+                    "Cannot soft-delete {0}; cyclic delete cascade.".format(
+                        self.model.__name__))
+            for child in ready:
+                q = models.Q()
+                for fk, parent in edges[child]:
+                    q = q | models.Q(
+                        **{"{0}__in".format(fk.name):
+                               querysets[parent].values("pk")})
+                querysets[child] = child._base_manager.using(
+                    self.using).filter(q)
+                ordered.append((child, querysets[child]))
+                remaining.discard(child)
+        return ordered
+
+
 
+def _has_soft_deletion_hook(model):
+    """Return True if ``model`` overrides ``_soft_deletion_changed``."""
+    return (
+        model._soft_deletion_changed.im_func is not
+        CCModel._soft_deletion_changed.im_func
+        )
 
 
-class CCQuerySet(QuerySet):
+
+class CCQuerySet(PreloadQuerySet):
     """
     Implements modification tracking and soft deletes on bulk update/delete.
 
@@ -119,26 +228,123 @@ class CCQuerySet(QuerySet):
         return super(CCQuerySet, self).update(*args, **kwargs)
 
 
-    def delete(self, user=None, permanent=False):
+    def bulk_save(self, instances, user=None, notrack=False):
+        """
+        Save changes to many existing instances in a few batched statements.
+
+        As with ``save``, only changed fields (plus modification tracking and
+        version) are written, unchanged instances are skipped, and each row is
+        only updated if its ``cc_version`` matches the instance's. But rows are
+        written in batches, one UPDATE statement per batch; if any row does
+        not match, nothing is saved, and ``ConcurrencyError`` is raised with
+        the out-of-date instances as its ``conflicts``.
+
+        All instances must be of this queryset's model. Returns the number of
+        instances saved.
+
+        Inside a managed transaction, the updates are made within a savepoint,
+        which is rolled back on conflict; committing or rolling back the
+        transaction is left to its manager. (Where the database backend doesn't
+        support savepoints, the manager must roll back on ``ConcurrencyError``
+        to undo any rows already written.) Otherwise, the updates are made in
+        their own transaction.
+
+        """
+        rows = []
+        for obj in instances:
+            fields = obj._changed_fields()
+            if fields:
+                rows.append((obj, fields))
+        if not rows:
+            return 0
+
+        if not notrack:
+            now = utcnow()
+            tracking = [
+                self.model._meta.get_field(name)
+                for name in ["modified_on", "modified_by"]
+                ]
+            for obj, fields in rows:
+                obj.modified_by = user
+                obj.modified_on = now
+                fields.extend(f for f in tracking if f not in fields)
+
+        if transaction.is_managed(using=self.db):
+            sid = transaction.savepoint(using=self.db)
+            updated = bulk_update(
+                rows, version_field="cc_version", using=self.db)
+            if updated != len(rows):
+                transaction.savepoint_rollback(sid, using=self.db)
+                self._raise_conflicts(rows)
+            transaction.savepoint_commit(sid, using=self.db)
+        else:
+            try:
+                with transaction.commit_on_success(using=self.db):
+                    updated = bulk_update(
+                        rows, version_field="cc_version", using=self.db)
+                    if updated != len(rows):
+                        raise ConcurrencyError("Version mismatch.")
+            except ConcurrencyError:
+                # the transaction is rolled back
+                self._raise_conflicts(rows)
+
+        for obj, fields in rows:
+            obj.cc_version += 1
+            obj._mark_saved(fields)
+        return len(rows)
+
+
+    def _raise_conflicts(self, rows):
+        """Raise ConcurrencyError with out-of-date instances of ``rows``."""
+        versions = {}
+        for batch in chunked([obj.pk for obj, fields in rows], BATCH_SIZE):
+            versions.update(
+                self.model._base_manager.using(self.db).filter(
+                    pk__in=batch).values_list("pk", "cc_version")
+                )
+        conflicts = [
+            obj for obj, fields in rows
+            if versions.get(obj.pk) != obj.cc_version
+            ]
+        raise ConcurrencyError(
+            "Rows with ids {0} out of date; nothing updated.".format(
+                ", ".join(str(obj.pk) for obj in conflicts)),
+            conflicts
+            )
+
+
+    def delete(self, user=None, permanent=False, dry_run=False):
         """
         Soft-delete all objects in this queryset, unless permanent=True.
 
+        Returns per-model counts of soft-deleted objects, including cascades;
+        with ``dry_run``, only counts what would be deleted. See
+        ``SoftDeleteCascade``. Raises ``ProtectedError`` (deleting nothing) if
+        any of the objects is in use; see ``CCModel.deletable``.
+
         """
+        self.model._check_deletable(self.values_list("pk", flat=True))
         if permanent:
             return super(CCQuerySet, self).delete()
-        collector = SoftDeleteCollector(using=self.db)
-        collector.collect(self)
-        collector.delete(user)
+        return self._cascade.delete(user, dry_run=dry_run)
 
 
-    def undelete(self, user=None):
+    def undelete(self, user=None, dry_run=False):
         """
         Undelete all objects in this queryset.
 
+        Returns per-model counts of undeleted objects, including cascades; with
+        ``dry_run``, only counts what would be undeleted.
+
         """
-        collector = SoftDeleteCollector(using=self.db)
-        collector.collect(self)
-        collector.undelete(user)
+        return self._cascade.undelete(user, dry_run=dry_run)
+
+
+    @property
+    def _cascade(self):
+        """Returns soft-delete cascade from objects in this queryset."""
+        return SoftDeleteCascade(
+            self.model, self.values_list("pk", flat=True), using=self.db)
 
 
 
@@ -168,6 +374,16 @@ class CCManager(models.Manager):
         return qs
 
 
+    def preload(self, *funcs):
+        """Return a queryset that calls ``funcs`` on fetched instances."""
+        return self.get_query_set().preload(*funcs)
+
+
+    def bulk_save(self, *args, **kwargs):
+        """Save changes to many instances; see ``CCQuerySet.bulk_save``."""
+        return self.get_query_set().bulk_save(*args, **kwargs)
+
+
 
 class CCModel(models.Model):
     """
@@ -198,6 +414,23 @@ class CCModel(models.Model):
     objects = CCManager(show_deleted=False)
 
 
+    def __init__(self, *args, **kwargs):
+        """
+        Instantiate, remembering loaded field values for change tracking.
+
+        Only instances loaded from the database (which querysets construct
+        with positional args, or as deferred-field proxies) are snapshotted;
+        for an instance constructed by the caller every field counts as
+        changed, so ``Model(pk=existing, ...).save()`` writes all fields.
+
+        """
+        super(CCModel, self).__init__(*args, **kwargs)
+        if args or self._deferred:
+            self._loaded_values = self._field_values()
+        else:
+            self._loaded_values = {}
+
+
     def save(self, *args, **kwargs):
         """
         Save this instance.
@@ -205,9 +438,30 @@ class CCModel(models.Model):
         Records modified timestamp and user, and raises ConcurrencyError if an
         out-of-date version is being saved.
 
+        Updates only write fields changed since the instance was loaded or last
+        saved (plus modification tracking and version); if nothing changed,
+        nothing is saved. ``update_fields`` may list names of fields to write
+        regardless of changes, instead. Updates send ``pre_save`` and
+        ``post_save`` signals with an ``update_fields`` set of the names of the
+        written fields (as Django 1.5 does).
+
         """
-        if not kwargs.pop("notrack", False):
-            user = kwargs.pop("user", None)
+        update_fields = kwargs.pop("update_fields", None)
+        track = not kwargs.pop("notrack", False)
+        user = kwargs.pop("user", None)
+
+        # CCModels always have an auto-PK and we don't set PKs explicitly, so
+        # we can assume that a set PK means this should be an update.
+        updating = kwargs.get("force_update") or self.id is not None
+        if updating:
+            if update_fields is None:
+                fields = self._changed_fields()
+            else:
+                fields = [self._meta.get_field(name) for name in update_fields]
+            if not fields:
+                return
+
+        if track:
             now = utcnow()
             if self.pk is None and user is not None:
                 self.created_by = user
@@ -216,15 +470,23 @@ class CCModel(models.Model):
                 self.modified_by = user
             self.modified_on = now
 
-        # CCModels always have an auto-PK and we don't set PKs explicitly, so
-        # we can assume that a set PK means this should be an update.
-        if kwargs.get("force_update") or self.id is not None:
-            non_pks = [f for f in self._meta.local_fields if not f.primary_key]
+        if updating:
+            extra = ["cc_version"]
+            if track:
+                extra.extend(["modified_on", "modified_by"])
+            fields.extend(
+                f for f in map(self._meta.get_field, extra) if f not in fields)
             # This isn't a race condition because the save will only take
             # effect if previous_version is actually up to date.
             previous_version = self.cc_version
             self.cc_version += 1
-            values = [(f, None, f.pre_save(self, False)) for f in non_pks]
+            cls = self.__class__
+            using = router.db_for_write(cls, instance=self)
+            names = frozenset(f.name for f in fields)
+            models.signals.pre_save.send(
+                sender=cls, instance=self, raw=False, using=using,
+                update_fields=names)
+            values = [(f, None, f.pre_save(self, False)) for f in fields]
             rows = self.__class__.objects.filter(
                 id=self.id, cc_version=previous_version)._update(values)
             if not rows:
@@ -232,11 +494,54 @@ class CCModel(models.Model):
                     "No row with id {0} and version {1} updated.".format(
                         self.id, previous_version)
                     )
+            self._mark_saved(fields)
+            models.signals.post_save.send(
+                sender=cls, instance=self, created=False, raw=False,
+                using=using, update_fields=names)
         else:
-            return super(CCModel, self).save(*args, **kwargs)
+            ret = super(CCModel, self).save(*args, **kwargs)
+            self._loaded_values = self._field_values()
+            return ret
+
 
+    def _field_values(self):
+        """
+        Return dictionary of current values of loaded non-PK fields.
+
+        Deferred fields that haven't been loaded are left out, so their values
+        aren't fetched. (Instances with deferred fields are of a proxy subclass,
+        with no local fields; hence ``fields`` rather than ``local_fields``.)
 
-    def clone(self, cascade=None, overrides=None, user=None):
+        """
+        return dict(
+            (f.attname, self.__dict__[f.attname])
+            for f in self._meta.fields
+            if not f.primary_key and f.attname in self.__dict__
+            )
+
+
+    def _mark_saved(self, fields):
+        """Record current values of ``fields`` as saved to the database."""
+        current = self._field_values()
+        self._loaded_values.update(
+            (f.attname, current[f.attname]) for f in fields)
+
+
+    def _changed_fields(self):
+        """Return list of non-PK fields changed since last load or save."""
+        loaded = self._loaded_values
+        return [
+            f for f in self._meta.fields
+            if not f.primary_key and f.name != "cc_version" and
+            f.attname in self.__dict__ and (
+                f.attname not in loaded or
+                self.__dict__[f.attname] != loaded[f.attname] or
+                # a newly-assigned file
+                not getattr(self.__dict__[f.attname], "_committed", True))
+            ]
+
+
+    def clone(self, cascade=None, overrides=None, user=None, commit=True):
         """
         Clone this instance and return the new, cloned instance.
 
@@ -252,6 +557,11 @@ class CCModel(models.Model):
         and values are a callable that takes the queryset of all related
         objects and returns those that should be cloned.
 
+        Cascades are set-based: each cascaded relation is copied with a fixed
+        number of queries, however many related objects there are (see
+        ``clone_related``). If ``commit`` is False, the clone is returned
+        unsaved and nothing is cascaded.
+
         """
         if cascade is None:
             cascade = {}
@@ -259,7 +569,7 @@ class CCModel(models.Model):
             try:
                 cascade.iteritems
             except AttributeError:
-                cascade = dict((i, lambda qs: qs) for i in cascade)
+                cascade = dict((i, _clone_all) for i in cascade)
 
         if overrides is None:
             overrides = {}
@@ -273,56 +583,160 @@ class CCModel(models.Model):
         for field in self._meta.fields:
             if field.primary_key:
                 continue
-            val = overrides.get(field.name, getattr(self, field.name))
-            setattr(clone, field.name, val)
-
-        clone.save(force_insert=True)
-
-        for name, filter_func in cascade.items():
-            mgr = getattr(self, name)
-            if mgr.__class__.__name__ == "ManyRelatedManager": # M2M
-                clone_mgr = getattr(clone, name)
-                existing = set(clone_mgr.all())
-                new = set(filter_func(mgr.all()))
-                clone_mgr.add(*new.difference(existing))
-                clone_mgr.remove(*existing.difference(new))
-            elif mgr.__class__.__name__ == "RelatedManager": # reverse FK
-                reverse_name = getattr(self.__class__, name).related.field.name
-                for obj in filter_func(mgr.all()):
-                    obj.clone(overrides={reverse_name: clone})
+            if field.name in overrides:
+                setattr(clone, field.name, overrides[field.name])
             else:
-                raise ValueError(
-                    "Cannot cascade-clone '{0}'; "
-                    "not a many-to-many or reverse foreignkey.".format(name))
+                # copy raw values, so related objects aren't fetched
+                setattr(clone, field.attname, getattr(self, field.attname))
+
+        clone._clone_cascade = cascade
+
+        if commit:
+            clone.save(force_insert=True)
+            clone_related([(self, clone)], user)
 
         return clone
 
 
-    def delete(self, user=None, permanent=False):
+    @classmethod
+    def _cloned(cls, pks):
+        """
+        Hook called after instances with ``pks`` are cascade-cloned.
+
+        Cascade-cloned instances are inserted in bulk, without calling
+        ``save()``. Does nothing by default; models that maintain denormalized
+        data about their instances can override it.
+
+        """
+        pass
+
+
+    @classmethod
+    def _restored(cls, pks):
+        """
+        Hook called after archived instances with ``pks`` are restored.
+
+        Restored instances are inserted in bulk, still soft-deleted, without
+        calling ``save()``. Does nothing by default; models that maintain
+        denormalized data about their instances can override it.
+
+        """
+        pass
+
+
+    def delete(self, user=None, permanent=False, dry_run=False):
         """
         (Soft) delete this instance, unless permanent=True.
 
+        Returns per-model counts of soft-deleted objects, including cascades;
+        with ``dry_run``, only counts what would be deleted. Raises
+        ``ProtectedError`` if this instance is in use (see ``deletable``).
+
         """
+        self._check_deletable([self.pk])
         if permanent:
             return super(CCModel, self).delete()
-        self._collector.delete(user)
+        return self._cascade.delete(user, dry_run=dry_run)
 
 
-    def undelete(self, user=None):
+    def undelete(self, user=None, dry_run=False):
         """
         Undelete this instance.
 
+        Returns per-model counts of undeleted objects, including cascades; with
+        ``dry_run``, only counts what would be undeleted.
+
+        """
+        return self._cascade.undelete(user, dry_run=dry_run)
+
+
+    @classmethod
+    def _soft_deletion_changed(cls, pks):
+        """
+        Hook called after instances with ``pks`` are soft-deleted or undeleted.
+
+        Called for every model in a delete or undelete cascade. Does nothing by
+        default; models that maintain denormalized data about their instances
+        can override it.
+
+        """
+        pass
+
+
+    @classmethod
+    def _in_use(cls, pks):
         """
-        self._collector.undelete(user)
+        Hook returning the set of those ``pks`` whose instances are in use.
+
+        Instances in use can't be deleted. ``pks`` may be a list of IDs or a
+        queryset of them; overrides should check them all with one query.
+        Nothing is in use by default.
+
+        """
+        return set()
+
+
+    @classmethod
+    def _in_use_by(cls, pks):
+        """
+        Hook returning the objects that use instances with ``pks``.
+
+        These are the objects that protect the instances from deletion, and
+        are reported as ``protected_objects`` of the ``ProtectedError``;
+        models that override ``_in_use`` should override this to match.
+
+        """
+        return []
 
 
     @property
-    def _collector(self):
-        """Returns populated delete-cascade collector."""
+    def deletable(self):
+        """Return True if this instance can be deleted, otherwise False."""
+        deletable = getattr(self, "_deletable", None)
+        if deletable is None:
+            deletable = self.pk not in self._in_use([self.pk])
+        return deletable
+
+
+    @classmethod
+    def load_deletable(cls, instances):
+        """
+        Load ``deletable`` of many instances of this class at once.
+
+        Checks whether they are in use with one query per batch, rather than
+        one per instance. Returns the instances, as a list.
+
+        """
+        instances = list(instances)
+        in_use = set()
+        for batch in chunked([obj.pk for obj in instances], BATCH_SIZE):
+            in_use.update(cls._in_use(batch))
+        for obj in instances:
+            obj._deletable = obj.pk not in in_use
+        return instances
+
+
+    @classmethod
+    def _check_deletable(cls, pks):
+        """Raise ``ProtectedError`` if any instance with ``pks`` is in use."""
+        in_use = cls._in_use(pks)
+        if not in_use:
+            return
+        if len(in_use) == 1:
+            msg = u"{0} '{1}' is in use and cannot be deleted.".format(
+                unicode(cls._meta.verbose_name).capitalize(),
+                cls._base_manager.get(pk=list(in_use)[0]))
+        else:
+            msg = u"{0} {1} are in use and cannot be deleted.".format(
+                len(in_use), cls._meta.verbose_name_plural)
+        raise models.ProtectedError(msg, list(cls._in_use_by(in_use)))
+
+
+    @property
+    def _cascade(self):
+        """Returns soft-delete cascade from this instance."""
         db = router.db_for_write(self.__class__, instance=self)
-        collector = SoftDeleteCollector(using=db)
-        collector.collect([self])
-        return collector
+        return SoftDeleteCascade(self.__class__, [self.pk], using=db)
 
 
     class Meta:
@@ -330,28 +744,148 @@ class CCModel(models.Model):
 
 
 
-class NotDeletedCount(models.Count):
-    """A Count on a related field that only counts not-deleted objects."""
-    def add_to_query(self, query, alias, col, source, is_summary):
-        """
-        Add the aggregate to the nominated query.
+def _clone_all(qs):
+    """Default cascade filter for ``CCModel.clone``: clone all related."""
+    return qs
 
-        Expects col to be a tuple (which means this can only be used to count
-        related fields), and transforms it into a NotDeletedCountColumn.
 
-        """
-        try:
-            table, field = col
-        except ValueError:
-            table, field = None, col
-        col = NotDeletedCountColumn(table, field)
-        return super(NotDeletedCount, self).add_to_query(
-            query, alias, col, source, is_summary)
 
+def clone_related(pairs, user=None):
+    """
+    Cascade-clone relations for a list of (original, clone) instance pairs.
 
+    All pairs must be of the same model, and each clone must be saved and have
+    the cascade it was cloned with (see ``CCModel.clone``). Relations are
+    copied for all pairs at once: reverse-FK related objects are cloned
+    (unsaved) with their own ``clone`` method, so per-model cloning defaults
+    apply, then inserted in bulk and cascaded in turn; M2M relations are
+    copied as through-table rows. Queries are per relation and batch, not per
+    object; no ``save()`` methods run and no signals are sent for the
+    cascaded objects.
 
-class NotDeletedCountColumn(object):
-    """An object with an as_sql method that counts only not-deleted objects."""
+    """
+    if not pairs:
+        return
+    model = pairs[0][0].__class__
+    by_relation = {}
+    for orig, clone in pairs:
+        for name, filter_func in clone._clone_cascade.items():
+            by_relation.setdefault((name, filter_func), []).append(
+                (orig, clone))
+
+    for (name, filter_func), relation_pairs in by_relation.items():
+        descriptor = getattr(model, name, None)
+        if isinstance(descriptor, ForeignRelatedObjectsDescriptor):
+            _clone_reverse_fk(
+                descriptor.related, filter_func, relation_pairs, user)
+        elif isinstance(
+                descriptor,
+                (ManyRelatedObjectsDescriptor,
+                 ReverseManyRelatedObjectsDescriptor)):
+            _clone_m2m(descriptor, filter_func, relation_pairs)
+        else:
+            raise ValueError(
+                "Cannot cascade-clone '{0}'; "
+                "not a many-to-many or reverse foreignkey.".format(name))
+
+
+
+def _clone_reverse_fk(related, filter_func, pairs, user):
+    """Clone objects related to originals by reverse FK, in bulk."""
+    fk = related.field
+    clones_by_id = dict((orig.pk, clone) for orig, clone in pairs)
+    new = []
+    for batch in chunked(clones_by_id.keys(), BATCH_SIZE):
+        qs = related.model.objects.filter(
+            **{"{0}__in".format(fk.name): batch}).order_by("pk")
+        for obj in filter_func(qs):
+            parent = clones_by_id[getattr(obj, fk.attname)]
+            new.append(
+                (
+                    obj,
+                    obj.clone(
+                        overrides={fk.name: parent}, user=user, commit=False),
+                    )
+                )
+    if not new:
+        return
+
+    bulk_insert([clone for obj, clone in new])
+    # auto-increment keys are assigned in insertion order, and nothing else
+    # can be related to the brand-new parents yet, so the highest keys
+    # related to them belong to the inserted rows, in order
+    pks = []
+    for batch in chunked([c.pk for c in clones_by_id.values()], BATCH_SIZE):
+        pks.extend(
+            related.model._base_manager.filter(
+                **{"{0}__in".format(fk.name): batch}).values_list(
+                "pk", flat=True)
+            )
+    pks = sorted(pks)[-len(new):]
+    for (obj, clone), pk in zip(new, pks):
+        clone.pk = pk
+
+    related.model._cloned(pks)
+    clone_related(new, user)
+
+
+
+def _clone_m2m(descriptor, filter_func, pairs):
+    """Copy M2M relations of originals to clones as through-table rows."""
+    if isinstance(descriptor, ReverseManyRelatedObjectsDescriptor):
+        field = descriptor.field
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        related_model = field.rel.to
+        query_name = field.related_query_name()
+    else:
+        field = descriptor.related.field
+        source, target = field.m2m_reverse_field_name(), field.m2m_field_name()
+        related_model = descriptor.related.model
+        query_name = field.name
+    through = field.rel.through
+    source_attr = through._meta.get_field(source).attname
+    target_attr = through._meta.get_field(target).attname
+    clone_ids = dict((orig.pk, clone.pk) for orig, clone in pairs)
+
+    wanted = set()
+    for batch in chunked(clone_ids.keys(), BATCH_SIZE):
+        targets = set(
+            obj.pk for obj in filter_func(
+                related_model.objects.filter(
+                    **{"{0}__in".format(query_name): batch}))
+            )
+        wanted.update(
+            (clone_ids[source_id], target_id)
+            for source_id, target_id
+            in through._base_manager.filter(
+                **{"{0}__in".format(source): batch}).values_list(
+                source, target)
+            if target_id in targets
+            )
+
+    # clones may already have some relations (e.g. inherited on save)
+    existing = {}
+    for batch in chunked(clone_ids.values(), BATCH_SIZE):
+        existing.update(
+            ((source_id, target_id), pk)
+            for pk, source_id, target_id
+            in through._base_manager.filter(
+                **{"{0}__in".format(source): batch}).values_list(
+                "pk", source, target)
+            )
+
+    bulk_insert(
+        through(**{source_attr: source_id, target_attr: target_id})
+        for source_id, target_id in wanted.difference(existing)
+        )
+    remove = [pk for key, pk in existing.items() if key not in wanted]
+    for batch in chunked(remove, BATCH_SIZE):
+        through._base_manager.filter(pk__in=batch).delete()
+
+
+
+class NotDeletedColumn(object):
+    """An object with an as_sql method selecting a not-deleted object's field."""
     def __init__(self, table, field):
         """Initialize the column with a table and field name."""
         self.table = table
@@ -359,15 +893,88 @@ class NotDeletedCountColumn(object):
 
 
     def as_sql(self, qn, connection):
-        """Return CASE statement to select only not-deleted objects."""
+        """Return CASE statement to select field only of not-deleted objects."""
+        field, deleted_on = self.columns(qn)
+        return "CASE WHEN {0} IS NULL THEN {1} ELSE NULL END".format(
+            deleted_on, field)
+
+
+    def columns(self, qn):
+        """Return quoted (field, deleted_on) column references."""
         field = qn(self.field)
         deleted_on = qn("deleted_on")
         if self.table is not None:
             table = qn(self.table)
             field = "{0}.{1}".format(table, field)
             deleted_on = "{0}.{1}".format(table, deleted_on)
-        return "CASE WHEN {0} IS NULL THEN {1} ELSE NULL END".format(
-            deleted_on, field)
+        return field, deleted_on
+
+
+
+class NotDeletedExistsColumn(NotDeletedColumn):
+    """An object with an as_sql method that is 1 for not-deleted objects."""
+    def as_sql(self, qn, connection):
+        """Return CASE statement that is 1 for a not-deleted object, else 0."""
+        field, deleted_on = self.columns(qn)
+        return (
+            "CASE WHEN {0} IS NULL AND {1} IS NOT NULL THEN 1 ELSE 0 END"
+            .format(deleted_on, field)
+            )
+
+
+
+class NotDeletedAggregate(object):
+    """
+    Mixin for aggregates on a related field that skip deleted objects.
+
+    Mixed in ahead of a Django aggregate class, aggregates over the field of
+    not-deleted related objects only. The field must be a column of the related
+    model's own table; the primary key of a model related by a many-to-many
+    without explicit through model is a column of the link table instead.
+
+    """
+    column_class = NotDeletedColumn
+
+
+    def add_to_query(self, query, alias, col, source, is_summary):
+        """
+        Add the aggregate to the nominated query.
+
+        Expects col to be a tuple (which means this can only be used to
+        aggregate related fields), and transforms it into a ``column_class``.
+
+        """
+        try:
+            table, field = col
+        except ValueError:
+            table, field = None, col
+        col = self.column_class(table, field)
+        return super(NotDeletedAggregate, self).add_to_query(
+            query, alias, col, source, is_summary)
+
+
+
+class NotDeletedCount(NotDeletedAggregate, models.Count):
+    """A Count on a related field that only counts not-deleted objects."""
+    pass
+
+
+
+class NotDeletedMax(NotDeletedAggregate, models.Max):
+    """The maximum of a related field over not-deleted objects."""
+    pass
+
+
+
+class NotDeletedMin(NotDeletedAggregate, models.Min):
+    """The minimum of a related field over not-deleted objects."""
+    pass
+
+
+
+class NotDeletedExists(NotDeletedAggregate, models.Max):
+    """1 if there are any not-deleted related objects, else 0."""
+    column_class = NotDeletedExistsColumn
 
 
 
@@ -380,15 +987,35 @@ class TeamModel(models.Model):
 
     If a ``TeamModel`` does not implement a ``parent`` property that returns
     its "parent" for purposes of team inheritance, it will be considered to be
-    the top of the inheritance chain and won't inherit a team.
+    the top of the inheritance chain and won't inherit a team. Subclasses that
+    do should also set ``team_parent`` to the name of the foreign key to the
+    parent.
+
+    The resolved team is stored in ``effective_team``, so it can be read (or
+    queried, e.g. ``Run.objects.filter(effective_team=user)``) without walking
+    up the chain. It is kept current on changes to ``own_team``, and on saves
+    that change ``has_team`` or the parent; after changing those by other
+    means (queryset updates, ``bulk_save``, raw SQL) call ``refresh_team``.
 
     """
     has_team = models.BooleanField(default=False)
     own_team = models.ManyToManyField(User, blank=True)
+    effective_team = models.ManyToManyField(
+        User, blank=True, editable=False, related_name="team_%(class)ss")
+
+    # name of foreign key to parent to inherit team from, if any
+    team_parent = None
 
 
     @property
     def team(self):
+        """
+        The team-owning object's ``own_team`` (this object's, or an ancestor's).
+
+        Walks up the chain (a query per level); to read the team, use
+        ``effective_team`` instead.
+
+        """
         if self.has_team or self.parent is None:
             return self.own_team
         return self.parent.team
@@ -400,6 +1027,8 @@ class TeamModel(models.Model):
         self.__class__.objects.filter(pk=self.pk).update(has_team=True)
         self.has_team = True
         self.cc_version += 1
+        self._mark_saved([self._meta.get_field("has_team")])
+        self.refresh_team([self.pk])
 
 
     @property
@@ -407,11 +1036,140 @@ class TeamModel(models.Model):
         return None
 
 
+    @classmethod
+    def refresh_team(cls, pks, cascade=True):
+        """
+        Recompute stored effective team of instances with given ``pks``.
+
+        Parents' effective teams must be current. Unless ``cascade`` is False,
+        also refreshes descendants that inherit their team from these
+        instances. Works in batches, with a fixed number of queries per batch
+        and descendant model.
+
+        """
+        pks = list(pks)
+        if not pks:
+            return
+        field = cls.effective_team.field
+        through = field.rel.through
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        own_field = cls.own_team.field
+        own = own_field.rel.through._default_manager
+        if cls.team_parent is not None:
+            parent_fk = cls._meta.get_field(cls.team_parent)
+            parent_field = parent_fk.rel.to.effective_team.field
+            inherited = parent_field.rel.through._default_manager
+
+        for batch in chunked(pks, BATCH_SIZE):
+            through._default_manager.filter(
+                **{"{0}__in".format(source): batch}).delete()
+            if cls.team_parent is None:
+                owners = batch
+                heirs = {}
+            else:
+                owners = []
+                heirs = {}
+                for pk, has_team, parent_id in cls._base_manager.filter(
+                        pk__in=batch).values_list(
+                        "pk", "has_team", parent_fk.attname):
+                    if has_team:
+                        owners.append(pk)
+                    else:
+                        heirs.setdefault(parent_id, []).append(pk)
+
+            rows = list(
+                own.filter(
+                    **{"{0}__in".format(own_field.m2m_field_name()): owners}
+                    ).values_list(
+                    own_field.m2m_field_name(),
+                    own_field.m2m_reverse_field_name(),
+                    )
+                ) if owners else []
+            if heirs:
+                for parent_id, user_id in inherited.filter(
+                        **{
+                            "{0}__in".format(
+                                parent_field.m2m_field_name()): heirs.keys()
+                            }
+                        ).values_list(
+                        parent_field.m2m_field_name(),
+                        parent_field.m2m_reverse_field_name(),
+                        ):
+                    rows.extend(
+                        (pk, user_id) for pk in heirs[parent_id])
+            bulk_insert(
+                [
+                    through(
+                        **{
+                            "{0}_id".format(source): pk,
+                            "{0}_id".format(target): user_id,
+                            }
+                        )
+                    for pk, user_id in rows
+                    ]
+                )
+
+        if not cascade:
+            return
+        for related in cls._meta.get_all_related_objects():
+            child = related.model
+            if not (issubclass(child, TeamModel) and
+                    child.team_parent == related.field.name):
+                continue
+            child_pks = []
+            for batch in chunked(pks, BATCH_SIZE):
+                child_pks.extend(
+                    child._base_manager.filter(
+                        has_team=False,
+                        **{"{0}__in".format(related.field.name): batch}
+                        ).values_list("pk", flat=True)
+                    )
+            child.refresh_team(child_pks)
+
+
     class Meta:
         abstract = True
 
 
 
+def _team_saved(sender, instance, created, update_fields=None, **kwargs):
+    """New team models get their team; so do those saved with a new one."""
+    if not issubclass(sender, TeamModel):
+        return
+    if created or update_fields is None or update_fields & set(
+            ["has_team", sender.team_parent]):
+        sender.refresh_team([instance.pk])
+
+
+
+def _own_team_changed(sender, instance, action, reverse, model, pk_set,
+                      **kwargs):
+    """Keep effective teams current on changes to own teams."""
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+    team_model = model if reverse else instance.__class__
+    if not (issubclass(team_model, TeamModel) and
+            sender is team_model.own_team.through):
+        return
+    if not reverse:
+        team_model.refresh_team([instance.pk])
+    elif action == "post_clear":
+        # the user was removed from every own team; only teams including
+        # the user can have changed
+        team_model.refresh_team(
+            team_model._base_manager.filter(
+                effective_team=instance).values_list("pk", flat=True))
+    else:
+        team_model.refresh_team(pk_set)
+
+
+
+models.signals.post_save.connect(_team_saved)
+models.signals.m2m_changed.connect(_own_team_changed)
+
+
+
 class DraftStatusModel(models.Model):
     """
     Model which has a status that can be draft, active, or disabled.
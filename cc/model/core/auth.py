@@ -21,14 +21,33 @@ Proxy User and Role models.
 """
 from django.contrib.auth.backends import ModelBackend as DjangoModelBackend
 # Permission is imported solely so other places can import it from here
-from django.contrib.auth.models import User as BaseUser, Group, Permission
+from django.contrib.auth.models import (
+    User as BaseUser, UserManager as BaseUserManager, Group, Permission)
 
 from registration.models import RegistrationProfile
 
+from ..sql import PreloadQuerySet
+
+
+
+class UserManager(BaseUserManager):
+    """Manager using ``PreloadQuerySet``, so roles can be preloaded."""
+    def get_query_set(self):
+        """Return a ``PreloadQuerySet`` for all queries."""
+        return PreloadQuerySet(self.model, using=self.db)
+
+
+    def preload(self, *funcs):
+        """Return a queryset that calls ``funcs`` on fetched instances."""
+        return self.get_query_set().preload(*funcs)
+
 
 
 class User(BaseUser):
     """Proxy for contrib.auth User that adds action methods and roles alias."""
+    objects = UserManager()
+
+
     class Meta:
         proxy = True
 
@@ -68,11 +87,43 @@ class User(BaseUser):
         return self.groups
 
 
+    def role_list(self):
+        """
+        Return list of this user's roles.
+
+        Uses roles loaded by ``preload_roles``, if any.
+
+        """
+        preloaded = getattr(self, "_preloaded_roles", None)
+        if preloaded is not None:
+            return preloaded
+        return list(self.groups.order_by("name"))
+
+
 
 Role = Group
 
 
 
+def preload_roles(users):
+    """
+    Load roles of a list of users in one query.
+
+    For use with ``UserManager.preload``; ``role_list`` then needs no queries.
+
+    """
+    by_id = dict((u.id, u) for u in users)
+    for user in users:
+        user._preloaded_roles = []
+    if not by_id:
+        return
+    memberships = BaseUser.groups.through.objects.filter(
+        user__in=by_id.keys()).select_related("group").order_by("group__name")
+    for membership in memberships:
+        by_id[membership.user_id]._preloaded_roles.append(membership.group)
+
+
+
 class ModelBackend(DjangoModelBackend):
     """Authentication backend that returns instances of our proxy User model."""
     def authenticate(self, username=None, password=None):
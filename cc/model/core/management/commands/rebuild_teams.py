@@ -0,0 +1,63 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Management command to rebuild stored effective teams from scratch.
+
+"""
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+from django.db.models import get_models
+
+from cc.model.ccmodel import TeamModel
+
+
+
+class Command(NoArgsCommand):
+    help = (
+        "Rebuild the stored effective team of every product, product version "
+        "and run from their own teams.")
+
+
+    @transaction.commit_on_success
+    def handle_noargs(self, **options):
+        verbosity = int(options.get("verbosity", 1))
+
+        for model in team_models():
+            pks = list(model._base_manager.values_list("pk", flat=True))
+            model.refresh_team(pks, cascade=False)
+            if verbosity:
+                print(u"Rebuilt teams for %s %s." % (
+                    len(pks), model._meta.verbose_name_plural))
+
+
+
+def team_models():
+    """Return all team models, each after the model it inherits teams from."""
+    remaining = [m for m in get_models() if issubclass(m, TeamModel)]
+    ordered = []
+    while remaining:
+        for model in remaining:
+            parent = model.team_parent and model._meta.get_field(
+                model.team_parent).rel.to
+            if parent is None or parent in ordered:
+                ordered.append(model)
+                remaining.remove(model)
+                break
+        else:
+            raise ValueError("Cyclic team inheritance.")
+    return ordered
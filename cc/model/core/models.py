@@ -51,10 +51,14 @@ class Product(CCModel, TeamModel):
         Clone Product, with team.
 
         """
-        kwargs.setdefault("cascade", ["team"])
+        kwargs.setdefault("cascade", ["own_team"])
         overrides = kwargs.setdefault("overrides", {})
         overrides.setdefault("name", "Cloned: {0}".format(self.name))
-        return super(Product, self).clone(*args, **kwargs)
+        clone = super(Product, self).clone(*args, **kwargs)
+        # own team is copied in bulk, without signals
+        if clone.pk is not None:
+            Product.refresh_team([clone.pk])
+        return clone
 
 
     def reorder_versions(self, update_instance=None):
@@ -62,21 +66,23 @@ class Product(CCModel, TeamModel):
         Reorder versions of this product, saving new order in db.
 
         If an ``update_instance`` is given, update it with new order and
-        ``latest`` flag.
+        ``latest`` flag. Only versions whose order changed are saved; if any
+        did, latest caseversions of all cases of this product are recomputed,
+        set-based (see ``Case.set_latest_versions``).
 
         """
         ordered = sorted(self.versions.all(), key=by_version)
         for i, version in enumerate(ordered, 1):
             version.order = i
             version.latest = (i == len(ordered))
-            version.save(force_update=True, skip_reorder=True, notrack=True)
+        changed = ProductVersion.objects.bulk_save(ordered, notrack=True)
+        for version in ordered:
             if version == update_instance:
                 update_instance.order = version.order
                 update_instance.latest = version.latest
-                update_instance.cc_version += 1
-        # now we have to update latest caseversions too, @@@ too slow?
-        for case in self.cases.all():
-            case.set_latest_version()
+                update_instance.cc_version = version.cc_version
+        if changed:
+            self.cases.model.set_latest_versions(self.cases.all())
 
 
 
@@ -88,6 +94,8 @@ class ProductVersion(CCModel, TeamModel, HasEnvironmentsModel):
     # denormalized for querying
     latest = models.BooleanField(default=False, editable=False)
 
+    team_parent = "product"
+
 
     @property
     def name(self):
@@ -105,8 +113,17 @@ class ProductVersion(CCModel, TeamModel, HasEnvironmentsModel):
 
 
     def save(self, *args, **kwargs):
-        """Save productversion, updating latest version."""
+        """
+        Save productversion, updating latest version.
+
+        Versions are only reordered for a new productversion, or if its version
+        or product changed.
+
+        """
         skip_reorder = kwargs.pop("skip_reorder", False)
+        if self.pk is not None and not skip_reorder:
+            changed = set(f.name for f in self._changed_fields())
+            skip_reorder = not changed.intersection(["version", "product"])
         super(ProductVersion, self).save(*args, **kwargs)
         if not skip_reorder:
             self.product.reorder_versions(update_instance=self)
@@ -114,14 +131,16 @@ class ProductVersion(CCModel, TeamModel, HasEnvironmentsModel):
 
     def delete(self, *args, **kwargs):
         """Delete productversion, updating latest version."""
-        super(ProductVersion, self).delete(*args, **kwargs)
+        ret = super(ProductVersion, self).delete(*args, **kwargs)
         self.product.reorder_versions()
+        return ret
 
 
     def undelete(self, *args, **kwargs):
         """Undelete productversion, updating latest version."""
-        super(ProductVersion, self).undelete(*args, **kwargs)
+        ret = super(ProductVersion, self).undelete(*args, **kwargs)
         self.product.reorder_versions()
+        return ret
 
 
     def clean(self):
@@ -177,8 +196,12 @@ class ProductVersion(CCModel, TeamModel, HasEnvironmentsModel):
         overrides = kwargs.setdefault("overrides", {})
         overrides["version"] = "%s.next" % self.version
         overrides["codename"] = "Cloned: %s" % self.codename
-        kwargs.setdefault("cascade", ["environments", "team"])
-        return super(ProductVersion, self).clone(*args, **kwargs)
+        kwargs.setdefault("cascade", ["environments", "own_team"])
+        clone = super(ProductVersion, self).clone(*args, **kwargs)
+        # own team is copied in bulk, without signals
+        if clone.pk is not None:
+            ProductVersion.refresh_team([clone.pk])
+        return clone
 
 
 
@@ -19,12 +19,19 @@
 Models for environments.
 
 """
+import hashlib
 import itertools
+import json
+import operator
 from collections import defaultdict
 
 from django.db import models
+from django.db.models import Max
+from django.db.models.query import QuerySet
 
-from ..ccmodel import CCModel
+from ..ccmodel import CCModel, CCManager, CCQuerySet
+from ..sql import (
+    bulk_insert, bulk_update, bulk_delete, chunked, having, BATCH_SIZE)
 
 
 
@@ -50,20 +57,84 @@ class Profile(CCModel):
         Create profile of environments as Cartesian product of given elements.
 
         Elements are split by category, and then an environment is generated
-        for each combination of one element from each category.
+        for each combination of one element from each category. Environments
+        are inserted in bulk (see ``add_combinations``); use ``Combinations``
+        to preview them without writing anything.
 
         """
-        by_category = defaultdict(list)
-        for element in elements:
-            by_category[element.category].append(element)
-
         new = cls.objects.create(name=name, **kwargs)
+        new.add_combinations(elements, user=kwargs.get("user"))
+        return new
 
-        for element_list in itertools.product(*by_category.values()):
-            e = Environment.objects.create(profile=new)
-            e.elements.add(*element_list)
 
-        return new
+    def add_combinations(self, elements, user=None, skip_existing=True):
+        """
+        Add an environment for each combination of given elements.
+
+        Combinations are as for ``generate``; unless ``skip_existing`` is
+        False, those with the same elements as an existing environment of this
+        profile are skipped. Environments and their element links are inserted
+        in batches, with a fixed number of queries per batch and without
+        holding all combinations in memory. Returns number of environments
+        added.
+
+        """
+        skip = self.element_sets() if skip_existing else ()
+        combinations = Combinations(elements, skip)
+        category_names = dict(
+            Category._base_manager.filter(
+                pk__in=[es[0].category_id for es in combinations.categories]
+                ).values_list("id", "name")
+            )
+        through = Environment.elements.through
+        added = 0
+        for batch in chunked(combinations, BATCH_SIZE):
+            max_id = Environment._base_manager.aggregate(
+                Max("id"))["id__max"] or 0
+            bulk_insert(
+                [
+                    Environment(
+                        profile=self,
+                        signature=signature,
+                        signature_hash=signature_hash(signature),
+                        labels=element_labels(
+                            (category_names[e.category_id], e.name)
+                            for e in combination
+                            ),
+                        created_by=user,
+                        modified_by=user,
+                        )
+                    for combination, signature in (
+                        (c, element_signature(c)) for c in batch)
+                    ]
+                )
+            # auto-increment keys are assigned in insertion order
+            pks = list(
+                Environment._base_manager.filter(
+                    id__gt=max_id, profile=self).order_by(
+                    "id").values_list("id", flat=True)
+                )
+            if len(pks) != len(batch):
+                raise RuntimeError(
+                    "Concurrent creation of profile environments.")
+            bulk_insert(
+                [
+                    through(environment_id=pk, element_id=element.id)
+                    for pk, combination in zip(pks, batch)
+                    for element in combination
+                    ]
+                )
+            added += len(batch)
+        return added
+
+
+    def element_sets(self):
+        """Return set of frozensets of element IDs of this profile's envs."""
+        return set(
+            frozenset(signature_ids(signature))
+            for signature in self.environments.values_list(
+                "signature", flat=True)
+            )
 
 
     def clone(self, *args, **kwargs):
@@ -75,12 +146,72 @@ class Profile(CCModel):
 
 
     def categories(self):
-        """Return an iterable of categories that are part of this profile."""
+        """
+        Return an iterable of categories that are part of this profile.
+
+        Uses categories loaded by ``preload_categories``, if any.
+
+        """
+        preloaded = getattr(self, "_preloaded_categories", None)
+        if preloaded is not None:
+            return preloaded
         return Category.objects.filter(
             elements__environments__profile=self).distinct().order_by("name")
 
 
 
+class Combinations(object):
+    """
+    Combinations of one element from each category of the given elements.
+
+    Iterates lazily over tuples of elements (in order of category, and of
+    elements within a category as given). Combinations whose set of element IDs
+    is in ``skip`` are left out. The number of combinations (``len``) and a
+    ``sample`` are available without enumerating them all, so a profile can be
+    previewed before generating it.
+
+    """
+    def __init__(self, elements, skip=()):
+        by_category = defaultdict(list)
+        for element in elements:
+            by_category[element.category_id].append(element)
+        self.categories = [by_category[c] for c in sorted(by_category)]
+
+        category_of = dict(
+            (e.id, e.category_id) for es in self.categories for e in es)
+        self.skip = set()
+        for element_ids in skip:
+            element_ids = frozenset(element_ids)
+            categories = set(category_of.get(i) for i in element_ids)
+            if (len(element_ids) == len(self.categories) and
+                    len(categories) == len(self.categories) and
+                    None not in categories):
+                self.skip.add(element_ids)
+
+
+    def __len__(self):
+        if not self.categories:
+            return 0
+        total = reduce(operator.mul, [len(es) for es in self.categories])
+        return total - len(self.skip)
+
+
+    def __iter__(self):
+        if not self.categories:
+            return
+        for combination in itertools.product(*self.categories):
+            if self.skip and frozenset(
+                    e.id for e in combination) in self.skip:
+                continue
+            yield combination
+
+
+    def sample(self, size=10):
+        """Return a list of (up to) the first ``size`` combinations."""
+        return list(itertools.islice(self, size))
+
+
+
 class Category(CCModel):
     """
     A category of parallel environment elements.
@@ -102,23 +233,22 @@ class Category(CCModel):
         verbose_name_plural = "categories"
 
 
-    # @@@ there should be some way to annotate this onto a queryset efficiently
-    @property
-    def deletable(self):
-        """Return True if this category can be deleted, otherwise False."""
-        return not Environment.objects.filter(elements__category=self).exists()
-
-
-    # @@@ this protection should apply to queryset.delete as well
-    def delete(self, *args, **kwargs):
-        """Delete this category, or raise ProtectedError if its in use."""
-        if not self.deletable:
-            raise models.ProtectedError(
-                "Category '{0}' is in use and cannot be deleted.".format(
-                    self.name),
-                list(Environment.objects.filter(elements__category=self).all())
-                )
-        return super(Category, self).delete(*args, **kwargs)
+    @classmethod
+    def _in_use(cls, pks):
+        """Categories with elements in (non-deleted) environments are in use."""
+        return set(
+            Environment.elements.through._default_manager.filter(
+                element__category__in=pks,
+                environment__deleted_on__isnull=True,
+                ).values_list("element__category", flat=True).distinct()
+            )
+
+
+    @classmethod
+    def _in_use_by(cls, pks):
+        """Return environments using elements of categories with ``pks``."""
+        return Environment.objects.filter(
+            elements__category__in=pks).distinct().order_by("id")
 
 
 
@@ -140,23 +270,171 @@ class Element(CCModel):
         ordering = ["name"]
 
 
-    # @@@ there should be some way to annotate this onto a queryset efficiently
-    @property
-    def deletable(self):
-        """Return True if this element can be deleted, otherwise False."""
-        return not self.environments.exists()
-
-
-    # @@@ this protection should apply to queryset.delete as well
-    def delete(self, *args, **kwargs):
-        """Delete this element, or raise ProtectedError if its in use."""
-        if not self.deletable:
-            raise models.ProtectedError(
-                "Element '{0}' is in use and cannot be deleted.".format(
-                    self.name),
-                list(self.environments.all())
-                )
-        return super(Element, self).delete(*args, **kwargs)
+    @classmethod
+    def _in_use(cls, pks):
+        """Elements of (non-deleted) environments are in use."""
+        return set(
+            Environment.elements.through._default_manager.filter(
+                element__in=pks,
+                environment__deleted_on__isnull=True,
+                ).values_list("element", flat=True).distinct()
+            )
+
+
+    @classmethod
+    def _in_use_by(cls, pks):
+        """Return environments using elements with ``pks``."""
+        return Environment.objects.filter(
+            elements__in=pks).distinct().order_by("id")
+
+
+
+def element_signature(elements):
+    """
+    Return canonical signature of a set of elements (or of element IDs).
+
+    The signature is the sorted, comma-separated element IDs, with leading and
+    trailing commas (so each ID can be matched as ",id,"); empty for no
+    elements.
+
+    """
+    ids = sorted(set(int(getattr(e, "id", e)) for e in elements))
+    if not ids:
+        return u""
+    return u",{0},".format(u",".join(str(i) for i in ids))
+
+
+
+def signature_hash(signature):
+    """
+    Return indexed hash of given signature; empty for an empty signature.
+
+    Signatures of environments with many elements can be longer than any
+    column that can be indexed, so lookups by signature use the hash.
+
+    """
+    if not signature:
+        return u""
+    return hashlib.sha1(signature.encode("ascii")).hexdigest()
+
+
+
+def signature_ids(signature):
+    """Return list of element IDs in given signature."""
+    return [int(i) for i in signature.split(",") if i]
+
+
+
+def element_labels(names):
+    """
+    Return stored labels for given (category name, element name) pairs.
+
+    Labels are the element names, ordered by category name and then by name,
+    as a JSON list.
+
+    """
+    return json.dumps(
+        [name for category, name in sorted(
+                names, key=lambda n: (n[0].lower(), n[1].lower()))]
+        )
+
+
+
+class EnvironmentQuerySet(CCQuerySet):
+    """Adds lookups of environments by their set of elements."""
+    def match(self, elements):
+        """Environments with exactly the given elements (or element IDs)."""
+        signature = element_signature(elements)
+        return self.filter(
+            signature_hash=signature_hash(signature), signature=signature)
+
+
+    def including(self, elements):
+        """
+        Environments with (at least) all of the given elements.
+
+        Looks up the element links by their indexed element column, grouped
+        by environment, rather than scanning signatures.
+
+        """
+        ids = signature_ids(element_signature(elements))
+        if not ids:
+            return self._clone()
+        links = self.model.elements.through._default_manager.filter(
+            element__in=ids).values_list("environment", flat=True)
+        return self.filter(
+            pk__in=having(links, "COUNT(*) = %s", [len(ids)]))
+
+
+    def within(self, elements):
+        """
+        Environments with no elements other than the given elements.
+
+        Only environments linked to one of the given elements (by the indexed
+        element column) or with no elements at all (by the indexed signature
+        hash) are candidates; their other links are found by the indexed
+        environment column.
+
+        """
+        ids = signature_ids(element_signature(elements))
+        if not ids:
+            return self.filter(signature_hash="")
+        through = self.model.elements.through._default_manager
+        touching = through.filter(element__in=ids).values("environment")
+        outside = through.filter(environment__in=touching).exclude(
+            element__in=ids).values("environment")
+        return self.filter(
+            models.Q(pk__in=touching) | models.Q(signature_hash="")).exclude(
+            pk__in=outside)
+
+
+    def duplicates(self):
+        """
+        Return lists of IDs of environments with the same set of elements.
+
+        Environments are compared by signature (via its indexed hash); each
+        list is in ID order.
+
+        """
+        hashes = self.values("signature_hash").annotate(
+            count=models.Count("id")).filter(count__gt=1).order_by()
+        groups = defaultdict(list)
+        for batch in chunked(
+                [row["signature_hash"] for row in hashes], BATCH_SIZE):
+            for pk, signature in self.filter(
+                    signature_hash__in=batch).order_by("id").values_list(
+                    "id", "signature"):
+                groups[signature].append(pk)
+        return [ids for ids in groups.values() if len(ids) > 1]
+
+
+
+class EnvironmentManager(CCManager):
+    """Manager for environments, adding element-set lookups."""
+    def get_query_set(self):
+        """Return an ``EnvironmentQuerySet`` for all queries."""
+        return super(EnvironmentManager, self).get_query_set()._clone(
+            klass=EnvironmentQuerySet)
+
+
+    def match(self, elements):
+        """See ``EnvironmentQuerySet.match``."""
+        return self.get_query_set().match(elements)
+
+
+    def including(self, elements):
+        """See ``EnvironmentQuerySet.including``."""
+        return self.get_query_set().including(elements)
+
+
+    def within(self, elements):
+        """See ``EnvironmentQuerySet.within``."""
+        return self.get_query_set().within(elements)
+
+
+    def duplicates(self):
+        """See ``EnvironmentQuerySet.duplicates``."""
+        return self.get_query_set().duplicates()
 
 
 
@@ -177,11 +455,21 @@ class Environment(CCModel):
         Profile, blank=True, null=True, related_name="environments")
 
     elements = models.ManyToManyField(Element, related_name="environments")
+    # denormalized for matching by set of elements; see ``element_signature``
+    signature = models.TextField(blank=True, editable=False)
+    # indexed for lookups by signature; see ``signature_hash``
+    signature_hash = models.CharField(
+        max_length=40, db_index=True, blank=True, editable=False)
+    # denormalized for display; see ``element_names``
+    labels = models.TextField(blank=True, default="[]", editable=False)
+
+    everything = EnvironmentManager(show_deleted=True)
+    objects = EnvironmentManager(show_deleted=False)
 
 
     def __unicode__(self):
         """Return unicode representation."""
-        return u", ".join(unicode(e) for e in self.ordered_elements())
+        return u", ".join(self.element_names)
 
 
     class Meta:
@@ -193,9 +481,98 @@ class Environment(CCModel):
             ]
 
 
+    @property
+    def element_names(self):
+        """
+        Names of all elements, in category name order.
+
+        Read from the stored ``labels``, so no query is needed.
+
+        """
+        return json.loads(self.labels or "[]")
+
+
     def ordered_elements(self):
-        """All elements in category name order."""
-        return iter(self.elements.order_by("category__name"))
+        """
+        All elements in category name order.
+
+        Uses elements loaded by ``load_elements``, if any; otherwise queries.
+
+        """
+        loaded = getattr(self, "_ordered_elements", None)
+        if loaded is None:
+            return iter(self.elements.order_by("category__name", "name"))
+        return iter(loaded)
+
+
+    @classmethod
+    def load_elements(cls, environments):
+        """
+        Load ordered elements (and their categories) of many environments.
+
+        After this, ``ordered_elements`` of each of the given environments
+        needs no query; elements of all of them are fetched with one query per
+        batch. Returns the environments, as a list.
+
+        """
+        environments = list(environments)
+        by_id = defaultdict(list)
+        for env in environments:
+            env._ordered_elements = []
+            by_id[env.id].append(env)
+        through = cls.elements.through._default_manager
+        for batch in chunked(by_id, BATCH_SIZE):
+            for link in through.filter(environment__in=batch).select_related(
+                    "element__category"):
+                for env in by_id[link.environment_id]:
+                    env._ordered_elements.append(link.element)
+        for env in environments:
+            env._ordered_elements.sort(
+                key=lambda e: (e.category.name.lower(), e.name.lower()))
+        return environments
+
+
+    @classmethod
+    def refresh_elements(cls, pks):
+        """
+        Recompute stored signatures and labels of environments with ``pks``.
+
+        These are kept current on ``m2m_changed`` and when elements or
+        categories are renamed; code that writes element links in bulk either
+        sets them itself (cloning copies them, ``Profile.add_combinations``
+        computes them) or should call this. Returns dictionary mapping each pk
+        to a dictionary of the stored values, by field name.
+
+        """
+        through = cls.elements.through._default_manager
+        fields = [
+            cls._meta.get_field("signature"),
+            cls._meta.get_field("signature_hash"),
+            cls._meta.get_field("labels"),
+            ]
+        values = {}
+        for batch in chunked(set(pks), BATCH_SIZE):
+            ids = dict((pk, []) for pk in batch)
+            names = dict((pk, []) for pk in batch)
+            for env_id, element_id, name, category in through.filter(
+                    environment__in=batch).values_list(
+                    "environment",
+                    "element",
+                    "element__name",
+                    "element__category__name",
+                    ):
+                ids[env_id].append(element_id)
+                names[env_id].append((category, name))
+            for pk in batch:
+                signature = element_signature(ids[pk])
+                values[pk] = {
+                    "signature": signature,
+                    "signature_hash": signature_hash(signature),
+                    "labels": element_labels(names[pk]),
+                    }
+            bulk_update(
+                [(cls(id=pk, **values[pk]), fields) for pk in batch])
+        return values
 
 
     def clone(self, *args, **kwargs):
@@ -204,25 +581,24 @@ class Environment(CCModel):
         return super(Environment, self).clone(*args, **kwargs)
 
 
-    # @@@ there should be some way to annotate this onto a queryset efficiently
-    @property
-    def deletable(self):
-        """Return True if this environment can be deleted, otherwise False."""
+    @classmethod
+    def _in_use(cls, pks):
+        """Environments of (non-deleted) product versions are in use."""
         from cc.model import ProductVersion
-        return not ProductVersion.objects.filter(environments=self).exists()
-
-
-    # @@@ this protection should apply to queryset.delete as well
-    def delete(self, *args, **kwargs):
-        """Delete this environment, or raise ProtectedError if its in use."""
-        if not self.deletable:
-            from cc.model import ProductVersion
-            raise models.ProtectedError(
-                "Environment '{0}' is in use and cannot be deleted.".format(
-                    str(self)),
-                list(ProductVersion.objects.filter(environments=self).all())
-                )
-        return super(Environment, self).delete(*args, **kwargs)
+        return set(
+            ProductVersion.environments.through._default_manager.filter(
+                environment__in=pks,
+                productversion__deleted_on__isnull=True,
+                ).values_list("environment", flat=True).distinct()
+            )
+
+
+    @classmethod
+    def _in_use_by(cls, pks):
+        """Return product versions using environments with ``pks``."""
+        from cc.model import ProductVersion
+        return ProductVersion.objects.filter(
+            environments__in=pks).distinct().order_by("id")
 
 
     def remove_from_profile(self, user=None):
@@ -235,6 +611,82 @@ class Environment(CCModel):
 
 
 
+def preload_categories(profiles):
+    """
+    Load categories of a list of profiles in two queries.
+
+    For use with ``CCQuerySet.preload``; ``categories`` then needs no queries.
+
+    """
+    by_id = dict((p.id, p) for p in profiles)
+    for profile in profiles:
+        profile._preloaded_categories = []
+    if not by_id:
+        return
+    pairs = list(
+        Environment.elements.through.objects.filter(
+            environment__profile__in=by_id.keys()).values_list(
+            "environment__profile", "element__category").distinct()
+        )
+    categories = Category.objects.in_bulk(set(c for p, c in pairs))
+    for profile_id, category_id in pairs:
+        if category_id in categories:
+            by_id[profile_id]._preloaded_categories.append(
+                categories[category_id])
+    for profile in profiles:
+        profile._preloaded_categories.sort(key=lambda c: c.name)
+
+
+
+def _elements_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep environment signatures and labels current on element changes."""
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+    if not reverse:
+        values = Environment.refresh_elements([instance.pk])[instance.pk]
+        for name, value in values.items():
+            setattr(instance, name, value)
+        instance._mark_saved(
+            [instance._meta.get_field(name) for name in values])
+        instance._ordered_elements = None
+    elif action == "post_clear":
+        # the signature still lists the element
+        Environment.refresh_elements(
+            Environment._base_manager.filter(
+                signature__contains=",{0},".format(instance.pk)
+                ).values_list("pk", flat=True)
+            )
+    else:
+        Environment.refresh_elements(pk_set)
+
+
+
+def _renamed(sender, instance, created, update_fields=None, **kwargs):
+    """Keep environment labels current when elements or categories change."""
+    if created:
+        return
+    if update_fields is not None:
+        # an element's label includes its category's name
+        labelled = ["name", "category"] if sender is Element else ["name"]
+        if not update_fields & set(labelled):
+            return
+    if sender is Element:
+        environments = Environment._base_manager.filter(elements=instance)
+    else:
+        environments = Environment._base_manager.filter(
+            elements__category=instance)
+    Environment.refresh_elements(
+        environments.values_list("pk", flat=True).distinct())
+
+
+
+models.signals.m2m_changed.connect(
+    _elements_changed, sender=Environment.elements.through)
+models.signals.post_save.connect(_renamed, sender=Element)
+models.signals.post_save.connect(_renamed, sender=Category)
+
+
+
 class HasEnvironmentsModel(models.Model):
     """
     Base for models that inherit/cascade environments to/from parents/children.
@@ -279,40 +731,101 @@ class HasEnvironmentsModel(models.Model):
         Return model instances to cascade env profile changes to.
 
         Return value should be a dictionary mapping model classes to iterables
-        of model instances to cascade to.
+        of model instances (or querysets) to cascade to.
 
-        ``objs`` arg is list of objs`` of this class to cascade from;
-        ``adding`` arg is True if cascading for an addition of envs to the
-        profile, False if cascading a removal.
+        ``objs`` arg is list of objs`` (or a queryset) of this class to
+        cascade from; ``adding`` arg is True if cascading for an addition of
+        envs to the profile, False if cascading a removal.
 
         """
         return {}
 
 
     @classmethod
-    def _remove_envs(cls, objs, envs):
-        """Remove one or environments from one or more objects of this class."""
-        for model, instances in cls.cascade_envs_to(objs, adding=False).items():
-            model._remove_envs(instances, envs)
-        m2m_reverse_name = cls.environments.field.related_query_name()
-        cls.environments.through._base_manager.filter(
-            **{
-                "{0}__in".format(m2m_reverse_name): objs,
-                "environment__in": envs
-                }
-              ).delete()
+    def bulk_add_envs(cls, objs, envs):
+        """
+        Add environments to many objects of this class, and cascade.
+
+        ``objs`` may be a list of instances or IDs, or a queryset; ``envs`` a
+        list of environments or their IDs. Through-table rows are inserted in
+        bulk (skipping any that already exist) for all objects at once, and
+        the addition cascades the same way to each model in
+        ``cascade_envs_to``: queries are per model and batch, not per object.
+        No ``m2m_changed`` signals are sent.
+
+        """
+        env_ids = set(int(getattr(e, "id", e)) for e in envs)
+        if not env_ids:
+            return
+        field = cls.environments.field
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        through = field.rel.through
+        for batch in chunked(_ids(objs), BATCH_SIZE):
+            existing = set(
+                through._base_manager.filter(
+                    **{
+                        "{0}__in".format(source): batch,
+                        "{0}__in".format(target): env_ids,
+                        }
+                    ).values_list(source, target)
+                )
+            bulk_insert(
+                [
+                    through(
+                        **{
+                            "{0}_id".format(source): obj_id,
+                            "{0}_id".format(target): env_id,
+                            }
+                        )
+                    for obj_id in batch
+                    for env_id in env_ids
+                    if (obj_id, env_id) not in existing
+                    ]
+                )
+        for model, instances in cls.cascade_envs_to(objs, adding=True).items():
+            model.bulk_add_envs(instances, env_ids)
+
+
+    @classmethod
+    def bulk_remove_envs(cls, objs, envs):
+        """
+        Remove environments from many objects of this class, and cascade.
+
+        Arguments are as for ``bulk_add_envs``. The removal cascades first,
+        then this model's through-table rows are deleted with a single
+        statement. No ``m2m_changed`` signals are sent.
+
+        """
+        env_ids = set(int(getattr(e, "id", e)) for e in envs)
+        if not env_ids:
+            return
+        for model, instances in cls.cascade_envs_to(
+                objs, adding=False).items():
+            model.bulk_remove_envs(instances, env_ids)
+        field = cls.environments.field
+        bulk_delete(
+            field.rel.through._base_manager.filter(
+                **{
+                    "{0}__in".format(field.m2m_field_name()): objs,
+                    "{0}__in".format(field.m2m_reverse_field_name()): env_ids,
+                    }
+                )
+            )
 
 
     def remove_envs(self, *envs):
         """Remove one or more environments from this object's profile."""
-        self._remove_envs([self], envs)
+        self.bulk_remove_envs([self], envs)
 
 
     def add_envs(self, *envs):
         """Add one or more environments to this object's profile."""
-        # @@@ optimize this to reduce queries once we have bulk insert in 1.4
-        self.environments.add(*envs)
-        for model, instances in self.cascade_envs_to(
-                [self], adding=True).items():
-            for instance in instances:
-                instance.add_envs(*envs)
+        self.bulk_add_envs([self], envs)
+
+
+
+def _ids(objs):
+    """Return list of IDs of ``objs`` (instances or IDs, or a queryset)."""
+    if isinstance(objs, QuerySet):
+        return list(objs.values_list("pk", flat=True))
+    return [int(getattr(o, "pk", o)) for o in objs]
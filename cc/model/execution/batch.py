@@ -0,0 +1,361 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Bulk submission of results, for automated test harnesses.
+
+"""
+from collections import defaultdict
+import json
+
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+
+from ..ccmodel import utcnow
+from ..library.models import CaseStep
+from ..sql import bulk_insert, chunked, BATCH_SIZE
+from .models import (
+    RunCaseVersion, Result, StepResult, BugReference, ResultBatch,
+    refresh_stats)
+
+
+
+# statuses that can be submitted
+STATUSES = [
+    Result.STATUS.started,
+    Result.STATUS.passed,
+    Result.STATUS.failed,
+    Result.STATUS.invalidated,
+    ]
+
+
+
+def submit_results(run, tester, records, batch_key=None):
+    """
+    Record results of many runcaseversions in ``run`` by ``tester``.
+
+    ``records`` is a list of dictionaries with keys "runcaseversion" and
+    "environment" (IDs), "status" (one of ``STATUSES``), and optionally
+    "comment"; failed results can also have "stepnumber" and "bug".
+
+    Each record updates the tester's existing result for its
+    runcaseversion/environment, or creates one. Submitting "started" restarts
+    the result, as the ``Result.restart`` method does. Everything is written
+    in one transaction, with a fixed number of queries per batch of records.
+
+    Returns a list of outcomes, one per record and in the same order: a
+    dictionary with "outcome" of "created" or "updated" and the "result" ID,
+    or "outcome" of "invalid" and a list of "errors". Invalid records are
+    skipped; valid records are written regardless.
+
+    If ``batch_key`` is given and ``tester`` has already submitted a batch
+    with that key, nothing is written and the original outcomes are returned.
+
+    """
+    if batch_key is None:
+        return _submit(run, tester, records, None)
+    outcomes = _prior_outcomes(tester, batch_key)
+    if outcomes is None:
+        try:
+            outcomes = _submit(run, tester, records, batch_key)
+        except IntegrityError:
+            # a concurrent submission of the same batch was recorded first
+            outcomes = _prior_outcomes(tester, batch_key)
+            if outcomes is None:
+                raise
+    return outcomes
+
+
+
+def _prior_outcomes(tester, batch_key):
+    """Return outcomes of ``tester``'s batch with given key, or None."""
+    try:
+        batch = ResultBatch.objects.get(tester=tester, key=batch_key)
+    except ResultBatch.DoesNotExist:
+        return None
+    return json.loads(batch.outcomes)
+
+
+
+def _submit(run, tester, records, batch_key):
+    """
+    Validate and write ``records``; return outcomes.
+
+    Inside a managed transaction (e.g. a request's), the writes are wrapped in
+    a savepoint, so a failure rolls back only this submission and never
+    commits the caller's work; otherwise they are committed, or rolled back
+    on failure, as a unit.
+
+    """
+    if transaction.is_managed():
+        sid = transaction.savepoint()
+        try:
+            outcomes = _submit_all(run, tester, records, batch_key)
+        except Exception:
+            transaction.savepoint_rollback(sid)
+            raise
+        transaction.savepoint_commit(sid)
+        return outcomes
+    with transaction.commit_on_success():
+        return _submit_all(run, tester, records, batch_key)
+
+
+
+def _submit_all(run, tester, records, batch_key):
+    """Validate and write ``records``; return outcomes."""
+    batch = None
+    if batch_key is not None:
+        # claim the key before writing anything, so a concurrent submission
+        # of the same batch fails here rather than after writing results
+        batch = ResultBatch.objects.create(
+            tester=tester, key=batch_key, run=run, outcomes="[]")
+
+    outcomes = [None] * len(records)
+    valid = []
+    seen = {}
+    for i, record in enumerate(records):
+        try:
+            record = _clean(record)
+        except ValueError as e:
+            outcomes[i] = {"outcome": "invalid", "errors": [str(e)]}
+            continue
+        key = (record["runcaseversion"], record["environment"])
+        if key in seen:
+            outcomes[i] = {
+                "outcome": "invalid",
+                "errors": ["Duplicate of record {0}.".format(seen[key])],
+                }
+            continue
+        seen[key] = i
+        valid.append((i, record))
+
+    rcv_ids = set()
+    for chunk in chunked(valid, BATCH_SIZE):
+        by_index = dict(chunk)
+        for i, outcome in _write(run, tester, chunk):
+            outcomes[i] = outcome
+            if outcome["outcome"] != "invalid":
+                rcv_ids.add(by_index[i]["runcaseversion"])
+    # results were written without Result.save; bring their stats up to date
+    refresh_stats(rcv_ids)
+
+    if batch is not None:
+        ResultBatch.objects.filter(pk=batch.pk).update(
+            outcomes=json.dumps(outcomes))
+    return outcomes
+
+
+
+def _clean(record):
+    """Return normalized copy of submitted ``record``; ValueError if bad."""
+    if not isinstance(record, dict):
+        raise ValueError("Record must be an object.")
+    cleaned = {}
+    for name in ["runcaseversion", "environment"]:
+        try:
+            cleaned[name] = int(record[name])
+        except KeyError:
+            raise ValueError("Missing {0}.".format(name))
+        except (TypeError, ValueError):
+            raise ValueError("Invalid {0} ID.".format(name))
+
+    cleaned["status"] = record.get("status")
+    if cleaned["status"] not in STATUSES:
+        raise ValueError(
+            "Status must be one of {0}.".format(", ".join(STATUSES)))
+
+    for name in ["comment", "bug"]:
+        cleaned[name] = record.get(name) or ""
+        if not isinstance(cleaned[name], basestring):
+            raise ValueError("Invalid {0}.".format(name))
+    if len(cleaned["bug"]) > StepResult._meta.get_field("bug_url").max_length:
+        raise ValueError("Bug URL is too long.")
+
+    stepnumber = record.get("stepnumber")
+    if stepnumber is not None:
+        if cleaned["status"] != Result.STATUS.failed:
+            raise ValueError("Only failed results can have a stepnumber.")
+        try:
+            stepnumber = int(stepnumber)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid stepnumber.")
+    cleaned["stepnumber"] = stepnumber
+
+    if cleaned["status"] == Result.STATUS.started:
+        cleaned["comment"] = ""
+    return cleaned
+
+
+
+def _write(run, tester, batch):
+    """
+    Write a batch of cleaned ``(index, record)`` pairs.
+
+    Returns list of ``(index, outcome)`` pairs.
+
+    """
+    now = utcnow()
+    records = [r for i, r in batch]
+
+    caseversions = dict(
+        run.runcaseversions.filter(
+            id__in=set(r["runcaseversion"] for r in records)).values_list(
+            "id", "caseversion")
+        )
+    env_pairs = set(
+        RunCaseVersion.environments.through._default_manager.filter(
+            runcaseversion__in=caseversions.keys()).values_list(
+            "runcaseversion", "environment")
+        )
+    stepnumbers = set(r["stepnumber"] for r in records if r["stepnumber"])
+    steps = {}
+    if stepnumbers:
+        steps = dict(
+            ((cv_id, number), step_id)
+            for step_id, cv_id, number in CaseStep.objects.filter(
+                caseversion__in=set(caseversions.values()),
+                number__in=stepnumbers,
+                ).values_list("id", "caseversion", "number")
+            )
+    # if a tester has duplicate results, the latest one is updated
+    existing = dict(
+        ((rcv_id, env_id), result_id)
+        for result_id, rcv_id, env_id in Result.objects.filter(
+            tester=tester,
+            runcaseversion__in=caseversions.keys(),
+            environment__in=set(r["environment"] for r in records),
+            ).order_by("id").values_list("id", "runcaseversion", "environment")
+        )
+
+    outcomes = []
+    updates = defaultdict(list)
+    new_results = []
+    failed_steps = []
+    for i, r in batch:
+        key = (r["runcaseversion"], r["environment"])
+        rcv_id, env_id = key
+        errors = []
+        if rcv_id not in caseversions:
+            errors.append(
+                "Runcaseversion {0} is not in this run.".format(rcv_id))
+        elif key not in env_pairs:
+            errors.append(
+                "Environment {0} is not valid for runcaseversion {1}.".format(
+                    env_id, rcv_id))
+        elif r["stepnumber"]:
+            step_id = steps.get((caseversions[rcv_id], r["stepnumber"]))
+            if step_id is None:
+                errors.append(
+                    "Runcaseversion {0} has no step {1}.".format(
+                        rcv_id, r["stepnumber"]))
+            else:
+                failed_steps.append((key, step_id, r["bug"]))
+        if errors:
+            outcomes.append((i, {"outcome": "invalid", "errors": errors}))
+        elif key in existing:
+            updates[(r["status"], r["comment"])].append(existing[key])
+            outcomes.append(
+                (i, {"outcome": "updated", "result": existing[key]}))
+        else:
+            new_results.append(
+                Result(
+                    tester=tester,
+                    runcaseversion_id=rcv_id,
+                    environment_id=env_id,
+                    status=r["status"],
+                    comment=r["comment"],
+                    started=now,
+                    completed=(
+                        None if r["status"] == Result.STATUS.started else now),
+                    created_by=tester,
+                    modified_by=tester,
+                    )
+                )
+            outcomes.append((i, {"outcome": "created", "result": key}))
+
+    for (status, comment), result_ids in updates.items():
+        fields = {"status": status, "comment": comment, "completed": now}
+        if status == Result.STATUS.started:
+            fields.update({"started": now, "completed": None})
+            StepResult.objects.filter(result__in=result_ids).delete(
+                user=tester)
+        Result.objects.filter(pk__in=result_ids).update(user=tester, **fields)
+
+    if new_results:
+        max_id = Result._base_manager.aggregate(Max("id"))["id__max"] or 0
+        bulk_insert(new_results)
+        created = dict(
+            ((rcv_id, env_id), result_id)
+            for result_id, rcv_id, env_id in Result.objects.filter(
+                id__gt=max_id,
+                tester=tester,
+                runcaseversion__in=set(
+                    r.runcaseversion_id for r in new_results),
+                ).values_list("id", "runcaseversion", "environment")
+            )
+        existing.update(created)
+        for i, outcome in outcomes:
+            if outcome["outcome"] == "created":
+                outcome["result"] = created[outcome["result"]]
+
+    if failed_steps:
+        _fail_steps(
+            tester,
+            [(existing[key], step_id, bug)
+             for key, step_id, bug in failed_steps]
+            )
+
+    return outcomes
+
+
+
+def _fail_steps(tester, failures):
+    """Record failed step results given ``(result_id, step_id, bug)``."""
+    existing = dict(
+        ((result_id, step_id), sr_id)
+        for sr_id, result_id, step_id in StepResult.objects.filter(
+            result__in=set(f[0] for f in failures),
+            step__in=set(f[1] for f in failures),
+            ).values_list("id", "result", "step")
+        )
+    updates = defaultdict(list)
+    new_stepresults = []
+    for result_id, step_id, bug in failures:
+        try:
+            updates[bug].append(existing[(result_id, step_id)])
+        except KeyError:
+            new_stepresults.append(
+                StepResult(
+                    result_id=result_id,
+                    step_id=step_id,
+                    status=StepResult.STATUS.failed,
+                    bug_url=bug,
+                    created_by=tester,
+                    modified_by=tester,
+                    )
+                )
+    for bug, stepresult_ids in updates.items():
+        StepResult.objects.filter(pk__in=stepresult_ids).update(
+            user=tester, status=StepResult.STATUS.failed, bug_url=bug)
+    bulk_insert(new_stepresults)
+    # step results were written without StepResult.save
+    BugReference.refresh(
+        StepResult.objects.filter(
+            result__in=set(f[0] for f in failures),
+            step__in=set(f[1] for f in failures),
+            )
+        )
@@ -0,0 +1,221 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Streaming export of results, for reporting.
+
+"""
+import csv
+import json
+from cStringIO import StringIO
+
+from ..environments.models import Environment
+from ..sql import BATCH_SIZE
+from .models import Result, StepResult
+
+
+
+# export column names, and the result fields (or lookups) they come from
+COLUMNS = [
+    ("id", "id"),
+    ("run_id", "runcaseversion__run"),
+    ("run", "runcaseversion__run__name"),
+    ("product", "runcaseversion__run__productversion__product__name"),
+    ("version", "runcaseversion__run__productversion__version"),
+    ("case_id", "runcaseversion__caseversion__case"),
+    ("caseversion_id", "runcaseversion__caseversion"),
+    ("case", "runcaseversion__caseversion__name"),
+    ("environment_id", "environment"),
+    ("tester", "tester__username"),
+    ("status", "status"),
+    ("started", "started"),
+    ("completed", "completed"),
+    ("comment", "comment"),
+    ]
+
+# bytes of output to collect before yielding it to the response
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = ["csv", "jsonl"]
+
+
+
+def filter_results(run=None, productversion=None, since=None, until=None):
+    """
+    Return queryset of results to export.
+
+    Optionally limited to results in ``run``, in runs of ``productversion``,
+    or last modified on or after ``since`` and before ``until`` (datetimes).
+
+    """
+    results = Result.objects.all()
+    if run is not None:
+        results = results.filter(runcaseversion__run=run)
+    if productversion is not None:
+        results = results.filter(
+            runcaseversion__run__productversion=productversion)
+    if since is not None:
+        results = results.filter(modified_on__gte=since)
+    if until is not None:
+        results = results.filter(modified_on__lt=until)
+    return results
+
+
+
+def export_rows(results, batch_size=BATCH_SIZE):
+    """
+    Yield a dictionary for each result in ``results`` queryset, in ID order.
+
+    Related names are joined in SQL; results are fetched in batches, keyed on
+    ID rather than using offsets, so memory use and the cost of each query
+    stay constant however many results there are. Each batch costs three
+    queries: results, environment elements, and step results.
+
+    Each row has the keys named in ``COLUMNS``, plus "environment" (element
+    names) and "stepresults" (list of dictionaries with step "number",
+    "status" and "bug_url").
+
+    """
+    names = [name for name, lookup in COLUMNS]
+    lookups = [lookup for name, lookup in COLUMNS]
+    environments = {}
+    last_id = 0
+    while True:
+        batch = list(
+            results.filter(id__gt=last_id).order_by("id").values_list(
+                *lookups)[:batch_size])
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        rows = [dict(zip(names, values)) for values in batch]
+
+        env_ids = set(r["environment_id"] for r in rows) - set(environments)
+        if env_ids:
+            environments.update(_environment_labels(env_ids))
+
+        stepresults = dict((r["id"], []) for r in rows)
+        for result_id, number, status, bug_url in StepResult.objects.filter(
+                result__in=stepresults.keys()).order_by(
+                "step__number").values_list(
+                "result", "step__number", "status", "bug_url"):
+            stepresults[result_id].append(
+                {"number": number, "status": status, "bug_url": bug_url})
+
+        for row in rows:
+            row["environment"] = environments[row["environment_id"]]
+            row["stepresults"] = stepresults[row["id"]]
+            yield row
+
+
+
+def _environment_labels(env_ids):
+    """Return dict mapping given environment IDs to their element names."""
+    labels = dict((i, []) for i in env_ids)
+    for env_id, name in Environment.elements.through._default_manager.filter(
+            environment__in=env_ids,
+            element__deleted_on__isnull=True,
+            ).order_by("element__category__name", "element__name").values_list(
+            "environment", "element__name"):
+        labels[env_id].append(name)
+    return dict((i, u", ".join(names)) for i, names in labels.items())
+
+
+
+def export_csv(rows):
+    """
+    Yield UTF-8 CSV text: a header line, then a line per row.
+
+    Step results are summarized as space-separated "failed_steps" numbers and
+    "bug_urls".
+
+    """
+    columns = [name for name, lookup in COLUMNS] + [
+        "environment", "failed_steps", "bug_urls"]
+    buf = StringIO()
+    writer = csv.writer(buf)
+
+    writer.writerow(columns)
+    yield _flush(buf)
+
+    for row in rows:
+        row = row.copy()
+        stepresults = row.pop("stepresults")
+        row["failed_steps"] = u" ".join(
+            unicode(sr["number"]) for sr in stepresults
+            if sr["status"] == StepResult.STATUS.failed)
+        row["bug_urls"] = u" ".join(
+            sr["bug_url"] for sr in stepresults if sr["bug_url"])
+        writer.writerow([_csv_value(row[c]) for c in columns])
+        yield _flush(buf)
+
+
+
+def export_jsonl(rows):
+    """Yield JSON Lines text: one JSON object per row."""
+    for row in rows:
+        yield json.dumps(row, default=_json_default) + "\n"
+
+
+
+def _flush(buf):
+    """Return and clear contents of StringIO ``buf``."""
+    value = buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    return value
+
+
+
+def _csv_value(value):
+    """Prepare a value for the (bytes-only) csv writer."""
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    return value
+
+
+
+def _json_default(value):
+    """Serialize datetimes as ISO 8601."""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+
+def export(results, format="csv"):
+    """
+    Yield ``results`` queryset exported in given format (see ``FORMATS``).
+
+    Output is yielded in chunks of roughly ``CHUNK_SIZE`` bytes.
+
+    """
+    writer = {"csv": export_csv, "jsonl": export_jsonl}[format]
+    chunk = []
+    size = 0
+    for text in writer(export_rows(results)):
+        chunk.append(text)
+        size += len(text)
+        if size >= CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield "".join(chunk)
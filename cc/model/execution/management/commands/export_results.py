@@ -0,0 +1,97 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Management command to export results as CSV or JSON Lines.
+
+"""
+import datetime
+from optparse import make_option
+import sys
+
+from django.core.management.base import NoArgsCommand, CommandError
+
+from cc.model.core.models import ProductVersion
+from cc.model.execution.export import export, filter_results, FORMATS
+from cc.model.execution.models import Run
+
+
+
+class Command(NoArgsCommand):
+    help = (
+        "Write results (with step results) to stdout as CSV or JSON Lines, "
+        "optionally limited to a run, product version, or date range of last "
+        "modification.")
+
+    option_list = NoArgsCommand.option_list + (
+        make_option(
+            "--run",
+            dest="run",
+            type="int",
+            help="Export only results in the run with this ID."),
+        make_option(
+            "--productversion",
+            dest="productversion",
+            type="int",
+            help="Export only results in runs of the product version with "
+            "this ID."),
+        make_option(
+            "--since",
+            dest="since",
+            help="Export only results modified on or after this date "
+            "(YYYY-MM-DD)."),
+        make_option(
+            "--until",
+            dest="until",
+            help="Export only results modified before this date "
+            "(YYYY-MM-DD)."),
+        make_option(
+            "--format",
+            dest="format",
+            default="csv",
+            choices=FORMATS,
+            help="Output format: {0} (default csv).".format(
+                ", ".join(FORMATS))),
+        )
+
+
+    def handle_noargs(self, **options):
+        filters = {
+            "since": self._date(options.get("since")),
+            "until": self._date(options.get("until")),
+            }
+        for name, model in [
+                ("run", Run), ("productversion", ProductVersion)]:
+            if options.get(name) is not None:
+                try:
+                    filters[name] = model.objects.get(pk=options[name])
+                except model.DoesNotExist:
+                    raise CommandError(
+                        "No {0} with ID {1}.".format(name, options[name]))
+
+        for chunk in export(filter_results(**filters), options["format"]):
+            sys.stdout.write(chunk)
+
+
+    def _date(self, value):
+        """Parse YYYY-MM-DD ``value`` to a date; None if not given."""
+        if value is None:
+            return None
+        try:
+            return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError("Invalid date {0!r}.".format(value))
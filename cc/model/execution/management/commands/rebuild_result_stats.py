@@ -0,0 +1,119 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Management command to rebuild denormalized result stats, or check for drift.
+
+"""
+from collections import defaultdict
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+
+from cc.model.execution.models import (
+    Run, RunCaseVersion, RunStats, RunCaseVersionStats, refresh_stats)
+from cc.model.sql import chunked, BATCH_SIZE
+
+
+
+class Command(NoArgsCommand):
+    help = (
+        "Rebuild result stats for all runs and runcaseversions from scratch. "
+        "With --check, only report stats that have drifted.")
+
+    option_list = NoArgsCommand.option_list + (
+        make_option(
+            "--check",
+            action="store_true",
+            dest="check",
+            default=False,
+            help="Report drifted stats without changing anything."),
+        )
+
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get("verbosity", 1))
+
+        if options.get("check"):
+            self.check(verbosity)
+        else:
+            self.rebuild(verbosity)
+
+
+    @transaction.commit_on_success
+    def rebuild(self, verbosity):
+        """Recompute and store stats for every runcaseversion and run."""
+        refresh_stats(RunCaseVersion._base_manager.all())
+        run_ids = Run._base_manager.values_list("id", flat=True)
+        for batch in chunked(run_ids, BATCH_SIZE):
+            RunStats.refresh(batch)
+
+        if verbosity:
+            print("Rebuilt result stats for %s runcaseversions and %s runs." % (
+                RunCaseVersionStats.objects.count(), RunStats.objects.count()))
+
+
+    def check(self, verbosity):
+        """Compare stored stats to stats computed from results."""
+        drifted = 0
+
+        expected_runs = defaultdict(lambda: defaultdict(int))
+        rcvs = RunCaseVersion._base_manager.values_list(
+            "id", "run", "deleted_on")
+        for batch in chunked(rcvs, BATCH_SIZE):
+            expected = RunCaseVersionStats.compute([r[0] for r in batch])
+            stored = RunCaseVersionStats.objects.in_bulk(expected.keys())
+            for rcv_id, run_id, deleted_on in batch:
+                counts = expected[rcv_id].counts()
+                if deleted_on is None:
+                    for c, val in counts.items():
+                        expected_runs[run_id][c] += val
+                if self._drifted(
+                        "Runcaseversion", rcv_id, counts,
+                        stored.get(rcv_id), verbosity):
+                    drifted += 1
+
+        run_ids = Run._base_manager.values_list("id", flat=True)
+        for batch in chunked(run_ids, BATCH_SIZE):
+            stored = RunStats.objects.in_bulk(batch)
+            for run_id in batch:
+                counts = dict(
+                    (c, expected_runs[run_id][c]) for c in RunStats.COUNTERS)
+                if self._drifted(
+                        "Run", run_id, counts, stored.get(run_id), verbosity):
+                    drifted += 1
+
+        if verbosity:
+            print("%s result stats drifted." % drifted)
+
+
+    def _drifted(self, label, obj_id, counts, stats, verbosity):
+        """Return True (and report) if ``stats`` don't match ``counts``."""
+        if stats is None:
+            # missing stats are only drift if there's something to count
+            if not any(counts.values()):
+                return False
+            stored = None
+        else:
+            stored = stats.counts()
+            if stored == counts:
+                return False
+        if verbosity:
+            print("%s %s: stored %r, expected %r." % (
+                label, obj_id, stored, counts))
+        return True
@@ -19,10 +19,13 @@
 Models for test execution (runs, results).
 
 """
+from collections import defaultdict
 import datetime
+import time
 
 from django.core.exceptions import ValidationError
-from django.db import connection, models
+from django.db import models
+from django.db.models.query import QuerySet
 
 from model_utils import Choices
 
@@ -30,7 +33,8 @@ from ..ccmodel import CCModel, TeamModel, DraftStatusModel, utcnow
 from ..core.auth import User
 from ..core.models import ProductVersion
 from ..environments.models import Environment, HasEnvironmentsModel
-from ..library.models import CaseVersion, Suite, CaseStep, SuiteCase
+from ..library.models import CaseVersion, Suite, CaseStep
+from ..sql import bulk_insert, chunked, BATCH_SIZE
 
 
 
@@ -47,6 +51,8 @@ class Run(CCModel, TeamModel, DraftStatusModel, HasEnvironmentsModel):
     suites = models.ManyToManyField(
         Suite, through="RunSuite", related_name="runs")
 
+    team_parent = "productversion"
+
 
     def __unicode__(self):
         """Return unicode representation."""
@@ -78,62 +84,144 @@ class Run(CCModel, TeamModel, DraftStatusModel, HasEnvironmentsModel):
     def clone(self, *args, **kwargs):
         """Clone this Run with default cascade behavior."""
         kwargs.setdefault(
-            "cascade", ["runsuites", "environments", "team"])
+            "cascade", ["runsuites", "environments", "own_team"])
         overrides = kwargs.setdefault("overrides", {})
         overrides["status"] = self.STATUS.draft
         overrides.setdefault("name", "Cloned: {0}".format(self.name))
-        return super(Run, self).clone(*args, **kwargs)
+        clone = super(Run, self).clone(*args, **kwargs)
+        # own team is copied in bulk, without signals
+        if clone.pk is not None:
+            Run.refresh_team([clone.pk])
+        return clone
 
 
     def activate(self, *args, **kwargs):
-        """Make run active, locking in runcaseversions for all suites."""
+        """
+        Make run active, locking in runcaseversions for all suites.
+
+        Returns a dictionary summarizing the lock-in: number of
+        ``runcaseversions`` created, number of case/env ``environments``
+        combinations created, and ``elapsed`` seconds. Both counts are zero if
+        the run was not a draft.
+
+        """
+        summary = {"runcaseversions": 0, "environments": 0, "elapsed": 0.0}
         if self.status == self.STATUS.draft:
-            self._lock_case_versions()
+            summary = self._lock_case_versions(user=kwargs.get("user"))
         super(Run, self).activate(*args, **kwargs)
+        return summary
 
 
-    def _lock_case_versions(self):
-        """Select caseversions from suites, create runcaseversions."""
-        order = 1
-        for runsuite in RunSuite.objects.filter(
-                run=self).order_by("order").select_related("suite"):
-            for suitecase in SuiteCase.objects.filter(
-                    suite=runsuite.suite).order_by(
-                    "order").select_related("case"):
-                try:
-                    caseversion = suitecase.case.versions.filter(
-                        productversion=self.productversion,
-                        status=CaseVersion.STATUS.active).get()
-                except CaseVersion.DoesNotExist:
-                    pass
-                else:
-                    rcv = RunCaseVersion(
-                        run=self, caseversion=caseversion, order=order)
-                    envs = rcv._inherited_environment_ids
-                    if envs:
-                        rcv.save(force_insert=True, inherit_envs=False)
-                        rcv.environments.add(*envs)
-                        order += 1
+    def _lock_case_versions(self, user=None):
+        """
+        Select caseversions from suites, create runcaseversions.
+
+        Caseversions are ordered by suite order in the run, then case order in
+        the suite; a caseversion is only included if it shares at least one
+        environment with the run, and its runcaseversion gets exactly those
+        shared environments. Uses a fixed number of queries regardless of the
+        number of suites, cases, or environments.
+
+        """
+        started = time.time()
+        # the path from a caseversion to this run's runsuites, and the filters
+        # that select the active caseversions of this run's suites.
+        to_suitecase = "case__suitecases__"
+        to_runsuite = to_suitecase + "suite__runsuites__"
+        in_run = {
+            "productversion": self.productversion_id,
+            "status": CaseVersion.STATUS.active,
+            to_runsuite + "run": self,
+            to_runsuite + "deleted_on__isnull": True,
+            to_suitecase + "deleted_on__isnull": True,
+            }
+
+        # one row per suite membership, in run order; a case included in two
+        # suites is included in the run twice.
+        caseversion_ids = CaseVersion.objects.filter(**in_run).order_by(
+            to_runsuite + "order",
+            to_runsuite + "id",
+            to_suitecase + "order",
+            to_suitecase + "id",
+            ).values_list("id", flat=True)
+
+        run_env_ids = list(self.environments.values_list("id", flat=True))
+        envs_by_cv = defaultdict(list)
+        cv_envs = CaseVersion.environments.through._default_manager.filter(
+            environment__in=run_env_ids,
+            **dict(("caseversion__" + k, v) for k, v in in_run.items())
+            ).filter(caseversion__deleted_on__isnull=True).values_list(
+            "caseversion", "environment").distinct()
+        for cv_id, env_id in cv_envs:
+            envs_by_cv[cv_id].append(env_id)
+
+        now = utcnow()
+        rcvs = [
+            RunCaseVersion(
+                run=self,
+                caseversion_id=cv_id,
+                order=order,
+                created_on=now,
+                created_by=user,
+                modified_on=now,
+                modified_by=user,
+                )
+            for order, cv_id in enumerate(
+                [cv_id for cv_id in caseversion_ids if envs_by_cv[cv_id]], 1)
+            ]
+
+        previous_max_id = RunCaseVersion._base_manager.filter(
+            run=self).aggregate(models.Max("id"))["id__max"] or 0
+        bulk_insert(rcvs)
+
+        new_rcvs = RunCaseVersion._base_manager.filter(
+            run=self, id__gt=previous_max_id).values_list("id", "caseversion")
+        RCVEnvironment = RunCaseVersion.environments.through
+        rcv_envs = [
+            RCVEnvironment(runcaseversion_id=rcv_id, environment_id=env_id)
+            for rcv_id, cv_id in new_rcvs
+            for env_id in envs_by_cv[cv_id]
+            ]
+        bulk_insert(rcv_envs)
+
+        # new runcaseversions have no results yet, just env combos
+        bulk_insert(
+            [
+                RunCaseVersionStats(
+                    runcaseversion_id=rcv_id,
+                    total_envs=len(envs_by_cv[cv_id]),
+                    )
+                for rcv_id, cv_id in new_rcvs
+                ]
+            )
+        RunStats.refresh([self.id])
+
+        return {
+            "runcaseversions": len(rcvs),
+            "environments": len(rcv_envs),
+            "elapsed": time.time() - started,
+            }
 
 
     def result_summary(self):
         """Return a dict summarizing status of results."""
-        return result_summary(Result.objects.filter(runcaseversion__run=self))
+        return self._stats.summary()
 
 
     def completion(self):
         """Return fraction of case/env combos that have a completed result."""
-        total = RunCaseVersion.environments.through._default_manager.filter(
-            runcaseversion__run=self).count()
-        completed = Result.objects.filter(
-            status__in=Result.COMPLETED_STATES,
-            runcaseversion__run=self).values(
-            "runcaseversion", "environment").distinct().count()
+        return self._stats.completion
 
+
+    @property
+    def _stats(self):
+        """This run's result stats; all zero if it has none yet."""
         try:
-            return float(completed) / total
-        except ZeroDivisionError:
-            return 0
+            stats = self.stats
+        except RunStats.DoesNotExist:
+            stats = None
+        # select_related("stats") caches None for a missing row
+        return stats or RunStats(run=self)
 
 
 
@@ -158,10 +246,7 @@ class RunCaseVersion(HasEnvironmentsModel, CCModel):
     def bug_urls(self):
         """Returns set of bug URLs associated with this run/caseversion."""
         return set(
-            StepResult.objects.filter(
-                result__runcaseversion=self).exclude(
-                bug_url="").values_list("bug_url", flat=True).distinct()
-            )
+            self.bugreferences.values_list("bug_url", flat=True).distinct())
 
 
     class Meta:
@@ -193,28 +278,70 @@ class RunCaseVersion(HasEnvironmentsModel, CCModel):
 
         ret = super(RunCaseVersion, self).save(*args, **kwargs)
 
-        if adding and inherit_envs:
-            self.environments.add(*self._inherited_environment_ids)
+        if adding:
+            env_ids = inherit_envs and self._inherited_environment_ids
+            if env_ids:
+                # result stats are refreshed by the m2m_changed receiver
+                self.environments.add(*env_ids)
+            else:
+                refresh_stats([self])
 
         return ret
 
 
     def result_summary(self):
         """Return a dict summarizing status of results."""
-        return result_summary(self.results.all())
+        return self._stats.summary()
 
 
     def completion(self):
         """Return fraction of environments that have a completed result."""
-        total = self.environments.count()
-        completed = self.results.filter(
-            status__in=Result.COMPLETED_STATES).values(
-            "environment").distinct().count()
+        return self._stats.completion
+
 
+    @property
+    def _stats(self):
+        """This runcaseversion's result stats; all zero if it has none yet."""
         try:
-            return float(completed) / total
-        except ZeroDivisionError:
-            return 0
+            stats = self.stats
+        except RunCaseVersionStats.DoesNotExist:
+            stats = None
+        # select_related("stats") caches None for a missing row
+        return stats or RunCaseVersionStats(runcaseversion=self)
+
+
+    @classmethod
+    def bulk_add_envs(cls, objs, envs):
+        """Add environments to runcaseversions, updating result stats."""
+        super(RunCaseVersion, cls).bulk_add_envs(objs, envs)
+        refresh_stats(objs)
+
+
+    @classmethod
+    def bulk_remove_envs(cls, objs, envs):
+        """Remove environments from runcaseversions, updating result stats."""
+        super(RunCaseVersion, cls).bulk_remove_envs(objs, envs)
+        refresh_stats(objs)
+
+
+    @classmethod
+    def _soft_deletion_changed(cls, pks):
+        """Runcaseversions were deleted or undeleted; update run stats."""
+        run_ids = set()
+        for batch in chunked(pks, BATCH_SIZE):
+            run_ids.update(
+                cls._base_manager.filter(pk__in=batch).values_list(
+                    "run", flat=True)
+                )
+        for batch in chunked(run_ids, BATCH_SIZE):
+            RunStats.refresh(batch)
+
+
+    @classmethod
+    def _restored(cls, pks):
+        """Runcaseversions were restored from the archive; rebuild stats."""
+        for batch in chunked(pks, BATCH_SIZE):
+            RunCaseVersionStats.refresh(batch)
 
 
     def testers(self):
@@ -281,12 +408,48 @@ class Result(CCModel):
         permissions = [("review_results", "Can review/edit test results.")]
 
 
+    def __init__(self, *args, **kwargs):
+        """Instantiate a Result, remembering the status counted in stats."""
+        super(Result, self).__init__(*args, **kwargs)
+        self._counted_status = self._countable_status()
+
+
+    def _countable_status(self):
+        """The status this result counts as in stats; None if not counted."""
+        if self.id is None or self.deleted_on is not None:
+            return None
+        return self.status
+
+
+    def save(self, *args, **kwargs):
+        """Save result, updating its runcaseversion and run result stats."""
+        ret = super(Result, self).save(*args, **kwargs)
+        status = self._countable_status()
+        if status != self._counted_status:
+            ResultStats.count_transition(self, self._counted_status, status)
+            self._counted_status = status
+        return ret
+
+
+    @classmethod
+    def _soft_deletion_changed(cls, pks):
+        """Results were deleted or undeleted; refresh affected stats."""
+        rcv_ids = set()
+        for batch in chunked(pks, BATCH_SIZE):
+            rcv_ids.update(
+                cls._base_manager.filter(pk__in=batch).values_list(
+                    "runcaseversion", flat=True)
+                )
+        refresh_stats(rcv_ids)
+
+
     def bug_urls(self):
         """Returns set of bug URLs associated with this result."""
+        preloaded = getattr(self, "_preloaded_stepresults", None)
+        if preloaded is not None:
+            return set(sr.bug_url for sr in preloaded.values() if sr.bug_url)
         return set(
-            self.stepresults.exclude(
-                bug_url="").values_list("bug_url", flat=True).distinct()
-            )
+            self.bugreferences.values_list("bug_url", flat=True).distinct())
 
 
     def start(self, user=None):
@@ -360,25 +523,445 @@ class StepResult(CCModel):
         return "%s (%s: %s)" % (self.result, self.step, self.status)
 
 
+    def save(self, *args, **kwargs):
+        """Save step result, updating the bug reference index."""
+        ret = super(StepResult, self).save(*args, **kwargs)
+        BugReference.refresh([self.id])
+        return ret
 
-def result_summary(results):
+
+    @classmethod
+    def _soft_deletion_changed(cls, pks):
+        """Step results were deleted or undeleted; update bug references."""
+        BugReference.refresh(pks)
+
+
+
+class BugReference(models.Model):
     """
-    Given a queryset of results, return a dict summarizing their states.
+    Index of the bug URLs recorded on (not-deleted) step results.
+
+    Denormalizes the result, runcaseversion, run and caseversion of each step
+    result with a bug URL, so bug URLs for any of those can be listed, and the
+    objects referencing a bug URL found, with one indexed query.
+
+    Kept current by ``StepResult`` saves, soft delete and undelete; anything
+    that updates step results in bulk must call ``refresh``.
+
+    """
+    stepresult = models.OneToOneField(
+        StepResult, primary_key=True, related_name="bugreference")
+    bug_url = models.URLField(db_index=True)
+    result = models.ForeignKey(Result, related_name="bugreferences")
+    runcaseversion = models.ForeignKey(
+        RunCaseVersion, related_name="bugreferences")
+    run = models.ForeignKey(Run, related_name="bugreferences")
+    caseversion = models.ForeignKey(CaseVersion, related_name="bugreferences")
+
+    # rebuilt by refresh; removed when what it references is archived
+    derived_data = True
+
+
+    def __unicode__(self):
+        """Return unicode representation."""
+        return self.bug_url
+
+
+    @classmethod
+    def refresh(cls, stepresults):
+        """
+        Recompute index entries for given step results.
+
+        ``stepresults`` may be an iterable of step results or their IDs, or a
+        queryset. Works in batches, with a fixed number of queries per batch.
+
+        """
+        if isinstance(stepresults, QuerySet):
+            stepresults = stepresults.values_list("id", flat=True)
+        ids = set(getattr(sr, "id", sr) for sr in stepresults)
+        for batch in chunked(ids, BATCH_SIZE):
+            cls.objects.filter(stepresult__in=batch).delete()
+            bulk_insert(
+                cls(
+                    stepresult_id=sr_id,
+                    bug_url=bug_url,
+                    result_id=result_id,
+                    runcaseversion_id=rcv_id,
+                    run_id=run_id,
+                    caseversion_id=cv_id,
+                    )
+                for sr_id, bug_url, result_id, rcv_id, run_id, cv_id
+                in StepResult.objects.filter(pk__in=batch).exclude(
+                    bug_url="").values_list(
+                    "id",
+                    "bug_url",
+                    "result",
+                    "result__runcaseversion",
+                    "result__runcaseversion__run",
+                    "result__runcaseversion__caseversion",
+                    )
+                )
+
+
+
+class ResultBatch(models.Model):
+    """
+    A batch of results submitted at once (see ``execution.batch``).
+
+    Records the outcomes reported for a client-supplied batch key, so that
+    resubmitting the same batch writes nothing and returns the same outcomes.
+
+    """
+    tester = models.ForeignKey(User, related_name="+")
+    key = models.CharField(max_length=100)
+    run = models.ForeignKey(Run, related_name="+")
+    submitted_on = models.DateTimeField(default=utcnow)
+    # JSON-encoded list of per-record outcomes
+    outcomes = models.TextField()
+
+
+    class Meta:
+        unique_together = [("tester", "key")]
+
+
+    def __unicode__(self):
+        """Return unicode representation."""
+        return "%s (%s)" % (self.key, self.tester)
+
+
+
+class ResultStats(models.Model):
+    """
+    Denormalized counts of not-deleted results, by status.
+
+    ``completed_envs`` is the number of case/environment combinations with at
+    least one completed result, and ``total_envs`` the number of case/env
+    combinations. ``completion`` is their ratio, stored so that lists can be
+    sorted by it in the database.
+
+    Kept current by ``Result`` saves and transitions, soft delete and undelete,
+    and runcaseversion environment changes. Use the ``rebuild_result_stats``
+    management command to check for or repair drift (e.g. after permanent
+    deletes or raw SQL updates).
 
     """
-    states = Result.COMPLETED_STATES
+    assigned = models.IntegerField(default=0)
+    started = models.IntegerField(default=0)
+    passed = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    invalidated = models.IntegerField(default=0)
+    completed_envs = models.IntegerField(default=0)
+    total_envs = models.IntegerField(default=0)
+    completion = models.FloatField(default=0, db_index=True)
+
+    # names of all counter fields
+    COUNTERS = [s for s, label in Result.STATUS] + [
+        "completed_envs", "total_envs"]
+
+    # rebuilt by refresh; removed when the run or runcaseversion is archived
+    derived_data = True
+
+
+    class Meta:
+        abstract = True
+
+
+    def summary(self):
+        """Return a dict summarizing status of results."""
+        return dict((s, getattr(self, s)) for s in Result.COMPLETED_STATES)
+
+
+    def set_completion(self):
+        """Set fraction of case/env combos that have a completed result."""
+        try:
+            self.completion = float(self.completed_envs) / self.total_envs
+        except ZeroDivisionError:
+            self.completion = 0
+
+
+    def counts(self):
+        """Return a dict of all counter values."""
+        return dict((c, getattr(self, c)) for c in self.COUNTERS)
+
+
+    @staticmethod
+    def count_transition(result, old_status, new_status):
+        """
+        Update stats for ``result`` changing from ``old_status`` to new.
+
+        Either status may be None, meaning the result wasn't / isn't counted
+        (unsaved or deleted). Increments and decrements counters in place,
+        with at most one query to decide if the case/env combination's
+        completion changed.
+
+        """
+        deltas = {}
+        if old_status is not None:
+            deltas[old_status] = -1
+        if new_status is not None:
+            deltas[new_status] = deltas.get(new_status, 0) + 1
+
+        completed = Result.COMPLETED_STATES
+        if (old_status in completed) != (new_status in completed):
+            others = Result.objects.filter(
+                runcaseversion=result.runcaseversion_id,
+                environment=result.environment_id,
+                status__in=completed).exclude(pk=result.pk)
+            if not others.exists():
+                deltas["completed_envs"] = 1 if new_status in completed else -1
+
+        updates = dict(
+            (c, models.F(c) + d) for c, d in deltas.items() if d)
+        if not updates:
+            return
+        rcv_id = result.runcaseversion_id
+        rcv_stats = RunCaseVersionStats.objects.filter(runcaseversion=rcv_id)
+        # the run is found by a subquery in the update itself, rather than by
+        # loading the runcaseversion
+        run_stats = RunStats.objects.filter(
+            run__in=RunCaseVersion._base_manager.filter(
+                pk=rcv_id).values("run"))
+        rcv_updated = rcv_stats.update(**updates)
+        run_updated = run_stats.update(**updates)
+        if not (rcv_updated and run_updated):
+            refresh_stats([rcv_id])
+        elif "completed_envs" in updates:
+            completion = (
+                models.F("completed_envs") * 1.0 / models.F("total_envs"))
+            for stats in [rcv_stats, run_stats]:
+                stats.filter(total_envs__gt=0).update(completion=completion)
+
+
+
+class RunStats(ResultStats):
+    """Result stats for a run (totals over its runcaseversions)."""
+    run = models.OneToOneField(Run, primary_key=True, related_name="stats")
+
+
+    @classmethod
+    def refresh(cls, run_ids):
+        """Recompute and store stats for given run IDs."""
+        run_ids = list(run_ids)
+        if not run_ids:
+            return
+        stats = cls.compute(run_ids)
+        cls.objects.filter(run__in=run_ids).delete()
+        bulk_insert(stats.values())
+
+
+    @classmethod
+    def compute(cls, run_ids):
+        """
+        Return dict mapping given run IDs to unsaved, up-to-date stats.
+
+        Totals the stored stats of each run's not-deleted runcaseversions.
+
+        """
+        stats = dict((i, cls(run_id=i)) for i in run_ids)
+        totals = RunCaseVersionStats.objects.filter(
+            runcaseversion__run__in=run_ids,
+            runcaseversion__deleted_on__isnull=True,
+            ).values("runcaseversion__run").annotate(
+            **dict(("sum_" + c, models.Sum(c)) for c in cls.COUNTERS)
+            ).order_by()
+        for row in totals:
+            run_stats = stats[row["runcaseversion__run"]]
+            for c in cls.COUNTERS:
+                setattr(run_stats, c, row["sum_" + c] or 0)
+        for run_stats in stats.values():
+            run_stats.set_completion()
+        return stats
+
 
-    result_ids = results.values_list("id", flat=True)
 
-    if not result_ids:
-        return dict((s, 0) for s in states)
+class RunCaseVersionStats(ResultStats):
+    """Result stats for a single runcaseversion."""
+    runcaseversion = models.OneToOneField(
+        RunCaseVersion, primary_key=True, related_name="stats")
+
+
+    @classmethod
+    def refresh(cls, rcv_ids):
+        """Recompute and store stats for given runcaseversion IDs."""
+        rcv_ids = list(rcv_ids)
+        if not rcv_ids:
+            return
+        stats = cls.compute(rcv_ids)
+        cls.objects.filter(runcaseversion__in=rcv_ids).delete()
+        bulk_insert(stats.values())
 
-    cols = ["COUNT(CASE WHEN status=%s THEN 1 ELSE NULL END)"] * len(states)
-    sql = "SELECT {0} FROM {1} WHERE id IN ({2})".format(
-        ",".join(cols), Result._meta.db_table, ",".join(map(str, result_ids))
-        )
 
-    cursor = connection.cursor()
-    cursor.execute(sql, states)
+    @classmethod
+    def compute(cls, rcv_ids):
+        """
+        Return dict mapping given runcaseversion IDs to unsaved stats.
+
+        Counts are computed from results and environments with three grouped
+        queries.
+
+        """
+        stats = dict((i, cls(runcaseversion_id=i)) for i in rcv_ids)
+        results = Result.objects.filter(runcaseversion__in=rcv_ids)
+        by_status = results.values("runcaseversion", "status").annotate(
+            count=models.Count("id")).order_by()
+        for row in by_status:
+            setattr(stats[row["runcaseversion"]], row["status"], row["count"])
+        completed = results.filter(
+            status__in=Result.COMPLETED_STATES).values(
+            "runcaseversion").annotate(
+            count=models.Count("environment", distinct=True)).order_by()
+        for row in completed:
+            stats[row["runcaseversion"]].completed_envs = row["count"]
+        envs = RunCaseVersion.environments.through._default_manager.filter(
+            runcaseversion__in=rcv_ids).values("runcaseversion").annotate(
+            count=models.Count("id")).order_by()
+        for row in envs:
+            stats[row["runcaseversion"]].total_envs = row["count"]
+        for rcv_stats in stats.values():
+            rcv_stats.set_completion()
+        return stats
+
+
+
+def refresh_stats(runcaseversions):
+    """
+    Recompute result stats for given runcaseversions and their runs.
+
+    ``runcaseversions`` may be an iterable of runcaseversions or their IDs, or
+    a queryset. Works in batches, with a fixed number of queries per batch.
+
+    """
+    if isinstance(runcaseversions, QuerySet):
+        runcaseversions = runcaseversions.values_list("id", flat=True)
+    rcv_ids = set(getattr(rcv, "id", rcv) for rcv in runcaseversions)
+    run_ids = set()
+    for batch in chunked(rcv_ids, BATCH_SIZE):
+        RunCaseVersionStats.refresh(batch)
+        run_ids.update(
+            RunCaseVersion._base_manager.filter(pk__in=batch).values_list(
+                "run", flat=True))
+    for batch in chunked(run_ids, BATCH_SIZE):
+        RunStats.refresh(batch)
+
 
-    return dict(zip(states, cursor.fetchone()))
+
+def _rcv_environments_changed(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    """Keep runcaseversion env-combo totals current on m2m changes."""
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+    if not reverse:
+        refresh_stats([instance])
+    elif pk_set:
+        refresh_stats(pk_set)
+
+
+models.signals.m2m_changed.connect(
+    _rcv_environments_changed, sender=RunCaseVersion.environments.through)
+
+
+
+def result_stats(objs):
+    """
+    Return dict mapping IDs of given runs or runcaseversions to result stats.
+
+    ``objs`` must all be runs, or all runcaseversions. Stats are fetched in
+    one query per batch; any object without stored stats gets all-zero stats.
+
+    """
+    objs = list(objs)
+    if not objs:
+        return {}
+    related = type(objs[0]).stats.related
+    stats = {}
+    for batch in chunked([o.id for o in objs], BATCH_SIZE):
+        found = related.model.objects.in_bulk(batch)
+        for i in batch:
+            stats[i] = found.get(i) or related.model(
+                **{related.field.attname: i})
+    return stats
+
+
+
+def result_summaries(objs):
+    """
+    Return dict mapping IDs of given runs or runcaseversions to summaries.
+
+    Each summary is a dict of result counts by completed status, as returned
+    by ``result_summary``.
+
+    """
+    return dict((i, s.summary()) for i, s in result_stats(objs).items())
+
+
+
+def completions(objs):
+    """
+    Return dict mapping IDs of given runs or runcaseversions to completion.
+
+    """
+    return dict((i, s.completion) for i, s in result_stats(objs).items())
+
+
+
+def preload_result_stats(objs):
+    """
+    Load result stats for a list of runs or runcaseversions in one query.
+
+    For use with ``CCQuerySet.preload``; ``result_summary`` and ``completion``
+    on each object then need no further queries.
+
+    """
+    if not objs:
+        return
+    cache_name = type(objs[0]).stats.cache_name
+    stats = result_stats(objs)
+    for obj in objs:
+        setattr(obj, cache_name, stats[obj.id])
+
+
+
+def preload_results(runcaseversions, tester, environment):
+    """
+    Load ``tester``'s results in ``environment`` for list of runcaseversions.
+
+    Fetches the results and their step results in two queries. For use (via
+    ``functools.partial``) with ``CCQuerySet.preload``; the ``result_for`` and
+    ``stepresult_for`` template tags then need no queries.
+
+    """
+    if not runcaseversions:
+        return
+    by_rcv = dict((rcv.id, None) for rcv in runcaseversions)
+    results = Result.objects.filter(
+        runcaseversion__in=by_rcv.keys(),
+        tester=tester,
+        environment=environment,
+        ).order_by("id")
+    for result in results:
+        # if there are duplicates, the latest result wins
+        result._preloaded_stepresults = {}
+        by_rcv[result.runcaseversion_id] = result
+    by_id = dict((r.id, r) for r in by_rcv.values() if r is not None)
+    if by_id:
+        for stepresult in StepResult.objects.filter(result__in=by_id.keys()):
+            result = by_id[stepresult.result_id]
+            stepresult.result = result
+            result._preloaded_stepresults[stepresult.step_id] = stepresult
+    key = (tester.id, environment.id)
+    for rcv in runcaseversions:
+        rcv._preloaded_results = {key: by_rcv[rcv.id]}
+
+
+
+def result_summary(results):
+    """
+    Given a queryset of results, return a dict summarizing their states.
+
+    """
+    summary = dict((s, 0) for s in Result.COMPLETED_STATES)
+    counts = results.filter(status__in=Result.COMPLETED_STATES).values(
+        "status").annotate(count=models.Count("id")).order_by()
+    for row in counts:
+        summary[row["status"]] = row["count"]
+    return summary
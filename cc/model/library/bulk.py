@@ -16,9 +16,14 @@
 # You should have received a copy of the GNU General Public License
 # along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
 """
-Parser for text format for bulk test case entry.
+Parsers for bulk test case entry formats.
 
 """
+import csv
+import json
+
+
+
 class ParsingError(Exception):
     pass
 
@@ -43,25 +48,47 @@ class BulkParser(object):
     and/or possibly an "error" key containing an error message encountered in
     parsing.
 
+    To parse a large file without holding all of it in memory, use
+    ``iter_parse`` instead, which takes an iterable of lines.
+
     """
     def parse(self, text):
         """Parse given text and return list of data dictionaries."""
+        return [data for number, data in self.iter_parse(text.splitlines())]
+
+
+    def iter_parse(self, lines):
+        """
+        Parse given iterable of lines, generating data dictionaries.
+
+        Generates ``(line number, data)`` tuples, each as soon as the test case
+        is complete; the line number is where the test case begins, or where
+        the error was found for data with an "error" key. Parsing stops at the
+        first error.
+
+        """
         data = []
         state = self.begin
-
-        lines = text.splitlines()
         error = False
+        start = number = 0
 
-        for line in lines:
+        for number, line in enumerate(lines, 1):
             line = line.strip()
             if line:
+                count = len(data)
                 try:
                     state = state(line.lower(), line, data)
                 except ParsingError as e:
                     data = data or [{}]
                     data[-1]["error"] = str(e)
+                    start = number
                     error = True
                     break
+                if len(data) > count:
+                    # a new test case begins; the previous one is complete
+                    if count:
+                        yield start, self._finish(data.pop(0))
+                    start = number
 
         if not error and not state.expect_end:
             if not data:
@@ -70,16 +97,21 @@ class BulkParser(object):
                 "Unexpected end of input, looking for %s"
                 % " or ".join(repr(k.title()) for k in state.keys)
                 )
+            start = number
 
         for item in data:
-            if "description" in item:
-                item["description"] = "\n".join(item["description"])
-            for step in item.get("steps", []):
-                step["instruction"] = "\n".join(step["instruction"])
-                if "expected" in step:
-                    step["expected"] = "\n".join(step["expected"])
+            yield start, self._finish(item)
 
-        return data
+
+    def _finish(self, item):
+        """Join lines of description and steps of parsed ``item``."""
+        if "description" in item:
+            item["description"] = "\n".join(item["description"])
+        for step in item.get("steps", []):
+            step["instruction"] = "\n".join(step["instruction"])
+            if "expected" in step:
+                step["expected"] = "\n".join(step["expected"])
+        return item
 
 
     def begin(self, lc, orig, data):
@@ -141,3 +173,155 @@ class BulkParser(object):
         return self.expectedresult
     after_and.keys = ["when "]
     after_and.expect_end = False
+
+
+
+class CSVParser(object):
+    """
+    Parser for CSV format for bulk test case entry.
+
+    The first row names the columns: "name", "instruction", and optionally
+    "description" and "expected", in any order. Each following row is a step;
+    a row with a name begins a new test case::
+
+        name,description,instruction,expected
+        Test that I can log in,,Click the login button,I am logged in
+        ,,Click the logout button,I am logged out
+
+    """
+    def iter_parse(self, lines):
+        """
+        Parse given iterable of (unicode) lines, generating data dictionaries.
+
+        Generates ``(line number, data)`` tuples as ``BulkParser.iter_parse``
+        does, but invalid rows don't stop parsing; a test case with an invalid
+        step is reported as an error at that step's line.
+
+        """
+        reader = csv.reader(line.encode("utf-8") for line in lines)
+        current = start = None
+        try:
+            header = [self._decode(c).lower() for c in next(reader, [])]
+            missing = [c for c in ["name", "instruction"] if c not in header]
+            if missing:
+                yield 1, {
+                    "error": "Expected a header row with columns %s." % (
+                        ", ".join(repr(c) for c in missing))
+                    }
+                return
+            for row in reader:
+                values = dict(zip(header, [self._decode(c) for c in row]))
+                if not any(values.values()):
+                    continue
+                if values["name"]:
+                    if current is not None:
+                        yield start, current
+                    current = {
+                        "name": values["name"],
+                        "description": values.get("description", ""),
+                        "steps": [],
+                        }
+                    start = reader.line_num
+                elif current is None:
+                    yield reader.line_num, {
+                        "error": "Expected a test case name, not a step."}
+                    continue
+                if "error" in current:
+                    continue
+                if not values.get("instruction"):
+                    current["error"] = "Expected a step instruction."
+                    start = reader.line_num
+                    continue
+                current["steps"].append(
+                    {
+                        "instruction": values["instruction"],
+                        "expected": values.get("expected", ""),
+                        }
+                    )
+        except csv.Error as e:
+            current = {"error": "Invalid CSV: %s" % e}
+            start = reader.line_num
+        if current is not None:
+            yield start, current
+
+
+    def _decode(self, cell):
+        """Return decoded and stripped ``cell``."""
+        return cell.decode("utf-8").strip()
+
+
+
+class JSONLinesParser(object):
+    """
+    Parser for JSON Lines format for bulk test case entry.
+
+    Each line is a JSON object for one test case::
+
+        {"name": "Test that I can log in", "steps": [{"instruction": "Go"}]}
+
+    "name" and a list of "steps", each with an "instruction", are required;
+    "description" and steps' "expected" are optional.
+
+    """
+    def iter_parse(self, lines):
+        """
+        Parse given iterable of lines, generating data dictionaries.
+
+        Generates ``(line number, data)`` tuples as ``BulkParser.iter_parse``
+        does, but invalid lines don't stop parsing.
+
+        """
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if line:
+                try:
+                    yield number, self._clean(json.loads(line))
+                except ValueError:
+                    yield number, {"error": "Invalid JSON."}
+                except ParsingError as e:
+                    yield number, {"error": str(e)}
+
+
+    def _clean(self, record):
+        """Return test case data from decoded ``record``; or ParsingError."""
+        if not isinstance(record, dict):
+            raise ParsingError("Expected an object.")
+        steps = record.get("steps")
+        if not isinstance(steps, list) or not steps:
+            raise ParsingError("Expected a list of steps.")
+        data = {
+            "name": self._text(record, "name", required=True),
+            "description": self._text(record, "description"),
+            "steps": [],
+            }
+        for step in steps:
+            if not isinstance(step, dict):
+                raise ParsingError("Expected each step to be an object.")
+            data["steps"].append(
+                {
+                    "instruction": self._text(
+                        step, "instruction", required=True),
+                    "expected": self._text(step, "expected"),
+                    }
+                )
+        return data
+
+
+    def _text(self, record, key, required=False):
+        """Return stripped string value of ``key`` in ``record``."""
+        value = record.get(key) or u""
+        if not isinstance(value, basestring):
+            raise ParsingError("Expected %r to be a string." % key)
+        value = value.strip()
+        if required and not value:
+            raise ParsingError("Expected a non-empty %r." % key)
+        return value
+
+
+
+# bulk entry formats, by name
+PARSERS = {
+    "text": BulkParser,
+    "csv": CSVParser,
+    "jsonl": JSONLinesParser,
+    }
@@ -0,0 +1,273 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Bulk import of test cases.
+
+"""
+import itertools
+import json
+
+from django.db import transaction
+from django.db.models import Max
+
+from ..ccmodel import ConcurrencyError, utcnow
+from ..core.models import ProductVersion
+from ..search.models import SearchTerm
+from ..sql import bulk_insert, chunked, BATCH_SIZE
+from .bulk import PARSERS
+from .models import Case, CaseVersion, CaseStep, SuiteCase, CaseImport
+
+
+
+@transaction.commit_on_success
+def import_cases(product, productversions, cases, user=None, status=None,
+                 tags=None, suite=None, progress=None):
+    """
+    Create test cases in ``product`` from parsed ``cases`` data.
+
+    ``cases`` is an iterable of dictionaries as returned by ``BulkParser``,
+    with "name", optional "description", and a list of "steps" with
+    "instruction" and optional "expected". Each case gets a version for each
+    of ``productversions``, with the given ``status`` and tag IDs ``tags``,
+    and its product version's environments. With ``suite``, each case is
+    added to that suite.
+
+    Everything is written in one transaction, with a fixed number of
+    multi-row inserts per batch of cases rather than queries per case,
+    version and step. If given, ``progress`` is called with the number of
+    cases imported so far after each batch.
+
+    Returns list of new cases.
+
+    """
+    productversions = list(productversions)
+    tags = set(tags or [])
+    envs = _environments(productversions)
+
+    imported = []
+    caseversion_ids = []
+    for batch in chunked(cases, BATCH_SIZE):
+        new_cases, new_caseversion_ids = _import_batch(
+            product, productversions, envs, batch, user, status, tags, suite)
+        imported.extend(new_cases)
+        caseversion_ids.extend(new_caseversion_ids)
+        if progress is not None:
+            progress(len(imported))
+
+    _imported(imported, caseversion_ids)
+
+    return imported
+
+
+
+def run_import(caseimport, progress=None):
+    """
+    Import (or resume importing) the test cases in ``caseimport``'s file.
+
+    The file is parsed incrementally, and each batch of records is written in
+    its own transaction along with the import's progress, so memory use is
+    bounded and an import interrupted by an error can be resumed by running
+    it again: records processed in an earlier attempt are skipped. Invalid
+    records are skipped and recorded, with their line numbers, in the import's
+    errors. If given, ``progress`` is called with the number of cases
+    imported so far after each batch.
+
+    Each batch commits its own transaction, so this must not be called inside
+    a managed transaction (e.g. a request's); the ``resume_case_imports``
+    management command runs it for every import that hasn't completed. Only
+    one run of an import can record a given batch: if another run got there
+    first, ``ConcurrencyError`` is raised and the batch is rolled back.
+
+    If any other exception interrupts the import, it is recorded (and
+    committed) as the import's ``failure`` and re-raised; ``caseimport``
+    should then be reloaded before trying again.
+
+    """
+    productversions = caseimport.productversions()
+    tags = set(caseimport.tag_ids)
+    envs = _environments(productversions)
+    errors = caseimport.error_list
+
+    caseimport.file.open("rb")
+    try:
+        records = PARSERS[caseimport.format]().iter_parse(
+            line.decode("utf-8", "replace") for line in caseimport.file)
+        for batch in chunked(
+                itertools.islice(records, caseimport.records, None),
+                BATCH_SIZE):
+            cases = []
+            for number, data in batch:
+                error = data.get("error") or _check(data)
+                if error:
+                    caseimport.error_count += 1
+                    if len(errors) < caseimport.MAX_ERRORS:
+                        errors.append((number, error))
+                else:
+                    cases.append(data)
+
+            with transaction.commit_on_success():
+                if cases:
+                    _imported(
+                        *_import_batch(
+                            caseimport.product, productversions, envs, cases,
+                            caseimport.user, caseimport.status, tags,
+                            caseimport.suite)
+                        )
+                caseimport.errors = json.dumps(errors)
+                updated = CaseImport.objects.filter(
+                    pk=caseimport.pk, records=caseimport.records).update(
+                    records=caseimport.records + len(batch),
+                    imported=caseimport.imported + len(cases),
+                    error_count=caseimport.error_count,
+                    errors=caseimport.errors,
+                    )
+                if not updated:
+                    raise ConcurrencyError(
+                        "Import {0} has been resumed elsewhere.".format(
+                            caseimport.pk))
+                caseimport.records += len(batch)
+                caseimport.imported += len(cases)
+
+            if progress is not None:
+                progress(caseimport.imported)
+    except ConcurrencyError:
+        raise
+    except Exception as e:
+        with transaction.commit_on_success():
+            CaseImport.objects.filter(pk=caseimport.pk).update(
+                failure=u"{0}: {1}".format(e.__class__.__name__, e))
+        raise
+    finally:
+        caseimport.file.close()
+
+    caseimport.failure = u""
+    caseimport.completed_on = utcnow()
+    caseimport.save()
+
+
+
+def _check(data):
+    """Return error message if parsed ``data`` can't be imported, or None."""
+    max_length = CaseVersion._meta.get_field("name").max_length
+    if len(data["name"]) > max_length:
+        return "Test case name is longer than {0} characters.".format(
+            max_length)
+    return None
+
+
+
+def _environments(productversions):
+    """Return dictionary mapping product version IDs to environment IDs."""
+    envs = dict((pv.id, []) for pv in productversions)
+    pv_envs = ProductVersion.environments.through._default_manager.filter(
+        productversion__in=envs.keys())
+    for pv_id, env_id in pv_envs.values_list("productversion", "environment"):
+        envs[pv_id].append(env_id)
+    return envs
+
+
+
+def _imported(cases, caseversion_ids):
+    """Update latest versions and search index of newly imported cases."""
+    # versions were written without CaseVersion.save
+    for batch in chunked(cases, BATCH_SIZE):
+        Case.set_latest_versions(batch)
+    SearchTerm.reindex(caseversion_ids)
+
+
+
+def _import_batch(product, productversions, envs, batch, user, status, tags,
+                  suite):
+    """Write a batch of cases; return (new cases, new caseversion IDs)."""
+    now = utcnow()
+    tracking = {
+        "created_on": now,
+        "created_by": user,
+        "modified_on": now,
+        "modified_by": user,
+        }
+
+    max_id = Case._base_manager.aggregate(Max("id"))["id__max"] or 0
+    bulk_insert([Case(product=product, **tracking) for data in batch])
+    # auto-increment keys are assigned in insertion order
+    cases = [
+        Case(pk=pk, product=product, **tracking)
+        for pk in Case._base_manager.filter(
+            id__gt=max_id, product=product, **tracking).order_by(
+            "id").values_list("id", flat=True)
+        ]
+    if len(cases) != len(batch):
+        raise RuntimeError("Concurrent creation of imported cases.")
+
+    if suite is not None:
+        bulk_insert(
+            [SuiteCase(suite=suite, case=case, **tracking) for case in cases])
+
+    bulk_insert(
+        [
+            CaseVersion(
+                case=case,
+                productversion=pv,
+                name=data["name"],
+                description=data.get("description", ""),
+                status=status or CaseVersion.STATUS.draft,
+                **tracking
+                )
+            for case, data in zip(cases, batch)
+            for pv in productversions
+            ]
+        )
+    # nothing else can have versions of the brand-new cases yet
+    caseversions = list(
+        CaseVersion._base_manager.filter(case__in=cases).values_list(
+            "id", "case", "productversion")
+        )
+    steps_by_case = dict(
+        (case.id, data.get("steps", [])) for case, data in zip(cases, batch))
+
+    EnvThrough = CaseVersion.environments.through
+    bulk_insert(
+        [
+            EnvThrough(caseversion_id=cv_id, environment_id=env_id)
+            for cv_id, case_id, pv_id in caseversions
+            for env_id in envs[pv_id]
+            ]
+        )
+    TagThrough = CaseVersion.tags.through
+    bulk_insert(
+        [
+            TagThrough(caseversion_id=cv_id, tag_id=tag_id)
+            for cv_id, case_id, pv_id in caseversions
+            for tag_id in tags
+            ]
+        )
+    bulk_insert(
+        [
+            CaseStep(
+                caseversion_id=cv_id,
+                number=number,
+                instruction=step["instruction"],
+                expected=step.get("expected", ""),
+                **tracking
+                )
+            for cv_id, case_id, pv_id in caseversions
+            for number, step in enumerate(steps_by_case[case_id], 1)
+            ]
+        )
+
+    return cases, [cv_id for cv_id, case_id, pv_id in caseversions]
@@ -0,0 +1,72 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Management command to run uploaded and interrupted imports of test case files.
+
+"""
+from functools import partial
+
+from django.core.management.base import NoArgsCommand, CommandError
+
+from cc.model.ccmodel import ConcurrencyError
+from cc.model.library.importer import run_import
+from cc.model.library.models import CaseImport
+
+
+
+class Command(NoArgsCommand):
+    help = (
+        "Run every test case file import that hasn't completed, resuming "
+        "interrupted imports where they left off.")
+
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get("verbosity", 1))
+
+        failed = 0
+        for pk in CaseImport.objects.filter(
+                completed_on__isnull=True).order_by("id").values_list(
+                "id", flat=True):
+            caseimport = CaseImport.objects.get(pk=pk)
+            progress = None
+            if verbosity:
+                progress = partial(self._progress, caseimport)
+            try:
+                run_import(caseimport, progress)
+            except ConcurrencyError:
+                if verbosity:
+                    print(u"%s is being imported elsewhere." % caseimport.name)
+                continue
+            except Exception as e:
+                failed += 1
+                print(u"Import of %s failed: %s" % (caseimport.name, e))
+                continue
+            if verbosity:
+                print(u"Imported %s test cases from %s (%s skipped)." % (
+                    caseimport.imported,
+                    caseimport.name,
+                    caseimport.error_count)
+                    )
+
+        if failed:
+            raise CommandError("%s imports failed." % failed)
+
+
+    def _progress(self, caseimport, imported):
+        """Report progress of ``caseimport``."""
+        print(u"%s: %s test cases imported." % (caseimport.name, imported))
@@ -19,11 +19,17 @@
 Models for test-case library (cases, suites).
 
 """
+import json
+
 from django.core.exceptions import ValidationError
 from django.db import models
 
+from model_utils import Choices
+
 from ..attachments.models import Attachment
-from ..ccmodel import CCModel, DraftStatusModel
+from ..ccmodel import CCModel, DraftStatusModel, utcnow
+from ..core.auth import User
+from ..sql import chunked, BATCH_SIZE
 from ..core.models import Product, ProductVersion
 from ..environments.models import HasEnvironmentsModel
 from ..tags.models import Tag
@@ -53,21 +59,45 @@ class Case(CCModel):
         appropriately.
 
         """
-        try:
-            latest_version = self.versions.order_by("-productversion__order")[0]
-        except IndexError:
-            pass
-        else:
-            self.versions.exclude(pk=latest_version.pk).update(
-                latest=False, notrack=True)
-            self.versions.filter(pk=latest_version.pk).update(
-                latest=True, notrack=True)
-            if update_instance is not None:
-                update_instance.cc_version += 1
-                if update_instance == latest_version:
-                    update_instance.latest = True
-                else:
-                    update_instance.latest = False
+        changed = self.set_latest_versions([self.pk])
+        if update_instance is not None and update_instance.pk in changed:
+            update_instance.latest = changed[update_instance.pk]
+            update_instance.cc_version += 1
+            update_instance._mark_saved(
+                [update_instance._meta.get_field("latest")])
+
+
+    @classmethod
+    def set_latest_versions(cls, cases):
+        """
+        Mark latest version of each of ``cases``, marking others non-latest.
+
+        ``cases`` may be a list of cases or their IDs, or a queryset. The
+        latest version of a case is its non-deleted version for the highest
+        ordered product version. Versions of all cases are read with one
+        query; only those whose flag changes are updated, in batches. Returns
+        dictionary mapping IDs of updated versions to their new flag.
+
+        """
+        CaseVersion = cls.versions.related.model
+        latest = {}
+        flagged = set()
+        versions = CaseVersion.everything.filter(case__in=cases).order_by(
+            "productversion__order", "id")
+        for case_id, pk, is_latest, deleted_on in versions.values_list(
+                "case", "id", "latest", "deleted_on"):
+            if deleted_on is None:
+                latest[case_id] = pk
+            if is_latest:
+                flagged.add(pk)
+        latest = set(latest.values())
+        changed = {}
+        for flag, pks in [(False, flagged - latest), (True, latest - flagged)]:
+            for batch in chunked(pks, BATCH_SIZE):
+                CaseVersion.everything.filter(pk__in=batch).update(
+                    latest=flag, notrack=True)
+            changed.update((pk, flag) for pk in pks)
+        return changed
 
 
     def all_versions(self):
@@ -127,8 +157,18 @@ class CaseVersion(CCModel, DraftStatusModel, HasEnvironmentsModel):
 
 
     def save(self, *args, **kwargs):
-        """Save CaseVersion, updating latest version."""
+        """
+        Save CaseVersion, updating latest version.
+
+        Latest version is only updated for a new CaseVersion, or if its case or
+        product version changed.
+
+        """
         skip_set_latest = kwargs.pop("skip_set_latest", False)
+        if self.pk is not None and not skip_set_latest:
+            changed = set(f.name for f in self._changed_fields())
+            skip_set_latest = not changed.intersection(
+                ["case", "productversion"])
         super(CaseVersion, self).save(*args, **kwargs)
         if not skip_set_latest:
             self.case.set_latest_version(update_instance=self)
@@ -136,14 +176,16 @@ class CaseVersion(CCModel, DraftStatusModel, HasEnvironmentsModel):
 
     def delete(self, *args, **kwargs):
         """Delete CaseVersion, updating latest version."""
-        super(CaseVersion, self).delete(*args, **kwargs)
+        ret = super(CaseVersion, self).delete(*args, **kwargs)
         self.case.set_latest_version()
+        return ret
 
 
     def undelete(self, *args, **kwargs):
         """Undelete CaseVersion, updating latest version."""
-        super(CaseVersion, self).undelete(*args, **kwargs)
+        ret = super(CaseVersion, self).undelete(*args, **kwargs)
         self.case.set_latest_version()
+        return ret
 
 
     def clean(self):
@@ -190,6 +232,20 @@ class CaseVersion(CCModel, DraftStatusModel, HasEnvironmentsModel):
         return super(CaseVersion, self).clone(*args, **kwargs)
 
 
+    @classmethod
+    def _cloned(cls, pks):
+        """Versions were cascade-cloned; update latest flags, search index."""
+        Case.set_latest_versions(
+            Case.objects.filter(versions__in=pks).distinct())
+        _reindex(pks)
+
+
+    @classmethod
+    def _restored(cls, pks):
+        """Versions were restored from the archive; update search index."""
+        _reindex(pks)
+
+
     @property
     def parent(self):
         return self.productversion
@@ -219,13 +275,47 @@ class CaseVersion(CCModel, DraftStatusModel, HasEnvironmentsModel):
 
     def bug_urls(self):
         """Returns set of bug URLs associated with this caseversion."""
-        Result = self.runcaseversions.model.results.related.model
-        StepResult = Result.stepresults.related.model
         return set(
-            StepResult.objects.filter(
-                result__runcaseversion__caseversion=self).exclude(
-                bug_url="").values_list("bug_url", flat=True).distinct()
-            )
+            self.bugreferences.values_list("bug_url", flat=True).distinct())
+
+
+    def tag_list(self):
+        """
+        Return list of this caseversion's tags.
+
+        Uses tags loaded by ``preload_tags``, if any.
+
+        """
+        preloaded = getattr(self, "_preloaded_tags", None)
+        if preloaded is not None:
+            return preloaded
+        return list(self.tags.order_by("name"))
+
+
+    def step_list(self):
+        """
+        Return list of this caseversion's steps.
+
+        Uses steps loaded by ``preload_steps``, if any.
+
+        """
+        preloaded = getattr(self, "_preloaded_steps", None)
+        if preloaded is not None:
+            return preloaded
+        return list(self.steps.all())
+
+
+    def attachment_list(self):
+        """
+        Return list of this caseversion's attachments.
+
+        Uses attachments loaded by ``preload_attachments``, if any.
+
+        """
+        preloaded = getattr(self, "_preloaded_attachments", None)
+        if preloaded is not None:
+            return preloaded
+        return list(self.attachments.order_by("id"))
 
 
 
@@ -274,6 +364,36 @@ class CaseStep(CCModel):
         ordering = ["caseversion", "number"]
 
 
+    @classmethod
+    def _cloned(cls, pks):
+        """Steps were cascade-cloned; update search index."""
+        _reindex(cls._caseversion_ids(pks))
+
+
+    @classmethod
+    def _restored(cls, pks):
+        """Steps were restored from the archive; update search index."""
+        _reindex(cls._caseversion_ids(pks))
+
+
+    @classmethod
+    def _soft_deletion_changed(cls, pks):
+        """Steps were deleted or undeleted; update search index."""
+        _reindex(cls._caseversion_ids(pks))
+
+
+    @classmethod
+    def _caseversion_ids(cls, pks):
+        """Return set of IDs of caseversions of steps with given ``pks``."""
+        ids = set()
+        for batch in chunked(pks, BATCH_SIZE):
+            ids.update(
+                cls._base_manager.filter(pk__in=batch).values_list(
+                    "caseversion", flat=True)
+                )
+        return ids
+
+
 
 class Suite(CCModel, DraftStatusModel):
     """An ordered suite of test cases."""
@@ -339,3 +459,147 @@ class SuiteCase(CCModel):
                 "'{0}' is already in suite '{1}'".format(
                     self.case, self.suite)
                 )
+
+
+
+class CaseImport(models.Model):
+    """
+    A file of test cases imported in chunks (see ``library.importer``).
+
+    Records how far the import has got, so that an interrupted import can be
+    resumed where it left off, and which lines couldn't be imported.
+
+    """
+    FORMAT = Choices("text", "csv", "jsonl")
+    # errors beyond this many are counted, but not recorded
+    MAX_ERRORS = 100
+
+    file = models.FileField(upload_to="imports/%Y/%m/%d/")
+    name = models.CharField(max_length=250)
+    format = models.CharField(max_length=10, choices=FORMAT)
+
+    product = models.ForeignKey(Product, related_name="+")
+    productversion = models.ForeignKey(ProductVersion, related_name="+")
+    and_later_versions = models.BooleanField(default=False)
+    suite = models.ForeignKey(
+        Suite, blank=True, null=True, related_name="+",
+        on_delete=models.SET_NULL)
+    status = models.CharField(
+        max_length=30,
+        choices=DraftStatusModel.STATUS,
+        default=DraftStatusModel.STATUS.draft)
+    # JSON-encoded list of IDs of tags for the new caseversions
+    tags = models.TextField(default="[]")
+    user = models.ForeignKey(
+        User, blank=True, null=True, related_name="+",
+        on_delete=models.SET_NULL)
+    created_on = models.DateTimeField(default=utcnow)
+
+    # number of parsed records (test cases or errors) already processed
+    records = models.IntegerField(default=0)
+    imported = models.IntegerField(default=0)
+    # JSON-encoded list of [line number, error message] of skipped records
+    errors = models.TextField(default="[]")
+    error_count = models.IntegerField(default=0)
+    # error that interrupted the last attempt, if any
+    failure = models.TextField(blank=True)
+    completed_on = models.DateTimeField(blank=True, null=True)
+
+
+    def __unicode__(self):
+        """Unicode representation is name of imported file."""
+        return self.name
+
+
+    @property
+    def error_list(self):
+        """List of (line number, error message) of skipped records."""
+        return [tuple(e) for e in json.loads(self.errors)]
+
+
+    @property
+    def tag_ids(self):
+        """List of IDs of tags for the new caseversions."""
+        return json.loads(self.tags)
+
+
+    def productversions(self):
+        """Return list of product versions to create caseversions for."""
+        productversions = [self.productversion]
+        if self.and_later_versions:
+            productversions.extend(
+                self.product.versions.filter(
+                    order__gt=self.productversion.order)
+                )
+        return productversions
+
+
+
+def preload_tags(caseversions):
+    """
+    Load tags of a list of caseversions in one query.
+
+    For use with ``CCQuerySet.preload``; ``tag_list`` then needs no queries.
+
+    """
+    by_id = dict((cv.id, cv) for cv in caseversions)
+    for cv in caseversions:
+        cv._preloaded_tags = []
+    if not by_id:
+        return
+    taggings = CaseVersion.tags.through.objects.filter(
+        caseversion__in=by_id.keys(),
+        tag__deleted_on__isnull=True,
+        ).select_related("tag").order_by("tag__name")
+    for tagging in taggings:
+        by_id[tagging.caseversion_id]._preloaded_tags.append(tagging.tag)
+
+
+
+def preload_steps(caseversions):
+    """
+    Load steps of a list of caseversions in one query.
+
+    For use with ``CCQuerySet.preload``; ``step_list`` then needs no queries.
+
+    """
+    by_id = dict((cv.id, cv) for cv in caseversions)
+    for cv in caseversions:
+        cv._preloaded_steps = []
+    if not by_id:
+        return
+    steps = CaseStep.objects.filter(
+        caseversion__in=by_id.keys()).order_by("number")
+    for step in steps:
+        cv = by_id[step.caseversion_id]
+        step.caseversion = cv
+        cv._preloaded_steps.append(step)
+
+
+
+def preload_attachments(caseversions):
+    """
+    Load attachments of a list of caseversions in one query.
+
+    For use with ``CCQuerySet.preload``; ``attachment_list`` then needs no
+    queries.
+
+    """
+    by_id = dict((cv.id, cv) for cv in caseversions)
+    for cv in caseversions:
+        cv._preloaded_attachments = []
+    if not by_id:
+        return
+    attachments = CaseAttachment.objects.filter(
+        caseversion__in=by_id.keys()).order_by("id")
+    for attachment in attachments:
+        cv = by_id[attachment.caseversion_id]
+        attachment.caseversion = cv
+        cv._preloaded_attachments.append(attachment)
+
+
+
+def _reindex(caseversion_ids):
+    """Update search index entries of caseversions with given IDs."""
+    from ..search.models import SearchTerm
+    SearchTerm.reindex(caseversion_ids)
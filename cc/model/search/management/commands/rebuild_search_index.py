@@ -0,0 +1,42 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Management command to rebuild the search index from scratch.
+
+"""
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+
+from cc.model import CaseVersion, SearchTerm
+
+
+
+class Command(NoArgsCommand):
+    help = (
+        "Rebuild the search index of test case names, descriptions and step "
+        "text.")
+
+
+    @transaction.commit_on_success
+    def handle_noargs(self, **options):
+        verbosity = int(options.get("verbosity", 1))
+
+        pks = list(CaseVersion._base_manager.values_list("pk", flat=True))
+        SearchTerm.reindex(pks)
+        if verbosity:
+            print(u"Indexed %s caseversions." % len(pks))
@@ -0,0 +1,210 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Search index of test case text.
+
+Filtering caseversions with ``icontains`` on their name and step text means a
+join and a full scan of the step table per keyword. Instead, the words of each
+caseversion's name, description, and (non-deleted) steps' instructions and
+expected results are stored as rows of a single term table, indexed by term,
+and searched by word prefix. The index is kept current on saves and deletes of
+caseversions and steps; ``rebuild_search_index`` rebuilds it from scratch.
+
+"""
+import re
+from collections import defaultdict
+
+from django.db import models
+
+from ..library.models import CaseVersion, CaseStep
+from ..sql import bulk_insert, bulk_delete, chunked, having, BATCH_SIZE
+
+
+
+# longer words are truncated; a search still matches them by prefix
+TERM_LENGTH = 50
+
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+
+def tokenize(text):
+    """Return list of (lower-cased, truncated) words in ``text``."""
+    return [w[:TERM_LENGTH] for w in WORD.findall((text or u"").lower())]
+
+
+
+class SearchTerm(models.Model):
+    """A word in a field of a caseversion (or of its steps), with frequency."""
+    FIELDS = ["name", "description", "instruction", "expected"]
+
+    caseversion = models.ForeignKey(CaseVersion, related_name="searchterms")
+    field = models.CharField(max_length=20, choices=zip(FIELDS, FIELDS))
+    term = models.CharField(max_length=TERM_LENGTH)
+    frequency = models.IntegerField(default=1)
+
+    # rebuilt by reindexing; removed when its caseversion is archived
+    derived_data = True
+
+
+    def __unicode__(self):
+        """Unicode representation is field and term."""
+        return u"{0}: {1}".format(self.field, self.term)
+
+
+    class Meta:
+        # leading with the term, the unique index also serves searches
+        unique_together = [("term", "field", "caseversion")]
+
+
+    @classmethod
+    def reindex(cls, caseversion_ids):
+        """
+        Rebuild index rows of caseversions with given IDs.
+
+        Works in batches, with a fixed number of queries per batch. IDs of
+        caseversions that no longer exist are skipped.
+
+        """
+        for batch in chunked(set(caseversion_ids), BATCH_SIZE):
+            bulk_delete(cls._default_manager.filter(caseversion__in=batch))
+            counts = defaultdict(int)
+            texts = list(
+                CaseVersion._base_manager.filter(pk__in=batch).values_list(
+                    "id", "name", "description")
+                )
+            existing = set(row[0] for row in texts)
+            for pk, name, description in texts:
+                _count(counts, pk, "name", name)
+                _count(counts, pk, "description", description)
+            for pk, instruction, expected in CaseStep.objects.filter(
+                    caseversion__in=existing).values_list(
+                    "caseversion", "instruction", "expected"):
+                _count(counts, pk, "instruction", instruction)
+                _count(counts, pk, "expected", expected)
+            bulk_insert(
+                [
+                    cls(
+                        caseversion_id=pk,
+                        field=field,
+                        term=term,
+                        frequency=frequency,
+                        )
+                    for (pk, field, term), frequency in counts.items()
+                    ]
+                )
+
+
+    @classmethod
+    def matching(cls, text, fields=None):
+        """
+        Return IDs of caseversions matching all words of ``text``.
+
+        A word matches if it is a prefix of a word in any of ``fields`` (all
+        indexed fields by default). Returns a values queryset, for use in an
+        ``__in`` lookup, or None if ``text`` has no words.
+
+        The matching terms of all words are fetched in one scan of the index
+        and grouped by caseversion; a caseversion matches if its terms match
+        as many distinct words as were searched for.
+
+        """
+        words = set(tokenize(text))
+        # a word that is a prefix of another searched word matches whatever
+        # the longer word does; without them, a term matches at most one word
+        words = sorted(
+            w for w in words
+            if not any(o != w and o.startswith(w) for o in words)
+            )
+        if not words:
+            return None
+        # terms and words are both lower-cased, so a case-insensitive match
+        # is the same; unlike startswith (LIKE BINARY on MySQL) it can use
+        # the index on term under a case-insensitive collation
+        matches = models.Q()
+        for word in words:
+            matches |= models.Q(term__istartswith=word)
+        terms = cls._default_manager.filter(matches)
+        if fields is not None:
+            terms = terms.filter(field__in=fields)
+        cases = []
+        params = []
+        for i, word in enumerate(words):
+            cases.append(
+                "WHEN SUBSTR(term, 1, {0}) = %s THEN {1}".format(len(word), i))
+            params.append(word)
+        return having(
+            terms.values_list("caseversion", flat=True),
+            "COUNT(DISTINCT CASE {0} END) = %s".format(" ".join(cases)),
+            params + [len(words)],
+            )
+
+
+    @classmethod
+    def search(cls, text, fields=None):
+        """
+        Return caseversions matching all words of ``text``, best first.
+
+        Matching is as for ``matching``. Caseversions are annotated with a
+        ``score``, the number of occurrences of matching words in the searched
+        fields, and ordered by it (then by ID).
+
+        """
+        terms = set(tokenize(text))
+        if not terms:
+            return CaseVersion.objects.none()
+        matches = models.Q()
+        for term in terms:
+            matches |= models.Q(searchterms__term__istartswith=term)
+        qs = CaseVersion.objects.filter(pk__in=cls.matching(text, fields))
+        if fields is not None:
+            qs = qs.filter(matches, searchterms__field__in=fields)
+        else:
+            qs = qs.filter(matches)
+        return qs.annotate(
+            score=models.Sum("searchterms__frequency")).order_by("-score", "id")
+
+
+
+def _count(counts, pk, field, text):
+    """Count occurrences of words of ``text`` in ``field`` of caseversion."""
+    for term in tokenize(text):
+        counts[(pk, field, term)] += 1
+
+
+
+def _caseversion_saved(sender, instance, created, update_fields=None,
+                       **kwargs):
+    """Reindex a caseversion whose name or description may have changed."""
+    if created or update_fields is None or update_fields & set(
+            ["name", "description"]):
+        SearchTerm.reindex([instance.pk])
+
+
+
+def _step_changed(sender, instance, update_fields=None, **kwargs):
+    """Reindex the caseversion of a step that was saved or deleted."""
+    if update_fields is None or update_fields & set(
+            ["instruction", "expected", "caseversion"]):
+        SearchTerm.reindex([instance.caseversion_id])
+
+
+
+models.signals.post_save.connect(_caseversion_saved, sender=CaseVersion)
+models.signals.post_save.connect(_step_changed, sender=CaseStep)
+models.signals.post_delete.connect(_step_changed, sender=CaseStep)
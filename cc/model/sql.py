@@ -0,0 +1,264 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Set-based SQL helpers for operations the ORM can only do a row at a time.
+
+"""
+import itertools
+
+from django.db import connections, router, transaction
+from django.db.models import AutoField
+from django.db.models.query import QuerySet
+from django.db.models.sql import DeleteQuery
+from django.db.models.sql.where import AND, ExtraWhere
+
+
+
+# rows per multi-row INSERT statement
+BATCH_SIZE = 500
+
+# SQLite refuses statements with more than this many bound parameters
+SQLITE_MAX_PARAMS = 999
+
+
+
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+
+class PreloadQuerySet(QuerySet):
+    """
+    QuerySet that can load related data for fetched instances in batches.
+
+    """
+    # functions called with each batch of fetched instances; see ``preload``
+    _preload = ()
+
+
+    def preload(self, *funcs):
+        """
+        Return a queryset that calls each of ``funcs`` on fetched instances.
+
+        Each function is called with a list of instances as they are fetched
+        from the database (in batches), and can load related data for all of
+        them at once, rather than a query per instance.
+
+        """
+        return self._clone(_preload=self._preload + funcs)
+
+
+    def iterator(self):
+        """Yield instances, passing each batch through preload functions."""
+        objs = super(PreloadQuerySet, self).iterator()
+        if not self._preload:
+            for obj in objs:
+                yield obj
+            return
+        for batch in chunked(objs, BATCH_SIZE):
+            for func in self._preload:
+                func(batch)
+            for obj in batch:
+                yield obj
+
+
+    def _clone(self, *args, **kwargs):
+        """Clone this queryset, preserving preload functions."""
+        kwargs.setdefault("_preload", self._preload)
+        return super(PreloadQuerySet, self)._clone(*args, **kwargs)
+
+
+
+def bulk_insert(objs, using=None, batch_size=BATCH_SIZE, with_pk=False):
+    """
+    Insert unsaved model instances with multi-row INSERT statements.
+
+    All instances must be of the same model. Instances do not get their
+    primary key set, and no signals are sent and no ``save()`` methods run;
+    fields are prepared for the database exactly as ``save()`` would prepare
+    them. With ``with_pk``, auto primary keys are inserted from the instances
+    rather than generated. Returns the number of rows inserted.
+
+    """
+    objs = list(objs)
+    if not objs:
+        return 0
+    model = objs[0].__class__
+    if using is None:
+        using = router.db_for_write(model)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+
+    fields = [
+        f for f in model._meta.local_fields
+        if with_pk or not isinstance(f, AutoField)
+        ]
+    if connection.vendor == "sqlite":
+        batch_size = min(batch_size, SQLITE_MAX_PARAMS // len(fields))
+
+    placeholders = u"({0})".format(u", ".join([u"%s"] * len(fields)))
+    sql = u"INSERT INTO {0} ({1}) VALUES ".format(
+        qn(model._meta.db_table), u", ".join(qn(f.column) for f in fields))
+
+    cursor = connection.cursor()
+    for batch in chunked(objs, batch_size):
+        params = []
+        for obj in batch:
+            params.extend(
+                [
+                    f.get_db_prep_save(
+                        f.pre_save(obj, True), connection=connection)
+                    for f in fields
+                    ]
+                )
+        cursor.execute(
+            sql + u", ".join([placeholders] * len(batch)), params)
+
+    transaction.commit_unless_managed(using=using)
+    return len(objs)
+
+
+
+def bulk_delete(queryset):
+    """
+    Delete rows selected by ``queryset`` with a single DELETE statement.
+
+    The queryset's filters must not need joins (filters on the model's own
+    columns, including ``__in`` subqueries, are fine). No signals are sent and
+    nothing is collected or cascaded, so this is only suitable for models,
+    such as many-to-many through tables, that nothing else refers to.
+
+    """
+    query = queryset.query
+    # joins trimmed by the ORM stay in ``tables``, with no references left
+    if len([a for a in query.tables if query.alias_refcount[a]]) > 1:
+        raise ValueError("Cannot bulk-delete rows selected with joins.")
+    DeleteQuery(queryset.model).do_query(
+        queryset.model._meta.db_table, query.where, using=queryset.db)
+    transaction.commit_unless_managed(using=queryset.db)
+
+
+
+def having(queryset, sql, params=()):
+    """
+    Return ``queryset`` grouped by its selected columns, filtered by HAVING.
+
+    ``sql`` is a condition on aggregates of each group, with ``%s``
+    placeholders for ``params``. The queryset should select only the columns
+    to group by (e.g. a ``values_list``); it can then be used in an ``__in``
+    lookup, as the ORM can't express a HAVING clause without also selecting
+    the aggregate. Column names in ``sql`` should be unqualified, as the table
+    is aliased when nested.
+
+    """
+    queryset = queryset._clone()
+    queryset.query.group_by = []
+    queryset.query.having.add(ExtraWhere([sql], params), AND)
+    return queryset
+
+
+
+def bulk_update(rows, version_field=None, using=None, batch_size=BATCH_SIZE):
+    """
+    Update rows for model instances with one UPDATE statement per batch.
+
+    ``rows`` is a list of ``(instance, fields)`` pairs, all of the same model.
+    Each instance's row gets the instance's values for its ``fields`` (by way
+    of a CASE on primary key per column); other columns are left alone. No
+    signals are sent and no ``save()`` methods run.
+
+    If ``version_field`` is given, each row is only updated if that column
+    still holds the instance's value for it, and the column is incremented.
+    Returns the number of rows updated.
+
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    model = rows[0][0].__class__
+    if using is None:
+        using = router.db_for_write(model)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+
+    opts = model._meta
+    pk_column = qn(opts.pk.column)
+    if version_field is not None:
+        version_column = qn(opts.get_field(version_field).column)
+    if connection.vendor == "sqlite":
+        # two parameters per updated value, plus two per row for the WHERE
+        per_row = 2 * max(len(fields) for obj, fields in rows) + 2
+        batch_size = min(batch_size, SQLITE_MAX_PARAMS // per_row)
+
+    cursor = connection.cursor()
+    updated = 0
+    for batch in chunked(rows, batch_size):
+        values = {}
+        for obj, fields in batch:
+            for f in fields:
+                values.setdefault(f, []).extend(
+                    [
+                        obj.pk,
+                        f.get_db_prep_save(
+                            f.pre_save(obj, False), connection=connection),
+                        ]
+                    )
+
+        assignments = []
+        params = []
+        for f in opts.fields:
+            if f not in values:
+                continue
+            column = qn(f.column)
+            assignments.append(
+                u"{0} = CASE {1} {2} ELSE {0} END".format(
+                    column,
+                    pk_column,
+                    u" ".join([u"WHEN %s THEN %s"] * (len(values[f]) // 2)),
+                    )
+                )
+            params.extend(values[f])
+
+        if version_field is None:
+            where = u"{0} IN ({1})".format(
+                pk_column, u", ".join([u"%s"] * len(batch)))
+            params.extend(obj.pk for obj, fields in batch)
+        else:
+            assignments.append(
+                u"{0} = {0} + 1".format(version_column))
+            where = u" OR ".join(
+                [u"({0} = %s AND {1} = %s)".format(
+                        pk_column, version_column)] * len(batch))
+            for obj, fields in batch:
+                params.extend([obj.pk, getattr(obj, version_field)])
+
+        cursor.execute(
+            u"UPDATE {0} SET {1} WHERE {2}".format(
+                qn(opts.db_table), u", ".join(assignments), where),
+            params
+            )
+        updated += cursor.rowcount
+
+    transaction.commit_unless_managed(using=using)
+    return updated
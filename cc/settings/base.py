@@ -148,6 +148,8 @@ INSTALLED_APPS = [
     "cc.model.execution",
     "cc.model.attachments",
     "cc.model.tags",
+    "cc.model.archive",
+    "cc.model.search",
     "cc.view",
     "cc.view.lists",
     "cc.view.manage",
@@ -177,7 +179,11 @@ LOGGING = {
         "mail_admins": {
             "level": "ERROR",
             "class": "django.utils.log.AdminEmailHandler"
-        }
+        },
+        "console": {
+            "level": "INFO",
+            "class": "logging.StreamHandler"
+        },
     },
     "loggers": {
         "django.request":{
@@ -185,9 +191,18 @@ LOGGING = {
             "level": "ERROR",
             "propagate": True,
         },
+        "cc.debug.queries":{
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
     }
 }
 
+# In DEBUG mode, QueryBudgetMiddleware warns of requests that run more than
+# this many database queries (or that run any query more than once).
+QUERY_BUDGET = 50
+
 INSTALLED_APPS += ["registration"]
 
 ACCOUNT_ACTIVATION_DAYS = 1
@@ -232,6 +247,12 @@ MIDDLEWARE_CLASSES.insert(
 
 INSTALLED_APPS += ["ajax_loading_overlay"]
 
+# Soft-deleted objects are moved to the archive after this many days (by the
+# archive_deleted management command), and purged from the archive after
+# PURGE_ARCHIVED_AFTER_DAYS days, if set.
+ARCHIVE_DELETED_AFTER_DAYS = 90
+PURGE_ARCHIVED_AFTER_DAYS = None
+
 LOGIN_URL = "/users/login/"
 LOGIN_REDIRECT_URL = "/"
 
@@ -27,6 +27,8 @@ CACHES["default"]["VERSION"] = 1
 if DEBUG:
     MIDDLEWARE_CLASSES.insert(
         0, "cc.debug.middleware.AjaxTracebackMiddleware")
+    MIDDLEWARE_CLASSES.insert(
+        0, "cc.debug.middleware.QueryBudgetMiddleware")
 
 try:
     HMAC_KEYS
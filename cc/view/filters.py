@@ -19,6 +19,8 @@
 List filtering options.
 
 """
+from functools import partial
+
 from cc import model
 
 from .lists import filters
@@ -61,7 +63,8 @@ class RunFilterSet(filters.FilterSet):
             lookup="productversion__product",
             queryset=model.Product.objects.all()),
         filters.ModelFilter(
-            "productversion", queryset=model.ProductVersion.objects.all()),
+            "productversion",
+            queryset=model.ProductVersion.objects.select_related("product")),
         filters.KeywordFilter("name"),
         filters.KeywordFilter("description"),
         filters.ModelFilter(
@@ -77,6 +80,7 @@ class RunFilterSet(filters.FilterSet):
             lookup="environments__elements",
             key="envelement",
             queryset=model.Element.objects.all()),
+        filters.KeywordExactFilter("bug", lookup="bugreferences__bug_url"),
         ]
 
 
@@ -90,7 +94,10 @@ class RunCaseVersionFilterSet(filters.FilterSet):
             choices=model.CaseVersion.STATUS),
         filters.KeywordExactFilter(
             "id", lookup="caseversion__case__id", coerce=int),
-        filters.KeywordFilter("name", lookup="caseversion__name"),
+        filters.SearchFilter(
+            "name",
+            lookup="caseversion",
+            search=partial(model.SearchTerm.matching, fields=["name"])),
         filters.ModelFilter(
             "tag",
             lookup="caseversion__tags",
@@ -104,13 +111,16 @@ class RunCaseVersionFilterSet(filters.FilterSet):
             "product version",
             lookup="run__productversion",
             key="productversion",
-            queryset=model.ProductVersion.objects.all()),
-        filters.KeywordFilter(
-            "instruction", lookup="caseversion__steps__instruction"),
-        filters.KeywordFilter(
+            queryset=model.ProductVersion.objects.select_related("product")),
+        filters.SearchFilter(
+            "instruction",
+            lookup="caseversion",
+            search=partial(model.SearchTerm.matching, fields=["instruction"])),
+        filters.SearchFilter(
             "expected result",
-            lookup="caseversion__steps__expected",
-            key="expected"),
+            lookup="caseversion",
+            key="expected",
+            search=partial(model.SearchTerm.matching, fields=["expected"])),
         filters.ModelFilter(
             "creator",
             lookup="caseversion__created_by",
@@ -124,6 +134,7 @@ class RunCaseVersionFilterSet(filters.FilterSet):
             "suite",
             lookup="caseversion__case__suites",
             queryset=model.Suite.objects.all()),
+        filters.KeywordExactFilter("bug", lookup="bugreferences__bug_url"),
         ]
 
 
@@ -139,6 +150,7 @@ class ResultFilterSet(filters.FilterSet):
             lookup="environment__elements",
             key="envelement",
             queryset=model.Element.objects.all()),
+        filters.KeywordExactFilter("bug", lookup="bugreferences__bug_url"),
         ]
 
 
@@ -183,7 +195,10 @@ class CaseVersionFilterSet(filters.FilterSet):
     filters = [
         filters.ChoicesFilter("status", choices=model.CaseVersion.STATUS),
         filters.KeywordExactFilter("id", lookup="case__id", coerce=int),
-        filters.KeywordFilter("name"),
+        filters.SearchFilter(
+            "name",
+            lookup="id",
+            search=partial(model.SearchTerm.matching, fields=["name"])),
         filters.ModelFilter(
             "tag", lookup="tags", queryset=model.Tag.objects.all()),
         filters.ModelFilter(
@@ -194,12 +209,16 @@ class CaseVersionFilterSet(filters.FilterSet):
             "product version",
             lookup="productversion",
             key="productversion",
-            queryset=model.ProductVersion.objects.all()),
-        filters.KeywordFilter("instruction", lookup="steps__instruction"),
-        filters.KeywordFilter(
+            queryset=model.ProductVersion.objects.select_related("product")),
+        filters.SearchFilter(
+            "instruction",
+            lookup="id",
+            search=partial(model.SearchTerm.matching, fields=["instruction"])),
+        filters.SearchFilter(
             "expected result",
-            lookup="steps__expected",
-            key="expected"),
+            lookup="id",
+            key="expected",
+            search=partial(model.SearchTerm.matching, fields=["expected"])),
         filters.ModelFilter(
             "creator", lookup="created_by", queryset=model.User.objects.all()),
         filters.ModelFilter(
@@ -209,6 +228,7 @@ class CaseVersionFilterSet(filters.FilterSet):
             queryset=model.Element.objects.all()),
         filters.ModelFilter(
             "suite", lookup="case__suites", queryset=model.Suite.objects.all()),
+        filters.KeywordExactFilter("bug", lookup="bugreferences__bug_url"),
         ]
 
 
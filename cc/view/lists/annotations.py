@@ -0,0 +1,48 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Utilities for views that annotate list of objects with per-object aggregates.
+
+"""
+from functools import wraps
+
+
+
+def annotate(ctx_name, **annotations):
+    """
+    Annotate queryset found in TemplateResponse context under ``ctx_name``.
+
+    ``annotations`` are passed to the queryset's ``annotate()``, so per-object
+    aggregates (such as ``NotDeletedCount``) are selected along with the list
+    in a single query, rather than queried for each listed object.
+
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            response = view_func(request, *args, **kwargs)
+            try:
+                ctx = response.context_data
+            except AttributeError:
+                return response
+            ctx[ctx_name] = ctx[ctx_name].annotate(**annotations)
+            return response
+
+        return _wrapped_view
+
+    return decorator
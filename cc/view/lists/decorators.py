@@ -20,6 +20,7 @@ Decorators for list views.
 
 """
 from .actions import actions
+from .annotations import annotate
 from .filters import filter
 from .finder import finder
 from .sort import sort
@@ -407,3 +407,30 @@ class KeywordFilter(KeywordExactFilter):
             return queryset.distinct()
 
         return queryset
+
+
+
+class SearchFilter(KeywordExactFilter):
+    """
+    Values are ANDed in a search of a text index.
+
+    Rather than a 'contains' join, each value filters ``lookup`` by the IDs
+    returned by the ``search`` callable given at instantiation, which takes a
+    filter value and returns a queryset (used as a subquery) of matching IDs,
+    or None if the value doesn't restrict the search.
+
+    """
+    def __init__(self, *args, **kwargs):
+        """Looks for ``search`` kwarg."""
+        self.search = kwargs.pop("search")
+        super(SearchFilter, self).__init__(*args, **kwargs)
+
+
+    def filter(self, queryset, values):
+        """Values are ANDed in a search of the text index."""
+        for value in values:
+            ids = self.search(value)
+            if ids is not None:
+                queryset = queryset.filter(
+                    **{"{0}__in".format(self.lookup): ids})
+        return queryset
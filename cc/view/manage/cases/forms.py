@@ -19,6 +19,8 @@
 Management forms for cases.
 
 """
+import json
+
 from django.core.urlresolvers import reverse
 from django.forms.models import inlineformset_factory, BaseInlineFormSet
 
@@ -228,12 +230,23 @@ class AddCaseForm(BaseAddCaseForm, BaseCaseVersionForm, BaseCaseForm):
 
 class AddBulkCaseForm(BaseAddCaseForm, BaseCaseForm):
     """Form for adding test cases in bulk."""
-    cases = forms.CharField(widget=ccforms.BareTextarea)
+    cases = forms.CharField(widget=ccforms.BareTextarea, required=False)
+    cases_file = forms.FileField(required=False)
+    file_format = forms.ChoiceField(
+        choices=model.CaseImport.FORMAT,
+        initial=model.CaseImport.FORMAT.text,
+        required=False)
 
 
     def clean_cases(self):
-        """Validate the bulk cases text."""
-        data = model.BulkParser().parse(self.cleaned_data["cases"])
+        """Validate the bulk cases text, unless a file is uploaded instead."""
+        text = self.cleaned_data["cases"]
+        if not text.strip():
+            if self.files.get("cases_file"):
+                return []
+            raise forms.ValidationError(
+                self.fields["cases"].error_messages["required"])
+        data = model.BulkParser().parse(text)
 
         for d in data:
             if "error" in d:
@@ -271,40 +284,49 @@ class AddBulkCaseForm(BaseAddCaseForm, BaseCaseForm):
             productversions.extend(product.versions.filter(
                     order__gt=productversions[0].order))
 
-        initial_suite = self.cleaned_data.get("initial_suite")
-
-        cases = []
+        return model.import_cases(
+            product,
+            productversions,
+            self.cleaned_data["cases"],
+            user=self.user,
+            status=self.cleaned_data["status"],
+            tags=self.cleaned_data.get("tags"),
+            suite=self.cleaned_data.get("initial_suite"),
+            )
 
-        for case_data in self.cleaned_data["cases"]:
-            case = model.Case.objects.create(product=product, user=self.user)
 
-            version_kwargs = case_data.copy()
-            steps_data = version_kwargs.pop("steps")
+    def save_import(self):
+        """
+        Queue the uploaded file for import; return the ``CaseImport``.
 
-            version_kwargs["case"] = case
-            version_kwargs["status"] = self.cleaned_data["status"]
-            version_kwargs["user"] = self.user
+        The file is too large to import within the request; the
+        ``resume_case_imports`` management command streams and imports it in
+        chunks, skipping and recording invalid records by line number.
 
-            if initial_suite:
-                model.SuiteCase.objects.create(
-                    case=case, suite=initial_suite, user=self.user)
+        """
+        assert self.is_valid()
 
-            for productversion in productversions:
-                this_version_kwargs = version_kwargs.copy()
-                this_version_kwargs["productversion"] = productversion
-                caseversion = model.CaseVersion.objects.create(
-                    **this_version_kwargs)
-                for i, step_kwargs in enumerate(steps_data, 1):
-                    model.CaseStep.objects.create(
-                        user=self.user,
-                        caseversion=caseversion,
-                        number=i,
-                        **step_kwargs)
-                self.save_tags(caseversion)
+        product = self.cleaned_data["product"]
 
-            cases.append(case)
+        self.save_new_tags(product)
 
-        return cases
+        uploaded = self.cleaned_data["cases_file"]
+        caseimport = model.CaseImport.objects.create(
+            file=uploaded,
+            name=uploaded.name,
+            format=(
+                self.cleaned_data["file_format"] or
+                model.CaseImport.FORMAT.text),
+            product=product,
+            productversion=self.cleaned_data["productversion"],
+            and_later_versions=bool(
+                self.cleaned_data.get("and_later_versions")),
+            suite=self.cleaned_data.get("initial_suite"),
+            status=self.cleaned_data["status"],
+            tags=json.dumps(sorted(self.cleaned_data.get("tags", []))),
+            user=self.user,
+            )
+        return caseimport
 
 
 
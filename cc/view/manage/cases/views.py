@@ -58,7 +58,9 @@ def cases_list(request):
         request,
         "manage/case/cases.html",
         {
-            "caseversions": model.CaseVersion.objects.select_related("case"),
+            "caseversions": model.CaseVersion.objects.select_related(
+                "case", "productversion__product").preload(
+                    model.preload_tags),
             }
         )
 
@@ -109,11 +111,19 @@ def case_add_bulk(request):
         form = forms.AddBulkCaseForm(
             request.POST, request.FILES, user=request.user)
         if form.is_valid():
-            cases = form.save()
-            messages.success(
-                request, "Added {0} test case{1}.".format(
-                    len(cases), "" if len(cases) == 1 else "s")
-                )
+            if form.cleaned_data.get("cases_file"):
+                caseimport = form.save_import()
+                messages.success(
+                    request,
+                    "Uploaded {0}; its test cases will be added "
+                    "shortly.".format(caseimport.name)
+                    )
+            else:
+                cases = form.save()
+                messages.success(
+                    request, "Added {0} test case{1}.".format(
+                        len(cases), "" if len(cases) == 1 else "s")
+                    )
             return redirect("manage_cases")
     else:
         form = forms.AddBulkCaseForm(user=request.user)
@@ -61,7 +61,10 @@ class EnvironmentElementSelectMultiple(ccforms.CCSelectMultiple):
             element = c[1].obj
             available.setdefault(element.category, []).append(element)
         # ensure we also include empty categories
-        categories = list(model.Category.objects.order_by("name"))
+        categories = model.Category.load_deletable(
+            model.Category.objects.order_by("name"))
+        model.Element.load_deletable(
+            [e for elements in available.values() for e in elements])
         for category in categories:
             # annotate with elements available in this widget
             category.choice_elements = available.get(category, [])
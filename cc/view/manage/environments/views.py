@@ -29,6 +29,7 @@ from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
 
 from cc import model
+from cc.model.ccmodel import NotDeletedCount
 
 from cc.view.filters import ProfileFilterSet, EnvironmentFilterSet
 from cc.view.lists import decorators as lists
@@ -46,6 +47,9 @@ from .decorators import category_element_ajax_add_edit
     permission="environments.manage_environments")
 @lists.filter("profiles", filterset_class=ProfileFilterSet)
 @lists.sort("profiles")
+@lists.annotate(
+    "profiles",
+    environment_count=NotDeletedCount("environments", distinct=True))
 @ajax("manage/environment/profile_list/_profiles_list.html")
 def profiles_list(request):
     """List profiles."""
@@ -53,7 +57,8 @@ def profiles_list(request):
         request,
         "manage/environment/profiles.html",
         {
-            "profiles": model.Profile.objects.all(),
+            "profiles": model.Profile.objects.preload(
+                model.preload_categories),
             }
         )
 
@@ -132,6 +137,11 @@ def profile_edit(request, profile_id):
             if not element_ids:
                 messages.error(
                     request, "Please select some environment elements.")
+            elif profile.environments.match(element_ids).exists():
+                messages.error(
+                    request,
+                    "This profile already has an environment "
+                    "with those elements.")
             else:
                 env = model.Environment.objects.create(
                     profile=profile, user=request.user)
@@ -162,13 +172,32 @@ def productversion_environments_edit(request, productversion_id):
             if not element_ids:
                 messages.error(
                     request, "Please select some environment elements.")
+            elif productversion.environments.match(element_ids).exists():
+                messages.error(
+                    request,
+                    "This product version already has an environment "
+                    "with those elements.")
             else:
-                env = model.Environment.objects.create(user=request.user)
-                env.elements.add(*element_ids)
-                productversion.environments.add(env)
+                # reuse an existing environment with the same elements
+                existing = model.Environment.objects.match(
+                    element_ids).order_by("id")[:1]
+                if existing:
+                    env = existing[0]
+                else:
+                    env = model.Environment.objects.create(user=request.user)
+                    env.elements.add(*element_ids)
+                productversion.add_envs(env)
         elif "action-remove" in request.POST:
             env_id = request.POST.get("action-remove")
+            # like additions, the removal reaches only draft runs; active and
+            # finished runs (and their runcaseversions) keep the environment
             productversion.environments.remove(env_id)
+            model.Run.bulk_remove_envs(
+                productversion.runs.filter(status=model.Run.STATUS.draft),
+                [env_id])
+            model.CaseVersion.environments.through._base_manager.filter(
+                caseversion__productversion=productversion,
+                environment=env_id).delete()
 
     return TemplateResponse(
         request,
@@ -37,7 +37,7 @@ class ManageFinder(finder.Finder):
         finder.Column(
             "productversions",
             "_productversions.html",
-            model.ProductVersion.objects.all(),
+            model.ProductVersion.objects.select_related("product"),
             "manage_runs",
             ),
         finder.Column(
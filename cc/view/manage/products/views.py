@@ -26,6 +26,7 @@ from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
 
 from cc import model
+from cc.model.ccmodel import NotDeletedCount
 
 from cc.view.filters import ProductFilterSet
 from cc.view.lists import decorators as lists
@@ -45,6 +46,8 @@ from . import forms
 @lists.finder(ManageFinder)
 @lists.filter("products", filterset_class=ProductFilterSet)
 @lists.sort("products")
+@lists.annotate(
+    "products", version_count=NotDeletedCount("versions", distinct=True))
 @ajax("manage/product/list/_products_list.html")
 def products_list(request):
     """List products."""
@@ -45,6 +45,7 @@ from . import forms
 @lists.finder(ManageFinder)
 @lists.filter("suites", filterset_class=SuiteFilterSet)
 @lists.sort("suites")
+@lists.annotate("suites", case_count=NotDeletedCount("cases", distinct=True))
 @ajax("manage/suite/list/_suites_list.html")
 def suites_list(request):
     """List suites."""
@@ -52,8 +53,7 @@ def suites_list(request):
         request,
         "manage/suite/suites.html",
         {
-            "suites": model.Suite.objects.select_related().annotate(
-                case_count=NotDeletedCount("cases", distinct=True)),
+            "suites": model.Suite.objects.select_related(),
             }
         )
 
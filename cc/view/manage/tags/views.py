@@ -30,6 +30,7 @@ from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
 
 from cc import model
+from cc.model.ccmodel import NotDeletedCount
 
 from cc.view.filters import TagFilterSet
 from cc.view.lists import decorators as lists
@@ -49,6 +50,10 @@ from . import forms
 @lists.finder(ManageFinder)
 @lists.filter("tags", filterset_class=TagFilterSet)
 @lists.sort("tags")
+# counts the case_id column of the tagged caseversions, so the not-deleted
+# condition is on the caseversion: cases are only counted through live versions
+@lists.annotate(
+    "tags", case_count=NotDeletedCount("caseversions__case", distinct=True))
 @ajax("manage/tag/list/_tags_list.html")
 def tags_list(request):
     """List tags."""
@@ -56,7 +61,7 @@ def tags_list(request):
         request,
         "manage/tag/tags.html",
         {
-            "tags": model.Tag.objects.all(),
+            "tags": model.Tag.objects.select_related("product"),
             }
         )
 
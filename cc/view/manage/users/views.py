@@ -52,7 +52,7 @@ def users_list(request):
         request,
         "manage/user/users.html",
         {
-            "users": model.User.objects.all(),
+            "users": model.User.objects.preload(model.preload_roles),
             }
         )
 
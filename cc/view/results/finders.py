@@ -49,7 +49,7 @@ class ResultsFinder(finder.Finder):
         finder.Column(
             "productversions",
             "_productversions.html",
-            model.ProductVersion.objects.all(),
+            model.ProductVersion.objects.select_related("product"),
             "results_runs",
             ),
         finder.Column(
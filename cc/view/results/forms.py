@@ -0,0 +1,46 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Forms for results.
+
+"""
+import floppyforms as forms
+
+from ... import model
+from ...model.execution.export import FORMATS
+
+
+
+class ExportForm(forms.Form):
+    """Form for choosing which results to export, and in what format."""
+    run = forms.ModelChoiceField(
+        queryset=model.Run.objects.all(), required=False)
+    productversion = forms.ModelChoiceField(
+        queryset=model.ProductVersion.objects.all(), required=False)
+    since = forms.DateField(required=False)
+    until = forms.DateField(required=False)
+    format = forms.ChoiceField(
+        choices=[(f, f) for f in FORMATS], required=False)
+
+
+    def filters(self):
+        """Return keyword arguments for ``filter_results``."""
+        return dict(
+            (k, self.cleaned_data[k])
+            for k in ["run", "productversion", "since", "until"]
+            )
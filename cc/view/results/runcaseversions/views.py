@@ -45,7 +45,9 @@ def runcaseversions_list(request):
         request,
         "results/case/cases.html",
         {
-            "runcaseversions": model.RunCaseVersion.objects.select_related(),
+            "runcaseversions": model.RunCaseVersion.objects.select_related(
+                "run__productversion__product", "caseversion").preload(
+                    model.preload_result_stats),
             }
         )
 
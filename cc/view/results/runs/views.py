@@ -45,7 +45,9 @@ def runs_list(request):
         request,
         "results/run/runs.html",
         {
-            "runs": model.Run.objects.select_related(),
+            "runs": model.Run.objects.select_related(
+                "productversion__product").preload(
+                    model.preload_result_stats),
             }
         )
 
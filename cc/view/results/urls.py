@@ -57,5 +57,11 @@ urlpatterns = patterns(
     # list
     url(r"^case/(?P<rcv_id>\d+)/$",
         "results.views.results_list",
-        name="results_results")
+        name="results_results"),
+
+    # export -----------------------------------------------------------------
+
+    url(r"^export/$",
+        "views.export_results",
+        name="results_export"),
 )
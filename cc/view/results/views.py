@@ -19,11 +19,18 @@
 Home results view.
 
 """
+import json
+
 from django.core.urlresolvers import reverse
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import redirect
 
 from django.contrib.auth.decorators import login_required
 
+from ...model.execution.export import export, filter_results
+
+from .forms import ExportForm
+
 
 
 @login_required
@@ -31,3 +38,41 @@ def home(request):
     """Results home redirects to list of active test runs, with finder open."""
     return redirect(
         reverse("results_runs") + "?openfinder=1&filter-status=active")
+
+
+
+# content type for each export format
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+    }
+
+
+
+@login_required
+def export_results(request):
+    """
+    Stream results as CSV (default) or JSON Lines.
+
+    Query parameters ``run``, ``productversion``, ``since`` and ``until``
+    (YYYY-MM-DD dates, of last modification) limit which results are
+    exported; ``format`` is "csv" or "jsonl". The response is written
+    incrementally, so exporting any number of results takes constant memory.
+
+    """
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(
+            json.dumps(
+                dict((k, map(unicode, v)) for k, v in form.errors.items())),
+            content_type="application/json",
+            )
+
+    fmt = form.cleaned_data["format"] or "csv"
+    response = HttpResponse(
+        export(filter_results(**form.filters()), fmt),
+        content_type=EXPORT_CONTENT_TYPES[fmt],
+        )
+    response["Content-Disposition"] = (
+        "attachment; filename=results.{0}".format(fmt))
+    return response
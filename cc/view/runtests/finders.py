@@ -38,7 +38,7 @@ class RunTestsFinder(finder.Finder):
         finder.Column(
             "productversions",
             "_productversions.html",
-            model.ProductVersion.objects.all(),
+            model.ProductVersion.objects.select_related("product"),
             ),
         finder.Column(
             "runs",
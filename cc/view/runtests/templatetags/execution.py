@@ -36,6 +36,9 @@ class ResultFor(Tag):
     If no relevant Result exists, returns *unsaved* default Result for use in
     template (result will be saved when case is started.)
 
+    Uses results loaded by ``model.preload_results``, if any, and otherwise
+    queries for the result.
+
     """
     name = "result_for"
     options = Options(
@@ -54,9 +57,16 @@ class ResultFor(Tag):
             tester=user,
             runcaseversion=runcaseversion
             )
-        try:
-            result = model.Result.objects.get(**result_kwargs)
-        except model.Result.DoesNotExist:
+        preloaded = getattr(runcaseversion, "_preloaded_results", {})
+        key = (user.id, environment.id)
+        if key in preloaded:
+            result = preloaded[key]
+        else:
+            try:
+                result = model.Result.objects.get(**result_kwargs)
+            except model.Result.DoesNotExist:
+                result = None
+        if result is None:
             result = model.Result(**result_kwargs)
 
         context[varname] = result
@@ -74,6 +84,9 @@ class StepResultFor(Tag):
     If no relevant StepResult exists, returns *unsaved* default StepResult for
     use in template.
 
+    Uses step results loaded by ``model.preload_results``, if any, and
+    otherwise queries for the step result.
+
     """
     name = "stepresult_for"
     options = Options(
@@ -90,9 +103,17 @@ class StepResultFor(Tag):
             result=result,
             step=casestep,
             )
-        try:
-            stepresult = model.StepResult.objects.get(**stepresult_kwargs)
-        except model.StepResult.DoesNotExist:
+        preloaded = getattr(result, "_preloaded_stepresults", None)
+        if result.pk is None:
+            stepresult = None
+        elif preloaded is not None:
+            stepresult = preloaded.get(casestep.id)
+        else:
+            try:
+                stepresult = model.StepResult.objects.get(**stepresult_kwargs)
+            except model.StepResult.DoesNotExist:
+                stepresult = None
+        if stepresult is None:
             stepresult = model.StepResult(**stepresult_kwargs)
 
         context[varname] = stepresult
@@ -33,5 +33,8 @@ urlpatterns = patterns(
     url(r"^run/(?P<run_id>\d+)/env/(?P<env_id>\d+)/$",
         "run",
         name="runtests_run"),
+    url(r"^run/(?P<run_id>\d+)/results/$",
+        "submit_results",
+        name="runtests_submit_results"),
 
 )
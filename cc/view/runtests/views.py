@@ -19,11 +19,13 @@
 Views for test execution.
 
 """
+from functools import partial
 import json
 
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.response import TemplateResponse
+from django.views.decorators.http import require_POST
 
 from django.contrib import messages
 from django.contrib.auth.decorators import permission_required
@@ -32,6 +34,7 @@ from ... import model
 
 from ..lists import decorators as lists
 from ..utils.ajax import ajax
+from ..utils.auth import basic_auth
 
 from .finders import RunTestsFinder
 from .forms import EnvironmentSelectionForm
@@ -206,7 +209,14 @@ def run(request, run_id, env_id):
             "run": run,
             "envform": envform,
             "runcaseversions": run.runcaseversions.select_related(
-                "caseversion"),
+                "caseversion").preload(
+                partial(
+                    model.preload_results,
+                    tester=request.user,
+                    environment=environment,
+                    ),
+                _preload_caseversions,
+                ),
             "finder": {
                 # finder decorator populates top column (products), we
                 # prepopulate the other two columns
@@ -218,3 +228,68 @@ def run(request, run_id, env_id):
                 },
             }
         )
+
+
+
+@require_POST
+@basic_auth
+@permission_required("execution.execute")
+def submit_results(request, run_id):
+    """
+    Record many results at once for the current user, e.g. from automation.
+
+    Expects a JSON request body with a list of "results" records, as
+    accepted by ``model.submit_results``, and an optional client-supplied
+    "batch_key" that makes retrying the same submission safe. Returns JSON
+    with the outcome of each record.
+
+    Scripts authenticate with HTTP Basic credentials and need no CSRF token;
+    in-browser requests use the session and its CSRF token.
+
+    """
+    run = get_object_or_404(model.Run, pk=run_id)
+
+    if not run.status == model.Run.STATUS.active:
+        return _json_error("That test run is currently not open for testing.")
+
+    try:
+        data = json.loads(request.raw_post_data)
+        records = data["results"]
+        batch_key = data.get("batch_key")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return _json_error(
+            "Request body must be a JSON object with a list of results.")
+    if not isinstance(records, list):
+        return _json_error("Results must be a list.")
+    if batch_key is not None:
+        if not isinstance(batch_key, basestring):
+            return _json_error("Batch key must be a string.")
+        max_length = model.ResultBatch._meta.get_field("key").max_length
+        if len(batch_key) > max_length:
+            return _json_error(
+                "Batch key must be at most {0} characters.".format(max_length))
+
+    outcomes = model.submit_results(
+        run, request.user, records, batch_key=batch_key)
+
+    return HttpResponse(
+        json.dumps({"batch_key": batch_key, "results": outcomes}),
+        content_type="application/json",
+        )
+
+
+
+def _json_error(message):
+    """Return a 400 response with JSON body containing ``message``."""
+    return HttpResponseBadRequest(
+        json.dumps({"error": message}),
+        content_type="application/json",
+        )
+
+
+
+def _preload_caseversions(runcaseversions):
+    """Load steps and attachments of the caseversions of runcaseversions."""
+    caseversions = [rcv.caseversion for rcv in runcaseversions]
+    model.preload_steps(caseversions)
+    model.preload_attachments(caseversions)
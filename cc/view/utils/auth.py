@@ -0,0 +1,70 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Authentication view decorators.
+
+"""
+import base64
+from functools import wraps
+
+from django.http import HttpResponse
+
+from django.contrib import auth
+
+from session_csrf import CsrfMiddleware
+
+
+
+def basic_auth(view_func):
+    """
+    A view decorator that accepts HTTP Basic credentials, for scripted clients.
+
+    A request with a Basic ``Authorization`` header is run as the user with
+    those credentials, with no CSRF check (another site's form can't supply
+    the header); bad credentials get a 401 response. Requests without the
+    header fall through with the session user, and are CSRF-checked as usual.
+
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        header = request.META.get("HTTP_AUTHORIZATION", "")
+        if not header.startswith("Basic "):
+            reject = CsrfMiddleware().process_view(
+                request, view_func, args, kwargs)
+            if reject is not None:
+                return reject
+            return view_func(request, *args, **kwargs)
+
+        try:
+            username, password = base64.b64decode(
+                header[len("Basic "):]).decode("utf-8").split(":", 1)
+        except (TypeError, ValueError):
+            user = None
+        else:
+            user = auth.authenticate(username=username, password=password)
+        if user is None or not user.is_active:
+            response = HttpResponse("Invalid credentials.", status=401)
+            response["WWW-Authenticate"] = 'Basic realm="Case Conductor"'
+            return response
+        request.user = user
+        return view_func(request, *args, **kwargs)
+
+    # the CSRF middleware skips this view; requests without credentials are
+    # checked above instead
+    _wrapped_view.csrf_exempt = True
+    return _wrapped_view
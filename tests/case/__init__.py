@@ -22,7 +22,9 @@ django.utils.unittest.TestCase provides a bare TestCase class for tests that
 don't access the database or need any of the other Django TestCase class
 utilities.
 
-DBTestCase is a Django TestCase, plus some CC-specific helpers.
+DBTestCase is a Django TestCase, plus some CC-specific helpers;
+TransactionDBTestCase is the same for a Django TransactionTestCase, for tests
+that need commits and rollbacks to actually happen.
 
 View and admin test case classes (using WebTest) are available from the view
 and admin sub-modules.
@@ -32,4 +34,4 @@ from django.utils.unittest import TestCase
 
 from . import admin
 from . import view
-from .base import DBTestCase
+from .base import DBTestCase, TransactionDBTestCase
@@ -19,7 +19,7 @@
 Utility base TestCase classes for Case Conductor.
 
 """
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 
 
 
@@ -52,3 +52,9 @@ class DBMixin(object):
 class DBTestCase(DBMixin, TestCase):
     """Base test case class for Case Conductor tests that need the database."""
     pass
+
+
+
+class TransactionDBTestCase(DBMixin, TransactionTestCase):
+    """Base test case class for tests that need real transaction behavior."""
+    pass
@@ -26,4 +26,5 @@ from .base import (
     ListViewTestCase,
     ListFinderTests,
     )
+from .budget import QueryBudgetTestCase
 from . import manage
@@ -0,0 +1,118 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Utility base TestCase class for asserting per-view query budgets.
+
+"""
+from collections import defaultdict
+
+from django.core.signals import request_started
+from django.db import connection, reset_queries
+
+from cc.debug.middleware import fingerprint
+
+from .base import ViewTestCase
+
+
+
+class QueryCounter(object):
+    """Context manager counting database queries, including in requests."""
+    def __enter__(self):
+        self.debug_cursor = connection.use_debug_cursor
+        connection.use_debug_cursor = True
+        request_started.disconnect(reset_queries)
+        self.start = len(connection.queries)
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.queries = connection.queries[self.start:]
+        self.count = len(self.queries)
+        request_started.connect(reset_queries)
+        connection.use_debug_cursor = self.debug_cursor
+
+
+
+class QueryBudgetTestCase(ViewTestCase):
+    """
+    Base class for asserting that views run a bounded number of queries.
+
+    Each view is requested with a small and then a large synthetic dataset; it
+    must run the same number of queries for both (so that no query is repeated
+    for each listed object), and no more than its budget.
+
+    """
+    # number of rows in the small and large datasets; the large one should
+    # still fit on the first page of a list
+    small = 2
+    large = 12
+
+
+    def setUp(self):
+        """Create a user with every permission, so all controls render."""
+        self.user = self.F.UserFactory.create()
+        self.user.user_permissions.add(*self.model.Permission.objects.all())
+
+
+    def get_queries(self, url, **kwargs):
+        """Return list of queries run in getting ``url``."""
+        kwargs.setdefault("user", self.user)
+        with QueryCounter() as counter:
+            self.app.get(url, **kwargs)
+        return counter.queries
+
+
+    def assertQueryBudget(self, budget, populate, url, **kwargs):
+        """
+        Assert that getting ``url`` runs no more than ``budget`` queries.
+
+        ``populate(n)`` is called to add ``n`` rows to the dataset, first up to
+        the small and then the large dataset size; the query count must be the
+        same for both. ``url`` may be a callable that returns the URL. Extra
+        keyword arguments are passed on to WebTest's ``get``.
+
+        """
+        get_url = url if callable(url) else lambda: url
+        populate(self.small)
+        # warm up caches (content types, etc)
+        self.get_queries(get_url(), **kwargs)
+        small = self.get_queries(get_url(), **kwargs)
+        populate(self.large - self.small)
+        large = self.get_queries(get_url(), **kwargs)
+
+        if len(small) != len(large):
+            counts = defaultdict(int)
+            for q in small:
+                counts[fingerprint(q["sql"])] -= 1
+            for q in large:
+                counts[fingerprint(q["sql"])] += 1
+            self.fail(
+                "{0} ran {1} queries with {2} rows, but {3} with {4} rows. "
+                "Growing queries:\n{5}".format(
+                    get_url(), len(small), self.small, len(large), self.large,
+                    "\n".join(
+                        "{0:+d}: {1}".format(c, sql)
+                        for sql, c in counts.items() if c)
+                    )
+                )
+        self.assertLessEqual(
+            len(large),
+            budget,
+            "{0} ran {1} queries; budget is {2}.".format(
+                get_url(), len(large), budget)
+            )
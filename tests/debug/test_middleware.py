@@ -73,3 +73,152 @@ class AjaxTracebackMiddlewareTest(case.TestCase):
         request.is_ajax.return_value = False
 
         self.assertIs(m.process_exception(request), None)
+
+
+
+class QueryBudgetMiddlewareTest(case.TestCase):
+    @property
+    def middleware(self):
+        from cc.debug.middleware import QueryBudgetMiddleware
+        return QueryBudgetMiddleware
+
+
+    def setUp(self):
+        """Save and empty connection.queries; mock the logger."""
+        from django.db import connection
+        self.connection = connection
+        self.saved_queries = connection.queries
+        connection.queries = []
+        patcher = patch("cc.debug.middleware.log")
+        self.log = patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+    def tearDown(self):
+        """Restore connection.queries."""
+        self.connection.queries = self.saved_queries
+
+
+    def query(self, sql, time="0.002"):
+        """Record a fake query."""
+        self.connection.queries.append({"sql": sql, "time": time})
+
+
+    @override_settings(DEBUG=False)
+    def test_not_used_when_DEBUG_off(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            self.middleware()
+
+
+    @override_settings(DEBUG=True, QUERY_BUDGET=10)
+    def test_headers(self):
+        """Sets query count, time and duplicates headers; logs summary."""
+        m = self.middleware()
+        request = Mock()
+        request.method = "GET"
+        request.path = "/some/"
+
+        self.query("SELECT 1")
+        m.process_request(request)
+        self.query("SELECT a FROM b WHERE id = 1")
+        self.query("SELECT a FROM b WHERE id = 2")
+        self.query("SELECT c FROM d", time="0.0015")
+        response = m.process_response(request, {})
+
+        self.assertEqual(response["X-Query-Count"], "3")
+        self.assertEqual(response["X-Query-Time"], "5.5")
+        self.assertEqual(response["X-Duplicate-Queries"], "1")
+        self.assertTrue(self.log.warning.called)
+
+
+    @override_settings(DEBUG=True, QUERY_BUDGET=10)
+    def test_within_budget(self):
+        """Without duplicates and within budget, logs at info level."""
+        m = self.middleware()
+        request = Mock()
+
+        m.process_request(request)
+        self.query("SELECT a FROM b")
+        response = m.process_response(request, {})
+
+        self.assertEqual(response["X-Duplicate-Queries"], "0")
+        self.assertTrue(self.log.info.called)
+        self.assertFalse(self.log.warning.called)
+
+
+    @override_settings(DEBUG=True, QUERY_BUDGET=0)
+    def test_over_budget(self):
+        """Exceeding the budget logs a warning."""
+        m = self.middleware()
+        request = Mock()
+
+        m.process_request(request)
+        self.query("SELECT a FROM b")
+        m.process_response(request, {})
+
+        self.assertTrue(self.log.warning.called)
+
+
+    @override_settings(DEBUG=True, QUERY_BUDGET=10)
+    def test_duplicate_templates(self):
+        """Duplicate query warning names the template that ran the query."""
+        from django.template import Template, Context, Node, NodeList
+
+        m = self.middleware()
+        request = Mock()
+        test = self
+
+        class QueryNode(Node):
+            def render(self, context):
+                test.query("SELECT a FROM b WHERE id = 3")
+                return ""
+
+        t = Template("", name="some/template.html")
+        t.nodelist = NodeList([QueryNode(), QueryNode()])
+
+        m.process_request(request)
+        t.render(Context())
+        m.process_response(request, {})
+
+        msg = self.log.warning.call_args[0][0]
+        self.assertIn(
+            "2x (in some/template.html): SELECT a FROM b WHERE id = ?", msg)
+
+
+    @override_settings(DEBUG=True)
+    def test_no_process_request(self):
+        """Response is returned unchanged if request was not tracked."""
+        response = {}
+
+        self.assertIs(
+            self.middleware().process_response(object(), response), response)
+
+
+
+class FingerprintTest(case.TestCase):
+    @property
+    def func(self):
+        from cc.debug.middleware import fingerprint
+        return fingerprint
+
+
+    def test_literals(self):
+        """String and numeric literals are replaced by placeholders."""
+        self.assertEqual(
+            self.func("SELECT a FROM b WHERE c = 'it''s' AND d > 1.5"),
+            "SELECT a FROM b WHERE c = ? AND d > ?",
+            )
+
+
+    def test_lists(self):
+        """Lists of literals of any length are collapsed."""
+        self.assertEqual(
+            self.func("SELECT a FROM b WHERE id IN (1, 2, 3)"),
+            self.func("SELECT a FROM b WHERE id IN (4)"),
+            )
+
+
+    def test_identifiers(self):
+        """Digits within identifiers are left alone."""
+        self.assertEqual(
+            self.func('SELECT "t1"."a" FROM "t1"'), 'SELECT "t1"."a" FROM "t1"')
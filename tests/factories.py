@@ -231,6 +231,31 @@ class CaseStepFactory(factory.Factory):
 
 
 
+class CaseImportFactory(factory.Factory):
+    FACTORY_FOR = model.CaseImport
+
+    name = "cases.txt"
+    format = "text"
+    productversion = factory.SubFactory(ProductVersionFactory)
+
+
+    @factory.lazy_attribute
+    def product(obj):
+        return obj.productversion.product
+
+
+    @classmethod
+    def _prepare(cls, create, **kwargs):
+        """Special handling for file so we can set its contents."""
+        content = kwargs.pop("content", "")
+        obj = super(CaseImportFactory, cls)._prepare(create=False, **kwargs)
+        obj.file = SimpleUploadedFile(obj.name, content)
+        if create:
+            obj.save()
+        return obj
+
+
+
 class ProfileFactory(factory.Factory):
     FACTORY_FOR = model.Profile
 
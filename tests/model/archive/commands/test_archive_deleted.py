@@ -0,0 +1,85 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for management command to archive deleted objects.
+
+"""
+from cStringIO import StringIO
+import datetime
+
+from django.core.management import call_command
+
+from djangosecure.test_utils import override_settings
+from mock import patch
+
+from tests import case
+
+
+
+class ArchiveDeletedTest(case.DBTestCase):
+    """Tests for archive_deleted management command."""
+    def call_command(self, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("archive_deleted", **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def setUp(self):
+        """Create a tag deleted ten days ago."""
+        self.tag = self.F.TagFactory.create()
+        self.tag.delete()
+        self.model.Tag._base_manager.update(
+            deleted_on=datetime.datetime.utcnow() - datetime.timedelta(days=10))
+
+
+    def test_archive(self):
+        """Archives objects deleted more than given days ago."""
+        output = self.call_command(days=5)
+
+        self.assertEqual(self.model.Tag._base_manager.count(), 0)
+        self.assertEqual(self.model.ArchivedRow.objects.count(), 1)
+        self.assertIn("Archived 1 tags.", output)
+        self.assertIn("Archived 1 objects deleted more than 5 days ago.", output)
+        self.assertNotIn("Purged", output)
+
+
+    @override_settings(ARCHIVE_DELETED_AFTER_DAYS=20)
+    def test_default_days(self):
+        """Archives objects deleted more than ARCHIVE_DELETED_AFTER_DAYS ago."""
+        self.call_command()
+
+        self.assertEqual(self.model.Tag._base_manager.count(), 1)
+
+
+    def test_purge(self):
+        """Purges archived objects deleted more than given days ago."""
+        output = self.call_command(days=5, purge_days=5)
+
+        self.assertEqual(self.model.ArchivedRow.objects.count(), 0)
+        self.assertIn(
+            "Purged 1 archived objects deleted more than 5 days ago.", output)
+
+
+    def test_bad_batch_size(self):
+        """A batch size less than one is an error."""
+        with patch("sys.stderr", StringIO()):
+            with self.assertRaises(SystemExit):
+                self.call_command(batch_size=0)
@@ -0,0 +1,348 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for archiving, restoring and purging long-deleted objects.
+
+"""
+import datetime
+
+from mock import Mock, patch
+
+from tests import case
+
+
+
+class ArchiveTestCase(case.DBTestCase):
+    """Base class for archive tests."""
+    @property
+    def archive(self):
+        """The module under test."""
+        from cc.model.archive import models
+        return models
+
+
+    def later(self, days=1):
+        """Return a datetime ``days`` from now."""
+        return datetime.datetime.utcnow() + datetime.timedelta(days=days)
+
+
+    def archived(self, model):
+        """Return sorted list of archived object IDs of given model."""
+        from django.contrib.contenttypes.models import ContentType
+        return sorted(
+            self.model.ArchivedRow.objects.filter(
+                content_type=ContentType.objects.get_for_model(model)
+                ).values_list("object_id", flat=True)
+            )
+
+
+    def exists(self, obj):
+        """Return True if ``obj`` is (still) in its model's table."""
+        return obj.__class__._base_manager.filter(pk=obj.pk).exists()
+
+
+
+class ArchiveTest(ArchiveTestCase):
+    """Tests for archiving deleted objects."""
+    def test_archive(self):
+        """Objects deleted before the cutoff move to the archive."""
+        t = self.F.TagFactory.create()
+        t.delete()
+
+        counts = self.archive.archive(self.later())
+
+        self.assertFalse(self.exists(t))
+        self.assertEqual(self.archived(self.model.Tag), [t.id])
+        self.assertEqual(counts, {self.model.Tag: 1})
+
+
+    def test_unicode(self):
+        """Unicode representation is model and object ID."""
+        t = self.F.TagFactory.create()
+        t.delete()
+        self.archive.archive(self.later())
+
+        self.assertEqual(
+            unicode(self.model.ArchivedRow.objects.get()),
+            u"tag {0}".format(t.id))
+
+
+    def test_recently_deleted(self):
+        """Objects deleted after the cutoff stay in place."""
+        t = self.F.TagFactory.create()
+        t.delete()
+
+        self.archive.archive(self.later(-1))
+
+        self.assertTrue(self.exists(t))
+        self.assertEqual(self.archived(self.model.Tag), [])
+
+
+    def test_not_deleted(self):
+        """Objects that aren't deleted stay in place."""
+        t = self.F.TagFactory.create()
+
+        self.archive.archive(self.later())
+
+        self.assertTrue(self.exists(t))
+
+
+    def test_cascade(self):
+        """Dependents deleted with an object are archived with it."""
+        r = self.F.ResultFactory.create()
+        run = r.runcaseversion.run
+        run.delete()
+
+        self.archive.archive(self.later())
+
+        self.assertFalse(self.exists(run))
+        self.assertFalse(self.exists(r))
+        self.assertEqual(self.archived(self.model.Result), [r.id])
+        self.assertEqual(
+            self.archived(self.model.RunCaseVersion), [r.runcaseversion.id])
+
+
+    def test_derived_data(self):
+        """Derived data of archived objects is removed."""
+        r = self.F.ResultFactory.create(status="passed")
+        r.runcaseversion.run.delete()
+
+        self.archive.archive(self.later())
+
+        self.assertEqual(self.model.RunCaseVersionStats.objects.count(), 0)
+        self.assertEqual(self.model.RunStats.objects.count(), 0)
+
+
+    def test_result_batch(self):
+        """A run with recorded result batches isn't archived."""
+        run = self.F.RunFactory.create()
+        batch = self.model.ResultBatch.objects.create(
+            tester=self.F.UserFactory.create(),
+            key="one",
+            run=run,
+            outcomes="[]",
+            )
+        run.delete()
+
+        self.archive.archive(self.later())
+
+        self.assertTrue(self.exists(run))
+        self.assertTrue(self.exists(batch))
+
+
+    def test_case_import(self):
+        """A productversion with import history isn't archived."""
+        ci = self.F.CaseImportFactory.create()
+        pv = ci.productversion
+        pv.delete()
+
+        self.archive.archive(self.later())
+
+        self.assertTrue(self.exists(pv))
+        self.assertTrue(self.exists(ci))
+
+
+    def test_m2m_links(self):
+        """Many-to-many links of archived objects are archived with them."""
+        envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Linux", "Windows"]})
+        run = self.F.RunFactory.create(environments=envs)
+        run.delete()
+
+        self.archive.archive(self.later())
+
+        through = self.model.Run.environments.through
+        self.assertEqual(through.objects.filter(run=run.id).count(), 0)
+        row = self.model.ArchivedRow.objects.get(object_id=run.id)
+        self.assertEqual(
+            sorted(row.record["m2m"]["environments"]),
+            sorted(e.id for e in envs))
+
+
+    def test_referenced(self):
+        """Deleted objects still referenced by other objects stay in place."""
+        env = self.F.EnvironmentFactory.create()
+        self.F.RunFactory.create(environments=[env])
+        env.delete()
+
+        self.archive.archive(self.later())
+
+        self.assertTrue(self.exists(env))
+
+
+    def test_batch_size(self):
+        """Objects are archived in batches of given size."""
+        tags = [self.F.TagFactory.create() for i in range(3)]
+        self.model.Tag.objects.all().delete()
+
+        archive_batch = Mock(wraps=self.archive._archive_batch)
+        with patch("cc.model.archive.models._archive_batch", archive_batch):
+            self.archive.archive(self.later(), batch_size=2)
+
+        self.assertEqual(
+            [len(c[0][1]) for c in archive_batch.call_args_list], [2, 1])
+        self.assertEqual(
+            self.archived(self.model.Tag), sorted(t.id for t in tags))
+
+
+    def test_order(self):
+        """Models come after all models that reference them."""
+        order = self.archive.archive_order()
+
+        self.assertLess(
+            order.index(self.model.StepResult), order.index(self.model.Result))
+        self.assertLess(
+            order.index(self.model.Run), order.index(self.model.Environment))
+        self.assertLess(
+            order.index(self.model.Environment),
+            order.index(self.model.Element))
+
+
+
+class RestoreTest(ArchiveTestCase):
+    """Tests for restoring archived objects on undelete."""
+    def test_unarchive(self):
+        """An archived object is restored and undeleted with its cascade."""
+        envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Linux", "Windows"]})
+        r = self.F.ResultFactory.create(
+            status="passed",
+            environment=envs[0],
+            runcaseversion__run__environments=envs,
+            runcaseversion__environments=envs,
+            )
+        run = r.runcaseversion.run
+        run.delete()
+        self.archive.archive(self.later())
+
+        self.archive.unarchive(self.model.Run, [run.id])
+
+        run = self.model.Run.objects.get(pk=run.id)
+        self.assertEqual(set(run.environments.all()), set(envs))
+        self.assertEqual(self.refresh(r).deleted_on, None)
+        self.assertEqual(self.model.ArchivedRow.objects.count(), 0)
+        self.assertEqual(run.stats.passed, 1)
+        self.assertEqual(run.stats.total_envs, 2)
+
+
+    def test_undelete(self):
+        """Undeleting an object restores its archived dependents."""
+        sr = self.F.StepResultFactory.create(
+            bug_url="http://www.example.com/bug1")
+        env = sr.result.environment
+        self.F.RunFactory.create(environments=[env])
+        env.delete()
+
+        self.archive.archive(self.later())
+        self.assertTrue(self.exists(env))
+        self.assertFalse(self.exists(sr))
+
+        self.refresh(env).undelete()
+
+        self.assertEqual(self.model.StepResult.objects.get().id, sr.id)
+        self.assertEqual(
+            list(self.model.BugReference.objects.values_list(
+                    "bug_url", flat=True)),
+            ["http://www.example.com/bug1"],
+            )
+
+
+    def test_undelete_limited(self):
+        """Only archived dependents deleted in the same cascade are restored."""
+        r = self.F.ResultFactory.create()
+        env = r.environment
+        self.F.RunFactory.create(environments=[env])
+        r.delete()
+        self.model.Result._base_manager.update(
+            deleted_on=datetime.datetime(2011, 12, 13))
+        env.delete()
+        self.archive.archive(self.later())
+
+        self.refresh(env).undelete()
+
+        self.assertFalse(self.exists(r))
+        self.assertEqual(self.archived(self.model.Result), [r.id])
+
+
+    def test_missing_m2m_target(self):
+        """Links to objects that no longer exist are dropped on restore."""
+        envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Linux", "Windows"]})
+        run = self.F.RunFactory.create(environments=envs)
+        run.delete()
+        self.archive.archive(self.later())
+        envs[0].delete(permanent=True)
+
+        self.archive.unarchive(self.model.Run, [run.id])
+
+        self.assertEqual(
+            list(self.model.Run.objects.get(pk=run.id).environments.all()),
+            [envs[1]])
+
+
+    def test_missing_fk_target(self):
+        """Objects whose required foreign key target is gone stay archived."""
+        s = self.F.SuiteFactory.create()
+        s.delete()
+        self.archive.archive(self.later())
+        s.product.delete(permanent=True)
+
+        self.archive.unarchive(self.model.Suite, [s.id])
+
+        self.assertFalse(self.exists(s))
+        self.assertEqual(self.archived(self.model.Suite), [s.id])
+
+
+    def test_nullable_fk_target(self):
+        """Nullable foreign keys to objects that are gone are set to null."""
+        u = self.F.UserFactory.create()
+        t = self.F.TagFactory.create(user=u)
+        t.delete()
+        self.archive.archive(self.later())
+        u.delete()
+
+        self.archive.unarchive(self.model.Tag, [t.id])
+
+        self.assertEqual(self.model.Tag.objects.get(pk=t.id).created_by, None)
+
+
+
+class PurgeTest(ArchiveTestCase):
+    """Tests for purging the archive."""
+    def test_purge(self):
+        """Archived objects deleted before the cutoff are removed for good."""
+        t = self.F.TagFactory.create()
+        t.delete()
+        self.archive.archive(self.later())
+
+        count = self.archive.purge(self.later())
+
+        self.assertEqual(count, 1)
+        self.assertEqual(self.model.ArchivedRow.objects.count(), 0)
+
+
+    def test_recently_deleted(self):
+        """Archived objects deleted after the cutoff stay archived."""
+        t = self.F.TagFactory.create()
+        t.delete()
+        self.archive.archive(self.later())
+
+        count = self.archive.purge(self.later(-1))
+
+        self.assertEqual(count, 0)
+        self.assertEqual(self.archived(self.model.Tag), [t.id])
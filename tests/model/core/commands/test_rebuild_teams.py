@@ -0,0 +1,69 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for management command to rebuild effective teams.
+
+"""
+from cStringIO import StringIO
+
+from django.core.management import call_command
+
+from mock import patch
+
+from tests import case
+
+
+
+class RebuildTeamsTest(case.DBTestCase):
+    """Tests for rebuild_teams management command."""
+    def call_command(self, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("rebuild_teams", **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def test_rebuild(self):
+        """Rebuilds drifted effective teams, parents first."""
+        u = self.F.UserFactory.create()
+        r = self.F.RunFactory.create()
+        pv = r.productversion
+        self.model.Product.own_team.through.objects.create(
+            product=pv.product, user=u)
+        self.model.ProductVersion.effective_team.through.objects.create(
+            productversion=pv, user=self.F.UserFactory.create())
+
+        output = self.call_command()
+
+        self.assertEqual(list(pv.product.effective_team.all()), [u])
+        self.assertEqual(list(pv.effective_team.all()), [u])
+        self.assertEqual(list(r.effective_team.all()), [u])
+        self.assertIn("Rebuilt teams for 1 runs.", output)
+
+
+    def test_order(self):
+        """Team models are ordered parents first."""
+        from cc.model.core.management.commands.rebuild_teams import (
+            team_models)
+
+        self.assertEqual(
+            team_models(),
+            [self.model.Product, self.model.ProductVersion, self.model.Run],
+            )
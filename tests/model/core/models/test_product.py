@@ -57,6 +57,7 @@ class ProductTest(case.DBTestCase):
         new = p.clone()
 
         self.assertEqual(len(new.team.all()), 2)
+        self.assertEqual(len(new.effective_team.all()), 2)
 
 
     def test_reorder_versions(self):
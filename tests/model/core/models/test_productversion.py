@@ -119,6 +119,7 @@ class ProductVersionTest(case.DBTestCase):
         new = pv.clone()
 
         self.assertEqual(len(new.team.all()), 2)
+        self.assertEqual(len(new.effective_team.all()), 2)
 
 
     def test_adding_new_version_reorders(self):
@@ -134,6 +135,65 @@ class ProductVersionTest(case.DBTestCase):
             )
 
 
+    def test_reorder_queries(self):
+        """Reordering versions saves them all in one query."""
+        p = self.F.ProductFactory.create()
+        for v in ["3", "1", "2"]:
+            self.F.ProductVersionFactory.create(version=v, product=p)
+        p.versions.update(order=0)
+
+        # fetch versions, save them, fetch cases
+        with self.assertNumQueries(3):
+            p.reorder_versions()
+
+        self.assertEqual(
+            [v.version for v in p.versions.all()], ["1", "2", "3"])
+
+
+    def test_reorder_case_queries(self):
+        """Updating latest caseversions doesn't take a query per case."""
+        pv1 = self.F.ProductVersionFactory.create(version="1")
+        p = pv1.product
+        for i in range(3):
+            self.F.CaseVersionFactory.create(productversion=pv1)
+        pv2 = self.F.ProductVersionFactory.create(version="2", product=p)
+
+        cvs = [
+            self.F.CaseVersionFactory.create(productversion=pv2, case=cv.case)
+            for cv in pv1.caseversions.all()
+            ]
+        pv2.version = "0"
+        # fetch versions, save them, fetch caseversions, update two batches
+        with self.assertNumQueries(6):
+            pv2.save()
+
+        self.assertEqual(
+            [self.refresh(cv).latest for cv in cvs], [False, False, False])
+        self.assertEqual(
+            [cv.latest for cv in pv1.caseversions.all()], [True, True, True])
+
+
+    def test_edit_codename_skips_reorder(self):
+        """Saving a version with unchanged version string doesn't reorder."""
+        pv = self.F.ProductVersionFactory.create(version="1")
+
+        pv.codename = "one"
+        with self.assertNumQueries(1):
+            pv.save()
+
+
+    def test_save_twice(self):
+        """A version can be saved again after its save reorders versions."""
+        pv = self.F.ProductVersionFactory.create(version="1")
+
+        pv.codename = "one"
+        pv.save()
+        pv.codename = "uno"
+        pv.save()
+
+        self.assertEqual(self.refresh(pv).codename, "uno")
+
+
     def test_editing_a_version_reorders(self):
         """Editing a product version reorders the versions."""
         # @@@ what about bulk update of product versions?
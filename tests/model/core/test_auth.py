@@ -75,6 +75,45 @@ class UserTest(case.DBTestCase):
 
 
 
+class PreloadRolesTest(case.DBTestCase):
+    """Tests for preloading roles of users."""
+    def test_preload(self):
+        """Loads roles of all users in one query."""
+        u = self.F.UserFactory.create()
+        u.roles.add(self.F.RoleFactory.create(name="Tester"))
+        u.roles.add(self.F.RoleFactory.create(name="Admin"))
+        self.F.UserFactory.create()
+        users = list(self.model.User.objects.order_by("id"))
+
+        with self.assertNumQueries(1):
+            self.model.preload_roles(users)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [r.name for r in users[0].role_list()], ["Admin", "Tester"])
+            self.assertEqual(users[1].role_list(), [])
+
+
+    def test_not_preloaded(self):
+        """Without preloading, role_list queries the user's roles."""
+        u = self.F.UserFactory.create()
+        r = self.F.RoleFactory.create()
+        u.roles.add(r)
+
+        self.assertEqual(self.refresh(u).role_list(), [r])
+
+
+    def test_manager_preload(self):
+        """The User manager supports preload functions."""
+        self.F.UserFactory.create()
+        calls = []
+
+        users = list(self.model.User.objects.preload(calls.append))
+
+        self.assertEqual(calls, [users])
+
+
+
 class ModelBackendTest(case.DBTestCase):
     """Tests for our custom ModelBackend."""
     @property
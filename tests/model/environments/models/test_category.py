@@ -38,9 +38,16 @@ class CategoryTest(case.DBTestCase):
         env = self.F.EnvironmentFactory.create()
         env.elements.add(el)
 
-        with self.assertRaises(self.model.ProtectedError):
+        with self.assertRaises(self.model.ProtectedError) as cm:
             el.category.delete()
 
+        self.assertEqual(cm.exception.protected_objects, [env])
+        self.assertEqual(
+            cm.exception.args[0],
+            u"Category '{0}' is in use and cannot be deleted.".format(
+                el.category.name),
+            )
+
 
     def test_delete_prevention_ignores_deleted_envs(self):
         """Can delete category included only in a deleted environment."""
@@ -73,3 +80,27 @@ class CategoryTest(case.DBTestCase):
         env.delete()
 
         self.assertTrue(el.category.deletable)
+
+
+    def test_queryset_delete_prevention(self):
+        """Bulk-deleting categories in use raises ProtectedError."""
+        el = self.F.ElementFactory.create(name="Debian")
+        self.F.EnvironmentFactory.create().elements.add(el)
+
+        with self.assertRaises(self.model.ProtectedError):
+            self.model.Category.objects.all().delete()
+
+        self.assertIsNone(self.refresh(el.category).deleted_on)
+
+
+    def test_load_deletable(self):
+        """load_deletable sets deletable of many categories with one query."""
+        el = self.F.ElementFactory.create(name="Debian")
+        self.F.EnvironmentFactory.create().elements.add(el)
+        unused = self.F.CategoryFactory.create()
+        categories = [self.refresh(el.category), self.refresh(unused)]
+
+        with self.assertNumQueries(1):
+            self.model.Category.load_deletable(categories)
+
+        self.assertEqual([c.deletable for c in categories], [False, True])
@@ -73,3 +73,40 @@ class ElementTest(case.DBTestCase):
         env.delete()
 
         self.assertTrue(el.deletable)
+
+
+    def test_queryset_delete_prevention(self):
+        """Bulk-deleting elements some of which are in use deletes none."""
+        el = self.F.ElementFactory.create(name="Debian")
+        other = self.F.ElementFactory.create(name="Ubuntu")
+        env = self.F.EnvironmentFactory.create()
+        env.elements.add(el)
+
+        with self.assertRaises(self.model.ProtectedError) as cm:
+            self.model.Element.objects.all().delete()
+
+        self.assertEqual(cm.exception.protected_objects, [env])
+        self.assertIsNone(self.refresh(other).deleted_on)
+
+
+    def test_queryset_delete_unused(self):
+        """Bulk-deleting elements not in use deletes them."""
+        el = self.F.ElementFactory.create(name="Debian")
+
+        self.model.Element.objects.all().delete()
+
+        self.assertIsNotNone(self.refresh(el).deleted_on)
+
+
+    def test_load_deletable(self):
+        """load_deletable sets deletable of many elements with one query."""
+        used, unused = [self.F.ElementFactory.create() for i in range(2)]
+        self.F.EnvironmentFactory.create().elements.add(used)
+
+        elements = [self.refresh(unused), self.refresh(used)]
+
+        with self.assertNumQueries(1):
+            self.model.Element.load_deletable(elements)
+
+        with self.assertNumQueries(0):
+            self.assertEqual([e.deletable for e in elements], [True, False])
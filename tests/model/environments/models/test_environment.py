@@ -19,6 +19,8 @@
 Tests for Environment model.
 
 """
+import hashlib
+
 from tests import case
 
 
@@ -54,11 +56,13 @@ class EnvironmentTest(case.DBTestCase):
     def test_delete_prevention(self):
         """Deleting env used in a productversion raises ProtectedError."""
         env = self.F.EnvironmentFactory.create()
-        self.F.ProductVersionFactory.create(environments=[env])
+        pv = self.F.ProductVersionFactory.create(environments=[env])
 
-        with self.assertRaises(self.model.ProtectedError):
+        with self.assertRaises(self.model.ProtectedError) as cm:
             env.delete()
 
+        self.assertEqual(cm.exception.protected_objects, [pv])
+
 
     def test_delete_prevention_ignores_deleted_product_versions(self):
         """Can delete env used only by a deleted product version."""
@@ -115,3 +119,378 @@ class EnvironmentTest(case.DBTestCase):
         env = self.refresh(env)
         self.assertEqual(env.profile, None)
         self.assertEqual(env.modified_by, u)
+
+
+
+class EnvironmentSignatureTest(case.DBTestCase):
+    """Tests for maintenance of environment element-set signatures."""
+    def setUp(self):
+        """Create three elements and an environment."""
+        self.e1, self.e2, self.e3 = [
+            self.F.ElementFactory.create() for i in range(3)]
+        self.env = self.F.EnvironmentFactory.create()
+
+
+    def signature(self, *elements):
+        """Return expected signature for given elements."""
+        return u",{0},".format(
+            u",".join(str(e.id) for e in sorted(elements, key=lambda e: e.id)))
+
+
+    def stored(self, env):
+        """Return signature of ``env`` as stored in the database."""
+        return self.refresh(env).signature
+
+
+    def test_empty(self):
+        """An environment without elements has an empty signature."""
+        self.assertEqual(self.stored(self.env), "")
+
+
+    def test_add(self):
+        """Adding elements updates stored and instance signature."""
+        self.env.elements.add(self.e3, self.e1)
+
+        expected = self.signature(self.e1, self.e3)
+        self.assertEqual(self.env.signature, expected)
+        self.assertEqual(self.stored(self.env), expected)
+        self.assertEqual(
+            self.refresh(self.env).signature_hash,
+            hashlib.sha1(expected).hexdigest(),
+            )
+
+
+    def test_long(self):
+        """Signatures of many elements aren't limited in length."""
+        elements = [self.F.ElementFactory.create() for i in range(100)]
+        self.env.elements.add(*elements)
+
+        self.assertEqual(self.stored(self.env), self.signature(*elements))
+        self.assertEqual(
+            list(self.model.Environment.objects.match(elements)), [self.env])
+
+
+    def test_remove(self):
+        """Removing elements updates signature."""
+        self.env.elements.add(self.e1, self.e2)
+        self.env.elements.remove(self.e1)
+
+        self.assertEqual(self.stored(self.env), self.signature(self.e2))
+
+
+    def test_clear(self):
+        """Clearing elements empties signature."""
+        self.env.elements.add(self.e1, self.e2)
+        self.env.elements.clear()
+
+        self.assertEqual(self.stored(self.env), "")
+        self.assertEqual(self.refresh(self.env).signature_hash, "")
+
+
+    def test_reverse_add(self):
+        """Adding environments to an element updates their signatures."""
+        self.e2.environments.add(self.env)
+
+        self.assertEqual(self.stored(self.env), self.signature(self.e2))
+
+
+    def test_reverse_clear(self):
+        """Clearing an element's environments updates their signatures."""
+        other = self.F.EnvironmentFactory.create()
+        self.env.elements.add(self.e1, self.e2)
+        other.elements.add(self.e1)
+
+        self.e1.environments.clear()
+
+        self.assertEqual(self.stored(self.env), self.signature(self.e2))
+        self.assertEqual(self.stored(other), "")
+
+
+    def test_clone(self):
+        """Clones have the same signature."""
+        self.env.elements.add(self.e1, self.e2)
+
+        new = self.env.clone()
+
+        self.assertEqual(self.stored(new), self.signature(self.e1, self.e2))
+
+
+    def test_generate(self):
+        """Generated environments get signatures."""
+        p = self.model.Profile.generate("Foo", self.e1)
+
+        env = p.environments.get()
+        self.assertEqual(env.signature, self.signature(self.e1))
+        self.assertEqual(
+            env.signature_hash,
+            hashlib.sha1(self.signature(self.e1)).hexdigest(),
+            )
+
+
+    def test_refresh_elements(self):
+        """refresh_elements recomputes signatures from element links."""
+        self.model.Environment.elements.through.objects.create(
+            environment=self.env, element=self.e1)
+
+        values = self.model.Environment.refresh_elements([self.env.id])
+
+        self.assertEqual(
+            values[self.env.id]["signature"], self.signature(self.e1))
+        self.assertEqual(self.stored(self.env), self.signature(self.e1))
+
+
+
+class EnvironmentLabelsTest(case.DBTestCase):
+    """Tests for maintenance and loading of environment element labels."""
+    def setUp(self):
+        """Create an environment with two elements in two categories."""
+        self.env = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["OS X"], "Language": ["English"]})[0]
+        self.english = self.model.Element.objects.get(name="English")
+        self.osx = self.model.Element.objects.get(name="OS X")
+
+
+    def stored(self, env):
+        """Return element names of ``env`` as stored in the database."""
+        return self.refresh(env).element_names
+
+
+    def test_names(self):
+        """Element names are stored in category name order."""
+        self.assertEqual(self.env.element_names, [u"English", u"OS X"])
+        self.assertEqual(self.stored(self.env), [u"English", u"OS X"])
+
+
+    def test_unicode_queries(self):
+        """Unicode representation needs no query."""
+        env = self.refresh(self.env)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(unicode(env), u"English, OS X")
+
+
+    def test_remove(self):
+        """Removing elements updates names."""
+        self.env.elements.remove(self.english)
+
+        self.assertEqual(self.env.element_names, [u"OS X"])
+        self.assertEqual(self.stored(self.env), [u"OS X"])
+
+
+    def test_rename_element(self):
+        """Renaming an element updates names of its environments."""
+        self.osx.name = u"Linux"
+        self.osx.save()
+
+        self.assertEqual(self.stored(self.env), [u"English", u"Linux"])
+
+
+    def test_rename_category(self):
+        """Renaming a category updates names (and order) of environments."""
+        category = self.osx.category
+        category.name = u"Alpha"
+        category.save()
+
+        self.assertEqual(self.stored(self.env), [u"OS X", u"English"])
+
+
+    def test_move_element(self):
+        """Moving an element to another category updates names and order."""
+        alpha = self.F.CategoryFactory.create(name=u"Alpha")
+        self.osx.category = alpha
+        self.osx.save(update_fields=["category"])
+
+        self.assertEqual(self.stored(self.env), [u"OS X", u"English"])
+
+
+    def test_save_without_rename(self):
+        """Saving an element with other changes doesn't refresh names."""
+        with self.assertNumQueries(1):
+            self.osx.save(update_fields=["modified_on"])
+
+
+    def test_generate(self):
+        """Generated environments get names."""
+        p = self.model.Profile.generate("Foo", self.osx, self.english)
+
+        self.assertEqual(
+            p.environments.get().element_names, [u"English", u"OS X"])
+
+
+    def test_clone(self):
+        """Clones have the same names."""
+        self.assertEqual(
+            self.stored(self.env.clone()), [u"English", u"OS X"])
+
+
+    def test_load_elements(self):
+        """load_elements fetches ordered elements of many envs at once."""
+        other = self.F.EnvironmentFactory.create()
+        other.elements.add(self.osx)
+        envs = list(self.model.Environment.objects.order_by("id"))
+
+        with self.assertNumQueries(1):
+            loaded = self.model.Environment.load_elements(envs)
+            self.assertEqual(
+                [[(e.category.name, e.name) for e in env.ordered_elements()]
+                 for env in loaded],
+                [[(u"Language", u"English"), (u"OS", u"OS X")],
+                 [(u"OS", u"OS X")]],
+                )
+
+
+    def test_load_elements_reset(self):
+        """Changing elements discards elements loaded by load_elements."""
+        self.model.Environment.load_elements([self.env])
+        self.env.elements.remove(self.english)
+
+        self.assertEqual(list(self.env.ordered_elements()), [self.osx])
+
+
+
+class EnvironmentLookupTest(case.DBTestCase):
+    """Tests for looking up environments by their elements."""
+    def setUp(self):
+        """Create elements, and environments with various sets of them."""
+        self.e1, self.e2, self.e3 = [
+            self.F.ElementFactory.create() for i in range(3)]
+        self.env1 = self.create(self.e1)
+        self.env12 = self.create(self.e1, self.e2)
+        self.env123 = self.create(self.e1, self.e2, self.e3)
+
+
+    def create(self, *elements):
+        """Create environment with given elements."""
+        env = self.F.EnvironmentFactory.create()
+        env.elements.add(*elements)
+        return env
+
+
+    def test_match(self):
+        """match finds environments with exactly the given elements."""
+        self.assertEqual(
+            list(self.model.Environment.objects.match([self.e2, self.e1])),
+            [self.env12],
+            )
+
+
+    def test_match_ids(self):
+        """Elements may be given as (string) IDs."""
+        self.assertEqual(
+            list(
+                self.model.Environment.objects.match(
+                    [str(self.e1.id), str(self.e2.id)])
+                ),
+            [self.env12],
+            )
+
+
+    def test_match_query(self):
+        """Matching is a single query, without joins."""
+        with self.assertNumQueries(1):
+            list(self.model.Environment.objects.match([self.e1]))
+
+
+    def test_match_related(self):
+        """Lookups are also available on related managers."""
+        p = self.F.ProfileFactory.create()
+        self.env1.profile = p
+        self.env1.save()
+
+        self.assertEqual(list(p.environments.match([self.e1])), [self.env1])
+        self.assertEqual(list(p.environments.match([self.e2])), [])
+
+
+    def test_including(self):
+        """including finds environments with all the given elements."""
+        self.assertEqual(
+            set(self.model.Environment.objects.including([self.e2])),
+            set([self.env12, self.env123]),
+            )
+
+
+    def test_including_none(self):
+        """Every environment includes an empty set of elements."""
+        self.assertEqual(
+            set(self.model.Environment.objects.including([])),
+            set([self.env1, self.env12, self.env123]),
+            )
+
+
+    def test_including_query(self):
+        """including is a single query, however many elements are given."""
+        with self.assertNumQueries(1):
+            list(
+                self.model.Environment.objects.including(
+                    [self.e1, self.e2, self.e3]))
+
+
+    def test_within(self):
+        """within finds environments with no elements but the given ones."""
+        self.assertEqual(
+            set(self.model.Environment.objects.within([self.e1, self.e2])),
+            set([self.env1, self.env12]),
+            )
+
+
+    def test_within_empty_environment(self):
+        """An environment with no elements is within any set of elements."""
+        empty = self.create()
+
+        self.assertEqual(
+            set(self.model.Environment.objects.within([self.e2])),
+            set([empty]),
+            )
+        self.assertEqual(
+            set(self.model.Environment.objects.within([])), set([empty]))
+
+
+    def test_duplicates(self):
+        """duplicates lists IDs of environments with the same elements."""
+        dupe = self.create(self.e1, self.e2)
+
+        self.assertEqual(
+            self.model.Environment.objects.duplicates(),
+            [[self.env12.id, dupe.id]],
+            )
+
+
+    def test_duplicates_hash_collision(self):
+        """Environments whose signatures share a hash aren't duplicates."""
+        self.model.Environment.everything.filter(
+            pk__in=[self.env1.id, self.env12.id]).update(signature_hash="x")
+
+        self.assertEqual(self.model.Environment.objects.duplicates(), [])
+
+
+    def test_duplicates_not_deleted(self):
+        """Deleted environments aren't duplicates, through ``objects``."""
+        self.create(self.e1, self.e2).delete()
+
+        self.assertEqual(self.model.Environment.objects.duplicates(), [])
+
+
+
+class EnvironmentDeletableTest(case.DBTestCase):
+    """Tests for protection of environments in use from deletion."""
+    def test_queryset_delete_prevention(self):
+        """Bulk-deleting environments in use raises ProtectedError."""
+        env = self.F.EnvironmentFactory.create()
+        self.F.ProductVersionFactory.create(environments=[env])
+
+        with self.assertRaises(self.model.ProtectedError):
+            self.model.Environment.objects.all().delete()
+
+        self.assertIsNone(self.refresh(env).deleted_on)
+
+
+    def test_load_deletable(self):
+        """load_deletable sets deletable of many envs with one query."""
+        used, unused = [self.F.EnvironmentFactory.create() for i in range(2)]
+        self.F.ProductVersionFactory.create(environments=[used])
+        envs = [self.refresh(used), self.refresh(unused)]
+
+        with self.assertNumQueries(1):
+            self.model.Environment.load_deletable(envs)
+
+        self.assertEqual([e.deletable for e in envs], [False, True])
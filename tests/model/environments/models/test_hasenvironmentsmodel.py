@@ -41,3 +41,79 @@ class HasEnvironmentsModelTest(case.TestCase):
     def test_cascade_envs_to(self):
         """cascade_envs_to returns empty dict in base class."""
         self.assertEqual(self.model_class.cascade_envs_to([], True), {})
+
+
+
+class BulkEnvsTest(case.DBTestCase):
+    """Tests for set-based environment add/remove and cascade."""
+    def setUp(self):
+        """Product version with some caseversions and a draft run."""
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["OS X", "Linux", "Windows"]})
+        self.pv = self.F.ProductVersionFactory.create(
+            environments=self.envs[1:])
+        self.cvs = [
+            self.F.CaseVersionFactory.create(productversion=self.pv)
+            for i in range(3)
+            ]
+        self.run = self.F.RunFactory.create(productversion=self.pv)
+
+
+    def test_add_cascades(self):
+        """Addition cascades to non-narrowed caseversions and draft runs."""
+        narrowed = self.F.CaseVersionFactory.create(
+            productversion=self.pv, envs_narrowed=True)
+
+        self.model.ProductVersion.bulk_add_envs([self.pv], [self.envs[0]])
+
+        self.assertEqual(set(self.pv.environments.all()), set(self.envs))
+        self.assertEqual(set(self.run.environments.all()), set(self.envs))
+        for cv in self.cvs:
+            self.assertEqual(set(cv.environments.all()), set(self.envs))
+        self.assertEqual(
+            set(narrowed.environments.all()), set(self.envs[1:]))
+
+
+    def test_add_existing(self):
+        """Adding an env some objects already have doesn't duplicate it."""
+        self.cvs[0].environments.add(self.envs[0])
+
+        self.model.CaseVersion.bulk_add_envs(self.cvs, [self.envs[0].id])
+
+        for cv in self.cvs:
+            self.assertEqual(
+                cv.environments.filter(pk=self.envs[0].pk).count(), 1)
+
+
+    def test_remove_cascades(self):
+        """Removal cascades to all caseversions and runs."""
+        self.model.ProductVersion.bulk_remove_envs(
+            self.model.ProductVersion.objects.filter(pk=self.pv.pk),
+            [self.envs[1]])
+
+        self.assertEqual(set(self.pv.environments.all()), set(self.envs[2:]))
+        self.assertEqual(set(self.run.environments.all()), set(self.envs[2:]))
+        for cv in self.cvs:
+            self.assertEqual(set(cv.environments.all()), set(self.envs[2:]))
+
+
+    def test_queries_independent_of_object_count(self):
+        """Number of queries does not grow with number of cascade targets."""
+        self.model.ProductVersion.bulk_add_envs([self.pv], [self.envs[0]])
+        with self.assertNumQueries(7):
+            self.model.ProductVersion.bulk_remove_envs(
+                [self.pv], [self.envs[0]])
+
+        for i in range(5):
+            self.F.CaseVersionFactory.create(productversion=self.pv)
+        self.model.ProductVersion.bulk_add_envs([self.pv], [self.envs[0]])
+        with self.assertNumQueries(7):
+            self.model.ProductVersion.bulk_remove_envs(
+                [self.pv], [self.envs[0]])
+
+
+    def test_empty(self):
+        """Adding or removing no environments does nothing."""
+        with self.assertNumQueries(0):
+            self.model.ProductVersion.bulk_add_envs([self.pv], [])
+            self.model.ProductVersion.bulk_remove_envs([self.pv], [])
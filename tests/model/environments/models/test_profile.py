@@ -19,6 +19,8 @@
 Tests for Profile model.
 
 """
+from mock import patch
+
 from tests import case
 
 
@@ -60,6 +62,113 @@ class ProfileTest(case.DBTestCase):
             )
 
 
+    def elements(self):
+        """Create and return two OS and three browser elements."""
+        os = self.F.CategoryFactory.create(name="OS")
+        browser = self.F.CategoryFactory.create(name="Browser")
+        return [
+            self.F.ElementFactory.create(name=name, category=os)
+            for name in ["Linux", "Windows"]
+            ] + [
+            self.F.ElementFactory.create(name=name, category=browser)
+            for name in ["Firefox", "Chrome", "Opera"]
+            ]
+
+
+    def test_generate_queries(self):
+        """Generating takes the same number of queries for many combinations."""
+        elements = self.elements()
+
+        with self.assertNumQueries(7):
+            p = self.model.Profile.generate("Small", *elements[:2])
+        with self.assertNumQueries(7):
+            p = self.model.Profile.generate("Large", *elements)
+
+        self.assertEqual(p.environments.count(), 6)
+
+
+    def test_generate_tracking(self):
+        """Generated environments record the creating user."""
+        u = self.F.UserFactory.create()
+
+        p = self.model.Profile.generate("Foo", *self.elements(), user=u)
+
+        self.assertEqual(
+            set(e.created_by for e in p.environments.all()), set([u]))
+
+
+    def test_generate_batches(self):
+        """Combinations are inserted in batches."""
+        elements = self.elements()
+
+        with patch("cc.model.environments.models.BATCH_SIZE", 4):
+            p = self.model.Profile.generate("Foo", *elements)
+
+        self.assertEqual(
+            sorted(unicode(e) for e in p.environments.all()),
+            [
+                "Chrome, Linux",
+                "Chrome, Windows",
+                "Firefox, Linux",
+                "Firefox, Windows",
+                "Opera, Linux",
+                "Opera, Windows",
+                ]
+            )
+
+
+    def test_add_combinations_concurrent(self):
+        """Environments inserted concurrently into the profile are detected."""
+        linux, windows, firefox, chrome, opera = self.elements()
+        p = self.F.ProfileFactory.create()
+        from cc.model.environments import models
+        bulk_insert = models.bulk_insert
+        def insert_another(objs, *args, **kwargs):
+            ret = bulk_insert(objs, *args, **kwargs)
+            if isinstance(objs[0], models.Environment):
+                self.F.EnvironmentFactory.create(profile=p)
+            return ret
+
+        with patch("cc.model.environments.models.bulk_insert", insert_another):
+            with self.assertRaises(RuntimeError):
+                p.add_combinations([linux, firefox])
+
+
+    def test_add_combinations_skips_existing(self):
+        """Combinations duplicating existing environments are skipped."""
+        linux, windows, firefox, chrome, opera = self.elements()
+        p = self.model.Profile.generate("Foo", linux, firefox)
+
+        added = p.add_combinations([linux, windows, firefox])
+
+        self.assertEqual(added, 1)
+        self.assertEqual(
+            sorted(unicode(e) for e in p.environments.all()),
+            ["Firefox, Linux", "Firefox, Windows"],
+            )
+
+
+    def test_add_combinations_no_skip(self):
+        """With skip_existing=False, duplicates are added."""
+        linux, windows, firefox, chrome, opera = self.elements()
+        p = self.model.Profile.generate("Foo", linux, firefox)
+
+        added = p.add_combinations([linux, firefox], skip_existing=False)
+
+        self.assertEqual(added, 1)
+        self.assertEqual(p.environments.count(), 2)
+
+
+    def test_element_sets(self):
+        """element_sets returns element IDs of each not-deleted env."""
+        linux, windows, firefox, chrome, opera = self.elements()
+        p = self.model.Profile.generate("Foo", linux, windows, firefox)
+        p.environments.get(elements=windows).delete()
+
+        self.assertEqual(
+            p.element_sets(), set([frozenset([linux.id, firefox.id])]))
+
+
     def test_clone(self):
         """Cloning a profile prefixes name with 'Cloned'."""
         p = self.F.ProfileFactory.create(name="Foo")
@@ -90,3 +199,104 @@ class ProfileTest(case.DBTestCase):
 
         self.assertEqual(
             [c.name for c in p.categories()], ["Browser", "OS"])
+
+
+    def test_preload_categories(self):
+        """Categories of many profiles can be preloaded in two queries."""
+        p = self.F.ProfileFactory.create(name="One")
+        self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows", "OS X"], "Browser": ["Firefox", "Chrome"]},
+            profile=p)
+        p2 = self.F.ProfileFactory.create(name="Two")
+        self.F.EnvironmentFactory.create_full_set(
+            {"Language": ["English"]}, profile=p2)
+        self.F.ProfileFactory.create(name="Three")
+        profiles = list(self.model.Profile.objects.order_by("id"))
+
+        with self.assertNumQueries(2):
+            self.model.preload_categories(profiles)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [[c.name for c in pr.categories()] for pr in profiles],
+                [["Browser", "OS"], ["Language"], []],
+                )
+
+
+
+class CombinationsTest(case.DBTestCase):
+    @property
+    def Combinations(self):
+        from cc.model import Combinations
+        return Combinations
+
+
+    def setUp(self):
+        """Create two OS and three browser elements."""
+        os = self.F.CategoryFactory.create(name="OS")
+        browser = self.F.CategoryFactory.create(name="Browser")
+        self.linux, self.windows = [
+            self.F.ElementFactory.create(name=name, category=os)
+            for name in ["Linux", "Windows"]
+            ]
+        self.firefox, self.chrome, self.opera = [
+            self.F.ElementFactory.create(name=name, category=browser)
+            for name in ["Firefox", "Chrome", "Opera"]
+            ]
+        self.elements = [
+            self.linux, self.windows, self.firefox, self.chrome, self.opera]
+
+
+    def test_len(self):
+        """Length is the product of element counts per category."""
+        self.assertEqual(len(self.Combinations(self.elements)), 6)
+
+
+    def test_empty(self):
+        """No elements, no combinations."""
+        c = self.Combinations([])
+
+        self.assertEqual(len(c), 0)
+        self.assertEqual(list(c), [])
+
+
+    def test_iter(self):
+        """Iterates over one element from each category."""
+        self.assertEqual(
+            list(self.Combinations([self.linux, self.firefox, self.chrome])),
+            [(self.linux, self.firefox), (self.linux, self.chrome)],
+            )
+
+
+    def test_sample(self):
+        """sample returns the first few combinations."""
+        self.assertEqual(
+            self.Combinations(self.elements).sample(2),
+            [(self.linux, self.firefox), (self.linux, self.chrome)],
+            )
+
+
+    def test_no_queries(self):
+        """Previewing combinations doesn't query the database."""
+        c = self.Combinations(self.elements)
+
+        with self.assertNumQueries(0):
+            len(c)
+            c.sample()
+
+
+    def test_skip(self):
+        """Combinations in skip are left out of iteration and count."""
+        c = self.Combinations(
+            self.elements,
+            skip=[
+                [self.linux.id, self.firefox.id],
+                # not a combination of these elements; ignored
+                [self.linux.id],
+                [self.linux.id, self.windows.id],
+                ]
+            )
+
+        self.assertEqual(len(c), 5)
+        self.assertEqual(len(list(c)), 5)
+        self.assertNotIn((self.linux, self.firefox), list(c))
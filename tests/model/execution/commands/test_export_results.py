@@ -0,0 +1,87 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for management command to export results.
+
+"""
+from cStringIO import StringIO
+import json
+
+from django.core.management import call_command
+
+from mock import patch
+
+from tests import case
+
+
+
+class ExportResultsTest(case.DBTestCase):
+    """Tests for export_results management command."""
+    def call_command(self, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("export_results", **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def test_csv(self):
+        """Writes CSV by default."""
+        r = self.F.ResultFactory.create()
+
+        output = self.call_command()
+
+        lines = output.splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("id,run_id,"))
+        self.assertTrue(lines[1].startswith("{0},".format(r.id)))
+
+
+    def test_jsonl_run(self):
+        """Can write JSON Lines for a single run."""
+        r = self.F.ResultFactory.create()
+        self.F.ResultFactory.create()
+
+        output = self.call_command(
+            format="jsonl", run=r.runcaseversion.run.id)
+
+        self.assertEqual(
+            [json.loads(l)["id"] for l in output.splitlines()], [r.id])
+
+
+    def call_command_error(self, **kwargs):
+        """Runs the command, expecting failure; returns stderr output."""
+        with patch("sys.stderr", StringIO()) as stderr:
+            with self.assertRaises(SystemExit):
+                self.call_command(**kwargs)
+
+        stderr.seek(0)
+        return stderr.read()
+
+
+    def test_bad_run(self):
+        """Nonexistent run is an error."""
+        self.assertIn("No run with ID 9999.", self.call_command_error(run=9999))
+
+
+    def test_bad_date(self):
+        """Badly formatted date is an error."""
+        self.assertIn(
+            "Invalid date '2012-13-45'.",
+            self.call_command_error(since="2012-13-45"))
@@ -0,0 +1,80 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for management command to rebuild result stats.
+
+"""
+from cStringIO import StringIO
+
+from django.core.management import call_command
+
+from mock import patch
+
+from tests import case
+
+
+
+class RebuildResultStatsTest(case.DBTestCase):
+    """Tests for rebuild_result_stats management command."""
+    def call_command(self, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("rebuild_result_stats", **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def setUp(self):
+        """Create a result, then break its stats."""
+        self.result = self.F.ResultFactory.create(status="passed")
+        self.model.RunCaseVersionStats.objects.update(passed=0, failed=3)
+
+
+    def test_rebuild(self):
+        """Rebuilds stats from results."""
+        output = self.call_command()
+
+        stats = self.model.RunCaseVersionStats.objects.get(
+            runcaseversion=self.result.runcaseversion)
+        self.assertEqual(stats.passed, 1)
+        self.assertEqual(stats.failed, 0)
+        self.assertIn("Rebuilt result stats for 1 runcaseversions", output)
+
+
+    def test_check(self):
+        """Reports drift without fixing it."""
+        output = self.call_command(check=True)
+
+        self.assertIn(
+            "Runcaseversion {0}: stored".format(
+                self.result.runcaseversion.id),
+            output)
+        self.assertIn("1 result stats drifted.", output)
+        stats = self.model.RunCaseVersionStats.objects.get(
+            runcaseversion=self.result.runcaseversion)
+        self.assertEqual(stats.failed, 3)
+
+
+    def test_check_after_rebuild(self):
+        """No drift after rebuild."""
+        self.call_command()
+
+        output = self.call_command(check=True)
+
+        self.assertIn("0 result stats drifted.", output)
@@ -0,0 +1,147 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for BugReference model.
+
+"""
+from tests import case
+
+
+
+class BugReferenceTest(case.DBTestCase):
+    """Tests for maintenance of the bug reference index."""
+    def refs(self):
+        """Return list of (stepresult id, bug url) in the index."""
+        return list(
+            self.model.BugReference.objects.order_by(
+                "stepresult").values_list("stepresult", "bug_url"))
+
+
+    def test_unicode(self):
+        """Unicode representation is the bug URL."""
+        sr = self.F.StepResultFactory.create(
+            bug_url="http://www.example.com/bug1")
+
+        self.assertEqual(
+            unicode(sr.bugreference), u"http://www.example.com/bug1")
+
+
+    def test_save(self):
+        """Saving a step result with a bug URL indexes it."""
+        sr = self.F.StepResultFactory.create(
+            bug_url="http://www.example.com/bug1")
+
+        ref = sr.bugreference
+        self.assertEqual(ref.bug_url, "http://www.example.com/bug1")
+        self.assertEqual(ref.result, sr.result)
+        self.assertEqual(ref.runcaseversion, sr.result.runcaseversion)
+        self.assertEqual(ref.run, sr.result.runcaseversion.run)
+        self.assertEqual(
+            ref.caseversion, sr.result.runcaseversion.caseversion)
+
+
+    def test_no_bug_url(self):
+        """A step result without a bug URL is not indexed."""
+        self.F.StepResultFactory.create()
+
+        self.assertEqual(self.refs(), [])
+
+
+    def test_change_bug_url(self):
+        """Changing the bug URL updates the index."""
+        sr = self.F.StepResultFactory.create(
+            bug_url="http://www.example.com/bug1")
+
+        sr.bug_url = "http://www.example.com/bug2"
+        sr.save()
+
+        self.assertEqual(self.refs(), [(sr.id, "http://www.example.com/bug2")])
+
+
+    def test_clear_bug_url(self):
+        """Clearing the bug URL removes it from the index."""
+        sr = self.F.StepResultFactory.create(
+            bug_url="http://www.example.com/bug1")
+
+        sr.bug_url = ""
+        sr.save()
+
+        self.assertEqual(self.refs(), [])
+
+
+    def test_delete_undelete(self):
+        """Soft-deleted step results are dropped, and restored on undelete."""
+        sr = self.F.StepResultFactory.create(
+            bug_url="http://www.example.com/bug1")
+
+        sr.delete()
+
+        self.assertEqual(self.refs(), [])
+
+        self.model.StepResult.everything.get(pk=sr.pk).undelete()
+
+        self.assertEqual(self.refs(), [(sr.id, "http://www.example.com/bug1")])
+
+
+    def test_cascade_delete(self):
+        """Soft-deleting a result drops its step results' bug URLs."""
+        sr = self.F.StepResultFactory.create(
+            bug_url="http://www.example.com/bug1")
+
+        sr.result.delete()
+
+        self.assertEqual(self.refs(), [])
+
+
+    def test_refresh(self):
+        """Refresh picks up step results updated in bulk."""
+        sr = self.F.StepResultFactory.create()
+        self.model.StepResult.objects.filter(pk=sr.pk).update(
+            bug_url="http://www.example.com/bug1")
+
+        self.model.BugReference.refresh(
+            self.model.StepResult.objects.filter(pk=sr.pk))
+
+        self.assertEqual(self.refs(), [(sr.id, "http://www.example.com/bug1")])
+
+
+    def test_lookup_by_bug_url(self):
+        """Runs referencing a bug URL can be found via the index."""
+        sr = self.F.StepResultFactory.create(
+            bug_url="http://www.example.com/bug1")
+        self.F.StepResultFactory.create(bug_url="http://www.example.com/bug2")
+
+        self.assertEqual(
+            list(
+                self.model.Run.objects.filter(
+                    bugreferences__bug_url="http://www.example.com/bug1")),
+            [sr.result.runcaseversion.run]
+            )
+
+
+    def test_caseversion_bug_urls(self):
+        """CaseVersion.bug_urls is a single query against the index."""
+        sr = self.F.StepResultFactory.create(
+            bug_url="http://www.example.com/bug1")
+        cv = self.model.CaseVersion.objects.get(
+            pk=sr.result.runcaseversion.caseversion.pk)
+
+        with self.assertNumQueries(1):
+            urls = cv.bug_urls()
+
+        self.assertEqual(urls, set(["http://www.example.com/bug1"]))
@@ -278,3 +278,63 @@ class ResultTest(case.DBTestCase):
         r = self.refresh(sr.result)
         self.assertEqual(r.status, "started")
         self.assertEqual(r.stepresults.count(), 0)
+
+
+
+class PreloadResultsTest(case.DBTestCase):
+    """Tests for preloading a tester's results for many runcaseversions."""
+    @property
+    def func(self):
+        """The function under test."""
+        from cc.model.execution.models import preload_results
+        return preload_results
+
+
+    def test_preload(self):
+        """Loads results and step results in two queries."""
+        r = self.F.ResultFactory.create()
+        sr = self.F.StepResultFactory.create(
+            result=r, bug_url="http://www.example.com/bug1")
+        other = self.F.RunCaseVersionFactory.create(run=r.runcaseversion.run)
+        rcvs = list(self.model.RunCaseVersion.objects.order_by("id"))
+
+        with self.assertNumQueries(2):
+            self.func(rcvs, tester=r.tester, environment=r.environment)
+
+        key = (r.tester.id, r.environment.id)
+        preloaded = rcvs[0]._preloaded_results[key]
+        self.assertEqual(preloaded, r)
+        self.assertEqual(preloaded._preloaded_stepresults, {sr.step.id: sr})
+        self.assertEqual(rcvs[1]._preloaded_results, {key: None})
+        self.assertEqual(rcvs[1], other)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                preloaded.bug_urls(), set(["http://www.example.com/bug1"]))
+
+
+    def test_other_tester(self):
+        """Doesn't load other testers' results."""
+        r = self.F.ResultFactory.create()
+        user = self.F.UserFactory.create()
+        rcvs = [r.runcaseversion]
+
+        self.func(rcvs, tester=user, environment=r.environment)
+
+        self.assertEqual(
+            rcvs[0]._preloaded_results, {(user.id, r.environment.id): None})
+
+
+    def test_latest(self):
+        """If a tester has duplicate results, the latest one is used."""
+        r = self.F.ResultFactory.create()
+        r2 = self.F.ResultFactory.create(
+            runcaseversion=r.runcaseversion,
+            tester=r.tester,
+            environment=r.environment,
+            )
+        rcvs = [r.runcaseversion]
+
+        self.func(rcvs, tester=r.tester, environment=r.environment)
+
+        self.assertEqual(
+            rcvs[0]._preloaded_results[(r.tester.id, r.environment.id)], r2)
@@ -0,0 +1,332 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for denormalized result stats.
+
+"""
+from mock import patch
+
+from tests import case
+
+
+
+class ResultStatsTest(case.DBTestCase):
+    """Tests for keeping RunStats and RunCaseVersionStats current."""
+    def setUp(self):
+        """Set up a run with one runcaseversion in two environments."""
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows", "Linux"]})
+        pv = self.F.ProductVersionFactory(environments=self.envs)
+        self.run = self.F.RunFactory(productversion=pv)
+        self.rcv = self.F.RunCaseVersionFactory(
+            run=self.run, caseversion__productversion=pv)
+
+
+    def assertStats(self, **counts):
+        """Assert stored rcv and run stats (fresh from db) have ``counts``."""
+        for stats in [
+                self.model.RunCaseVersionStats.objects.get(
+                    runcaseversion=self.rcv),
+                self.model.RunStats.objects.get(run=self.run),
+                ]:
+            for name, count in counts.items():
+                self.assertEqual(
+                    getattr(stats, name), count,
+                    "{0} {1} is {2}, not {3}".format(
+                        stats.__class__.__name__, name,
+                        getattr(stats, name), count)
+                    )
+
+
+    def result(self, env=0, **kwargs):
+        """Create and return a result for the rcv in environment ``env``."""
+        return self.F.ResultFactory.create(
+            runcaseversion=self.rcv, environment=self.envs[env], **kwargs)
+
+
+    def test_total_envs(self):
+        """Counts environment combinations."""
+        self.assertStats(total_envs=2, completed_envs=0, assigned=0)
+
+
+    def test_create_result(self):
+        """Creating a result counts its status."""
+        self.result()
+
+        self.assertStats(assigned=1)
+
+
+    def test_transitions(self):
+        """Result transitions move result between status counts."""
+        r = self.result()
+
+        r.start()
+        self.assertStats(assigned=0, started=1, completed_envs=0)
+
+        r.finishfail()
+        self.assertStats(started=0, failed=1, completed_envs=1)
+
+        r.restart()
+        self.assertStats(failed=0, started=1, completed_envs=0)
+
+        r.finishsucceed()
+        self.assertStats(started=0, passed=1, completed_envs=1)
+
+
+    def test_completed_envs_distinct(self):
+        """Two completed results in one env count as one completed env."""
+        r1 = self.result(status="passed")
+        self.result(status="failed")
+
+        self.assertStats(passed=1, failed=1, completed_envs=1)
+
+        r1.restart()
+
+        self.assertStats(passed=0, started=1, completed_envs=1)
+
+
+    def test_completion(self):
+        """Run and runcaseversion completion reads from stats."""
+        self.result(env=0, status="passed")
+        self.result(env=1, status="started")
+
+        self.assertEqual(self.refresh(self.rcv).completion(), 0.5)
+        self.assertEqual(self.refresh(self.run).completion(), 0.5)
+
+
+    def test_delete_result(self):
+        """Deleting a result uncounts it; undeleting counts it again."""
+        r = self.result(status="invalidated")
+
+        r.delete()
+        self.assertStats(invalidated=0, completed_envs=0)
+
+        self.refresh(r).undelete()
+        self.assertStats(invalidated=1, completed_envs=1)
+
+
+    def test_delete_results_in_batches(self):
+        """Deleting more results than a batch updates stats for all."""
+        self.result(env=0, status="passed")
+        self.result(env=1, status="failed")
+
+        with patch("cc.model.execution.models.BATCH_SIZE", 1):
+            self.model.Result.objects.all().delete()
+
+        self.assertStats(passed=0, failed=0, completed_envs=0)
+
+
+    def test_delete_runcaseversion(self):
+        """Deleting a runcaseversion removes its counts from run stats."""
+        self.result(status="passed")
+
+        self.rcv.delete()
+
+        stats = self.model.RunStats.objects.get(run=self.run)
+        self.assertEqual(stats.passed, 0)
+        self.assertEqual(stats.total_envs, 0)
+
+
+    def test_delete_runcaseversions_in_batches(self):
+        """Deleting more runcaseversions than a batch updates run stats."""
+        other = self.F.RunCaseVersionFactory.create(
+            run=self.F.RunFactory.create(
+                productversion=self.run.productversion),
+            caseversion=self.rcv.caseversion,
+            )
+        self.result(status="passed")
+
+        with patch("cc.model.execution.models.BATCH_SIZE", 1):
+            self.model.RunCaseVersion.objects.all().delete()
+
+        for run in [self.run, other.run]:
+            stats = self.model.RunStats.objects.get(run=run)
+            self.assertEqual(stats.passed, 0)
+            self.assertEqual(stats.total_envs, 0)
+
+
+    def test_remove_envs(self):
+        """Removing environments from the run updates env totals."""
+        self.run.remove_envs(self.envs[0])
+
+        self.assertStats(total_envs=1)
+
+
+    def test_add_envs(self):
+        """Adding environments to a runcaseversion updates env totals."""
+        self.rcv.remove_envs(self.envs[0])
+        self.rcv.add_envs(self.envs[0])
+
+        self.assertStats(total_envs=2)
+
+
+    def test_missing_stats_rebuilt(self):
+        """A transition rebuilds stats if they are missing."""
+        r = self.result()
+        self.model.RunCaseVersionStats.objects.all().delete()
+        self.model.RunStats.objects.all().delete()
+
+        r.start()
+
+        self.assertStats(assigned=0, started=1, total_envs=2)
+
+
+    def test_completion(self):
+        """Completion is kept current as env combos are completed."""
+        r = self.result()
+        r.finishsucceed()
+
+        self.assertStats(completed_envs=1, completion=0.5)
+
+        self.result(env=1, status="failed")
+
+        self.assertStats(completed_envs=2, completion=1)
+
+        r.restart()
+
+        self.assertStats(completed_envs=1, completion=0.5)
+
+
+    def test_completion_no_envs(self):
+        """Completion is zero with no environments."""
+        self.rcv.environments.clear()
+
+        self.assertStats(total_envs=0, completion=0)
+
+
+    def test_transition_queries(self):
+        """A transition costs a constant number of queries."""
+        r = self.result()
+        r = self.model.Result.objects.get(pk=r.pk)
+
+        # save, two stats updates; the runcaseversion isn't loaded
+        with self.assertNumQueries(3):
+            r.start()
+
+
+    def test_transition_completion(self):
+        """A result loaded on its own updates completion of rcv and run."""
+        r = self.result()
+        r = self.model.Result.objects.get(pk=r.pk)
+
+        r.finishsucceed()
+
+        self.assertStats(passed=1, completed_envs=1, completion=0.5)
+
+
+
+class BatchResultStatsTest(case.DBTestCase):
+    """Tests for fetching result stats of many runs/runcaseversions at once."""
+    def setUp(self):
+        """Set up two runs, each with a runcaseversion in one environment."""
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows"]})
+        pv = self.F.ProductVersionFactory(environments=self.envs)
+        self.rcvs = []
+        for i in range(2):
+            run = self.F.RunFactory(productversion=pv)
+            self.rcvs.append(
+                self.F.RunCaseVersionFactory(
+                    run=run, caseversion__productversion=pv))
+        self.F.ResultFactory.create(
+            runcaseversion=self.rcvs[0], environment=self.envs[0],
+            status="passed")
+        self.F.ResultFactory.create(
+            runcaseversion=self.rcvs[1], environment=self.envs[0],
+            status="failed")
+
+
+    def test_result_summaries(self):
+        """Returns summary for each runcaseversion, keyed by ID."""
+        from cc.model.execution.models import result_summaries
+
+        with self.assertNumQueries(1):
+            summaries = result_summaries(self.rcvs)
+
+        self.assertEqual(
+            summaries,
+            {
+                self.rcvs[0].id: {"passed": 1, "failed": 0, "invalidated": 0},
+                self.rcvs[1].id: {"passed": 0, "failed": 1, "invalidated": 0},
+                }
+            )
+
+
+    def test_completions(self):
+        """Returns completion fraction for each run, keyed by ID."""
+        from cc.model.execution.models import completions
+        self.F.RunFactory.create()
+        runs = list(self.model.Run.objects.order_by("id"))
+
+        with self.assertNumQueries(1):
+            res = completions(runs)
+
+        self.assertEqual(res, {runs[0].id: 1, runs[1].id: 1, runs[2].id: 0})
+
+
+    def test_empty(self):
+        """No objects, no queries."""
+        from cc.model.execution.models import result_summaries
+
+        with self.assertNumQueries(0):
+            self.assertEqual(result_summaries([]), {})
+
+
+    def test_preload(self):
+        """Preloaded runs give result summary and completion without queries."""
+        from cc.model.execution.models import preload_result_stats
+
+        runs = list(
+            self.model.Run.objects.order_by("id").preload(
+                preload_result_stats))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [r.result_summary()["failed"] for r in runs], [0, 1])
+            self.assertEqual([r.completion() for r in runs], [1, 1])
+
+
+
+class ResultSummaryTest(case.DBTestCase):
+    """Tests for result_summary of a results queryset."""
+    @property
+    def func(self):
+        """The function under test."""
+        from cc.model.execution.models import result_summary
+        return result_summary
+
+
+    def test_summary(self):
+        """Counts results in each completed state."""
+        self.F.ResultFactory.create(status="passed")
+        self.F.ResultFactory.create(status="passed")
+        self.F.ResultFactory.create(status="invalidated")
+        self.F.ResultFactory.create(status="started")
+
+        self.assertEqual(
+            self.func(self.model.Result.objects.all()),
+            {"passed": 2, "failed": 0, "invalidated": 1},
+            )
+
+
+    def test_empty(self):
+        """All zero for no results."""
+        self.assertEqual(
+            self.func(self.model.Result.objects.all()),
+            {"passed": 0, "failed": 0, "invalidated": 0},
+            )
@@ -148,6 +148,7 @@ class RunTest(case.DBTestCase):
         new = r.clone()
 
         self.assertEqual(len(new.team.all()), 2)
+        self.assertEqual(len(new.effective_team.all()), 2)
 
 
     def test_gets_productversion_envs(self):
@@ -441,3 +442,111 @@ class RunActivationTest(case.DBTestCase):
 
         self.assertCaseVersions(r, [])
         self.assertEqual(self.refresh(r).status, "active")
+
+
+    def test_environments_intersection(self):
+        """Runcaseversion gets exactly the run/caseversion shared envs."""
+        tc = self.F.CaseFactory.create(product=self.p)
+        tcv = self.F.CaseVersionFactory.create(
+            case=tc, productversion=self.pv8, status="active")
+        tcv.remove_envs(*self.envs[:2])
+
+        ts = self.F.SuiteFactory.create(product=self.p)
+        self.F.SuiteCaseFactory.create(suite=ts, case=tc)
+
+        r = self.F.RunFactory.create(productversion=self.pv8)
+        r.remove_envs(self.envs[3])
+        self.F.RunSuiteFactory.create(suite=ts, run=r)
+
+        r.activate()
+
+        self.assertEqual(
+            set(r.runcaseversions.get().environments.all()),
+            set([self.envs[2]]))
+
+
+    def test_case_in_two_suites(self):
+        """A case included in two suites is included in the run twice."""
+        tc = self.F.CaseFactory.create(product=self.p)
+        tcv = self.F.CaseVersionFactory.create(
+            case=tc, productversion=self.pv8, status="active")
+
+        ts1 = self.F.SuiteFactory.create(product=self.p)
+        self.F.SuiteCaseFactory.create(suite=ts1, case=tc)
+        ts2 = self.F.SuiteFactory.create(product=self.p)
+        self.F.SuiteCaseFactory.create(suite=ts2, case=tc)
+
+        r = self.F.RunFactory.create(productversion=self.pv8)
+        self.F.RunSuiteFactory.create(suite=ts1, run=r, order=1)
+        self.F.RunSuiteFactory.create(suite=ts2, run=r, order=2)
+
+        r.activate()
+
+        self.assertOrderedCaseVersions(r, [tcv, tcv])
+        self.assertEqual(
+            [rcv.order for rcv in r.runcaseversions.all()], [1, 2])
+
+
+    def test_deleted_suitecase_not_included(self):
+        """Cases removed from a suite are not included."""
+        tc = self.F.CaseFactory.create(product=self.p)
+        self.F.CaseVersionFactory.create(
+            case=tc, productversion=self.pv8, status="active")
+
+        ts = self.F.SuiteFactory.create(product=self.p)
+        self.F.SuiteCaseFactory.create(suite=ts, case=tc).delete()
+
+        r = self.F.RunFactory.create(productversion=self.pv8)
+        self.F.RunSuiteFactory.create(suite=ts, run=r)
+
+        r.activate()
+
+        self.assertCaseVersions(r, [])
+
+
+    def test_returns_summary(self):
+        """Returns counts of runcaseversions and environments locked in."""
+        for i in range(2):
+            tc = self.F.CaseFactory.create(product=self.p)
+            self.F.CaseVersionFactory.create(
+                case=tc, productversion=self.pv8, status="active")
+            ts = self.F.SuiteFactory.create(product=self.p)
+            self.F.SuiteCaseFactory.create(suite=ts, case=tc)
+        r = self.F.RunFactory.create(productversion=self.pv8)
+        for ts in self.model.Suite.objects.all():
+            self.F.RunSuiteFactory.create(suite=ts, run=r)
+
+        summary = r.activate()
+
+        self.assertEqual(summary["runcaseversions"], 2)
+        self.assertEqual(summary["environments"], 8)
+        self.assertTrue(summary["elapsed"] >= 0)
+
+
+    def test_not_draft_summary(self):
+        """Activating a non-draft run returns an empty summary."""
+        r = self.F.RunFactory.create(status="disabled")
+
+        summary = r.activate()
+
+        self.assertEqual(summary["runcaseversions"], 0)
+        self.assertEqual(summary["environments"], 0)
+
+
+    def test_constant_queries(self):
+        """Number of queries does not depend on number of suites and cases."""
+        ts = self.F.SuiteFactory.create(product=self.p)
+        for i in range(5):
+            tc = self.F.CaseFactory.create(product=self.p)
+            self.F.CaseVersionFactory.create(
+                case=tc, productversion=self.pv8, status="active")
+            self.F.SuiteCaseFactory.create(suite=ts, case=tc, order=i)
+        r = self.F.RunFactory.create(productversion=self.pv8)
+        self.F.RunSuiteFactory.create(suite=ts, run=r)
+
+        # envs, caseversions, case envs, max id, insert, ids, insert,
+        # rcv stats insert, run stats refresh (4), save
+        with self.assertNumQueries(12):
+            r.activate()
+
+        self.assertEqual(r.runcaseversions.count(), 5)
@@ -0,0 +1,309 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for bulk submission of results.
+
+"""
+from django.db import transaction
+
+from mock import Mock, patch
+
+from tests import case
+
+
+
+class SubmitResultsTest(case.DBTestCase):
+    """Tests for submit_results."""
+    def setUp(self):
+        """Set up an active run with two runcaseversions in two envs."""
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows", "Linux"]})
+        pv = self.F.ProductVersionFactory(environments=self.envs)
+        self.run = self.F.RunFactory(productversion=pv, status="active")
+        self.rcvs = [
+            self.F.RunCaseVersionFactory(
+                run=self.run, caseversion__productversion=pv)
+            for i in range(2)
+            ]
+        self.tester = self.F.UserFactory.create()
+
+
+    @property
+    def func(self):
+        """The function under test."""
+        from cc.model.execution.batch import submit_results
+        return submit_results
+
+
+    def record(self, rcv=0, env=0, status="passed", **kwargs):
+        """Return a record for rcv and env indices with given status."""
+        kwargs.update(
+            {
+                "runcaseversion": self.rcvs[rcv].id,
+                "environment": self.envs[env].id,
+                "status": status,
+                }
+            )
+        return kwargs
+
+
+    def submit(self, *records, **kwargs):
+        """Submit given records as self.tester; return outcomes."""
+        return self.func(self.run, self.tester, list(records), **kwargs)
+
+
+    def test_create(self):
+        """Creates results that don't exist yet."""
+        outcomes = self.submit(
+            self.record(), self.record(rcv=1, status="invalidated", comment="x"))
+
+        results = list(self.model.Result.objects.order_by("id"))
+        self.assertEqual(
+            outcomes,
+            [
+                {"outcome": "created", "result": results[0].id},
+                {"outcome": "created", "result": results[1].id},
+                ]
+            )
+        self.assertEqual(
+            [(r.runcaseversion, r.environment, r.tester, r.status, r.comment)
+             for r in results],
+            [
+                (self.rcvs[0], self.envs[0], self.tester, "passed", ""),
+                (self.rcvs[1], self.envs[0], self.tester, "invalidated", "x"),
+                ]
+            )
+        self.assertIsNotNone(results[0].completed)
+        self.assertEqual(results[0].created_by, self.tester)
+
+
+    def test_update(self):
+        """Updates the tester's existing result."""
+        r = self.F.ResultFactory.create(
+            runcaseversion=self.rcvs[0],
+            environment=self.envs[0],
+            tester=self.tester,
+            status="started",
+            )
+
+        outcomes = self.submit(self.record(status="failed", comment="bad"))
+
+        self.assertEqual(outcomes, [{"outcome": "updated", "result": r.id}])
+        r = self.refresh(r)
+        self.assertEqual(r.status, "failed")
+        self.assertEqual(r.comment, "bad")
+        self.assertEqual(r.modified_by, self.tester)
+        self.assertIsNotNone(r.completed)
+
+
+    def test_restart(self):
+        """Submitting started restarts an existing result."""
+        sr = self.F.StepResultFactory.create(
+            result__runcaseversion=self.rcvs[0],
+            result__environment=self.envs[0],
+            result__tester=self.tester,
+            result__status="failed",
+            result__comment="bad",
+            step__caseversion=self.rcvs[0].caseversion,
+            )
+
+        self.submit(self.record(status="started"))
+
+        r = self.refresh(sr.result)
+        self.assertEqual(r.status, "started")
+        self.assertEqual(r.comment, "")
+        self.assertEqual(r.completed, None)
+        self.assertEqual(r.stepresults.count(), 0)
+
+
+    def test_failed_step(self):
+        """Records failed step with bug URL."""
+        step = self.F.CaseStepFactory.create(
+            caseversion=self.rcvs[0].caseversion, number=1)
+
+        self.submit(
+            self.record(
+                status="failed", stepnumber=1, bug="http://example.com/1"))
+
+        sr = self.model.StepResult.objects.get()
+        self.assertEqual(sr.step, step)
+        self.assertEqual(sr.status, "failed")
+        self.assertEqual(sr.bug_url, "http://example.com/1")
+        self.assertEqual(sr.bugreference.bug_url, "http://example.com/1")
+
+
+    def test_failed_step_existing(self):
+        """Updates existing step result for failed step."""
+        sr = self.F.StepResultFactory.create(
+            result__runcaseversion=self.rcvs[0],
+            result__environment=self.envs[0],
+            result__tester=self.tester,
+            step__caseversion=self.rcvs[0].caseversion,
+            step__number=1,
+            status="passed",
+            )
+
+        self.submit(
+            self.record(
+                status="failed", stepnumber=1, bug="http://example.com/1"))
+
+        sr = self.refresh(sr)
+        self.assertEqual(sr.status, "failed")
+        self.assertEqual(sr.bug_url, "http://example.com/1")
+        self.assertEqual(sr.bugreference.bug_url, "http://example.com/1")
+        self.assertEqual(self.model.StepResult.objects.count(), 1)
+
+
+    def test_invalid(self):
+        """Invalid records are reported and skipped; others are written."""
+        other = self.F.RunCaseVersionFactory.create()
+
+        outcomes = self.submit(
+            self.record(status="assigned"),
+            {"runcaseversion": other.id, "environment": self.envs[0].id,
+             "status": "passed"},
+            {"runcaseversion": "x", "environment": 1, "status": "passed"},
+            {"environment": 1, "status": "passed"},
+            self.record(status="passed", stepnumber=3),
+            self.record(status="failed", stepnumber=3),
+            self.record(rcv=1),
+            self.record(rcv=1, status="failed"),
+            "foo",
+            )
+
+        errors = [o.get("errors") for o in outcomes]
+        self.assertEqual(
+            errors,
+            [
+                ["Status must be one of started, passed, failed, invalidated."],
+                ["Runcaseversion {0} is not in this run.".format(other.id)],
+                ["Invalid runcaseversion ID."],
+                ["Missing runcaseversion."],
+                ["Only failed results can have a stepnumber."],
+                ["Runcaseversion {0} has no step 3.".format(self.rcvs[0].id)],
+                None,
+                ["Duplicate of record 6."],
+                ["Record must be an object."],
+                ]
+            )
+        self.assertEqual(
+            self.model.Result.objects.get().runcaseversion, self.rcvs[1])
+
+
+    def test_invalid_environment(self):
+        """Environment must be one of the runcaseversion's environments."""
+        self.rcvs[0].environments.remove(self.envs[1])
+
+        outcomes = self.submit(self.record(env=1))
+
+        self.assertEqual(
+            outcomes[0]["errors"],
+            ["Environment {0} is not valid for runcaseversion {1}.".format(
+                    self.envs[1].id, self.rcvs[0].id)]
+            )
+
+
+    def test_stats(self):
+        """Result stats are brought up to date."""
+        self.submit(self.record(), self.record(env=1, status="failed"))
+
+        stats = self.model.RunStats.objects.get(run=self.run)
+        self.assertEqual(stats.passed, 1)
+        self.assertEqual(stats.failed, 1)
+        self.assertEqual(stats.completed_envs, 2)
+
+
+    def test_batch_key(self):
+        """Resubmitting a batch key returns original outcomes, writes nothing."""
+        outcomes = self.submit(self.record(), batch_key="one")
+
+        again = self.submit(
+            self.record(status="failed"), self.record(rcv=1), batch_key="one")
+
+        self.assertEqual(again, outcomes)
+        self.assertEqual(self.model.Result.objects.get().status, "passed")
+
+
+    def test_batch_key_per_tester(self):
+        """Batch keys are per-tester."""
+        self.submit(self.record(), batch_key="one")
+        self.tester = self.F.UserFactory.create()
+
+        outcomes = self.submit(self.record(), batch_key="one")
+
+        self.assertEqual(outcomes[0]["outcome"], "created")
+
+
+    def test_constant_queries(self):
+        """Number of queries doesn't depend on number of records."""
+        for i in range(2):
+            self.F.CaseStepFactory.create(
+                caseversion=self.rcvs[i].caseversion, number=1)
+        self.F.ResultFactory.create(
+            runcaseversion=self.rcvs[0],
+            environment=self.envs[0],
+            tester=self.tester,
+            )
+        records = [
+            self.record(rcv, env, status="failed", stepnumber=1)
+            for rcv in range(2) for env in range(2)
+            ]
+
+        # batch key lookup, batch record, 4 lookups, result update, max id,
+        # insert and read back, step result lookup and insert, 3 to refresh
+        # bug references, 11 to refresh stats, batch outcomes
+        with self.assertNumQueries(27):
+            self.submit(*records, batch_key="one")
+
+
+
+class SubmitResultsTransactionTest(case.TransactionDBTestCase):
+    """Tests for submit_results inside a caller's transaction."""
+    def test_failure_keeps_outer_work(self):
+        """A failed submission doesn't roll back the caller's earlier work."""
+        from cc.model.execution.batch import submit_results
+
+        # everything is rolled back at the end, so later tests don't see it
+        with transaction.commit_manually():
+            try:
+                envs = self.F.EnvironmentFactory.create_full_set(
+                    {"OS": ["Linux"]})
+                run = self.F.RunFactory.create(
+                    environments=envs, status="active")
+                rcv = self.F.RunCaseVersionFactory.create(
+                    run=run, environments=envs)
+                record = {
+                    "runcaseversion": rcv.id,
+                    "environment": envs[0].id,
+                    "status": "passed",
+                    }
+                tester = self.F.UserFactory.create()
+                self.F.ProductFactory.create(name="Earlier")
+
+                with patch(
+                        "cc.model.execution.batch.refresh_stats",
+                        Mock(side_effect=ValueError)):
+                    with self.assertRaises(ValueError):
+                        submit_results(run, tester, [record], batch_key="one")
+
+                self.assertIn(
+                    "Earlier",
+                    self.model.Product.objects.values_list("name", flat=True),
+                    )
+            finally:
+                transaction.rollback()
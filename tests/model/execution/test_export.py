@@ -0,0 +1,211 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for streaming results export.
+
+"""
+import csv
+from datetime import datetime
+import json
+from cStringIO import StringIO
+
+from mock import patch
+
+from tests import case
+
+
+
+class ExportTestCase(case.DBTestCase):
+    """Base class for export tests; creates a result with a failed step."""
+    def setUp(self):
+        """Create a failed result, with a bug, in a two-element environment."""
+        env = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Linux"], "Browser": [u"Fire\xfcfox"]})[0]
+        self.result = self.F.ResultFactory.create(
+            status="failed",
+            comment="broken",
+            tester__username="tester",
+            environment=env,
+            runcaseversion__run__name="Run 1",
+            runcaseversion__caseversion__name="Case 1",
+            )
+        self.F.StepResultFactory.create(
+            result=self.result,
+            step__number=2,
+            step__caseversion=self.result.runcaseversion.caseversion,
+            status="failed",
+            bug_url="http://example.com/1",
+            )
+
+
+
+class ExportRowsTest(ExportTestCase):
+    """Tests for export_rows."""
+    @property
+    def func(self):
+        """The function under test."""
+        from cc.model.execution.export import export_rows
+        return export_rows
+
+
+    def test_row(self):
+        """Rows include related names, environment and step results."""
+        rcv = self.result.runcaseversion
+
+        rows = list(self.func(self.model.Result.objects.all()))
+
+        self.assertEqual(len(rows), 1)
+        row = rows[0]
+        self.assertEqual(row["id"], self.result.id)
+        self.assertEqual(row["run_id"], rcv.run.id)
+        self.assertEqual(row["run"], "Run 1")
+        self.assertEqual(row["product"], rcv.run.productversion.product.name)
+        self.assertEqual(row["version"], rcv.run.productversion.version)
+        self.assertEqual(row["case_id"], rcv.caseversion.case.id)
+        self.assertEqual(row["caseversion_id"], rcv.caseversion.id)
+        self.assertEqual(row["case"], "Case 1")
+        self.assertEqual(row["environment"], u"Fire\xfcfox, Linux")
+        self.assertEqual(row["tester"], "tester")
+        self.assertEqual(row["status"], "failed")
+        self.assertEqual(row["comment"], "broken")
+        self.assertEqual(
+            row["stepresults"],
+            [{"number": 2, "status": "failed",
+              "bug_url": "http://example.com/1"}]
+            )
+
+
+    def test_batches(self):
+        """Fetches in batches, with a constant number of queries per batch."""
+        for i in range(4):
+            self.F.ResultFactory.create(environment=self.result.environment)
+
+        rows = self.func(self.model.Result.objects.all(), batch_size=2)
+
+        # results and step results for each of three batches, environments
+        # once (all share one), and a final empty fetch of results
+        with self.assertNumQueries(8):
+            ids = [r["id"] for r in rows]
+        self.assertEqual(
+            ids,
+            list(self.model.Result.objects.order_by("id").values_list(
+                    "id", flat=True))
+            )
+
+
+    def test_deleted_excluded(self):
+        """Deleted results are not exported."""
+        self.result.delete()
+
+        self.assertEqual(list(self.func(self.model.Result.objects.all())), [])
+
+
+
+class FilterResultsTest(ExportTestCase):
+    """Tests for filter_results."""
+    @property
+    def func(self):
+        """The function under test."""
+        from cc.model.execution.export import filter_results
+        return filter_results
+
+
+    def test_run(self):
+        """Can limit to a run."""
+        self.F.ResultFactory.create()
+
+        self.assertEqual(
+            list(self.func(run=self.result.runcaseversion.run)),
+            [self.result]
+            )
+
+
+    def test_productversion(self):
+        """Can limit to runs of a product version."""
+        self.F.ResultFactory.create()
+
+        self.assertEqual(
+            list(
+                self.func(
+                    productversion=self.result.runcaseversion.run.productversion)
+                ),
+            [self.result]
+            )
+
+
+    def test_dates(self):
+        """Can limit to a range of modification dates."""
+        self.model.Result.objects.filter(pk=self.result.pk).update(
+            modified_on=datetime(2012, 1, 2), notrack=True)
+
+        self.assertEqual(
+            list(self.func(since=datetime(2012, 1, 2))), [self.result])
+        self.assertEqual(list(self.func(since=datetime(2012, 1, 3))), [])
+        self.assertEqual(
+            list(self.func(until=datetime(2012, 1, 3))), [self.result])
+        self.assertEqual(list(self.func(until=datetime(2012, 1, 2))), [])
+
+
+
+class ExportTest(ExportTestCase):
+    """Tests for export in CSV and JSON Lines formats."""
+    @property
+    def func(self):
+        """The function under test."""
+        from cc.model.execution.export import export
+        return export
+
+
+    def test_csv(self):
+        """CSV has a header line, and summarizes step results."""
+        output = "".join(self.func(self.model.Result.objects.all(), "csv"))
+
+        rows = list(csv.DictReader(StringIO(output)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["environment"], "Fire\xc3\xbcfox, Linux")
+        self.assertEqual(rows[0]["failed_steps"], "2")
+        self.assertEqual(rows[0]["bug_urls"], "http://example.com/1")
+        self.assertEqual(rows[0]["completed"], "")
+        self.assertEqual(
+            rows[0]["started"], self.result.started.isoformat())
+
+
+    def test_jsonl(self):
+        """JSON Lines has one object per result."""
+        self.F.ResultFactory.create()
+
+        output = "".join(self.func(self.model.Result.objects.all(), "jsonl"))
+
+        lines = output.splitlines()
+        self.assertEqual(len(lines), 2)
+        row = json.loads(lines[0])
+        self.assertEqual(row["environment"], u"Fire\xfcfox, Linux")
+        self.assertEqual(row["started"], self.result.started.isoformat())
+        self.assertEqual(row["stepresults"][0]["number"], 2)
+
+
+    def test_chunks(self):
+        """Output is yielded in chunks, not all at once."""
+        for i in range(3):
+            self.F.ResultFactory.create()
+
+        with patch("cc.model.execution.export.CHUNK_SIZE", 1):
+            chunks = list(
+                self.func(self.model.Result.objects.all(), "jsonl"))
+
+        self.assertEqual(len(chunks), 4)
@@ -0,0 +1,101 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for management command to run uploaded and interrupted case imports.
+
+"""
+from cStringIO import StringIO
+
+from django.core.management import call_command
+
+from mock import patch
+
+from tests import case
+
+
+
+class ResumeCaseImportsTest(case.DBTestCase):
+    """Tests for resume_case_imports management command."""
+    def call_command(self, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("resume_case_imports", **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def test_resume(self):
+        """Runs imports that haven't completed."""
+        ci = self.F.CaseImportFactory.create(
+            name="cases.txt",
+            content="Test that one\nWhen I do\nThen it works\n")
+        done = self.F.CaseImportFactory.create(
+            content="Test that two\nWhen I do\nThen it works\n")
+        done.completed_on = done.created_on
+        done.save()
+
+        output = self.call_command()
+
+        self.assertEqual(
+            list(
+                self.model.CaseVersion.objects.values_list("name", flat=True)),
+            ["Test that one"],
+            )
+        self.assertIsNotNone(
+            self.model.CaseImport.objects.get(pk=ci.pk).completed_on)
+        self.assertIn("cases.txt: 1 test cases imported.", output)
+        self.assertIn(
+            "Imported 1 test cases from cases.txt (0 skipped).", output)
+
+
+    def test_failure(self):
+        """Reports failed imports, and continues with others."""
+        self.F.CaseImportFactory.create(name="one.txt")
+        self.F.CaseImportFactory.create(name="two.txt")
+
+        with patch(
+                "cc.model.library.management.commands.resume_case_imports."
+                "run_import") as run_import:
+            run_import.side_effect = ValueError("Oops.")
+            with patch("sys.stderr", StringIO()):
+                with self.assertRaises(SystemExit):
+                    self.call_command(verbosity=0)
+
+        self.assertEqual(run_import.call_count, 2)
+
+
+    def test_imported_elsewhere(self):
+        """Imports being run elsewhere are reported, but not as failures."""
+        self.F.CaseImportFactory.create(name="one.txt")
+
+        with patch(
+                "cc.model.library.management.commands.resume_case_imports."
+                "run_import") as run_import:
+            run_import.side_effect = self.model.ConcurrencyError("Oops.")
+            output = self.call_command()
+
+        self.assertIn("one.txt is being imported elsewhere.", output)
+
+
+    def test_quiet(self):
+        """No output with verbosity 0."""
+        self.F.CaseImportFactory.create(
+            content="Test that one\nWhen I do\nThen it works\n")
+
+        self.assertEqual(self.call_command(verbosity=0), "")
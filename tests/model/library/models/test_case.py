@@ -294,6 +294,45 @@ class CaseVersionTest(case.DBTestCase):
         self.assertEqual(cv.latest, True)
 
 
+    def test_set_latest_versions(self):
+        """set_latest_versions marks latest versions of many cases at once."""
+        pv1 = self.F.ProductVersionFactory.create(version="1")
+        pv2 = self.F.ProductVersionFactory.create(
+            product=pv1.product, version="2")
+        cv1 = self.F.CaseVersionFactory.create(productversion=pv1)
+        cv2 = self.F.CaseVersionFactory.create(
+            productversion=pv2, case=cv1.case)
+        other = self.F.CaseVersionFactory.create(productversion=pv1)
+        cv2.delete()
+        self.model.CaseVersion.everything.update(latest=False)
+
+        changed = self.model.Case.set_latest_versions(
+            self.model.Case.objects.all())
+
+        self.assertEqual(changed, {cv1.id: True, other.id: True})
+        self.assertEqual(
+            [self.refresh(cv).latest for cv in [cv1, cv2, other]],
+            [True, False, True])
+
+
+    def test_set_latest_versions_queries(self):
+        """Queries don't grow with number of cases, if nothing changes."""
+        cases = [self.F.CaseVersionFactory.create().case for i in range(3)]
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.model.Case.set_latest_versions(cases), {})
+
+
+    def test_edit_skips_set_latest(self):
+        """Saving a version with an unchanged product version is one query."""
+        cv = self.F.CaseVersionFactory.create()
+
+        cv.status = "active"
+        with self.assertNumQueries(1):
+            cv.save()
+
+
     def test_skip_set_latest(self):
         """Passing skip_set_latest to save skips setting latest version."""
         cv1 = self.F.CaseVersionFactory.create(productversion__version="1")
@@ -380,6 +419,76 @@ class CaseVersionTest(case.DBTestCase):
 
 
 
+class PreloadCaseVersionTest(case.DBTestCase):
+    """Tests for preloading tags, steps and attachments of caseversions."""
+    def test_tags(self):
+        """Loads tags of all caseversions in one query."""
+        cv = self.F.CaseVersionFactory.create()
+        other = self.F.CaseVersionFactory.create()
+        cv.tags.add(self.F.TagFactory.create(name="b"))
+        cv.tags.add(self.F.TagFactory.create(name="a"))
+        self.F.TagFactory.create(name="c").delete()
+        cvs = list(self.model.CaseVersion.objects.order_by("id"))
+
+        with self.assertNumQueries(1):
+            self.model.preload_tags(cvs)
+
+        with self.assertNumQueries(0):
+            self.assertEqual([t.name for t in cvs[0].tag_list()], ["a", "b"])
+            self.assertEqual(cvs[1].tag_list(), [])
+        self.assertEqual(cvs[1], other)
+
+
+    def test_tags_not_preloaded(self):
+        """Without preloading, tag_list queries the caseversion's tags."""
+        cv = self.F.CaseVersionFactory.create()
+        t = self.F.TagFactory.create()
+        cv.tags.add(t)
+
+        self.assertEqual(self.refresh(cv).tag_list(), [t])
+
+
+    def test_steps(self):
+        """Loads steps of all caseversions in one query."""
+        cv = self.F.CaseVersionFactory.create()
+        s2 = self.F.CaseStepFactory.create(caseversion=cv, number=2)
+        s1 = self.F.CaseStepFactory.create(caseversion=cv, number=1)
+        self.F.CaseStepFactory.create(caseversion=cv, number=3).delete()
+        self.F.CaseVersionFactory.create()
+        cvs = list(self.model.CaseVersion.objects.order_by("id"))
+
+        with self.assertNumQueries(1):
+            self.model.preload_steps(cvs)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(cvs[0].step_list(), [s1, s2])
+            self.assertIs(cvs[0].step_list()[0].caseversion, cvs[0])
+            self.assertEqual(cvs[1].step_list(), [])
+
+
+    def test_attachments(self):
+        """Loads attachments of all caseversions in one query."""
+        ca = self.F.CaseAttachmentFactory.create()
+        self.F.CaseVersionFactory.create()
+        cvs = list(self.model.CaseVersion.objects.order_by("id"))
+
+        with self.assertNumQueries(1):
+            self.model.preload_attachments(cvs)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(cvs[0].attachment_list(), [ca])
+            self.assertEqual(cvs[1].attachment_list(), [])
+
+
+    def test_empty(self):
+        """Preloading for no caseversions runs no queries."""
+        with self.assertNumQueries(0):
+            self.model.preload_tags([])
+            self.model.preload_steps([])
+            self.model.preload_attachments([])
+
+
+
 class CaseStepTest(case.DBTestCase):
     """Tests for the CaseStep model."""
     def test_unicode(self):
@@ -292,3 +292,251 @@ class ParseBulkTest(case.TestCase):
                     },
                 ]
             )
+
+
+    def test_iter_parse_line_numbers(self):
+        """iter_parse generates each case with the line it begins on."""
+        self.assertEqual(
+            [
+                (number, data["name"]) for number, data
+                in self.parser().iter_parse(
+                    [
+                        "",
+                        "Test that one",
+                        "When I do",
+                        "Then it works",
+                        "Test that two",
+                        "When I do",
+                        "Then it works",
+                        ]
+                    )
+                ],
+            [(2, "Test that one"), (5, "Test that two")],
+            )
+
+
+    def test_iter_parse_error_line_number(self):
+        """iter_parse generates an error with the line it was found on."""
+        self.assertEqual(
+            list(
+                self.parser().iter_parse(
+                    [
+                        "Test that one",
+                        "When I do",
+                        "Then it works",
+                        "Test that two",
+                        "When I do",
+                        "Then it works",
+                        "And",
+                        "When I do",
+                        "",
+                        ]
+                    )
+                )[-1],
+            (
+                9,
+                {
+                    "name": "Test that two",
+                    "description": "",
+                    "steps": [
+                        {
+                            "instruction": "When I do",
+                            "expected": "Then it works",
+                            },
+                        {"instruction": "When I do"},
+                        ],
+                    "error": "Unexpected end of input, looking for 'Then '",
+                    },
+                ),
+            )
+
+
+
+class CSVParserTest(case.TestCase):
+    """Tests for CSVParser."""
+    @property
+    def parser(self):
+        from cc.model.library.bulk import CSVParser
+        return CSVParser
+
+
+    def parse(self, text):
+        """Return list of (line number, data) parsed from ``text``."""
+        lines = textwrap.dedent(text).lstrip().splitlines(True)
+        return list(self.parser().iter_parse(lines))
+
+
+    def test_success(self):
+        """Rows with a name begin a case; each row is a step."""
+        self.assertEqual(
+            self.parse(
+                u"""
+                Name,Instruction,Expected,Description
+                Test that one,Do this,See this,"Some
+                description"
+                ,Do that,See that,
+                Test that two,Do it,,
+                """
+                ),
+            [
+                (
+                    3,
+                    {
+                        "name": u"Test that one",
+                        "description": u"Some\ndescription",
+                        "steps": [
+                            {
+                                "instruction": u"Do this",
+                                "expected": u"See this",
+                                },
+                            {
+                                "instruction": u"Do that",
+                                "expected": u"See that",
+                                },
+                            ],
+                        },
+                    ),
+                (
+                    5,
+                    {
+                        "name": u"Test that two",
+                        "description": u"",
+                        "steps": [{"instruction": u"Do it", "expected": u""}],
+                        },
+                    ),
+                ],
+            )
+
+
+    def test_unicode(self):
+        """Non-ASCII text is parsed."""
+        self.assertEqual(
+            self.parse(u"name,instruction\nTest that \xfc,Do\n")[0][1]["name"],
+            u"Test that \xfc",
+            )
+
+
+    def test_missing_columns(self):
+        """Header row must name the required columns."""
+        self.assertEqual(
+            self.parse(u"name,expected\nTest that one,See this\n"),
+            [
+                (
+                    1,
+                    {
+                        "error": (
+                            "Expected a header row with columns "
+                            "'instruction'."
+                            ),
+                        },
+                    ),
+                ],
+            )
+
+
+    def test_step_without_case(self):
+        """A step row before any case is an error; parsing continues."""
+        self.assertEqual(
+            [
+                (number, data.get("error", data.get("name")))
+                for number, data in self.parse(
+                    u"name,instruction\n,Do this\nTest that one,Do\n")
+                ],
+            [
+                (2, "Expected a test case name, not a step."),
+                (3, u"Test that one"),
+                ],
+            )
+
+
+    def test_step_without_instruction(self):
+        """A case with a step missing an instruction is an error at its row."""
+        self.assertEqual(
+            [
+                (number, data.get("error"))
+                for number, data in self.parse(
+                    u"""
+                    name,instruction,expected
+                    Test that one,Do this,
+                    ,,See this
+                    Test that two,Do,
+                    """
+                    )
+                ],
+            [(3, "Expected a step instruction."), (4, None)],
+            )
+
+
+
+class JSONLinesParserTest(case.TestCase):
+    """Tests for JSONLinesParser."""
+    @property
+    def parser(self):
+        from cc.model.library.bulk import JSONLinesParser
+        return JSONLinesParser
+
+
+    def parse(self, *lines):
+        """Return list of (line number, data) parsed from ``lines``."""
+        return list(self.parser().iter_parse(lines))
+
+
+    def test_success(self):
+        """Each line is a case."""
+        self.assertEqual(
+            self.parse(
+                '{"name": "Test that one", "steps": [{"instruction": "Do"}]}',
+                "",
+                '{"name": "Test that two", "description": "Desc", "steps": '
+                '[{"instruction": "Do", "expected": "See"}]}',
+                ),
+            [
+                (
+                    1,
+                    {
+                        "name": u"Test that one",
+                        "description": u"",
+                        "steps": [{"instruction": u"Do", "expected": u""}],
+                        },
+                    ),
+                (
+                    3,
+                    {
+                        "name": u"Test that two",
+                        "description": u"Desc",
+                        "steps": [{"instruction": u"Do", "expected": u"See"}],
+                        },
+                    ),
+                ],
+            )
+
+
+    def test_errors(self):
+        """Invalid lines are errors; parsing continues."""
+        self.assertEqual(
+            self.parse(
+                "{not json",
+                "[]",
+                '{"name": "Test that one"}',
+                '{"name": "Test that one", "steps": ["Do"]}',
+                '{"name": "Test that one", "steps": [{"expected": "See"}]}',
+                '{"name": 1, "steps": [{"instruction": "Do"}]}',
+                '{"name": "Test that one", "steps": [{"instruction": "Do"}]}',
+                ),
+            [
+                (1, {"error": "Invalid JSON."}),
+                (2, {"error": "Expected an object."}),
+                (3, {"error": "Expected a list of steps."}),
+                (4, {"error": "Expected each step to be an object."}),
+                (5, {"error": "Expected a non-empty 'instruction'."}),
+                (6, {"error": "Expected 'name' to be a string."}),
+                (
+                    7,
+                    {
+                        "name": u"Test that one",
+                        "description": u"",
+                        "steps": [{"instruction": u"Do", "expected": u""}],
+                        },
+                    ),
+                ],
+            )
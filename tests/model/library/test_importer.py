@@ -0,0 +1,393 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for bulk import of test cases.
+
+"""
+from mock import Mock, patch
+
+from tests import case
+
+
+
+class ImportCasesTest(case.DBTestCase):
+    """Tests for import_cases."""
+    def setUp(self):
+        """Set up a product with two versions."""
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows", "Linux"]})
+        self.pv1 = self.F.ProductVersionFactory.create(
+            version="1.0", environments=self.envs)
+        self.product = self.pv1.product
+        self.pv2 = self.F.ProductVersionFactory.create(
+            product=self.product, version="2.0", environments=self.envs[:1])
+        self.user = self.F.UserFactory.create()
+
+
+    def data(self, name=u"Test that it works", steps=1):
+        """Return parsed data for a case with some steps."""
+        return {
+            "name": name,
+            "description": u"Some description",
+            "steps": [
+                {
+                    "instruction": u"When I do {0}".format(i),
+                    "expected": u"Then it works",
+                    }
+                for i in range(steps)
+                ],
+            }
+
+
+    def import_cases(self, cases, **kwargs):
+        """Import ``cases`` into both product versions."""
+        from cc.model.library.importer import import_cases
+        kwargs.setdefault("user", self.user)
+        return import_cases(
+            self.product, [self.pv1, self.pv2], cases, **kwargs)
+
+
+    def test_cases(self):
+        """Creates a case with a version per product version, and steps."""
+        c = self.import_cases([self.data(steps=2)], status="active")[0]
+
+        self.assertEqual(c.product, self.product)
+        self.assertEqual(c.created_by, self.user)
+        versions = list(c.versions.all())
+        self.assertEqual(
+            [cv.productversion for cv in versions], [self.pv1, self.pv2])
+        cv = versions[0]
+        self.assertEqual(cv.name, u"Test that it works")
+        self.assertEqual(cv.description, u"Some description")
+        self.assertEqual(cv.status, "active")
+        self.assertEqual(cv.created_by, self.user)
+        self.assertEqual(
+            [(s.number, s.instruction, s.expected) for s in cv.steps.all()],
+            [
+                (1, u"When I do 0", u"Then it works"),
+                (2, u"When I do 1", u"Then it works"),
+                ],
+            )
+
+
+    def test_order(self):
+        """Cases are returned in the order given."""
+        cases = self.import_cases(
+            [
+                self.data(name=u"Test that one"),
+                self.data(name=u"Test that two"),
+                ]
+            )
+
+        self.assertEqual(
+            [c.versions.all()[0].name for c in cases],
+            [u"Test that one", u"Test that two"],
+            )
+
+
+    def test_default_status(self):
+        """Versions are drafts by default."""
+        c = self.import_cases([self.data()])[0]
+
+        self.assertEqual(c.versions.all()[0].status, "draft")
+
+
+    def test_latest(self):
+        """Version for the highest ordered product version is latest."""
+        c = self.import_cases([self.data()])[0]
+
+        self.assertEqual(c.latest_version().productversion, self.pv2)
+        self.assertEqual(c.versions.filter(latest=True).count(), 1)
+
+
+    def test_environments(self):
+        """Versions get the environments of their product version."""
+        c = self.import_cases([self.data()])[0]
+
+        v1, v2 = c.versions.all()
+        self.assertEqual(set(v1.environments.all()), set(self.envs))
+        self.assertEqual(set(v2.environments.all()), set(self.envs[:1]))
+
+
+    def test_tags(self):
+        """Versions get the given tags."""
+        t = self.F.TagFactory.create()
+
+        c = self.import_cases([self.data()], tags=[t.id])[0]
+
+        for cv in c.versions.all():
+            self.assertEqual(list(cv.tags.all()), [t])
+
+
+    def test_suite(self):
+        """Cases are added to the given suite."""
+        s = self.F.SuiteFactory.create(product=self.product)
+
+        c = self.import_cases([self.data()], suite=s)[0]
+
+        self.assertEqual(list(c.suites.all()), [s])
+
+
+    def test_search_index(self):
+        """New versions are indexed for search."""
+        c = self.import_cases([self.data()])[0]
+
+        self.assertEqual(
+            set(self.model.SearchTerm.matching(u"do works")),
+            set(cv.id for cv in c.versions.all()),
+            )
+
+
+    def test_progress(self):
+        """Progress callback is called with the count of imported cases."""
+        progress = Mock()
+
+        with patch("cc.model.library.importer.BATCH_SIZE", 2):
+            self.import_cases([self.data()] * 3, progress=progress)
+
+        self.assertEqual(
+            [args for args, kwargs in progress.call_args_list], [(2,), (3,)])
+
+
+    def test_batches(self):
+        """Cases in several batches are all imported."""
+        with patch("cc.model.library.importer.BATCH_SIZE", 2):
+            cases = self.import_cases([self.data()] * 3)
+
+        self.assertEqual(len(set(c.id for c in cases)), 3)
+        self.assertEqual(
+            self.model.CaseVersion.objects.filter(
+                case__in=cases, latest=True).count(),
+            3,
+            )
+
+
+    def test_constant_queries(self):
+        """Number of queries doesn't depend on number of cases or steps."""
+        t = self.F.TagFactory.create()
+        s = self.F.SuiteFactory.create(product=self.product)
+
+        # product version environments (1); per batch, max ID, cases, their
+        # IDs, suite cases, versions, their IDs, environments, tags, and
+        # steps (9); latest versions (2); search index (4)
+        with self.assertNumQueries(16):
+            self.import_cases(
+                [self.data(steps=3)] * 5, tags=[t.id], suite=s)
+
+
+
+class RunImportTest(case.DBTestCase):
+    """Tests for run_import."""
+    def run_import(self, caseimport, **kwargs):
+        """Run ``caseimport``."""
+        from cc.model.library.importer import run_import
+        return run_import(caseimport, **kwargs)
+
+
+    def reload(self, caseimport):
+        """Return fresh copy of ``caseimport`` from the database."""
+        return self.model.CaseImport.objects.get(pk=caseimport.pk)
+
+
+    def text(self, *names):
+        """Return bulk text for test cases with given names."""
+        return "".join(
+            "Test that {0}\nWhen I do\nThen it works\n".format(name)
+            for name in names
+            )
+
+
+    def names(self, caseimport):
+        """Return sorted names of versions in product of ``caseimport``."""
+        return sorted(
+            self.model.CaseVersion.objects.filter(
+                case__product=caseimport.product).values_list(
+                "name", flat=True)
+            )
+
+
+    def test_text(self):
+        """Imports test cases from a file in the bulk text format."""
+        ci = self.F.CaseImportFactory.create(
+            content=self.text("one", "two"), status="active")
+
+        self.run_import(ci)
+
+        ci = self.reload(ci)
+        self.assertEqual(self.names(ci), ["Test that one", "Test that two"])
+        self.assertEqual(ci.records, 2)
+        self.assertEqual(ci.imported, 2)
+        self.assertEqual(ci.error_list, [])
+        self.assertIsNotNone(ci.completed_on)
+        cv = self.model.CaseVersion.objects.all()[0]
+        self.assertEqual(cv.status, "active")
+        self.assertEqual(cv.steps.get().instruction, "When I do")
+        self.assertTrue(cv.latest)
+
+
+    def test_later_versions_tags_suite(self):
+        """Imported cases get later versions, tags and suite."""
+        ci = self.F.CaseImportFactory.create(
+            content=self.text("one"), and_later_versions=True)
+        pv2 = self.F.ProductVersionFactory.create(
+            product=ci.product, version="2.0")
+        t = self.F.TagFactory.create()
+        s = self.F.SuiteFactory.create(product=ci.product)
+        ci.tags = "[{0}]".format(t.id)
+        ci.suite = s
+        ci.save()
+
+        self.run_import(ci)
+
+        c = self.model.Case.objects.get(product=ci.product)
+        self.assertEqual(
+            [cv.productversion for cv in c.versions.all()],
+            [ci.productversion, pv2],
+            )
+        self.assertEqual(list(c.versions.all()[0].tags.all()), [t])
+        self.assertEqual(list(c.suites.all()), [s])
+
+
+    def test_csv(self):
+        """Imports test cases from a CSV file."""
+        ci = self.F.CaseImportFactory.create(
+            format="csv",
+            content="name,instruction\nTest that one,Do\nTest that two,Do\n")
+
+        self.run_import(ci)
+
+        self.assertEqual(
+            self.names(ci), ["Test that one", "Test that two"])
+
+
+    def test_jsonl(self):
+        """Imports test cases from a JSON Lines file."""
+        ci = self.F.CaseImportFactory.create(
+            format="jsonl",
+            content=(
+                '{"name": "Test that one", "steps": [{"instruction": "Do"}]}'
+                ))
+
+        self.run_import(ci)
+
+        self.assertEqual(self.names(ci), ["Test that one"])
+
+
+    def test_errors(self):
+        """Invalid records are skipped and reported by line number."""
+        ci = self.F.CaseImportFactory.create(
+            format="jsonl",
+            content="\n".join(
+                [
+                    '{"name": "Test that one", "steps": []}',
+                    '{"name": "%s", "steps": [{"instruction": "Do"}]}' % (
+                        "x" * 201),
+                    '{"name": "Test that two", "steps": '
+                    '[{"instruction": "Do"}]}',
+                    ]
+                ))
+
+        self.run_import(ci)
+
+        ci = self.reload(ci)
+        self.assertEqual(self.names(ci), ["Test that two"])
+        self.assertEqual(ci.records, 3)
+        self.assertEqual(ci.imported, 1)
+        self.assertEqual(ci.error_count, 2)
+        self.assertEqual(
+            ci.error_list,
+            [
+                (1, "Expected a list of steps."),
+                (2, "Test case name is longer than 200 characters."),
+                ],
+            )
+
+
+    def test_max_errors(self):
+        """Errors beyond the maximum are counted but not recorded."""
+        ci = self.F.CaseImportFactory.create(
+            format="jsonl", content="[]\n[]\n[]\n")
+
+        with patch.object(self.model.CaseImport, "MAX_ERRORS", 2):
+            self.run_import(ci)
+
+        ci = self.reload(ci)
+        self.assertEqual(ci.error_count, 3)
+        self.assertEqual([line for line, error in ci.error_list], [1, 2])
+
+
+    def test_resume(self):
+        """An interrupted import resumes after the last completed batch."""
+        ci = self.F.CaseImportFactory.create(
+            content=self.text("one", "two", "three"))
+        from cc.model.library import importer
+        import_batch = importer._import_batch
+        calls = []
+        def fail_second(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise ValueError("Oops.")
+            return import_batch(*args)
+
+        with patch("cc.model.library.importer.BATCH_SIZE", 2):
+            with patch(
+                    "cc.model.library.importer._import_batch", fail_second):
+                with self.assertRaises(ValueError):
+                    self.run_import(ci)
+
+            ci = self.reload(ci)
+            self.assertEqual(ci.records, 2)
+            self.assertEqual(ci.failure, "ValueError: Oops.")
+            self.assertIsNone(ci.completed_on)
+
+            progress = Mock()
+            self.run_import(ci, progress=progress)
+
+        ci = self.reload(ci)
+        self.assertEqual(
+            self.names(ci),
+            ["Test that one", "Test that three", "Test that two"],
+            )
+        self.assertEqual(ci.imported, 3)
+        self.assertEqual(ci.failure, "")
+        self.assertIsNotNone(ci.completed_on)
+        progress.assert_called_once_with(3)
+
+
+
+class RunImportConcurrencyTest(case.TransactionDBTestCase):
+    """Tests for overlapping runs of one import."""
+    def test_resumed_elsewhere(self):
+        """A batch already recorded by another run is not imported again."""
+        from cc.model.library.importer import run_import
+        ci = self.F.CaseImportFactory.create(
+            content="Test that one\nWhen I do\nThen it works\n")
+        stale = self.model.CaseImport.objects.get(pk=ci.pk)
+        run_import(ci)
+
+        with self.assertRaises(self.model.ConcurrencyError):
+            run_import(stale)
+
+        ci = self.model.CaseImport.objects.get(pk=ci.pk)
+        self.assertEqual(
+            list(
+                self.model.CaseVersion.objects.values_list("name", flat=True)),
+            ["Test that one"],
+            )
+        self.assertEqual(ci.records, 1)
+        self.assertEqual(ci.failure, "")
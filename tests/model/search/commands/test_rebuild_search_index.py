@@ -0,0 +1,64 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for management command to rebuild the search index.
+
+"""
+from cStringIO import StringIO
+
+from django.core.management import call_command
+
+from mock import patch
+
+from tests import case
+
+
+
+class RebuildSearchIndexTest(case.DBTestCase):
+    """Tests for rebuild_search_index management command."""
+    def call_command(self, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("rebuild_search_index", **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def test_rebuild(self):
+        """Rebuilds the index of all caseversions."""
+        cv = self.F.CaseVersionFactory.create(name=u"Foo")
+        self.model.SearchTerm.objects.all().delete()
+
+        output = self.call_command()
+
+        self.assertEqual(
+            list(
+                self.model.SearchTerm.objects.filter(
+                    caseversion=cv).values_list("field", "term")
+                ),
+            [(u"name", u"foo")],
+            )
+        self.assertIn("Indexed 1 caseversions.", output)
+
+
+    def test_quiet(self):
+        """No output with verbosity 0."""
+        self.F.CaseVersionFactory.create(name=u"Foo")
+
+        self.assertEqual(self.call_command(verbosity=0), "")
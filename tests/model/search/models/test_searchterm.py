@@ -0,0 +1,285 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for the search index of test case text.
+
+"""
+from tests import case
+
+
+
+class SearchTermTestCase(case.DBTestCase):
+    """Base class for search index tests."""
+    @property
+    def search(self):
+        """The module under test."""
+        from cc.model.search import models
+        return models
+
+
+    def terms(self, cv, field=None):
+        """Return sorted list of (field, term, frequency) indexed for ``cv``."""
+        qs = self.model.SearchTerm.objects.filter(caseversion=cv)
+        if field is not None:
+            qs = qs.filter(field=field)
+        return sorted(qs.values_list("field", "term", "frequency"))
+
+
+    def matching(self, text, fields=None):
+        """Return sorted IDs of caseversions matching ``text``."""
+        return sorted(self.model.SearchTerm.matching(text, fields))
+
+
+
+class TokenizeTest(SearchTermTestCase):
+    """Tests for tokenize."""
+    def test_words(self):
+        """Splits on non-word characters and lower-cases."""
+        self.assertEqual(
+            self.search.tokenize(u"Open the Foo-bar menu, twice."),
+            [u"open", u"the", u"foo", u"bar", u"menu", u"twice"],
+            )
+
+
+    def test_unicode(self):
+        """Non-ASCII letters are word characters."""
+        self.assertEqual(
+            self.search.tokenize(u"\xdcn\xefcode word"),
+            [u"\xfcn\xefcode", u"word"],
+            )
+
+
+    def test_empty(self):
+        """None or empty text has no words."""
+        self.assertEqual(self.search.tokenize(None), [])
+        self.assertEqual(self.search.tokenize(u""), [])
+
+
+    def test_truncate(self):
+        """Long words are truncated to the term length."""
+        self.assertEqual(
+            self.search.tokenize(u"a" * 60), [u"a" * self.search.TERM_LENGTH])
+
+
+
+class IndexTest(SearchTermTestCase):
+    """Tests for keeping the index current."""
+    def test_create(self):
+        """A new caseversion's name and description are indexed."""
+        cv = self.F.CaseVersionFactory.create(
+            name=u"Foo bar foo", description=u"Baz")
+
+        self.assertEqual(
+            self.terms(cv),
+            [
+                (u"description", u"baz", 1),
+                (u"name", u"bar", 1),
+                (u"name", u"foo", 2),
+                ],
+            )
+
+
+    def test_edit(self):
+        """A changed name replaces the old terms."""
+        cv = self.F.CaseVersionFactory.create(name=u"Foo")
+        cv.name = u"Bar"
+        cv.save()
+
+        self.assertEqual(self.terms(cv, "name"), [(u"name", u"bar", 1)])
+
+
+    def test_step(self):
+        """Step instructions and expected results are indexed."""
+        step = self.F.CaseStepFactory.create(
+            instruction=u"Click it", expected=u"It opens")
+
+        self.assertEqual(
+            self.terms(step.caseversion, "instruction"),
+            [(u"instruction", u"click", 1), (u"instruction", u"it", 1)],
+            )
+        self.assertEqual(
+            self.terms(step.caseversion, "expected"),
+            [(u"expected", u"it", 1), (u"expected", u"opens", 1)],
+            )
+
+
+    def test_step_frequency(self):
+        """Frequency sums over all steps of a caseversion."""
+        step = self.F.CaseStepFactory.create(instruction=u"Click")
+        self.F.CaseStepFactory.create(
+            caseversion=step.caseversion, instruction=u"Click", number=2)
+
+        self.assertEqual(
+            self.terms(step.caseversion, "instruction"),
+            [(u"instruction", u"click", 2)],
+            )
+
+
+    def test_step_delete(self):
+        """A deleted step's terms are removed."""
+        step = self.F.CaseStepFactory.create(instruction=u"Click")
+        step.delete()
+
+        self.assertEqual(self.terms(step.caseversion, "instruction"), [])
+
+
+    def test_step_undelete(self):
+        """An undeleted step's terms are restored."""
+        step = self.F.CaseStepFactory.create(instruction=u"Click")
+        step.delete()
+        step.undelete()
+
+        self.assertEqual(
+            self.terms(step.caseversion, "instruction"),
+            [(u"instruction", u"click", 1)],
+            )
+
+
+    def test_clone(self):
+        """A cloned caseversion, with its steps, is indexed."""
+        step = self.F.CaseStepFactory.create(
+            caseversion__name=u"Foo", instruction=u"Click")
+        pv = self.F.ProductVersionFactory.create(
+            product=step.caseversion.productversion.product, version="2.0")
+
+        new = step.caseversion.clone(overrides={"productversion": pv})
+
+        self.assertEqual(
+            self.terms(new),
+            [
+                (u"instruction", u"click", 1),
+                (u"name", u"cloned", 1),
+                (u"name", u"foo", 1),
+                ],
+            )
+
+
+    def test_reindex(self):
+        """Reindexing rebuilds drifted terms."""
+        cv = self.F.CaseVersionFactory.create(name=u"Foo")
+        self.model.SearchTerm.objects.all().delete()
+
+        self.model.SearchTerm.reindex([cv.id, cv.id + 100])
+
+        self.assertEqual(self.terms(cv), [(u"name", u"foo", 1)])
+
+
+    def test_reindex_queries(self):
+        """Reindexing takes a fixed number of queries per batch."""
+        cvs = [
+            self.F.CaseStepFactory.create(instruction=u"Click").caseversion
+            for i in range(3)
+            ]
+
+        with self.assertNumQueries(4):
+            self.model.SearchTerm.reindex([cv.id for cv in cvs])
+
+
+
+class MatchingTest(SearchTermTestCase):
+    """Tests for SearchTerm.matching and SearchTerm.search."""
+    def test_prefix(self):
+        """Words match as prefixes of indexed words, case-insensitively."""
+        cv = self.F.CaseVersionFactory.create(name=u"Opening menus")
+        self.F.CaseVersionFactory.create(name=u"Closing menus")
+
+        self.assertEqual(self.matching(u"OPEN"), [cv.id])
+
+
+    def test_all_words(self):
+        """All words must match, in any field."""
+        cv = self.F.CaseStepFactory.create(
+            caseversion__name=u"Menu", instruction=u"Open").caseversion
+        self.F.CaseVersionFactory.create(name=u"Menu")
+
+        self.assertEqual(self.matching(u"open menu"), [cv.id])
+
+
+    def test_word_matching_many_terms(self):
+        """A word matching several terms doesn't stand in for other words."""
+        self.F.CaseStepFactory.create(
+            caseversion__name=u"Open opened", instruction=u"Opening")
+
+        self.assertEqual(self.matching(u"open close"), [])
+
+
+    def test_prefix_of_other_word(self):
+        """A word that is a prefix of another matches what the other does."""
+        cv = self.F.CaseVersionFactory.create(name=u"Menus")
+        self.F.CaseVersionFactory.create(name=u"Mention")
+
+        self.assertEqual(self.matching(u"men menus"), [cv.id])
+
+
+    def test_one_subquery(self):
+        """Filtering by matching caseversions takes one query."""
+        cv = self.F.CaseVersionFactory.create(name=u"Open menu")
+        self.F.CaseVersionFactory.create(name=u"Open window")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                list(
+                    self.model.CaseVersion.objects.filter(
+                        pk__in=self.model.SearchTerm.matching(u"open menu"))
+                    ),
+                [cv],
+                )
+
+
+    def test_fields(self):
+        """Only given fields are searched."""
+        cv = self.F.CaseStepFactory.create(
+            caseversion__name=u"Foo", instruction=u"Bar").caseversion
+
+        self.assertEqual(self.matching(u"bar", ["instruction"]), [cv.id])
+        self.assertEqual(self.matching(u"bar", ["name"]), [])
+
+
+    def test_no_words(self):
+        """Text with no words matches nothing in particular."""
+        self.assertIs(self.model.SearchTerm.matching(u" !? "), None)
+
+
+    def test_search_ranked(self):
+        """Search results are ordered by frequency of matching words."""
+        cv1 = self.F.CaseVersionFactory.create(name=u"Menu")
+        cv2 = self.F.CaseVersionFactory.create(name=u"Menu menu")
+        self.F.CaseVersionFactory.create(name=u"Other")
+
+        results = list(self.model.SearchTerm.search(u"menu"))
+
+        self.assertEqual(results, [cv2, cv1])
+        self.assertEqual([cv.score for cv in results], [2, 1])
+
+
+    def test_search_fields(self):
+        """Search score only counts the given fields."""
+        cv = self.F.CaseStepFactory.create(
+            caseversion__name=u"Menu", instruction=u"Menu menu").caseversion
+
+        results = list(self.model.SearchTerm.search(u"menu", ["name"]))
+
+        self.assertEqual(results, [cv])
+        self.assertEqual(results[0].score, 1)
+
+
+    def test_search_no_words(self):
+        """Search for text with no words returns nothing."""
+        self.F.CaseVersionFactory.create(name=u"Menu")
+
+        self.assertEqual(list(self.model.SearchTerm.search(u"!")), [])
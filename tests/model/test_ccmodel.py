@@ -186,6 +186,7 @@ class SaveTest(CCModelMockNowTestCase):
     def test_modified_by_none(self):
         """If ``user`` is not given to save(), modified_by is set to None."""
         p = self.model.Product.objects.create(name="Foo", user=self.user)
+        p.name = "Bar"
         p.save()
 
         self.assertEqual(p.modified_by, None)
@@ -194,6 +195,7 @@ class SaveTest(CCModelMockNowTestCase):
     def test_modified_by(self):
         """If ``user`` is given to save(), modified_by is set."""
         p = self.model.Product.objects.create(name="Foo")
+        p.name = "Bar"
         p.save(user=self.user)
 
         self.assertEqual(p.modified_by, self.user)
@@ -204,6 +206,7 @@ class SaveTest(CCModelMockNowTestCase):
         p = self.model.Product.objects.create(name="Foo")
         new_now = datetime.datetime(2012, 1, 1, 12, 0)
         self.mock_utcnow.return_value = new_now
+        p.name = "Bar"
         p.save()
 
         self.assertEqual(p.modified_on, new_now)
@@ -361,6 +364,40 @@ class HardDeleteTest(case.DBTestCase):
 
 
 
+class DeletableTest(case.DBTestCase):
+    """Tests for deletion protection of instances in use."""
+    def test_deletable(self):
+        """By default nothing is in use, and checking needs no query."""
+        p = self.F.ProductFactory.create()
+
+        with self.assertNumQueries(0):
+            self.assertTrue(p.deletable)
+
+
+    def test_load_deletable(self):
+        """By default, load_deletable needs no query."""
+        products = [self.F.ProductFactory.create() for i in range(2)]
+
+        with self.assertNumQueries(0):
+            self.model.Product.load_deletable(products)
+
+        self.assertTrue(all(p.deletable for p in products))
+
+
+    def test_permanent(self):
+        """Instances in use can't be hard-deleted either."""
+        el = self.F.ElementFactory.create()
+        self.F.EnvironmentFactory.create().elements.add(el)
+
+        with self.assertRaises(self.model.ProtectedError):
+            el.delete(permanent=True)
+        with self.assertRaises(self.model.ProtectedError):
+            self.model.Element.objects.all().delete(permanent=True)
+
+        self.assertEqual(self.model.Element.objects.count(), 1)
+
+
+
 class CascadeDeleteTest(CCModelTestCase):
     """Tests for cascading soft-delete."""
     def test_queryset_deleted_by_none(self):
@@ -450,6 +487,71 @@ class CascadeDeleteTest(CCModelTestCase):
             self.refresh(s).deleted_on, self.refresh(p).deleted_on)
 
 
+    def test_deep_cascade(self):
+        """Cascade reaches all dependents, however indirectly related."""
+        sr = self.F.StepResultFactory.create()
+        p = sr.result.runcaseversion.run.productversion.product
+
+        p.delete()
+
+        self.assertEqual(self.model.StepResult.objects.count(), 0)
+        self.assertEqual(self.model.Result.objects.count(), 0)
+
+
+    def test_returns_counts(self):
+        """delete() returns counts of deleted objects by model."""
+        p = self.F.ProductFactory.create()
+        self.F.SuiteFactory.create(product=p)
+        self.F.SuiteFactory.create(product=p)
+
+        counts = p.delete()
+
+        self.assertEqual(counts[self.model.Product], 1)
+        self.assertEqual(counts[self.model.Suite], 2)
+        self.assertEqual(counts[self.model.Case], 0)
+
+
+    def test_dry_run(self):
+        """delete(dry_run=True) counts objects that would be deleted."""
+        p = self.F.ProductFactory.create()
+        self.F.SuiteFactory.create(product=p)
+        self.F.SuiteFactory.create(product=p).delete()
+
+        counts = p.delete(dry_run=True)
+
+        self.assertEqual(counts[self.model.Product], 1)
+        self.assertEqual(counts[self.model.Suite], 1)
+        self.assertEqual(self.refresh(p).deleted_on, None)
+        self.assertEqual(self.model.Suite.objects.count(), 1)
+
+
+    def test_queryset_dry_run(self):
+        """Queryset delete(dry_run=True) counts objects that would be deleted."""
+        self.F.SuiteFactory.create()
+        self.F.SuiteFactory.create()
+
+        counts = self.model.Product.objects.all().delete(dry_run=True)
+
+        self.assertEqual(counts[self.model.Product], 2)
+        self.assertEqual(counts[self.model.Suite], 2)
+        self.assertEqual(self.model.Product.objects.count(), 2)
+
+
+    def test_constant_queries(self):
+        """Number of queries doesn't depend on number of dependents."""
+        p = self.F.ProductFactory.create()
+        for i in range(3):
+            self.F.StepResultFactory.create(
+                result__runcaseversion__run__productversion__product=p)
+
+        # an update per model in the cascade (14), plus fetching IDs of
+        # deleted runcaseversions, results and step results (3), and
+        # refreshing result stats and bug references for them (19), plus
+        # fetching caseversions of deleted steps to reindex for search (1)
+        with self.assertNumQueries(37):
+            p.delete()
+
+
 
 class UndeleteMixin(object):
     """Utility assertions mixin for undelete tests."""
@@ -527,6 +629,30 @@ class CascadeUndeleteTest(UndeleteMixin, CCModelTestCase):
         self.assertIsNot(self.refresh(s).deleted_on, None)
 
 
+    def test_returns_counts(self):
+        """undelete() returns counts of undeleted objects by model."""
+        p = self.F.ProductFactory.create()
+        self.F.SuiteFactory.create(product=p)
+        p.delete()
+
+        counts = self.refresh(p).undelete()
+
+        self.assertEqual(counts[self.model.Product], 1)
+        self.assertEqual(counts[self.model.Suite], 1)
+
+
+    def test_dry_run(self):
+        """undelete(dry_run=True) counts objects that would be undeleted."""
+        p = self.F.ProductFactory.create()
+        s = self.F.SuiteFactory.create(product=p)
+        p.delete()
+
+        counts = self.refresh(p).undelete(dry_run=True)
+
+        self.assertEqual(counts[self.model.Suite], 1)
+        self.assertIsNot(self.refresh(s).deleted_on, None)
+
+
 
 class CloneTest(UndeleteMixin, CCModelTestCase):
     """Tests for cloning."""
@@ -587,6 +713,82 @@ class CloneTest(UndeleteMixin, CCModelTestCase):
         self.assertEqual(new.modified_by, u2)
 
 
+    @patch("cc.model.ccmodel.datetime")
+    def test_cascade_created(self, mock_dt):
+        """Cascade-cloned objects get cloning timestamp and user."""
+        mock_dt.datetime.utcnow.return_value = datetime.datetime(
+            2012, 1, 30)
+        p = self.F.ProfileFactory.create()
+        self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows"]}, profile=p)
+
+        cloned_on = datetime.datetime(2012, 1, 31)
+        mock_dt.datetime.utcnow.return_value = cloned_on
+        new = p.clone(user=self.user)
+
+        env = new.environments.get()
+        self.assertEqual(env.created_on, cloned_on)
+        self.assertEqual(env.created_by, self.user)
+
+
+    def test_cascade_filter(self):
+        """Cascade can be a dict of filter callables for related objects."""
+        p = self.F.ProfileFactory.create()
+        envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows", "Linux"]}, profile=p)
+
+        new = p.clone(
+            cascade={"environments": lambda qs: qs.filter(pk=envs[0].pk)})
+
+        self.assertEqual(
+            [e.elements.get().name for e in new.environments.all()],
+            [envs[0].elements.get().name]
+            )
+
+
+    def test_cascade_skips_deleted(self):
+        """Deleted related objects are not cascade-cloned."""
+        p = self.F.ProfileFactory.create()
+        envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows", "Linux"]}, profile=p)
+        envs[0].delete()
+
+        new = p.clone()
+
+        self.assertEqual(
+            new.environments.get().elements.get(), envs[1].elements.get())
+
+
+    def test_cascade_nested(self):
+        """Cascade-cloned objects are cascade-cloned in turn."""
+        cs = self.F.CaseStepFactory.create(instruction="Do it")
+
+        new = cs.caseversion.case.clone()
+
+        cv = new.versions.get()
+        self.assertEqual(cv.steps.get().instruction, "Do it")
+        self.assertTrue(cv.latest)
+
+
+    def test_cascade_constant_queries(self):
+        """Cascade-cloning takes the same number of queries for many objects."""
+        p = self.F.ProfileFactory.create()
+        self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows", "Linux", "OS X"], "Browser": ["Firefox", "IE"]},
+            profile=p)
+
+        # profile insert; environments fetch, insert and read back;
+        # elements fetch, through rows fetch, clone rows fetch and insert
+        with self.assertNumQueries(8):
+            new = p.clone()
+
+        self.assertEqual(new.environments.count(), 6)
+        self.assertEqual(
+            set(frozenset(e.elements.all()) for e in new.environments.all()),
+            set(frozenset(e.elements.all()) for e in p.environments.all())
+            )
+
+
 
 class CCManagerTest(CCModelTestCase):
     """Tests for CCManager."""
@@ -640,6 +842,129 @@ class TeamModelTest(case.DBTestCase):
 
 
 
+    def assertTeam(self, obj, users):
+        """Assert stored effective team of ``obj`` is ``users``."""
+        self.assertEqual(
+            set(obj.__class__.objects.get(pk=obj.pk).effective_team.all()),
+            set(users),
+            )
+
+
+    def test_new_own_team(self):
+        """New object's effective team is its own team."""
+        u = self.F.UserFactory.create()
+        p = self.F.ProductFactory.create(team=[u])
+
+        self.assertTeam(p, [u])
+
+
+    def test_new_inherits_team(self):
+        """New object without own team gets its parent's effective team."""
+        u = self.F.UserFactory.create()
+        pv = self.F.ProductVersionFactory.create(
+            product=self.F.ProductFactory.create(team=[u]))
+        r = self.F.RunFactory.create(productversion=pv)
+
+        self.assertTeam(pv, [u])
+        self.assertTeam(r, [u])
+
+
+    def test_own_team_change_cascades(self):
+        """Changes to own team cascade to descendants that inherit it."""
+        u1 = self.F.UserFactory.create()
+        u2 = self.F.UserFactory.create()
+        r = self.F.RunFactory.create()
+        other = self.F.RunFactory.create(
+            productversion=r.productversion, team=[u2])
+        p = r.productversion.product
+
+        p.own_team.add(u1, u2)
+        self.assertTeam(r, [u1, u2])
+        p.own_team.remove(u2)
+        self.assertTeam(r, [u1])
+        p.own_team.clear()
+        self.assertTeam(r, [])
+        self.assertTeam(other, [u2])
+
+
+    def test_reverse_own_team_change(self):
+        """Changes to own teams from the user side are also tracked."""
+        u = self.F.UserFactory.create()
+        r = self.F.RunFactory.create()
+        p = r.productversion.product
+
+        u.product_set.add(p)
+        self.assertTeam(r, [u])
+        u.product_set.clear()
+        self.assertTeam(r, [])
+
+
+    def test_has_team_change(self):
+        """Saving a changed ``has_team`` flag updates effective team."""
+        u1 = self.F.UserFactory.create()
+        u2 = self.F.UserFactory.create()
+        pv = self.F.ProductVersionFactory.create(
+            product=self.F.ProductFactory.create(team=[u1]), team=[u2])
+        r = self.F.RunFactory.create(productversion=pv)
+        self.assertTeam(r, [u2])
+
+        pv.has_team = False
+        pv.save()
+
+        self.assertTeam(pv, [u1])
+        self.assertTeam(r, [u1])
+
+
+    def test_parent_change(self):
+        """Saving a new parent updates effective team."""
+        u = self.F.UserFactory.create()
+        r = self.F.RunFactory.create()
+        r.productversion = self.F.ProductVersionFactory.create(team=[u])
+        r.save()
+
+        self.assertTeam(r, [u])
+
+
+    def test_add_to_team(self):
+        """add_to_team switches effective team to own team."""
+        u1 = self.F.UserFactory.create()
+        u2 = self.F.UserFactory.create()
+        pv = self.F.ProductVersionFactory.create(
+            product=self.F.ProductFactory.create(team=[u1]))
+
+        pv.add_to_team(u2)
+
+        self.assertTeam(pv, [u2])
+
+
+    def test_query_by_member(self):
+        """Objects can be filtered by effective team membership."""
+        u = self.F.UserFactory.create()
+        pv = self.F.ProductVersionFactory.create(team=[u])
+        r1 = self.F.RunFactory.create(productversion=pv)
+        r2 = self.F.RunFactory.create(productversion=pv)
+        self.F.RunFactory.create()
+
+        with self.assertNumQueries(1):
+            runs = set(self.model.Run.objects.filter(effective_team=u))
+
+        self.assertEqual(runs, set([r1, r2]))
+
+
+    def test_refresh_no_cascade(self):
+        """refresh_team with cascade=False leaves descendants alone."""
+        u = self.F.UserFactory.create()
+        r = self.F.RunFactory.create()
+        p = r.productversion.product
+        self.model.Product.own_team.through.objects.create(product=p, user=u)
+
+        self.model.Product.refresh_team([p.pk], cascade=False)
+
+        self.assertTeam(p, [u])
+        self.assertTeam(r, [])
+
+
+
 class DraftStatusModelTest(case.DBTestCase):
     """
     Tests for DraftStatusModel base class.
@@ -734,6 +1059,72 @@ class NotDeletedCountTest(case.DBTestCase):
 
 
 
+class NotDeletedAggregateTest(case.DBTestCase):
+    """Tests for NotDeletedMax, NotDeletedMin and NotDeletedExists."""
+    @property
+    def ccmodel(self):
+        """The module under test."""
+        from cc.model import ccmodel
+        return ccmodel
+
+
+    def create_versions(self):
+        """Create product with three versions, the latest one deleted."""
+        p = self.F.ProductFactory.create()
+        for i, day in enumerate([10, 11, 12]):
+            pv = self.F.ProductVersionFactory.create(
+                product=p,
+                version=str(i),
+                created_on=datetime.datetime(2012, 1, day),
+                )
+        pv.delete()
+        return p
+
+
+    def test_max(self):
+        """Max is over not-deleted objects only."""
+        self.create_versions()
+
+        p = self.model.Product.objects.annotate(
+            latest=self.ccmodel.NotDeletedMax("versions__created_on")).get()
+
+        self.assertEqual(p.latest, datetime.datetime(2012, 1, 11))
+
+
+    def test_min(self):
+        """Min is over not-deleted objects only."""
+        p = self.create_versions()
+        self.model.ProductVersion.objects.get(version="0").delete()
+
+        p = self.model.Product.objects.annotate(
+            earliest=self.ccmodel.NotDeletedMin("versions__created_on")).get()
+
+        self.assertEqual(p.earliest, datetime.datetime(2012, 1, 11))
+
+
+    def test_exists(self):
+        """Exists is 1 if there are any not-deleted related objects."""
+        self.create_versions()
+
+        p = self.model.Product.objects.annotate(
+            has_versions=self.ccmodel.NotDeletedExists("versions")).get()
+
+        self.assertEqual(p.has_versions, 1)
+
+
+    def test_not_exists(self):
+        """Exists is 0 if there are only deleted related objects."""
+        pv = self.F.ProductVersionFactory.create()
+        pv.delete()
+        self.F.ProductFactory.create()
+
+        products = self.model.Product.objects.annotate(
+            has_versions=self.ccmodel.NotDeletedExists("versions"))
+
+        self.assertEqual([p.has_versions for p in products], [0, 0])
+
+
+
 class OptimisticLockingTest(case.DBTestCase):
     """Test optimistic locking to avoid silent overwrite on concurrent edits."""
     def test_concurrency_error(self):
@@ -760,3 +1151,273 @@ class OptimisticLockingTest(case.DBTestCase):
 
         with self.assertRaises(self.model.ConcurrencyError):
             p.save()
+
+
+
+class ChangedFieldsTest(CCModelTestCase):
+    """Tests for saving only changed fields."""
+    def test_writes_changed_only(self):
+        """save() doesn't overwrite fields that weren't changed."""
+        p = self.F.ProductFactory.create(name="Foo", description="old")
+        # sneak a change past version tracking
+        self.model.Product._base_manager.filter(pk=p.pk).update(
+            description="new")
+
+        p.name = "Bar"
+        p.save()
+
+        p = self.refresh(p)
+        self.assertEqual(p.name, "Bar")
+        self.assertEqual(p.description, "new")
+
+
+    def test_no_changes(self):
+        """save() with no changes does nothing."""
+        p = self.F.ProductFactory.create()
+        p = self.refresh(p)
+
+        with self.assertNumQueries(0):
+            p.save(user=self.user)
+
+        self.assertEqual(self.refresh(p).cc_version, p.cc_version)
+        self.assertEqual(self.refresh(p).modified_by, None)
+
+
+    def test_changes_tracked_since_save(self):
+        """A second save() without further changes does nothing."""
+        p = self.F.ProductFactory.create()
+        p.name = "Bar"
+        p.save()
+
+        with self.assertNumQueries(0):
+            p.save()
+
+
+    def test_update_fields(self):
+        """save() writes only fields named in update_fields."""
+        p = self.F.ProductFactory.create(name="Foo", description="old")
+
+        p.name = "Bar"
+        p.description = "new"
+        p.save(update_fields=["description"], user=self.user)
+
+        p2 = self.refresh(p)
+        self.assertEqual(p2.name, "Foo")
+        self.assertEqual(p2.description, "new")
+        self.assertEqual(p2.modified_by, self.user)
+        self.assertEqual(p2.cc_version, p.cc_version)
+
+        # name is still unsaved
+        p.save()
+
+        self.assertEqual(self.refresh(p).name, "Bar")
+
+
+    def test_update_fields_unchanged(self):
+        """Fields named in update_fields are written even if unchanged."""
+        p = self.F.ProductFactory.create()
+        version = p.cc_version
+
+        p.save(update_fields=["name"])
+
+        self.assertEqual(self.refresh(p).cc_version, version + 1)
+
+
+    def test_constructed_instance(self):
+        """save() of a caller-constructed instance with a PK writes fields."""
+        p = self.F.ProductFactory.create(name="orig")
+
+        self.model.Product(
+            id=p.id, name="overwritten", cc_version=p.cc_version).save()
+
+        self.assertEqual(self.refresh(p).name, "overwritten")
+
+
+    def test_deferred(self):
+        """Deferred fields aren't fetched or written."""
+        p = self.F.ProductFactory.create(name="Foo", description="old")
+        p = self.model.Product.objects.only("name", "cc_version").get()
+
+        p.name = "Bar"
+        with self.assertNumQueries(1):
+            p.save()
+
+        p = self.refresh(p)
+        self.assertEqual(p.name, "Bar")
+        self.assertEqual(p.description, "old")
+
+
+    def test_signals(self):
+        """Updates send pre/post_save with names of written fields."""
+        from django.db.models.signals import pre_save, post_save
+        p = self.F.ProductFactory.create(name="Foo")
+        received = []
+        def receiver(signal, sender, instance, update_fields, **kwargs):
+            received.append((signal, sender, instance, update_fields))
+        pre_save.connect(receiver)
+        post_save.connect(receiver)
+        self.addCleanup(pre_save.disconnect, receiver)
+        self.addCleanup(post_save.disconnect, receiver)
+
+        p.name = "Bar"
+        p.save()
+
+        fields = frozenset(["name", "cc_version", "modified_on", "modified_by"])
+        self.assertEqual(
+            received,
+            [
+                (pre_save, self.model.Product, p, fields),
+                (post_save, self.model.Product, p, fields),
+                ]
+            )
+
+
+
+class BulkSaveTest(CCModelMockNowTestCase):
+    """Tests for saving many instances with ``bulk_save``."""
+    def test_saves_changed(self):
+        """Saves changed fields of all instances, tracking modification."""
+        p1 = self.F.ProductFactory.create(name="one")
+        p2 = self.F.ProductFactory.create(name="two")
+        p1.name = "uno"
+        p2.name = "dos"
+        new_now = datetime.datetime(2012, 1, 1, 12, 0)
+        self.mock_utcnow.return_value = new_now
+
+        count = self.model.Product.objects.bulk_save([p1, p2], user=self.user)
+
+        self.assertEqual(count, 2)
+        for p, name in [(p1, "uno"), (p2, "dos")]:
+            p = self.refresh(p)
+            self.assertEqual(p.name, name)
+            self.assertEqual(p.modified_by, self.user)
+            self.assertEqual(p.modified_on, new_now)
+            self.assertEqual(p.cc_version, 1)
+
+
+    def test_updates_instances(self):
+        """Saved instances get new version and are no longer changed."""
+        p = self.F.ProductFactory.create()
+        p.name = "new"
+
+        self.model.Product.objects.bulk_save([p])
+
+        self.assertEqual(p.cc_version, 1)
+        with self.assertNumQueries(0):
+            p.save()
+
+
+    def test_unchanged_skipped(self):
+        """Unchanged instances aren't saved."""
+        p1 = self.F.ProductFactory.create()
+        p2 = self.F.ProductFactory.create()
+        p1.name = "new"
+
+        count = self.model.Product.objects.bulk_save([p1, p2])
+
+        self.assertEqual(count, 1)
+        self.assertEqual(self.refresh(p2).cc_version, 0)
+
+
+    def test_notrack(self):
+        """With notrack=True, modification is not tracked."""
+        p = self.F.ProductFactory.create(user=self.user)
+        p.name = "new"
+
+        self.model.Product.objects.bulk_save([p], notrack=True)
+
+        self.assertEqual(self.refresh(p).modified_by, self.user)
+
+
+    def test_single_statement(self):
+        """Many instances are saved with one query."""
+        products = [self.F.ProductFactory.create() for i in range(5)]
+        for p in products:
+            p.name = "new"
+
+        with self.assertNumQueries(1):
+            self.model.Product.objects.bulk_save(products)
+
+
+
+class BulkSaveConflictTest(case.TransactionDBTestCase):
+    """Tests for ``bulk_save`` conflicts, which roll back the transaction."""
+    def tearDown(self):
+        """Remove committed products, so later tests don't see them."""
+        self.model.Product.everything.all().delete(permanent=True)
+
+
+    def test_conflict(self):
+        """If any instance is out of date, nothing is saved."""
+        p1 = self.F.ProductFactory.create(name="one")
+        p2 = self.F.ProductFactory.create(name="two")
+        p3 = self.F.ProductFactory.create(name="three")
+        self.model.Product.objects.filter(pk=p2.pk).update(name="other")
+        for p in [p1, p2, p3]:
+            p.name = "new"
+
+        with self.assertRaises(self.model.ConcurrencyError) as cm:
+            self.model.Product.objects.bulk_save([p1, p2, p3])
+
+        self.assertEqual(cm.exception.conflicts, [p2])
+        self.assertEqual(
+            sorted(self.model.Product.objects.values_list("name", flat=True)),
+            ["one", "other", "three"]
+            )
+
+
+    def test_outer_transaction(self):
+        """Inside a managed transaction, doesn't commit the caller's work."""
+        from django.db import transaction
+        p = self.F.ProductFactory.create(name="one")
+        p.name = "new"
+
+        with self.assertRaises(ValueError):
+            with transaction.commit_on_success():
+                self.F.ProductFactory.create(name="two")
+                self.model.Product.objects.bulk_save([p])
+                raise ValueError()
+
+        self.assertEqual(
+            list(self.model.Product.objects.values_list("name", flat=True)),
+            ["one"]
+            )
+
+
+
+class PreloadTest(case.DBTestCase):
+    """Tests for queryset preload functions."""
+    def test_called_with_fetched(self):
+        """Preload functions are called once with list of fetched objects."""
+        self.F.ProductFactory.create(name="One")
+        self.F.ProductFactory.create(name="Two")
+        calls = []
+
+        products = list(
+            self.model.Product.objects.order_by("name").preload(calls.append))
+
+        self.assertEqual(calls, [products])
+        self.assertEqual([p.name for p in products], ["One", "Two"])
+
+
+    def test_preserved_by_clone(self):
+        """Preload functions carry over to filtered querysets."""
+        self.F.ProductFactory.create(name="One")
+        self.F.ProductFactory.create(name="Two")
+        calls = []
+
+        list(
+            self.model.Product.objects.preload(calls.append).filter(
+                name="Two"))
+
+        self.assertEqual([[p.name for p in c] for c in calls], [["Two"]])
+
+
+    def test_not_called_for_values(self):
+        """Preload functions are not called for values querysets."""
+        self.F.ProductFactory.create(name="One")
+        calls = []
+
+        list(self.model.Product.objects.preload(calls.append).values("name"))
+
+        self.assertEqual(calls, [])
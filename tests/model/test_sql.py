@@ -0,0 +1,213 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for set-based SQL helpers.
+
+"""
+from django.utils.unittest import TestCase
+
+from tests import case
+
+
+
+class ChunkedTest(TestCase):
+    """Tests for ``chunked`` function."""
+    @property
+    def func(self):
+        """The function under test."""
+        from cc.model.sql import chunked
+        return chunked
+
+
+    def test_chunks(self):
+        """Splits iterable into lists of given size, last one shorter."""
+        self.assertEqual(
+            list(self.func(xrange(5), 2)), [[0, 1], [2, 3], [4]])
+
+
+    def test_empty(self):
+        """Empty iterable yields no chunks."""
+        self.assertEqual(list(self.func([], 2)), [])
+
+
+
+class BulkInsertTest(case.DBTestCase):
+    """Tests for ``bulk_insert`` function."""
+    @property
+    def func(self):
+        """The function under test."""
+        from cc.model.sql import bulk_insert
+        return bulk_insert
+
+
+    def test_inserts(self):
+        """Inserts all given instances."""
+        p = self.F.ProductFactory.create()
+
+        count = self.func(
+            [self.model.Suite(product=p, name=str(i)) for i in range(3)])
+
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            sorted(p.suites.values_list("name", flat=True)),
+            ["0", "1", "2"])
+
+
+    def test_batches(self):
+        """Uses one INSERT statement per batch."""
+        p = self.F.ProductFactory.create()
+
+        with self.assertNumQueries(3):
+            self.func(
+                [self.model.Suite(product=p, name=str(i)) for i in range(5)],
+                batch_size=2)
+
+        self.assertEqual(p.suites.count(), 5)
+
+
+    def test_empty(self):
+        """Inserting no instances does nothing."""
+        with self.assertNumQueries(0):
+            self.assertEqual(self.func([]), 0)
+
+
+    def test_defaults(self):
+        """Field defaults are saved."""
+        p = self.F.ProductFactory.create()
+
+        self.func([self.model.Suite(product=p, name="one")])
+
+        s = p.suites.get()
+        self.assertEqual(s.status, "draft")
+        self.assertEqual(s.cc_version, 0)
+        self.assertIsNotNone(s.created_on)
+
+
+
+class BulkUpdateTest(case.DBTestCase):
+    """Tests for ``bulk_update`` function."""
+    @property
+    def func(self):
+        """The function under test."""
+        from cc.model.sql import bulk_update
+        return bulk_update
+
+
+    def field(self, name):
+        """Return Suite model field with given name."""
+        return self.model.Suite._meta.get_field(name)
+
+
+    def test_updates(self):
+        """Each row gets its own instance's values for its fields."""
+        s1 = self.F.SuiteFactory.create(name="one", description="d1")
+        s2 = self.F.SuiteFactory.create(name="two", description="d2")
+        s1.name = "uno"
+        s2.name = "dos"
+        s2.description = "new"
+
+        count = self.func(
+            [
+                (s1, [self.field("name")]),
+                (s2, [self.field("name"), self.field("description")]),
+                ]
+            )
+
+        self.assertEqual(count, 2)
+        s1, s2 = self.refresh(s1), self.refresh(s2)
+        self.assertEqual((s1.name, s1.description), ("uno", "d1"))
+        self.assertEqual((s2.name, s2.description), ("dos", "new"))
+
+
+    def test_batches(self):
+        """Uses one UPDATE statement per batch."""
+        suites = [self.F.SuiteFactory.create() for i in range(5)]
+        for s in suites:
+            s.name = "new"
+
+        with self.assertNumQueries(3):
+            self.func(
+                [(s, [self.field("name")]) for s in suites], batch_size=2)
+
+        self.assertEqual(
+            self.model.Suite.objects.filter(name="new").count(), 5)
+
+
+    def test_empty(self):
+        """Updating no rows does nothing."""
+        with self.assertNumQueries(0):
+            self.assertEqual(self.func([]), 0)
+
+
+    def test_version(self):
+        """With version field, only rows with matching version are updated."""
+        s1 = self.F.SuiteFactory.create(name="one")
+        s2 = self.F.SuiteFactory.create(name="two")
+        self.model.Suite.objects.filter(pk=s2.pk).update(name="other")
+        s1.name = "uno"
+        s2.name = "dos"
+
+        count = self.func(
+            [(s, [self.field("name")]) for s in [s1, s2]],
+            version_field="cc_version")
+
+        self.assertEqual(count, 1)
+        s1, s2 = self.refresh(s1), self.refresh(s2)
+        self.assertEqual((s1.name, s1.cc_version), ("uno", 1))
+        self.assertEqual((s2.name, s2.cc_version), ("other", 1))
+
+
+
+class BulkDeleteTest(case.DBTestCase):
+    """Tests for ``bulk_delete`` function."""
+    @property
+    def func(self):
+        """The function under test."""
+        from cc.model.sql import bulk_delete
+        return bulk_delete
+
+
+    def test_deletes(self):
+        """Deletes selected rows with a single statement."""
+        p = self.F.ProductFactory.create()
+        s1 = self.F.SuiteFactory.create(product=p, name="one")
+        s2 = self.F.SuiteFactory.create(product=p, name="two")
+
+        with self.assertNumQueries(1):
+            self.func(self.model.Suite._base_manager.filter(pk=s1.pk))
+
+        self.assertEqual(list(self.model.Suite._base_manager.all()), [s2])
+
+
+    def test_subquery(self):
+        """Rows may be selected with a subquery."""
+        p = self.F.ProductFactory.create(name="one")
+        self.F.SuiteFactory.create(product=p)
+        s = self.F.SuiteFactory.create()
+
+        self.func(
+            self.model.Suite._base_manager.filter(
+                product__in=self.model.Product.objects.filter(name="one")))
+
+        self.assertEqual(list(self.model.Suite._base_manager.all()), [s])
+
+
+    def test_joins(self):
+        """Selecting rows with a join is not supported."""
+        with self.assertRaises(ValueError):
+            self.func(self.model.Suite._base_manager.filter(product__name="one"))
@@ -36,6 +36,20 @@ class RunsListTests(object):
         self.assertNotInList(res, "Foo 2")
 
 
+    def test_filter_by_bug(self):
+        """Can filter by bug URL."""
+        self.F.StepResultFactory.create(
+            result__runcaseversion__run=self.factory.create(name="Foo 1"),
+            bug_url="http://www.example.com/bug1",
+            )
+        self.factory.create(name="Foo 2")
+
+        res = self.get(params={"filter-bug": "http://www.example.com/bug1"})
+
+        self.assertInList(res, "Foo 1")
+        self.assertNotInList(res, "Foo 2")
+
+
     def test_filter_by_product(self):
         """Can filter by product."""
         one = self.factory.create(name="Foo 1")
@@ -0,0 +1,77 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for list annotation utilities.
+
+"""
+from mock import Mock
+
+from django.template.response import TemplateResponse
+from django.test import RequestFactory
+
+from tests import case
+
+
+
+class AnnotateDecoratorTest(case.TestCase):
+    @property
+    def annotate(self):
+        """The decorator factory under test."""
+        from cc.view.lists.annotations import annotate
+        return annotate
+
+
+    def on_response(self, response, decorator=None):
+        """Apply given decorator to dummy view, return given response."""
+        decorator = decorator or self.annotate("ctx_name", count="agg")
+
+        @decorator
+        def view(request):
+            return response
+
+        return view(RequestFactory().get("/"))
+
+
+    def test_returns_non_template_response(self):
+        """Returns a non-TemplateResponse unmodified, without error."""
+        res = self.on_response("blah")
+
+        self.assertEqual(res, "blah")
+
+
+    def test_uses_wraps(self):
+        """Preserves docstring and name of original view func."""
+        @self.annotate("ctx_name")
+        def myview(request, some_id):
+            """docstring"""
+
+        self.assertEqual(myview.func_name, "myview")
+        self.assertEqual(myview.func_doc, "docstring")
+
+
+    def test_annotates_queryset(self):
+        """Annotates queryset in context with given aggregates."""
+        qs = Mock()
+        res = self.on_response(
+            TemplateResponse(
+                RequestFactory().get("/"), "some/template.html",
+                {"ctx_name": qs})
+            )
+
+        qs.annotate.assert_called_with(count="agg")
+        self.assertIs(res.context_data["ctx_name"], qs.annotate.return_value)
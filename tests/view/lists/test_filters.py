@@ -627,3 +627,32 @@ class KeywordFilterTest(FiltersTestCase):
 
         self.assertEqual(qs.filter.call_count, 0)
         self.assertEqual(qs.distinct.call_count, 0)
+
+
+
+class SearchFilterTest(FiltersTestCase):
+    """Tests for SearchFilter."""
+    def test_filter(self):
+        """Filters queryset by IDs returned by search, for each value."""
+        search = Mock()
+        search.side_effect = lambda value: "ids-" + value
+        f = self.filters.SearchFilter("name", lookup="id", search=search)
+
+        qs = Mock()
+        qs2 = f.filter(qs, ["one", "two"])
+
+        qs.filter.assert_called_with(id__in="ids-one")
+        qs.filter.return_value.filter.assert_called_with(id__in="ids-two")
+        self.assertIs(qs2, qs.filter.return_value.filter.return_value)
+
+
+    def test_filter_skips_empty_search(self):
+        """A value for which search returns None doesn't filter."""
+        f = self.filters.SearchFilter(
+            "name", lookup="id", search=Mock(return_value=None))
+
+        qs = Mock()
+        qs2 = f.filter(qs, ["!"])
+
+        self.assertEqual(qs.filter.call_count, 0)
+        self.assertIs(qs2, qs)
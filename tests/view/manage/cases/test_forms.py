@@ -309,6 +309,52 @@ class AddBulkCasesFormTest(case.DBTestCase):
         self.assertEqual(cv.status, "active")
 
 
+    def test_file(self):
+        """Can queue an uploaded file of cases for import instead of text."""
+        data = self.get_form_data()
+        data["cases"] = ""
+        data["file_format"] = "jsonl"
+        form = self.form(
+            data=data,
+            files={
+                "cases_file": SimpleUploadedFile(
+                    "cases.jsonl",
+                    '{"name": "Test that one", "steps": '
+                    '[{"instruction": "Do it"}]}\n'
+                    )
+                },
+            user=self.user,
+            )
+
+        caseimport = form.save_import()
+
+        self.assertEqual(caseimport.name, "cases.jsonl")
+        self.assertEqual(caseimport.format, "jsonl")
+        self.assertEqual(caseimport.product, self.product)
+        self.assertEqual(caseimport.user, self.user)
+        self.assertIsNone(caseimport.completed_on)
+        self.assertEqual(model.CaseVersion.objects.count(), 0)
+
+        model.run_import(caseimport)
+
+        cv = model.CaseVersion.objects.get()
+        self.assertEqual(cv.name, "Test that one")
+        self.assertEqual(cv.case.product, self.product)
+        self.assertEqual(cv.status, "active")
+        self.assertEqual(cv.created_by, self.user)
+
+
+    def test_text_or_file_required(self):
+        """Either cases text or a file is required."""
+        data = self.get_form_data()
+        data["cases"] = ""
+
+        form = self.form(data=data)
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["cases"], [u"This field is required."])
+
+
     def test_parse_error(self):
         """Error in bulk case text parsing."""
         data = self.get_form_data()
@@ -627,6 +673,7 @@ class EditCaseVersionFormTest(case.DBTestCase):
         cv = self.F.CaseVersionFactory.create(
             name="a name", description="a desc", status="draft")
         submitted_version = cv.cc_version
+        cv.description = "changed"
         cv.save() # increments the concurrency-control version
 
         form = self.form(
@@ -419,6 +419,32 @@ class AddBulkCaseTest(case.view.FormViewTestCase):
         res.follow().mustcontain("Added 1 test case.")
 
 
+    def test_file(self):
+        """Can upload a file of test cases, which is queued for import."""
+        pv = self.F.ProductVersionFactory.create()
+
+        form = self.get_form()
+        form["product"] = pv.product.id
+        form["productversion"] = pv.id
+        form["cases_file"] = (
+            "cases.csv",
+            "name,instruction\n"
+            "Test that I can log in,Log in\n"
+            ",\n"
+            "Test that I can register,\n",
+            )
+        form["file_format"] = "csv"
+        res = form.submit(status=302)
+
+        res.follow().mustcontain(
+            "Uploaded cases.csv; its test cases will be added shortly.")
+        from cc.model import CaseImport, CaseVersion
+        caseimport = CaseImport.objects.get()
+        self.assertEqual(caseimport.name, "cases.csv")
+        self.assertIsNone(caseimport.completed_on)
+        self.assertEqual(CaseVersion.objects.count(), 0)
+
+
     def test_error(self):
         """Bound form with errors is re-displayed."""
         res = self.get_form().submit()
@@ -729,6 +755,7 @@ class EditCaseVersionTest(case.view.FormViewTestCase):
         """Concurrency error is displayed."""
         form = self.get_form()
 
+        self.cv.description = "Changed"
         self.cv.save()
 
         form["name"] = "New"
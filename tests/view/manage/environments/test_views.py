@@ -48,6 +48,18 @@ class ProfilesViewTest(case.view.manage.ListViewTestCase,
         return reverse("manage_profiles")
 
 
+    def test_environment_count(self):
+        """Shows count of not-deleted environments of each profile."""
+        p = self.factory.create()
+        self.F.EnvironmentFactory.create(profile=p)
+        self.F.EnvironmentFactory.create(profile=p).delete()
+
+        res = self.get()
+
+        self.assertEqual(
+            res.html.find("div", "envcount").text, "(1 Environments)")
+
+
     def test_filter_by_name(self):
         """Can filter by name."""
         self.factory.create(name="Foo 1")
@@ -580,6 +592,24 @@ class EditProfileViewTest(case.view.FormViewTestCase):
         self.assertEqual(env.profile, self.profile)
 
 
+    def test_add_duplicate_environment(self):
+        """Can't add an environment with the same elements as another."""
+        e1 = self.F.ElementFactory.create(name="Linux")
+        env = self.F.EnvironmentFactory.create(profile=self.profile)
+        env.elements.add(e1)
+
+        res = self.ajax_post(
+            "add-environment-form",
+            {"add-environment": "1", "element-element": [str(e1.id)]},
+            )
+
+        self.assertEqual(
+            res.json["messages"][0]["message"],
+            "This profile already has an environment with those elements.",
+            )
+        self.assertEqual(self.profile.environments.get(), env)
+
+
     def test_no_elements(self):
         """Add env with no elements results in error message."""
         res = self.ajax_post(
@@ -659,6 +689,61 @@ class EditProductVersionEnvironmentsViewTest(case.view.FormViewTestCase):
         self.assertEqual(self.productversion.environments.count(), 0)
 
 
+    def test_remove_cascades(self):
+        """Removing an environment cascades to caseversions."""
+        env = self.factory()
+        cv = self.F.CaseVersionFactory.create(
+            productversion=self.productversion)
+        self.assertEqual(list(cv.environments.all()), [env])
+
+        self.get_form().submit(
+            name="action-remove",
+            index=0,
+            headers={"X-Requested-With": "XMLHttpRequest"}
+            )
+
+        self.assertEqual(cv.environments.count(), 0)
+
+
+    def test_remove_cascades_to_draft_run(self):
+        """Removing an environment cascades to draft runs."""
+        self.factory()
+        run = self.F.RunFactory.create(productversion=self.productversion)
+
+        self.get_form().submit(
+            name="action-remove",
+            index=0,
+            headers={"X-Requested-With": "XMLHttpRequest"}
+            )
+
+        self.assertEqual(run.environments.count(), 0)
+
+
+    def test_remove_does_not_cascade_to_active_run(self):
+        """An active run with results keeps its environments."""
+        env = self.factory()
+        run = self.F.RunFactory.create(
+            productversion=self.productversion,
+            status=self.model.Run.STATUS.active)
+        rcv = self.F.RunCaseVersionFactory.create(run=run)
+        self.F.ResultFactory.create(
+            runcaseversion=rcv,
+            environment=env,
+            status=self.model.Result.STATUS.passed,
+            )
+
+        self.get_form().submit(
+            name="action-remove",
+            index=0,
+            headers={"X-Requested-With": "XMLHttpRequest"}
+            )
+
+        self.assertEqual(self.productversion.environments.count(), 0)
+        self.assertEqual(list(run.environments.all()), [env])
+        self.assertEqual(list(rcv.environments.all()), [env])
+        self.assertEqual(rcv.caseversion.environments.count(), 0)
+
+
     def test_manage_products_permission_required(self):
         """Requires manage products permission."""
         res = self.app.get(self.url)
@@ -709,6 +794,57 @@ class EditProductVersionEnvironmentsViewTest(case.view.FormViewTestCase):
         self.assertEqual(self.productversion.environments.get(), env)
 
 
+    def test_add_environment_reuses_existing(self):
+        """Adding an environment reuses one with the same elements."""
+        e1 = self.F.ElementFactory.create(name="Linux")
+        env = self.F.EnvironmentFactory.create()
+        env.elements.add(e1)
+
+        self.ajax_post(
+            "add-environment-form",
+            {"add-environment": "1", "element-element": [str(e1.id)]},
+            )
+
+        self.assertEqual(self.productversion.environments.get(), env)
+        self.assertEqual(self.model.Environment.objects.count(), 1)
+
+
+    def test_add_environment_cascades(self):
+        """Adding an environment cascades to caseversions."""
+        e1 = self.F.ElementFactory.create(name="Linux")
+        cv = self.F.CaseVersionFactory.create(
+            productversion=self.productversion)
+
+        self.ajax_post(
+            "add-environment-form",
+            {"add-environment": "1", "element-element": [str(e1.id)]},
+            )
+
+        self.assertEqual(
+            list(cv.environments.all()),
+            list(self.productversion.environments.all()))
+
+
+    def test_add_duplicate_environment(self):
+        """Can't add an environment with the same elements as another."""
+        e1 = self.F.ElementFactory.create(name="Linux")
+        env = self.F.EnvironmentFactory.create()
+        env.elements.add(e1)
+        self.productversion.environments.add(env)
+
+        res = self.ajax_post(
+            "add-environment-form",
+            {"add-environment": "1", "element-element": [str(e1.id)]},
+            )
+
+        self.assertEqual(
+            res.json["messages"][0]["message"],
+            "This product version already has an environment "
+            "with those elements.",
+            )
+        self.assertEqual(self.productversion.environments.get(), env)
+
+
     def test_no_elements(self):
         """Add env with no elements results in error message."""
         res = self.ajax_post(
@@ -67,6 +67,23 @@ class ProductsTest(case.view.manage.ListViewTestCase,
         self.assertOrderInList(res, "Product 2", "Product 1")
 
 
+    def test_version_count(self):
+        """Shows count of not-deleted versions, linked to versions list."""
+        p = self.factory.create()
+        self.F.ProductVersionFactory.create(product=p, version="1")
+        self.F.ProductVersionFactory.create(product=p, version="2").delete()
+
+        res = self.get()
+
+        link = res.html.find("div", "versioncount").a
+        self.assertEqual(
+            link["href"],
+            "{0}?filter-product={1}".format(
+                reverse("manage_productversions"), str(p.id)),
+            )
+        self.assertEqual(link.text, "1 Versions")
+
+
 
 class ProductDetailTest(case.view.AuthenticatedViewTestCase):
     """Test for product-detail ajax view."""
@@ -212,6 +229,7 @@ class EditProductTest(case.view.FormViewTestCase):
         """Concurrency error is displayed."""
         form = self.get_form()
 
+        self.product.name = "Changed"
         self.product.save()
 
         form["name"] = "New"
@@ -254,6 +254,7 @@ class EditRunTest(case.view.FormViewTestCase):
         """Concurrency error is displayed."""
         form = self.get_form()
 
+        self.testrun.name = "Changed"
         self.testrun.save()
 
         form["name"] = "New"
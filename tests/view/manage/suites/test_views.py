@@ -348,6 +348,7 @@ class EditSuiteTest(case.view.FormViewTestCase):
         """Concurrency error is displayed."""
         form = self.get_form()
 
+        self.suite.name = "Changed"
         self.suite.save()
 
         form["name"] = "New"
@@ -45,6 +45,44 @@ class TagsTest(case.view.manage.ListViewTestCase,
         return reverse("manage_tags")
 
 
+    def test_case_count(self):
+        """Shows count of cases with not-deleted tagged versions."""
+        t = self.factory.create()
+        cv = self.F.CaseVersionFactory.create()
+        cv.tags.add(t)
+        self.F.CaseVersionFactory.create(
+            case=cv.case, productversion__product=cv.case.product).tags.add(t)
+        cv = self.F.CaseVersionFactory.create()
+        cv.tags.add(t)
+        cv.delete()
+
+        res = self.get()
+
+        link = res.html.find("div", "casecount").a
+        self.assertEqual(
+            link["href"],
+            "{0}?filter-tag={1}".format(reverse("manage_cases"), str(t.id)),
+            )
+        self.assertEqual(link.text, "1 Cases")
+
+
+    def test_case_count_deleted_version(self):
+        """A case isn't counted through a deleted version of it."""
+        t = self.factory.create()
+        deleted = self.F.CaseVersionFactory.create()
+        deleted.tags.add(t)
+        # another, untagged, version of the same case is not deleted
+        self.F.CaseVersionFactory.create(
+            case=deleted.case,
+            productversion__product=deleted.case.product,
+            )
+        deleted.delete()
+
+        res = self.get()
+
+        self.assertEqual(res.html.find("div", "casecount").a.text, "0 Cases")
+
+
     def test_filter_by_name(self):
         """Can filter by name."""
         self.factory.create(name="Tag 1")
@@ -199,6 +237,7 @@ class EditTagTest(case.view.FormViewTestCase):
         """Concurrency error is displayed."""
         form = self.get_form()
 
+        self.tag.name = "Changed"
         self.tag.save()
 
         form["name"] = "New"
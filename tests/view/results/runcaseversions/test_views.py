@@ -261,6 +261,43 @@ class RunCaseVersionResultsViewTest(case.view.ListViewTestCase,
         self.assertOrderInList(res, "Case 1", "Case 2")
 
 
+    def test_sort_by_completion(self):
+        """Can sort by completion."""
+        envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows", "Linux"]})
+        rcv1 = self.F.RunCaseVersionFactory.create(
+            caseversion__name="Case 1", environments=envs)
+        rcv2 = self.F.RunCaseVersionFactory.create(
+            caseversion__name="Case 2", environments=envs)
+        for env in envs:
+            self.F.ResultFactory.create(
+                runcaseversion=rcv1, environment=env, status="invalidated")
+        self.F.ResultFactory.create(
+            runcaseversion=rcv2, environment=envs[0], status="started")
+
+        res = self.get(
+            params={"sortfield": "stats__completion", "sortdirection": "asc"})
+
+        self.assertOrderInList(res, "Case 2", "Case 1")
+
+
+    def test_sort_by_results(self):
+        """Can sort by failed, then passed, result counts."""
+        rcv1 = self.F.RunCaseVersionFactory.create(caseversion__name="Case 1")
+        rcv2 = self.F.RunCaseVersionFactory.create(caseversion__name="Case 2")
+        self.F.ResultFactory.create(runcaseversion=rcv1, status="failed")
+        self.F.ResultFactory.create(runcaseversion=rcv2, status="passed")
+
+        res = self.get(
+            params={
+                "sortfield": "stats__failed,stats__passed",
+                "sortdirection": "desc",
+                }
+            )
+
+        self.assertOrderInList(res, "Case 1", "Case 2")
+
+
 
 class RunCaseVersionDetailTest(case.view.AuthenticatedViewTestCase):
     """Test for runcaseversion-detail ajax view."""
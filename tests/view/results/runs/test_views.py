@@ -44,6 +44,53 @@ class RunResultsViewTest(case.view.ListViewTestCase,
         return reverse("results_runs")
 
 
+    def test_result_summary(self):
+        """List shows result counts from run stats."""
+        rcv = self.F.RunCaseVersionFactory.create()
+        self.F.ResultFactory.create(runcaseversion=rcv, status="failed")
+
+        res = self.get()
+
+        res.mustcontain('1 <span class="context">failed</span>')
+
+
+    def test_sort_by_completion(self):
+        """Can sort by completion."""
+        envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows", "Linux"]})
+        rcv1 = self.F.RunCaseVersionFactory.create(
+            run__name="Run 1", environments=envs)
+        rcv2 = self.F.RunCaseVersionFactory.create(
+            run__name="Run 2", environments=envs)
+        self.F.ResultFactory.create(
+            runcaseversion=rcv1, environment=envs[0], status="passed")
+        for env in envs:
+            self.F.ResultFactory.create(
+                runcaseversion=rcv2, environment=env, status="failed")
+
+        res = self.get(
+            params={"sortfield": "stats__completion", "sortdirection": "desc"})
+
+        self.assertOrderInList(res, "Run 2", "Run 1")
+
+
+    def test_sort_by_results(self):
+        """Can sort by failed, then passed, result counts."""
+        rcv1 = self.F.RunCaseVersionFactory.create(run__name="Run 1")
+        rcv2 = self.F.RunCaseVersionFactory.create(run__name="Run 2")
+        self.F.ResultFactory.create(runcaseversion=rcv1, status="passed")
+        self.F.ResultFactory.create(runcaseversion=rcv2, status="failed")
+
+        res = self.get(
+            params={
+                "sortfield": "stats__failed,stats__passed",
+                "sortdirection": "asc",
+                }
+            )
+
+        self.assertOrderInList(res, "Run 1", "Run 2")
+
+
 
 class RunDetailTest(case.view.AuthenticatedViewTestCase):
     """Test for run-detail ajax view."""
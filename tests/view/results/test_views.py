@@ -19,6 +19,8 @@
 Tests for home results view.
 
 """
+import json
+
 from django.core.urlresolvers import reverse
 
 from tests import case
@@ -39,3 +41,47 @@ class ResultsHomeViewTest(case.view.AuthenticatedViewTestCase):
 
         self.assertRedirects(
             res, reverse("results_runs") + "?openfinder=1&filter-status=active")
+
+
+
+class ExportResultsViewTest(case.view.AuthenticatedViewTestCase):
+    """Tests for results export view."""
+    @property
+    def url(self):
+        """Shortcut for results export url."""
+        return reverse("results_export")
+
+
+    def test_csv(self):
+        """Exports CSV by default."""
+        r = self.F.ResultFactory.create()
+
+        res = self.get()
+
+        self.assertEqual(res.content_type, "text/csv")
+        self.assertEqual(
+            res.headers["Content-Disposition"],
+            "attachment; filename=results.csv")
+        lines = res.body.splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith("{0},".format(r.id)))
+
+
+    def test_jsonl_filtered(self):
+        """Can export JSON Lines for one run."""
+        r = self.F.ResultFactory.create()
+        self.F.ResultFactory.create()
+
+        res = self.get(
+            params={"format": "jsonl", "run": r.runcaseversion.run.id})
+
+        self.assertEqual(res.content_type, "application/x-ndjson")
+        self.assertEqual(
+            [json.loads(l)["id"] for l in res.body.splitlines()], [r.id])
+
+
+    def test_bad_params(self):
+        """Bad parameters return 400 with errors."""
+        res = self.get(params={"since": "foo", "format": "xml"}, status=400)
+
+        self.assertEqual(set(res.json), set(["since", "format"]))
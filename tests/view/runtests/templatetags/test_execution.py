@@ -16,6 +16,8 @@
 # You should have received a copy of the GNU General Public License
 # along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
 """Tests for template tags/filters for running tests."""
+from functools import partial
+
 from django.template import Template, Context
 
 from tests import case
@@ -61,6 +63,55 @@ class ResultForTest(case.DBTestCase):
             )
 
 
+    def test_preloaded(self):
+        """Uses preloaded result, without querying."""
+        r = self.F.ResultFactory()
+        rcv = self.model.RunCaseVersion.objects.preload(
+            partial(
+                self.model.preload_results,
+                tester=r.tester,
+                environment=r.environment)
+            ).get()
+
+        with self.assertNumQueries(0):
+            rendered = self.result_for(
+                rcv, r.tester, r.environment, "{{ result.id }}")
+
+        self.assertEqual(rendered, str(r.id))
+
+
+    def test_preloaded_does_not_exist(self):
+        """If preloaded result does not exist, returns unsaved result."""
+        rcv = self.F.RunCaseVersionFactory.create()
+        env = self.F.EnvironmentFactory.create()
+        user = self.F.UserFactory.create()
+        rcv = self.model.RunCaseVersion.objects.preload(
+            partial(
+                self.model.preload_results, tester=user, environment=env)
+            ).get()
+
+        with self.assertNumQueries(0):
+            rendered = self.result_for(rcv, user, env, "{{ result.id }}")
+
+        self.assertEqual(rendered, "None")
+
+
+    def test_preloaded_other_tester(self):
+        """Queries for result of a tester other than the one preloaded."""
+        r = self.F.ResultFactory()
+        rcv = self.model.RunCaseVersion.objects.preload(
+            partial(
+                self.model.preload_results,
+                tester=self.F.UserFactory.create(),
+                environment=r.environment)
+            ).get()
+
+        self.assertEqual(
+            self.result_for(rcv, r.tester, r.environment, "{{ result.id }}"),
+            str(r.id)
+            )
+
+
 
 class StepResultForTest(case.DBTestCase):
     """Tests for the step_result_for template tag."""
@@ -112,3 +163,26 @@ class StepResultForTest(case.DBTestCase):
                 "{{ stepresult.step.id }}"),
             "None None {0}".format(step.id)
             )
+
+
+    def test_preloaded(self):
+        """Uses preloaded step results, without querying."""
+        sr = self.F.StepResultFactory()
+        other_step = self.F.CaseStepFactory.create(
+            caseversion=sr.step.caseversion, number=2)
+        r = sr.result
+        rcv = self.model.RunCaseVersion.objects.preload(
+            partial(
+                self.model.preload_results,
+                tester=r.tester,
+                environment=r.environment)
+            ).get()
+        result = rcv._preloaded_results[(r.tester.id, r.environment.id)]
+
+        with self.assertNumQueries(0):
+            found = self.result_for(result, sr.step, "{{ stepresult.id }}")
+            missing = self.result_for(
+                result, other_step, "{{ stepresult.id }}")
+
+        self.assertEqual(found, str(sr.id))
+        self.assertEqual(missing, "None")
@@ -19,7 +19,9 @@
 Tests for runtests views.
 
 """
+import base64
 from datetime import datetime
+import json
 
 from django.core.urlresolvers import reverse
 
@@ -730,3 +732,230 @@ class RunTestsTest(case.view.AuthenticatedViewTestCase):
 
         self.assertEqual(result.status, result.STATUS.invalidated)
         self.assertEqual(result.comment, "")
+
+
+
+class SubmitResultsTest(case.view.AuthenticatedViewTestCase):
+    """Tests for batch result submission view."""
+    csrf_checks = False
+
+
+    def setUp(self):
+        """These tests require an active run with a case, and execute perm."""
+        super(SubmitResultsTest, self).setUp()
+        self.testrun = self.F.RunFactory.create(status="active")
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows 7", "Ubuntu Linux"]})
+        self.testrun.environments.add(*self.envs)
+        self.rcv = self.F.RunCaseVersionFactory.create(
+            run=self.testrun,
+            caseversion__productversion=self.testrun.productversion,
+            environments=self.envs,
+            )
+        self.add_perm("execute")
+
+
+    @property
+    def url(self):
+        """Shortcut for runtests_submit_results url."""
+        return reverse(
+            "runtests_submit_results", kwargs={"run_id": self.testrun.id})
+
+
+    def post_json(self, data, **kwargs):
+        """Post given data as JSON."""
+        return self.post(
+            json.dumps(data), content_type="application/json", **kwargs)
+
+
+    def test_login_required(self):
+        """Requires login."""
+        res = self.app.post(self.url, "{}", status=302)
+
+        self.assertIn("login", res.headers["Location"])
+
+
+    def test_requires_execute_permission(self):
+        """Requires execute permission."""
+        res = self.app.post(
+            self.url, "{}", user=self.F.UserFactory.create(), status=302)
+
+        self.assertIn("login", res.headers["Location"])
+
+
+    def test_get_not_allowed(self):
+        """Only accepts POST."""
+        self.get(status=405)
+
+
+    def test_submit(self):
+        """Records results and returns outcomes."""
+        res = self.post_json(
+            {
+                "batch_key": "build-1",
+                "results": [
+                    {
+                        "runcaseversion": self.rcv.id,
+                        "environment": self.envs[0].id,
+                        "status": "passed",
+                        },
+                    {
+                        "runcaseversion": self.rcv.id,
+                        "environment": self.envs[1].id,
+                        "status": "bogus",
+                        },
+                    ]
+                }
+            )
+
+        result = self.rcv.results.get()
+        self.assertEqual(result.tester, self.user)
+        self.assertEqual(result.status, "passed")
+        self.assertEqual(
+            res.json,
+            {
+                "batch_key": "build-1",
+                "results": [
+                    {"outcome": "created", "result": result.id},
+                    {
+                        "outcome": "invalid",
+                        "errors": [
+                            "Status must be one of "
+                            "started, passed, failed, invalidated."
+                            ]
+                        },
+                    ]
+                }
+            )
+
+
+    def test_inactive_run(self):
+        """Can't submit results to an inactive run."""
+        self.testrun.status = "draft"
+        self.testrun.save()
+
+        res = self.post_json({"results": []}, status=400)
+
+        self.assertEqual(
+            res.json["error"],
+            "That test run is currently not open for testing.")
+
+
+    def test_bad_json(self):
+        """Malformed request body returns 400 with error."""
+        res = self.post("not json", status=400)
+
+        self.assertEqual(
+            res.json["error"],
+            "Request body must be a JSON object with a list of results.")
+
+
+    def test_results_not_list(self):
+        """Results must be a list."""
+        res = self.post_json({"results": {}}, status=400)
+
+        self.assertEqual(res.json["error"], "Results must be a list.")
+
+
+    def test_bad_batch_key(self):
+        """Batch key must be a short string."""
+        res = self.post_json({"results": [], "batch_key": "x" * 101}, status=400)
+
+        self.assertEqual(
+            res.json["error"], "Batch key must be at most 100 characters.")
+
+
+
+class SubmitResultsAuthTest(case.view.AuthenticatedViewTestCase):
+    """Tests for authentication of the batch result submission view."""
+    def setUp(self):
+        """These tests require an active run with a case, and a tester."""
+        super(SubmitResultsAuthTest, self).setUp()
+        self.testrun = self.F.RunFactory.create(status="active")
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows 7"]})
+        self.testrun.environments.add(*self.envs)
+        self.rcv = self.F.RunCaseVersionFactory.create(
+            run=self.testrun,
+            caseversion__productversion=self.testrun.productversion,
+            environments=self.envs,
+            )
+        self.user.set_password("secret")
+        self.user.save()
+        self.add_perm("execute")
+
+
+    @property
+    def url(self):
+        """Shortcut for runtests_submit_results url."""
+        return reverse(
+            "runtests_submit_results", kwargs={"run_id": self.testrun.id})
+
+
+    def post_basic(self, username, password, **kwargs):
+        """Post a result with given Basic credentials and no session."""
+        data = {
+            "results": [
+                {
+                    "runcaseversion": self.rcv.id,
+                    "environment": self.envs[0].id,
+                    "status": "passed",
+                    }
+                ]
+            }
+        credentials = base64.b64encode(
+            "{0}:{1}".format(username, password))
+        return self.app.post(
+            self.url,
+            json.dumps(data),
+            content_type="application/json",
+            headers={"Authorization": "Basic {0}".format(credentials)},
+            **kwargs)
+
+
+    def test_login_required(self):
+        """Anonymous requests without a CSRF token are rejected."""
+        self.app.post(self.url, "{}", status=403)
+
+
+    def test_basic_auth(self):
+        """Scripts can submit with Basic credentials and no CSRF token."""
+        res = self.post_basic(self.user.username, "secret")
+
+        result = self.rcv.results.get()
+        self.assertEqual(result.tester, self.user)
+        self.assertEqual(res.json["results"][0]["outcome"], "created")
+
+
+    def test_basic_auth_bad_password(self):
+        """Wrong Basic credentials get a 401 challenge."""
+        res = self.post_basic(self.user.username, "wrong", status=401)
+
+        self.assertIn("Basic", res.headers["WWW-Authenticate"])
+        self.assertEqual(self.rcv.results.count(), 0)
+
+
+    def test_basic_auth_inactive_user(self):
+        """Inactive users can't submit with Basic credentials."""
+        self.user.is_active = False
+        self.user.save()
+
+        self.post_basic(self.user.username, "secret", status=401)
+
+
+    def test_basic_auth_requires_execute_permission(self):
+        """Basic credentials of a user without execute permission redirect."""
+        self.user.user_permissions.clear()
+
+        res = self.post_basic(self.user.username, "secret", status=302)
+
+        self.assertIn("login", res.headers["Location"])
+
+
+    def test_session_requires_csrf_token(self):
+        """Session-authenticated requests are still CSRF-checked."""
+        self.post(
+            json.dumps({"results": []}),
+            content_type="application/json",
+            status=403,
+            )
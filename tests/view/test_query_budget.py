@@ -0,0 +1,420 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-2012 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Query budgets for list, details, finder and runtests views.
+
+Each view is rendered with a small and a large synthetic dataset, and must run
+the same (budgeted) number of queries for both.
+
+"""
+from django.core.urlresolvers import reverse
+
+from tests import case
+
+
+
+AJAX = {"X-Requested-With": "XMLHttpRequest"}
+
+
+
+class BudgetTestCase(case.view.QueryBudgetTestCase):
+    """Builds a synthetic dataset around one product version."""
+    def setUp(self):
+        """Create product version with environments, and an active run."""
+        super(BudgetTestCase, self).setUp()
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Linux", "Windows"], "Browser": ["Firefox", "Chrome"]})
+        self.product = self.F.ProductFactory.create(team=[self.user])
+        self.productversion = self.F.ProductVersionFactory.create(
+            product=self.product, environments=self.envs)
+        self.suite = self.F.SuiteFactory.create(
+            product=self.product, status="active")
+        self.run = self.F.RunFactory.create(
+            productversion=self.productversion,
+            environments=self.envs,
+            status="active",
+            )
+        self.F.RunSuiteFactory.create(run=self.run, suite=self.suite)
+        self.tag = self.F.TagFactory.create(product=self.product)
+        self.serial = 0
+
+
+    def next(self):
+        """Return a new serial number, for unique names."""
+        self.serial += 1
+        return self.serial
+
+
+    def add_caseversions(self, n):
+        """Add ``n`` cases (in the suite) with tagged versions and steps."""
+        cvs = []
+        for i in range(n):
+            cv = self.F.CaseVersionFactory.create(
+                name="Case {0}".format(self.next()),
+                productversion=self.productversion,
+                case__product=self.product,
+                environments=self.envs,
+                status="active",
+                )
+            cv.tags.add(self.tag)
+            self.F.CaseStepFactory.create(caseversion=cv, number=1)
+            self.F.CaseStepFactory.create(caseversion=cv, number=2)
+            self.F.SuiteCaseFactory.create(suite=self.suite, case=cv.case)
+            cvs.append(cv)
+        return cvs
+
+
+    def add_runcaseversions(self, n):
+        """Add ``n`` cases to the run, each with a result and step result."""
+        rcvs = []
+        for cv in self.add_caseversions(n):
+            rcv = self.F.RunCaseVersionFactory.create(
+                run=self.run, caseversion=cv, environments=self.envs)
+            result = self.F.ResultFactory.create(
+                runcaseversion=rcv,
+                environment=self.envs[0],
+                tester=self.user,
+                status="failed",
+                )
+            self.F.StepResultFactory.create(
+                result=result,
+                step=cv.steps.all()[0],
+                status="failed",
+                bug_url="http://www.example.com/bug{0}".format(self.next()),
+                )
+            rcvs.append(rcv)
+        return rcvs
+
+
+    def add_products(self, n):
+        """Add ``n`` products, each with a version."""
+        for i in range(n):
+            p = self.F.ProductFactory.create(
+                name="Product {0}".format(self.next()), team=[self.user])
+            self.F.ProductVersionFactory.create(
+                product=p, environments=self.envs)
+
+
+    def add_productversions(self, n):
+        """Add ``n`` versions of the product, each with a run."""
+        for i in range(n):
+            pv = self.F.ProductVersionFactory.create(
+                product=self.product,
+                version="{0}.0".format(self.next()),
+                environments=self.envs,
+                )
+            self.F.RunFactory.create(productversion=pv, environments=self.envs)
+
+
+    def add_runs(self, n):
+        """Add ``n`` active runs of the product version, each with a suite."""
+        for i in range(n):
+            run = self.F.RunFactory.create(
+                name="Run {0}".format(self.next()),
+                productversion=self.productversion,
+                environments=self.envs,
+                status="active",
+                team=[self.user],
+                )
+            self.F.RunSuiteFactory.create(run=run, suite=self.suite)
+
+
+    def add_suites(self, n):
+        """Add ``n`` suites of the product, each in the run."""
+        for i in range(n):
+            suite = self.F.SuiteFactory.create(
+                name="Suite {0}".format(self.next()), product=self.product)
+            self.F.RunSuiteFactory.create(run=self.run, suite=suite)
+
+
+    def add_environments(self, n):
+        """Add ``n`` environments to the product version and the run."""
+        for i in range(n):
+            env = self.F.EnvironmentFactory.create()
+            env.elements.add(
+                self.F.ElementFactory.create(
+                    name="Element {0}".format(self.next())))
+            self.productversion.environments.add(env)
+            self.run.environments.add(env)
+
+
+
+class ManageListsBudgetTest(BudgetTestCase):
+    """Query budgets for manage list views."""
+    def test_products(self):
+        self.assertQueryBudget(
+            9, self.add_products, reverse("manage_products"))
+
+
+    def test_productversions(self):
+        self.assertQueryBudget(
+            13, self.add_productversions, reverse("manage_productversions"))
+
+
+    def test_runs(self):
+        self.assertQueryBudget(17, self.add_runs, reverse("manage_runs"))
+
+
+    def test_suites(self):
+        self.assertQueryBudget(13, self.add_suites, reverse("manage_suites"))
+
+
+    def test_cases(self):
+        self.assertQueryBudget(
+            21, self.add_caseversions, reverse("manage_cases"))
+
+
+    def test_tags(self):
+        def add_tags(n):
+            for i in range(n):
+                self.F.TagFactory.create(
+                    name="Tag {0}".format(self.next()), product=self.product)
+        self.assertQueryBudget(11, add_tags, reverse("manage_tags"))
+
+
+    def test_users(self):
+        def add_users(n):
+            role = self.F.RoleFactory.create()
+            for i in range(n):
+                self.F.UserFactory.create().groups.add(role)
+        self.assertQueryBudget(11, add_users, reverse("manage_users"))
+
+
+    def test_profiles(self):
+        def add_profiles(n):
+            for i in range(n):
+                self.F.EnvironmentFactory.create_full_set(
+                    {"OS": ["Linux", "Windows"]},
+                    profile=self.F.ProfileFactory.create(
+                        name="Profile {0}".format(self.next())),
+                    )
+        self.assertQueryBudget(16, add_profiles, reverse("manage_profiles"))
+
+
+
+class FormsBudgetTest(BudgetTestCase):
+    """Query budgets for form views."""
+    def test_profile_add(self):
+        def add_categories(n):
+            for i in range(n):
+                element = self.F.ElementFactory.create(
+                    name="Element {0}".format(self.next()),
+                    category__name="Category {0}".format(self.next()),
+                    )
+                self.F.ElementFactory.create(category=element.category)
+                self.F.EnvironmentFactory.create().elements.add(element)
+        self.assertQueryBudget(8, add_categories, reverse("manage_profile_add"))
+
+
+
+class DetailsBudgetTest(BudgetTestCase):
+    """Query budgets for list-item details views."""
+    def test_product(self):
+        self.assertQueryBudget(
+            5,
+            self.add_productversions,
+            reverse("manage_product_details", args=[self.product.id]),
+            headers=AJAX,
+            )
+
+
+    def test_productversion(self):
+        self.assertQueryBudget(
+            13,
+            self.add_environments,
+            reverse(
+                "manage_productversion_details",
+                args=[self.productversion.id]),
+            headers=AJAX,
+            )
+
+
+    def test_run(self):
+        self.assertQueryBudget(
+            12,
+            self.add_suites,
+            reverse("manage_run_details", args=[self.run.id]),
+            headers=AJAX,
+            )
+
+
+    def test_suite(self):
+        self.assertQueryBudget(
+            3,
+            self.add_caseversions,
+            reverse("manage_suite_details", args=[self.suite.id]),
+            headers=AJAX,
+            )
+
+
+    def test_caseversion(self):
+        cv = self.add_caseversions(1)[0]
+        def add_steps(n):
+            for i in range(n):
+                self.F.CaseStepFactory.create(
+                    caseversion=cv, number=self.next())
+        self.assertQueryBudget(
+            13,
+            add_steps,
+            reverse("manage_case_details", args=[cv.id]),
+            headers=AJAX,
+            )
+
+
+    def test_profile(self):
+        profile = self.F.ProfileFactory.create()
+        def add_envs(n):
+            for i in range(n):
+                env = self.F.EnvironmentFactory.create(profile=profile)
+                env.elements.add(
+                    self.F.ElementFactory.create(
+                        name="Element {0}".format(self.next())))
+        self.assertQueryBudget(
+            6,
+            add_envs,
+            reverse("manage_profile_details", args=[profile.id]),
+            headers=AJAX,
+            )
+
+
+    def test_results_run(self):
+        self.assertQueryBudget(
+            11,
+            self.add_runcaseversions,
+            reverse("results_run_details", args=[self.run.id]),
+            headers=AJAX,
+            )
+
+
+    def test_results_runcaseversion(self):
+        rcv = self.add_runcaseversions(1)[0]
+        def add_results(n):
+            for i in range(n):
+                self.F.ResultFactory.create(
+                    runcaseversion=rcv,
+                    environment=self.envs[i % len(self.envs)],
+                    status="passed",
+                    )
+        self.assertQueryBudget(
+            14,
+            add_results,
+            reverse("results_runcaseversion_details", args=[rcv.id]),
+            headers=AJAX,
+            )
+
+
+
+class FinderBudgetTest(BudgetTestCase):
+    """Query budgets for finder columns."""
+    def finder(self, col, parent):
+        """Return finder ajax URL for given column and parent."""
+        return "{0}?finder=1&col={1}&id={2}".format(
+            reverse("manage_products"), col, parent.id)
+
+
+    def test_products(self):
+        self.assertQueryBudget(
+            13, self.add_products, reverse("manage_productversions"))
+
+
+    def test_productversions(self):
+        self.assertQueryBudget(
+            3,
+            self.add_productversions,
+            self.finder("productversions", self.product),
+            headers=AJAX,
+            )
+
+
+    def test_runs(self):
+        self.assertQueryBudget(
+            3,
+            self.add_runs,
+            self.finder("runs", self.productversion),
+            headers=AJAX,
+            )
+
+
+    def test_suites(self):
+        self.assertQueryBudget(
+            3,
+            self.add_suites,
+            self.finder("suites", self.run),
+            headers=AJAX,
+            )
+
+
+
+class ResultsBudgetTest(BudgetTestCase):
+    """Query budgets for results list views."""
+    def test_runs(self):
+        def add_runs(n):
+            self.add_runs(n)
+            self.add_runcaseversions(1)
+        self.assertQueryBudget(18, add_runs, reverse("results_runs"))
+
+
+    def test_runcaseversions(self):
+        self.assertQueryBudget(
+            22, self.add_runcaseversions, reverse("results_runcaseversions"))
+
+
+    def test_results(self):
+        rcv = self.add_runcaseversions(1)[0]
+        def add_results(n):
+            for i in range(n):
+                self.F.ResultFactory.create(
+                    runcaseversion=rcv,
+                    environment=self.envs[i % len(self.envs)],
+                    status="passed",
+                    )
+        self.assertQueryBudget(
+            23, add_results, reverse("results_results", args=[rcv.id]))
+
+
+
+class RunTestsBudgetTest(BudgetTestCase):
+    """Query budgets for runtests views."""
+    def test_select(self):
+        self.assertQueryBudget(5, self.add_products, reverse("runtests"))
+
+
+    def test_select_finder(self):
+        self.assertQueryBudget(
+            5,
+            self.add_runs,
+            "{0}?finder=1&col=runs&id={1}".format(
+                reverse("runtests"), self.productversion.id),
+            headers=AJAX,
+            )
+
+
+    def test_environment(self):
+        self.assertQueryBudget(
+            6,
+            self.add_environments,
+            reverse("runtests_environment", args=[self.run.id]),
+            )
+
+
+    def test_run(self):
+        self.assertQueryBudget(
+            20,
+            self.add_runcaseversions,
+            reverse("runtests_run", args=[self.run.id, self.envs[0].id]),
+            )
@@ -0,0 +1,78 @@
+# Case Conductor is a Test Case Management system.
+# Copyright (C) 2011-12 Mozilla
+#
+# This file is part of Case Conductor.
+#
+# Case Conductor is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Case Conductor is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Case Conductor.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests for authentication view utilities.
+
+"""
+import base64
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from tests import case
+
+
+
+class BasicAuthTest(case.DBTestCase):
+    """Tests for basic_auth view decorator."""
+    @property
+    def view(self):
+        """A simple view returning the username, decorated with @basic_auth."""
+        from cc.view.utils.auth import basic_auth
+
+        @basic_auth
+        def view(request):
+            return HttpResponse(request.user.username)
+
+        return view
+
+
+    def request(self, credentials):
+        """Return a POST request with given raw Basic credentials."""
+        return RequestFactory().post(
+            "/", HTTP_AUTHORIZATION="Basic {0}".format(credentials))
+
+
+    def test_csrf_exempt(self):
+        """The CSRF middleware leaves the decorated view to check itself."""
+        self.assertTrue(self.view.csrf_exempt)
+
+
+    def test_authenticates(self):
+        """Valid credentials set request.user."""
+        user = self.F.UserFactory.create(username="tester")
+        user.set_password("secret")
+        user.save()
+
+        response = self.view(self.request(base64.b64encode("tester:secret")))
+
+        self.assertEqual(response.content, "tester")
+
+
+    def test_malformed(self):
+        """Undecodable credentials get a 401 response."""
+        response = self.view(self.request("not base64!"))
+
+        self.assertEqual(response.status_code, 401)
+
+
+    def test_no_colon(self):
+        """Credentials without a password get a 401 response."""
+        response = self.view(self.request(base64.b64encode("tester")))
+
+        self.assertEqual(response.status_code, 401)